@@ -80,11 +80,32 @@ class EnvironmentConfiguration(BaseConfigurationFile):
         self.cluster_ip: str = "0.0.0.0"
         self.spi_serial_port: str = "/dev/ttyACM0"
 
+        self.redis_host: str = "localhost"
         self.redis_port: int = 6379
+        self.redis_db: int = 0
+        self.redis_max_connections: int = 16
+        self.parameter_cache: bool = False
         self.plotting: bool = False
 
         self.mss_machine_root_url: str = "http://localhost:8002"
 
+        self.calibration_scheduler: str = "serial"
+        self.max_parallel_nodes: int = 2
+        self.background_analysis: bool = False
+
+        self.schedule_cache: bool = True
+        self.schedule_cache_dir: str = ""
+        self.schedule_cache_memory_items: int = 16
+        self.schedule_cache_disk_size_mb: int = 256
+        self.schedule_templates: bool = False
+
+        self.analysis_workers: int = 1
+        self.save_plots: bool = True
+        self.plot_preview_dpi: int = 100
+        self.plot_dpi: int = 400
+
+        self.benchmark_redis_db: int = 15
+
     @staticmethod
     def from_dot_env(
         filepath: Union[str, Path] = _get_default_env_path(),
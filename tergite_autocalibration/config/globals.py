@@ -14,11 +14,12 @@ import logging
 import os
 from pathlib import Path
 
-import redis
-
 from tergite_autocalibration.config.env import EnvironmentConfiguration
 from tergite_autocalibration.config.handler import ConfigurationHandler
 from tergite_autocalibration.config.package import ConfigurationPackage
+from tergite_autocalibration.utils.backend.redis_connection import (
+    RedisConnectionFactory,
+)
 from tergite_autocalibration.utils.misc.tests import is_pytest
 
 # Loads the environmental configuration
@@ -40,8 +41,10 @@ else:
     # Try to load the .env file from the default locations
     ENV = EnvironmentConfiguration.from_dot_env()
 
-# Creates a redis instance
-REDIS_CONNECTION = redis.Redis(decode_responses=True, port=ENV.redis_port)
+# Creates the redis connection pools, use REDIS_CONNECTION_FACTORY.async_connection()
+# for an asyncio client
+REDIS_CONNECTION_FACTORY = RedisConnectionFactory.from_env(ENV)
+REDIS_CONNECTION = REDIS_CONNECTION_FACTORY.connection()
 
 # This will be set in matplotlib
 PLOTTING_BACKEND = "tkagg" if ENV.plotting else "agg"
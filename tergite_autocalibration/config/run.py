@@ -10,7 +10,7 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 from datetime import datetime
-from typing import List
+from typing import List, Union
 
 from tergite_autocalibration.config.base import TOMLConfigurationFile
 
@@ -39,10 +39,11 @@ class RunConfiguration(TOMLConfigurationFile):
         return self._run_id
 
     @property
-    def target_node(self) -> str:
+    def target_node(self) -> Union[str, List[str]]:
         """
         Returns:
-            Node to calibrate to
+            Node to calibrate to. This can also be a list of nodes, then the calibration
+            runs through the union of the paths to all of them
 
         """
         return self._dict["target_node"]
@@ -17,6 +17,7 @@ import collections
 import re
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import List, Optional
 
 # TODO: we should have a conditional import depending on a feature flag here
 import matplotlib.patches as mpatches
@@ -24,11 +25,27 @@ import matplotlib.pyplot as plt
 import numpy as np
 import xarray as xr
 
-from tergite_autocalibration.config.globals import REDIS_CONNECTION
-from tergite_autocalibration.tools.mss.convert import structured_redis_storage
+from tergite_autocalibration.config.globals import ENV, REDIS_CONNECTION
+from tergite_autocalibration.lib.utils.analysis_execution import fit_elements
+from tergite_autocalibration.lib.utils.batched_fitting import (
+    TraceFit,
+    Traces,
+    fit_all_traces,
+    fit_traces,
+)
+from tergite_autocalibration.lib.utils.plot_rendering import (
+    get_plot_renderer,
+    plot_resolutions,
+)
+from tergite_autocalibration.utils.backend.redis_utils import ParameterBatch
 from tergite_autocalibration.utils.dto.qoi import QOI
+from tergite_autocalibration.utils.io.dataset_utils import to_complex_dataset
+from tergite_autocalibration.utils.logger.phase_timing import timed_phase
 from tergite_autocalibration.utils.logger.tac_logger import logger
 
+# Temporary dimension to concatenate the repeats of all qubits at once
+_REPEAT_DIM = "__repeat"
+
 
 class BaseAnalysis(ABC):
     """
@@ -66,21 +83,38 @@ class BaseAnalysis(ABC):
     # Cons: We would have to define and implement several QOI classes
     # -> It is probably not that much effort to implement several QOI classes
     # -> We could start with a BaseQOI and add more as soon as needed
-    def update_redis_trusted_values(self, node: str, this_element: str):
+    def update_redis_trusted_values(
+        self, node: str, this_element: str, batch: Optional[ParameterBatch] = None
+    ):
+        """
+        Store the quantities of interest of the element in redis.
+
+        Args:
+            node: The node that was calibrated
+            this_element: Name of the qubit or coupler e.g. 'q12' or 'q12_q13'
+            batch: Batch to add the values to, it is written by the caller.
+                   If None, the values are written immediately.
+
+        """
+        write_batch = batch is None
+        if write_batch:
+            batch = ParameterBatch()
         for i, transmon_parameter in enumerate(self.redis_fields):
             if "_" in this_element:
                 name = "couplers"
             else:
                 name = "transmons"
             # Setting the value in the tergite-autocalibration-lite format
-            REDIS_CONNECTION.hset(
-                f"{name}:{this_element}", transmon_parameter, self._qoi[i]
+            # and in the standard redis storage
+            batch.add(
+                f"{name}:{this_element}",
+                transmon_parameter,
+                self._qoi[i],
+                this_element.strip("q"),
             )
-            # Setting the value in the standard redis storage
-            structured_redis_storage(
-                transmon_parameter, this_element.strip("q"), self._qoi[i]
-            )
-            REDIS_CONNECTION.hset(f"cs:{this_element}", node, "calibrated")
+            batch.add(f"cs:{this_element}", node, "calibrated")
+        if write_batch:
+            batch.write(REDIS_CONNECTION)
 
     def rotate_to_probability_axis(self, complex_measurement_data):
         """
@@ -155,16 +189,22 @@ class BaseNodeAnalysis(ABC):
 
         return fig, axs
 
+    @timed_phase("save_plots")
     def save_plots(self):
-        self.fig.tight_layout()
-        preview_path = self.data_path / f"{self.name}_preview.png"
-        full_path = self.data_path / f"{self.name}.png"
-        self.fig.savefig(preview_path, bbox_inches="tight", dpi=100)
-        self.fig.savefig(full_path, bbox_inches="tight", dpi=400)
-        plt.show(block=False)
-        plt.pause(5)
-        plt.close()
-        logger.info(f"Plots saved to {preview_path} and {full_path}")
+        if ENV.plotting:
+            self.fig.tight_layout()
+            plt.show(block=False)
+            plt.pause(5)
+        if not ENV.save_plots:
+            # Close this figure explicitly, another analysis might be plotting at the same time
+            plt.close(self.fig)
+            return
+        # The figure is closed and rendered in the background
+        get_plot_renderer().save_figure(
+            self.fig,
+            plot_resolutions(self.data_path, self.name),
+            tight_layout=not ENV.plotting,
+        )
 
 
 class BaseAllQubitsAnalysis(BaseNodeAnalysis, ABC):
@@ -205,6 +245,7 @@ class BaseAllQubitsAnalysis(BaseNodeAnalysis, ABC):
     def _analyze_all_qubits(self):
         analysis_results = {}
         qubit_data_dict = self._group_by_qubit()
+        fit_tasks = []
         index = 0
         for this_qubit, qubit_data_vars in qubit_data_dict.items():
             ds = xr.merge([self.dataset[var] for var in qubit_data_vars])
@@ -221,13 +262,50 @@ class BaseAllQubitsAnalysis(BaseNodeAnalysis, ABC):
                 qubit_analysis = self.single_qubit_analysis_obj(
                     self.name, self.redis_fields
                 )
-                qubit_analysis.process_qubit(ds, this_qubit)  # this_qubit shoulq be qXX
-                self.qubit_analyses.append(qubit_analysis)
+                # this_qubit should be qXX
+                fit_tasks.append((qubit_analysis, "fit_qubit", ds, this_qubit))
 
             index = index + 1
 
+        # The qubits are fitted independently, redis is updated at once when all fits are done
+        if self.single_qubit_analysis_obj.fits_traces():
+            qubit_analyses = self._fit_traces_of_all_qubits(fit_tasks)
+        else:
+            qubit_analyses = fit_elements(fit_tasks)
+        batch = ParameterBatch()
+        for qubit_analysis in qubit_analyses:
+            qubit_analysis.update_redis_trusted_values(
+                self.name, qubit_analysis.qubit, batch
+            )
+        batch.write(REDIS_CONNECTION)
+        self.qubit_analyses.extend(qubit_analyses)
+
         return analysis_results
 
+    @staticmethod
+    def _fit_traces_of_all_qubits(fit_tasks) -> List["BaseQubitAnalysis"]:
+        """
+        Fit the traces of all qubits at once and finish the analyses in this process.
+
+        Args:
+            fit_tasks: Analyses with the name of their fit method, the dataset and the qubit
+
+        Returns:
+            The fitted analyses in the same order as the tasks
+        """
+        qubit_analyses = []
+        for qubit_analysis, _, ds, this_qubit in fit_tasks:
+            qubit_analysis.load_qubit(ds, this_qubit)
+            qubit_analyses.append(qubit_analysis)
+
+        all_fits = fit_all_traces(
+            [qubit_analysis.traces_to_fit() for qubit_analysis in qubit_analyses]
+        )
+        for qubit_analysis, fits in zip(qubit_analyses, all_fits):
+            qubit_analysis.trace_fits = fits if fits is not None else []
+            qubit_analysis._qoi = qubit_analysis.analyse_qubit()
+        return qubit_analyses
+
     def _group_by_qubit(self):
         qubit_data_dict = collections.defaultdict(set)
         for var in self.dataset.data_vars:
@@ -256,36 +334,60 @@ class BaseAllQubitsRepeatAnalysis(BaseAllQubitsAnalysis, ABC):
 
         self.num_repeats = len(data_files)
 
-        # Load the first dataset to infer the qubit names
-        first_dataset = xr.open_dataset(data_files[0], engine="scipy")
-        self.all_qubits = [
-            var for var in first_dataset.data_vars if var.startswith("yq")
+        # Every repeat file is opened once, the data is only read on concatenation
+        repeat_datasets = [
+            xr.open_dataset(self.data_path / f"dataset_{self.name}_{repeat_idx}.hdf5")
+            for repeat_idx in range(self.num_repeats)
         ]
 
-        datasets = []
-
-        for qubit in self.all_qubits:
-            qubit_datasets = []
-            for repeat_idx, file_path in enumerate(data_files):
-                dataset_name = f"dataset_{self.name}_{repeat_idx}.hdf5"
-                file_path = self.data_path / dataset_name
-
-                ds = xr.open_dataset(file_path, engine="scipy")
-
-                qubit_data = ds[[qubit]]
-
-                repeat_coord = (
-                    f"{self.repeat_coordinate_name}{qubit[1:]}"  # e.g., 'repeatq16'
-                )
+        # Infer the qubit names from the first dataset
+        self.all_qubits = [
+            var for var in repeat_datasets[0].data_vars if var.startswith("yq")
+        ]
+        repeat_coords = {
+            # e.g., 'repeatq16'
+            qubit: f"{self.repeat_coordinate_name}{qubit[1:]}"
+            for qubit in self.all_qubits
+        }
+
+        # Each qubit has its own repeat dimension. To concatenate all qubits in a
+        # single operation, the repeat dimensions are renamed to a common one and
+        # the repeat coordinates are collected separately.
+        repeat_values = collections.defaultdict(list)
+        repeat_attrs = {}
+        aligned_datasets = []
+        for repeat_idx, ds in enumerate(repeat_datasets):
+            qubit_data_arrays = {}
+            for qubit, repeat_coord in repeat_coords.items():
+                qubit_data = ds[qubit]
                 if repeat_coord not in qubit_data.coords:
-                    qubit_data = qubit_data.assign_coords({repeat_coord: repeat_idx})
-
-                qubit_datasets.append(qubit_data)
-
-            merged_qubit_data = xr.concat(qubit_datasets, dim=repeat_coord)
-            datasets.append(merged_qubit_data)
-
-        merged_datasets = xr.merge(datasets)
+                    qubit_data = qubit_data.expand_dims({repeat_coord: [repeat_idx]})
+                repeat_values[qubit].append(np.atleast_1d(qubit_data[repeat_coord]))
+                repeat_attrs.setdefault(qubit, qubit_data[repeat_coord].attrs)
+                qubit_data_arrays[qubit] = qubit_data.drop_vars(repeat_coord).rename(
+                    {repeat_coord: _REPEAT_DIM}
+                )
+            aligned_datasets.append(xr.Dataset(qubit_data_arrays, attrs=ds.attrs))
+
+        concatenated = xr.concat(aligned_datasets, dim=_REPEAT_DIM, coords="minimal")
+
+        merged_datasets = xr.Dataset(
+            {
+                qubit: concatenated[qubit]
+                .rename({_REPEAT_DIM: repeat_coord})
+                .assign_coords(
+                    {
+                        repeat_coord: (
+                            repeat_coord,
+                            np.concatenate(repeat_values[qubit]),
+                            repeat_attrs[qubit],
+                        )
+                    }
+                )
+                for qubit, repeat_coord in repeat_coords.items()
+            },
+            attrs=concatenated.attrs,
+        )
 
         return merged_datasets
 
@@ -312,20 +414,77 @@ class BaseQubitAnalysis(BaseAnalysis, ABC):
         self.data_var = None
         self.qubit = None
         self.coord = None
+        self.trace_fits = None
 
     def process_qubit(self, dataset, qubit_element):
+        self.fit_qubit(dataset, qubit_element)
+        self.update_redis_trusted_values(self.name, self.qubit)
+        return self._qoi
+
+    def fit_qubit(self, dataset, qubit_element):
+        """
+        Run the analysis of a qubit without writing the results to redis.
+
+        Args:
+            dataset: Dataset with the data variables of the qubit
+            qubit_element: Name of the qubit e.g. q06
+
+        Returns:
+            The quantity of interest as QOI wrapped object
+
+        """
+        self.load_qubit(dataset, qubit_element)
+        self._qoi = self.analyse_qubit()
+        return self._qoi
+
+    def load_qubit(self, dataset, qubit_element):
+        """
+        Set the data of the qubit to analyse.
+
+        Args:
+            dataset: Dataset with the data variables of the qubit
+            qubit_element: Name of the qubit e.g. q06
+
+        """
         self.dataset = dataset
         self.qubit = qubit_element
         self.coord = dataset.coords
         self.data_var = list(dataset.data_vars.keys())[
             0
         ]  # Assume the first data_var is relevant
-        self.S21 = dataset.isel(ReIm=0) + 1j * dataset.isel(ReIm=1)
+        self.S21 = to_complex_dataset(dataset)
         self.magnitudes = np.abs(self.S21)
-        self._qoi = self.analyse_qubit()
 
-        self.update_redis_trusted_values(self.name, self.qubit)
-        return self._qoi
+    @classmethod
+    def fits_traces(cls) -> bool:
+        """Whether the analysis fits a model to traces, see traces_to_fit"""
+        return cls.traces_to_fit is not BaseQubitAnalysis.traces_to_fit
+
+    def traces_to_fit(self) -> Optional[Traces]:
+        """
+        Traces of the qubit to fit with a model, together with their initial parameters.
+
+        The node analysis fits the traces of all qubits at once, before analyse_qubit
+        is called. The fits are available in analyse_qubit from fitted_traces.
+
+        Returns:
+            The traces or None if there is nothing to fit
+
+        """
+        return None
+
+    def fitted_traces(self) -> List[TraceFit]:
+        """
+        Fits of the traces of the qubit, the traces are fitted here if the node did not fit them.
+
+        Returns:
+            The fit of every trace of traces_to_fit
+
+        """
+        if self.trace_fits is None:
+            traces = self.traces_to_fit()
+            self.trace_fits = fit_traces(traces) if traces is not None else []
+        return self.trace_fits
 
     def _plot(self, primary_axis):
         self.plotter(primary_axis)  # Assuming node_analysis object is available
@@ -359,6 +518,23 @@ class BaseCouplerAnalysis(BaseAnalysis, ABC):
         self.name_qubit_2 = ""
 
     def process_coupler(self, dataset, coupler_element):
+        analysis_results = self.fit_coupler(dataset, coupler_element)
+        self.update_redis_trusted_values(self.name, coupler_element)
+
+        return analysis_results
+
+    def fit_coupler(self, dataset, coupler_element):
+        """
+        Run the analysis of a coupler without writing the results to redis.
+
+        Args:
+            dataset: Dataset with the data variables of the coupler
+            coupler_element: Name of the coupler e.g. q06_q07
+
+        Returns:
+            Dictionary with the quantities of interest of the coupler
+
+        """
         self.name_qubit_1 = coupler_element[0:3]
         self.name_qubit_2 = coupler_element[4:7]
         self.dataset = dataset
@@ -367,13 +543,10 @@ class BaseCouplerAnalysis(BaseAnalysis, ABC):
         self.data_var = list(dataset.data_vars.keys())[
             0
         ]  # Assume the first data_var is relevant
-        self.S21 = dataset.isel(ReIm=0) + 1j * dataset.isel(ReIm=1)
+        self.S21 = to_complex_dataset(dataset)
         self.magnitudes = np.abs(self.S21)
 
-        analysis_results = self._run_coupler_analysis(coupler_element)
-        self.update_redis_trusted_values(self.name, coupler_element)
-
-        return analysis_results
+        return self._run_coupler_analysis(coupler_element)
 
     def _extract_coupler_info(self):
         for settable in self.dataset.coords:
@@ -452,6 +625,7 @@ class BaseAllCouplersAnalysis(BaseNodeAnalysis, ABC):
         if len(coupler_data_dict) == 0:
             logger.error("Dataset does not have valid coordinates")
         print(coupler_data_dict)
+        fit_tasks = []
         for this_coupler, coupler_data_vars in coupler_data_dict.items():
             print(this_coupler)
             ds = xr.merge([self.dataset[var] for var in coupler_data_vars])
@@ -463,11 +637,20 @@ class BaseAllCouplersAnalysis(BaseNodeAnalysis, ABC):
                 self.name, self.redis_fields
             )
             coupler_analysis.data_path = self.data_path
-            coupler_analysis.process_coupler(ds, this_coupler)
-            self.coupler_analyses.append(coupler_analysis)
+            fit_tasks.append((coupler_analysis, "fit_coupler", ds, this_coupler))
 
             index = index + 1
 
+        # The couplers are fitted independently, redis is updated at once when all fits are done
+        coupler_analyses = fit_elements(fit_tasks)
+        batch = ParameterBatch()
+        for coupler_analysis in coupler_analyses:
+            coupler_analysis.update_redis_trusted_values(
+                self.name, coupler_analysis.coupler, batch
+            )
+        batch.write(REDIS_CONNECTION)
+        self.coupler_analyses.extend(coupler_analyses)
+
         return analysis_results
 
     def _group_by_coupler(self):
@@ -518,7 +701,7 @@ class BaseAllCouplersRepeatAnalysis(BaseAllCouplersAnalysis, ABC):
         self.num_repeats = len(data_files)
 
         # Load the first dataset to infer coupler-based coordinates
-        first_dataset = xr.open_dataset(data_files[0], engine="scipy")
+        first_dataset = xr.open_dataset(data_files[0])
 
         # Step 1: Group data variables by qubit (assuming qubit data starts with 'yq')
         self.all_qubits = [
@@ -543,7 +726,7 @@ class BaseAllCouplersRepeatAnalysis(BaseAllCouplersAnalysis, ABC):
 
         for file_idx, file_path in enumerate(data_files):
             print(f"Opening dataset {file_idx + 1}/{len(data_files)}: {file_path}")
-            ds = xr.open_dataset(file_path, engine="scipy")
+            ds = xr.open_dataset(file_path)
 
             # Step 3: Extract qubit-related data and identify couplers
             for coupler, coords in self.coupler_data_dict.items():
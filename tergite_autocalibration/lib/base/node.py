@@ -34,13 +34,20 @@ from quantify_scheduler.instrument_coordinator.instrument_coordinator import (
 from tergite_autocalibration.config.globals import CONFIG, PLOTTING_BACKEND
 from tergite_autocalibration.lib.base.analysis import BaseNodeAnalysis
 from tergite_autocalibration.lib.base.measurement import BaseMeasurement
-from tergite_autocalibration.lib.utils.device import DeviceConfiguration
+from tergite_autocalibration.lib.utils.device import get_device_manager
+from tergite_autocalibration.lib.utils.schedule_compilation import (
+    get_compiled_schedule_cache,
+)
 from tergite_autocalibration.lib.utils.schedule_execution import execute_schedule
 from tergite_autocalibration.utils.dto.enums import MeasurementMode
+from tergite_autocalibration.utils.hardware.simulated_cluster import (
+    SimulatedInstrumentCoordinator,
+)
 from tergite_autocalibration.utils.io.dataset_utils import (
     configure_dataset,
     save_dataset,
 )
+from tergite_autocalibration.utils.logger.phase_timing import node_timing, timed_phase
 from tergite_autocalibration.utils.logger.tac_logger import logger
 
 colorama_init()
@@ -88,11 +95,13 @@ class BaseNode(abc.ABC):
                 "Quantities of Interest are missing from the node implementation"
             )
 
-        # NOTE: In the future this will be problematic.
-        # Having the device creation in the init will prohibit concurrent
-        # initialization of two different nodes
-        self.device_manager = DeviceConfiguration(self.all_qubits, self.couplers)
-        self.device = self.device_manager.configure_device(self.name)
+        # The device is shared between the nodes and updated with the current redis values,
+        # the snapshot keeps the configuration this node has been initialised with
+        self.device_manager = get_device_manager().get_device_configuration(
+            self.all_qubits, self.couplers
+        )
+        self.device = self.device_manager.device
+        self.device_snapshot = self.device_manager.snapshot(self.name)
 
     def measure_node(self, cluster_status) -> xarray.Dataset:
         result_dataset = xarray.Dataset()
@@ -154,15 +163,29 @@ class BaseNode(abc.ABC):
         return dimensions
 
     def calibrate(self, data_path: Path, cluster_status):
-        if cluster_status != MeasurementMode.re_analyse:
-            result_dataset = self.measure_node(cluster_status)
-            self.device_manager.save_serial_device(self.name, self.device, data_path)
-            # After the measurement free the device resources
-            save_dataset(result_dataset, self.name, data_path)
-        self.device_manager.close_device()
-        self.post_process(data_path)
+        with node_timing(self.name, data_path), timed_phase("calibrate"):
+            self.measure_and_save(data_path, cluster_status)
+            self.post_process(data_path)
         logger.info("analysis completed")
 
+    def measure_and_save(self, data_path: Path, cluster_status):
+        """
+        Run the measurement part of the calibration and save the dataset and the device configuration.
+        After this method returns, the node does not need the cluster anymore and the analysis
+        can run while another node is measuring.
+
+        Args:
+            data_path: Path where the dataset will be saved
+            cluster_status: Measurement mode, in re-analysis mode nothing is measured
+
+        """
+        if cluster_status != MeasurementMode.re_analyse:
+            with node_timing(self.name, data_path), timed_phase("measure_and_save"):
+                result_dataset = self.measure_node(cluster_status)
+                self.device_snapshot.save(data_path)
+                save_dataset(result_dataset, self.name, data_path)
+
+    @timed_phase("precompile")
     def precompile(self, schedule_samplespace: dict) -> CompiledSchedule:
         constants.GRID_TIME_TOLERANCE_TIME = 5e-2
 
@@ -184,14 +207,21 @@ class BaseNode(abc.ABC):
         # TODO: Probably the compiler desn't need to be created every time self.precompile() is called.
         compiler = SerialCompiler(name=f"{self.name}_compiler")
 
-        compilation_config = self.device.generate_compilation_config()
+        compilation_config = self.device_snapshot.get_compilation_config()
         logger.info("Starting Compiling")
-        compiled_schedule = compiler.compile(
-            schedule=schedule, config=compilation_config
-        )
+        schedule_cache = get_compiled_schedule_cache()
+        if schedule_cache is None:
+            compiled_schedule = compiler.compile(
+                schedule=schedule, config=compilation_config
+            )
+        else:
+            compiled_schedule = schedule_cache.compile(
+                compiler, schedule, compilation_config
+            )
 
         return compiled_schedule
 
+    @timed_phase("measure_compiled_schedule")
     def measure_compiled_schedule(
         self,
         compiled_schedule: CompiledSchedule,
@@ -210,6 +240,10 @@ class BaseNode(abc.ABC):
         schedule_duration = self._calculate_schedule_duration(compiled_schedule)
         self._print_measurement_info(schedule_duration, measurement)
 
+        if isinstance(self.lab_instr_coordinator, SimulatedInstrumentCoordinator):
+            # The simulated cluster needs the samplespace of the node
+            self.lab_instr_coordinator.bind(self)
+
         raw_dataset = execute_schedule(
             compiled_schedule,
             schedule_duration,
@@ -245,11 +279,12 @@ class BaseNode(abc.ABC):
         )
 
     def post_process(self, data_path: Path):
-        analysis_kwargs = getattr(self, "analysis_kwargs", dict())
-        node_analysis = self.analysis_obj(
-            self.name, self.redis_fields, **analysis_kwargs
-        )
-        analysis_results = node_analysis.analyze_node(data_path)
+        with node_timing(self.name, data_path), timed_phase("post_process"):
+            analysis_kwargs = getattr(self, "analysis_kwargs", dict())
+            node_analysis = self.analysis_obj(
+                self.name, self.redis_fields, **analysis_kwargs
+            )
+            analysis_results = node_analysis.analyze_node(data_path)
         return analysis_results
 
     def __str__(self):
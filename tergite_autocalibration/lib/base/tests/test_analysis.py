@@ -0,0 +1,235 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import lmfit
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+import xarray as xr
+
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.lib.base import analysis as analysis_module
+from tergite_autocalibration.lib.base.analysis import (
+    BaseAllQubitsAnalysis,
+    BaseAllQubitsRepeatAnalysis,
+    BaseQubitAnalysis,
+)
+from tergite_autocalibration.lib.utils.batched_fitting import Traces, fit_all_traces
+from tergite_autocalibration.lib.utils.plot_rendering import wait_for_plots
+from tergite_autocalibration.tests.utils.fake_redis import FakeRedis
+from tergite_autocalibration.tools.mss import storage
+
+
+class _RepeatAnalysis(BaseAllQubitsRepeatAnalysis):
+    single_qubit_analysis_obj = None
+
+    def __init__(self, data_path, repeat_coordinate_name):
+        super().__init__("repeat_node", [])
+        self.data_path = data_path
+        self.repeat_coordinate_name = repeat_coordinate_name
+
+
+def _write_repeats(data_path, num_repeats, with_repeat_coordinate):
+    qubits = ["q00", "q01"]
+    for repeat_idx in range(num_repeats):
+        data_vars, coords = {}, {}
+        for qubit in qubits:
+            dims = [f"delays{qubit}"]
+            coords[f"delays{qubit}"] = (f"delays{qubit}", np.arange(4.0))
+            if with_repeat_coordinate:
+                dims.append(f"seeds{qubit}")
+                coords[f"seeds{qubit}"] = (f"seeds{qubit}", [10 * repeat_idx])
+            shape = [4] + [1] * (len(dims) - 1)
+            values = np.full(shape, repeat_idx + 10.0 * int(qubit[1:]))
+            data_vars[f"y{qubit}"] = (dims, values, {"qubit": qubit})
+        xr.Dataset(data_vars, coords, attrs={"name": "repeat_node"}).to_netcdf(
+            data_path / f"dataset_repeat_node_{repeat_idx}.hdf5"
+        )
+
+
+def test_open_dataset_adds_repeat_dimension(tmp_path):
+    _write_repeats(tmp_path, num_repeats=3, with_repeat_coordinate=False)
+    analysis = _RepeatAnalysis(tmp_path, "repeat")
+
+    dataset = analysis.open_dataset()
+
+    assert analysis.num_repeats == 3
+    assert analysis.all_qubits == ["yq00", "yq01"]
+    for qubit in ["q00", "q01"]:
+        data = dataset[f"y{qubit}"]
+        assert data.dims == (f"repeat{qubit}", f"delays{qubit}")
+        np.testing.assert_array_equal(data[f"repeat{qubit}"], [0, 1, 2])
+        np.testing.assert_array_equal(data[:, 0], np.arange(3) + 10 * int(qubit[1:]))
+        assert data.attrs == {"qubit": qubit}
+    assert dataset.attrs == {"name": "repeat_node"}
+
+
+def test_open_dataset_concatenates_existing_repeat_coordinate(tmp_path):
+    _write_repeats(tmp_path, num_repeats=2, with_repeat_coordinate=True)
+    analysis = _RepeatAnalysis(tmp_path, "seeds")
+
+    dataset = analysis.open_dataset()
+
+    for qubit in ["q00", "q01"]:
+        assert dataset[f"y{qubit}"].dims == (f"delays{qubit}", f"seeds{qubit}")
+        np.testing.assert_array_equal(dataset[f"seeds{qubit}"], [0, 10])
+        np.testing.assert_array_equal(
+            dataset[f"y{qubit}"][0], np.array([0, 1]) + 10 * int(qubit[1:])
+        )
+
+
+def test_open_dataset_without_files(tmp_path):
+    analysis = _RepeatAnalysis(tmp_path, "repeat")
+
+    with pytest.raises(FileNotFoundError):
+        analysis.open_dataset()
+
+
+class _QubitAnalysis(BaseQubitAnalysis):
+    events = []
+
+    def analyse_qubit(self):
+        self.events.append(("fit", self.qubit))
+        return [float(self.magnitudes[self.data_var].max())]
+
+    def update_redis_trusted_values(self, node, this_element, batch=None):
+        self.events.append(("redis", this_element, self._qoi))
+        super().update_redis_trusted_values(node, this_element, batch)
+
+    def plotter(self, ax):
+        pass
+
+
+class _NodeAnalysis(BaseAllQubitsAnalysis):
+    single_qubit_analysis_obj = _QubitAnalysis
+
+
+def test_analyze_all_qubits_updates_redis_after_fitting(monkeypatch):
+    monkeypatch.setattr(_QubitAnalysis, "events", [])
+    redis_connection = FakeRedis()
+    monkeypatch.setattr(analysis_module, "REDIS_CONNECTION", redis_connection)
+    monkeypatch.setattr(storage, "red", redis_connection)
+    dataset = xr.Dataset(
+        {
+            f"y{qubit}": (
+                (f"amplitudes{qubit}", "ReIm"),
+                np.full((3, 2), index + 1.0),
+                {"qubit": qubit},
+            )
+            for index, qubit in enumerate(["q06", "q07"])
+        },
+        coords={f"amplitudes{qubit}": np.arange(3.0) for qubit in ["q06", "q07"]},
+    )
+    analysis = _NodeAnalysis("rabi_oscillations", ["rxy:amp180"])
+    analysis.dataset = dataset
+
+    analysis._analyze_all_qubits()
+
+    assert sorted(_QubitAnalysis.events[:2]) == [("fit", "q06"), ("fit", "q07")]
+    assert sorted(_QubitAnalysis.events[2:]) == [
+        ("redis", "q06", [np.sqrt(2)]),
+        ("redis", "q07", [np.sqrt(8)]),
+    ]
+    assert len(analysis.qubit_analyses) == 2
+    for qubit, amplitude in [("q06", np.sqrt(2)), ("q07", np.sqrt(8))]:
+        assert redis_connection.data[f"transmons:{qubit}"] == {
+            "rxy:amp180": str(amplitude)
+        }
+        assert redis_connection.data[f"cs:{qubit}"] == {
+            "rabi_oscillations": "calibrated"
+        }
+    # One pipeline for the hashes of all qubits and one transaction (WATCH and EXEC)
+    # for the standard redis storage
+    assert redis_connection.round_trips == 3
+
+
+class _LineQubitAnalysis(BaseQubitAnalysis):
+    def traces_to_fit(self):
+        amplitudes = self.dataset[f"amplitudes{self.qubit}"].values
+        magnitudes = self.magnitudes[self.data_var].values
+        model = lmfit.models.LinearModel()
+        guess = model.make_params(slope=1.0, intercept=0.0)
+        return Traces(model, magnitudes[np.newaxis], [guess], {"x": amplitudes})
+
+    def analyse_qubit(self):
+        return [self.fitted_traces()[0].params["slope"].value]
+
+    def update_redis_trusted_values(self, node, this_element, batch=None):
+        pass
+
+    def plotter(self, ax):
+        pass
+
+
+class _LineNodeAnalysis(BaseAllQubitsAnalysis):
+    single_qubit_analysis_obj = _LineQubitAnalysis
+
+
+def test_analyze_all_qubits_fits_the_traces_of_all_qubits_at_once(monkeypatch):
+    fitted = []
+
+    def _fit_all_traces(all_traces):
+        fitted.append(len(all_traces))
+        return fit_all_traces(all_traces)
+
+    monkeypatch.setattr(analysis_module, "fit_all_traces", _fit_all_traces)
+    amplitudes = np.linspace(0, 1, 20)
+    dataset = xr.Dataset(
+        {
+            f"y{qubit}": (
+                (f"amplitudes{qubit}",),
+                (index + 1.0) * amplitudes + 0.5,
+                {"qubit": qubit},
+            )
+            for index, qubit in enumerate(["q06", "q07", "q08"])
+        },
+        coords={f"amplitudes{qubit}": amplitudes for qubit in ["q06", "q07", "q08"]},
+    )
+    analysis = _LineNodeAnalysis("rabi_oscillations", ["rxy:amp180"])
+    analysis.dataset = dataset
+
+    analysis._analyze_all_qubits()
+
+    assert fitted == [3]
+    for index, qubit_analysis in enumerate(analysis.qubit_analyses):
+        assert qubit_analysis.trace_fits[0].batched
+        assert np.isclose(qubit_analysis._qoi[0], index + 1.0)
+
+
+def test_single_qubit_analysis_fits_its_own_traces():
+    amplitudes = np.linspace(0, 1, 20)
+    dataset = xr.Dataset(
+        {"yq06": (("amplitudesq06",), 2 * amplitudes, {"qubit": "q06"})},
+        coords={"amplitudesq06": amplitudes},
+    )
+
+    qoi = _LineQubitAnalysis("rabi_oscillations", []).fit_qubit(dataset, "q06")
+
+    assert np.isclose(qoi[0], 2.0)
+
+
+def test_save_plots_without_waiting(tmp_path, monkeypatch):
+    def pause(interval):
+        raise AssertionError("The analysis must not pause without interactive plots")
+
+    monkeypatch.setattr(plt, "pause", pause)
+    monkeypatch.setattr(ENV, "plotting", False)
+    monkeypatch.setattr(ENV, "save_plots", True)
+    analysis = _NodeAnalysis("rabi_oscillations", ["rxy:amp180"])
+    analysis.data_path = tmp_path
+    analysis.fig, _ = plt.subplots()
+
+    analysis.save_plots()
+    wait_for_plots()
+
+    assert (tmp_path / "rabi_oscillations_preview.png").exists()
+    assert (tmp_path / "rabi_oscillations.png").exists()
@@ -17,8 +17,6 @@ import itertools
 import numpy as np
 from matplotlib import pyplot as plt
 from numpy.linalg import inv
-from scipy.linalg import norm
-from scipy.optimize import minimize
 from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
 from sklearn.metrics import confusion_matrix
 
@@ -28,29 +26,10 @@ from tergite_autocalibration.lib.base.analysis import (
     BaseQubitAnalysis,
     MultipleBaseAllQubitsAnalysis,
 )
+from tergite_autocalibration.lib.utils.mitigation import mitigate
 from tergite_autocalibration.utils.logger.tac_logger import logger
 
 
-def mitigate(v, cm_inv):
-    u = np.dot(v, cm_inv)
-
-    def m(t):
-        return norm(u - np.array(t))
-
-    def con(t):
-        return t[0] + t[1] + t[2] - 1
-
-    cons = (
-        {"type": "eq", "fun": con},
-        {"type": "ineq", "fun": lambda t: t[0]},
-        {"type": "ineq", "fun": lambda t: t[1]},
-        {"type": "ineq", "fun": lambda t: t[2]},
-    )
-    result = minimize(m, v, method="SLSQP", constraints=cons)
-    w = np.abs(np.round(result.x, 10))
-    return w
-
-
 class ProcessTomographyQubitAnalysis(BaseQubitAnalysis):
 
     def analyse_qubit(self):
@@ -74,6 +53,7 @@ class ProcessTomographyQubitAnalysis(BaseQubitAnalysis):
         # self.testing_group = 0
         self.dynamic = self.dataset.attrs["node"] == "cz_dynamic_phase"
         self.all_magnitudes = []
+        cm_invs = []
         for indx, _ in enumerate(self.sweeps):
             # Calculate confusion matrix from calibration shots
             y = np.repeat(self.calibs, self.shots)
@@ -113,12 +93,14 @@ class ProcessTomographyQubitAnalysis(BaseQubitAnalysis):
                 raw_prob = [0] * len(self.calibs)
                 for state_id, state in enumerate(uniques):
                     raw_prob[int(state)] = counts[state_id] / len(sweep)
-
-                mitigate_prob = mitigate(raw_prob, cm_inv)
-                data_res = np.append(data_res, mitigate_prob)
+                data_res = np.append(data_res, raw_prob)
             data_res = data_res.reshape(data_res_shape)
             self.all_magnitudes.append(data_res)
-        self.all_magnitudes = np.array(self.all_magnitudes)
+            cm_invs.append(cm_inv)
+        # The probabilities of all sweeps are mitigated at once
+        self.all_magnitudes = mitigate(
+            np.array(self.all_magnitudes), np.array(cm_invs)[:, np.newaxis]
+        )
         # Fitting the 1 state data
         self.g_magnitudes = self.all_magnitudes[:, :-3, 0]
         self.e_magnitudes = self.all_magnitudes[:, :-3, 1]
@@ -26,8 +26,8 @@ from quantify_scheduler.operations.pulse_library import (
 )
 from quantify_scheduler.resources import ClockResource
 
-from tergite_autocalibration.config.globals import REDIS_CONNECTION
 from tergite_autocalibration.lib.base.measurement import BaseMeasurement
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
 from tergite_autocalibration.utils.dto.extended_coupler_edge import (
     ExtendedCompositeSquareEdge,
 )
@@ -99,7 +99,7 @@ class Process_Tomography(BaseMeasurement):
         for coupler in all_couplers:
             qubits = coupler.split(sep="_")
             for this_coupler in all_couplers:
-                redis_config = REDIS_CONNECTION.hgetall(f"couplers:{this_coupler}")
+                redis_config = get_parameter_cache().hgetall(f"couplers:{this_coupler}")
                 cz_pulse_frequency[this_coupler] = float(
                     redis_config["cz_pulse_frequency"]
                 )
@@ -13,8 +13,6 @@
 # that they have been altered from the originals.
 
 import lmfit
-from scipy.linalg import norm
-from scipy.optimize import minimize
 from numpy.linalg import inv
 from matplotlib import pyplot as plt
 import numpy as np
@@ -26,31 +24,12 @@ from tergite_autocalibration.lib.base.analysis import (
     BaseQubitAnalysis,
     BaseAllQubitsRepeatAnalysis,
 )
+from tergite_autocalibration.lib.utils.batched_fitting import Traces, fit_traces
 from tergite_autocalibration.lib.utils.functions import (
     exponential_decay_function,
 )
 
 
-def mitigate(v, cm_inv):
-    u = np.dot(v, cm_inv)
-
-    def m(t):
-        return norm(u - np.array(t))
-
-    def con(t):
-        return t[0] + t[1] + t[2] - 1
-
-    cons = (
-        {"type": "eq", "fun": con},
-        {"type": "ineq", "fun": lambda t: t[0]},
-        {"type": "ineq", "fun": lambda t: t[1]},
-        {"type": "ineq", "fun": lambda t: t[2]},
-    )
-    result = minimize(m, v, method="SLSQP", constraints=cons)
-    w = np.abs(np.round(result.x, 10))
-    return w
-
-
 class ExpDecayModel(lmfit.model.Model):
     """
     Generate an exponential decay model that can be fit to randomized benchmarking data.
@@ -163,7 +142,6 @@ class RandomizedBenchmarkingSSROQubitAnalysis(BaseQubitAnalysis):
                 elif len(counts) == 2:
                     counts = np.append(counts, 0)
                 raw_prob = counts / len(sweep)
-                mitigate_prob = mitigate(raw_prob, cm_inv)
                 data_res = np.append(data_res, raw_prob)
             data_res = data_res.reshape(data_res_shape)
             self.all_magnitudes.append(data_res)
@@ -203,29 +181,32 @@ class RandomizedBenchmarkingSSROQubitAnalysis(BaseQubitAnalysis):
             fit_result2.params, **{model.independent_vars[0]: self.fit_n_cliffords}
         )
 
-        fidelities = []
-        for trace in self.magnitudes:
-            # Gives an initial guess for the model parameters and then fits the model to the data.
-            guess = model.guess(data=trace, m=self.number_of_cliffords)
-            fit_result = model.fit(trace, params=guess, m=self.number_of_cliffords)
-            fidelities.append(fit_result.params["p"].value)
+        # The traces of all seeds are fitted at once
+        guesses = [
+            model.guess(data=trace, m=self.number_of_cliffords)
+            for trace in self.magnitudes
+        ]
+        fits = fit_traces(
+            Traces(model, self.magnitudes, guesses, {"m": self.number_of_cliffords})
+        )
+        fidelities = [fit_result.best_values["p"] for fit_result in fits]
 
         self.fidelity = np.mean(np.array(fidelities))
         self.fidelity_error = np.std(np.array(fidelities))
 
-        leakage = []
+        guesses2 = []
         for trace in self.magnitudes2:
-            # Gives an initial guess for the model parameters and then fits the model to the data.
+            # Gives an initial guess for the model parameters
             guess2 = model.guess(data=trace, m=self.number_of_cliffords)
 
             # Adjust the parameters for an inverted decaying exponential fit
             guess2["A"].value = -abs(max(trace))  # Force 'a' to be negative
             guess2["p"].value = 0.998
-            fit_result2 = model.fit(trace, params=guess2, m=self.number_of_cliffords)
-            leakage_i = fit_result2.params["p"].value
-
-            leakage_i = 1 - leakage_i
-            leakage.append(leakage_i)
+            guesses2.append(guess2)
+        fits2 = fit_traces(
+            Traces(model, self.magnitudes2, guesses2, {"m": self.number_of_cliffords})
+        )
+        leakage = [1 - fit_result.best_values["p"] for fit_result in fits2]
 
         self.leakage = np.mean(np.array(leakage))
         self.leakage_error = np.std(np.array(leakage))
@@ -25,6 +25,7 @@ from quantify_scheduler.schedules.schedule import Schedule
 
 import tergite_autocalibration.utils.clifford_elements_decomposition as cliffords
 from tergite_autocalibration.lib.base.measurement import BaseMeasurement
+from tergite_autocalibration.utils.clifford_group import random_clifford_sequences
 from tergite_autocalibration.utils.dto.extended_gates import (
     Measure_RO_3state_Opt,
     Rxy_12,
@@ -94,10 +95,12 @@ class Randomized_Benchmarking_SSRO(BaseMeasurement):
 
         # The inner for loop iterates over the random clifford sequence lengths
         for this_qubit, clifford_sequence_lengths in number_of_cliffords.items():
-            all_cliffords = len(cliffords.XY_decompositions)
             seed = seeds[this_qubit]
 
-            rng = np.random.default_rng(seed)
+            # All random sequences of the qubit and their recovery Cliffords at once
+            random_sequences, recovery_indices = random_clifford_sequences(
+                [seed], clifford_sequence_lengths[:-3]
+            )
 
             reset = shot.add(
                 Reset(*qubits), ref_op=root_relaxation, ref_pt="end"
@@ -108,9 +111,9 @@ class Randomized_Benchmarking_SSRO(BaseMeasurement):
                 clifford_sequence_lengths[:-3]
             ):
                 # schedule.add(X(this_qubit))
-                random_sequence = rng.integers(
-                    all_cliffords, size=this_number_of_cliffords
-                )
+                random_sequence = random_sequences[
+                    0, acq_index, :this_number_of_cliffords
+                ]
 
                 for sequence_index in random_sequence:
                     physical_gates = cliffords.XY_decompositions[sequence_index]
@@ -119,9 +122,9 @@ class Randomized_Benchmarking_SSRO(BaseMeasurement):
                         phi = gate_angles["phi"]
                         shot.add(Rxy(qubit=this_qubit, theta=theta, phi=phi))
 
-                recovery_index, recovery_XY_operations = cliffords.reversing_XY_matrix(
-                    random_sequence
-                )
+                recovery_XY_operations = cliffords.XY_decompositions[
+                    recovery_indices[0, acq_index]
+                ]
 
                 for gate_angles in recovery_XY_operations.values():
                     theta = gate_angles["theta"]
@@ -25,6 +25,7 @@ from tergite_autocalibration.lib.base.analysis import (
     BaseAllQubitsRepeatAnalysis,
     BaseQubitAnalysis,
 )
+from tergite_autocalibration.lib.utils.batched_fitting import Traces
 
 
 def cos_func(
@@ -45,7 +46,7 @@ class T1QubitAnalysis(BaseQubitAnalysis):
     def __init__(self, name, redis_fields):
         super().__init__(name, redis_fields)
 
-    def analyse_qubit(self):
+    def traces_to_fit(self):
         for coord in self.dataset[self.data_var].coords:
             if "T1_repetition" in coord:
                 self.repetitions_coord = coord
@@ -56,23 +57,23 @@ class T1QubitAnalysis(BaseQubitAnalysis):
 
         model = ExpDecayModel()
 
+        magnitudes = self.magnitudes[self.data_var].transpose(
+            self.repetitions_coord, ...
+        )
+        magnitudes = magnitudes.values.reshape(magnitudes.shape[0], -1)
+
+        # Gives an initial guess for the model parameters of every repetition
+        guesses = [model.guess(data=trace, delay=self.delays) for trace in magnitudes]
+        return Traces(model, magnitudes, guesses, {"t": self.delays})
+
+    def analyse_qubit(self):
+        fits = self.fitted_traces()
+
         self.fit_delays = np.linspace(
             self.delays[0], self.delays[-1], 400
         )  # x-values for plotting
-        self.T1_times = []
-        for indx, repeat in enumerate(self.dataset.coords[self.repetitions_coord]):
-            magnitudes = self.magnitudes[self.data_var].isel(
-                {self.repetitions_coord: indx}
-            )
-            magnitudes_flat = magnitudes.values.flatten()
-
-            # Gives an initial guess for the model parameters and then fits the model to the data.
-            guess = model.guess(data=magnitudes_flat, delay=self.delays)
-            fit_result = model.fit(magnitudes_flat, params=guess, t=self.delays)
-            self.fit_y = model.eval(
-                fit_result.params, **{model.independent_vars[0]: self.fit_delays}
-            )
-            self.T1_times.append(fit_result.params["tau"].value)
+        self.T1_times = [fit_result.best_values["tau"] for fit_result in fits]
+        self.fit_y = fits[-1].eval(t=self.fit_delays)
         self.average_T1 = np.mean(self.T1_times)
         self.error = np.std(self.T1_times)
         return [self.average_T1]
@@ -22,8 +22,6 @@ import xarray as xr
 from matplotlib import pyplot as plt
 from numpy.linalg import inv
 from quantify_core.analysis.fitting_models import fft_freq_phase_guess
-from scipy.linalg import norm
-from scipy.optimize import minimize
 from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
 from sklearn.metrics import confusion_matrix
 
@@ -32,6 +30,7 @@ from tergite_autocalibration.lib.base.analysis import (
     BaseAllQubitsAnalysis,
     BaseQubitAnalysis,
 )
+from tergite_autocalibration.lib.utils.mitigation import mitigate
 
 
 # Cosine function that is fit to Rabi oscillations
@@ -45,27 +44,6 @@ def cos_func(
     return amplitude * np.cos(2 * np.pi * frequency * (drive_amp + phase)) + offset
 
 
-def mitigate(v, cm_inv):
-    u = np.dot(v, cm_inv)
-
-    def m(t):
-        return norm(u - np.array(t))
-
-    def con(t):
-        return t[0] + t[1] + t[2] - 1
-
-    cons = (
-        {"type": "eq", "fun": con},
-        {"type": "ineq", "fun": lambda t: t[0]},
-        {"type": "ineq", "fun": lambda t: t[1]},
-        {"type": "ineq", "fun": lambda t: t[2]},
-    )
-    result = minimize(m, v, method="SLSQP", constraints=cons)
-    w = np.abs(np.round(result.x, 10))
-
-    return w
-
-
 class CZModel(lmfit.model.Model):
     """
     Generate a cosine model that can be fit to Rabi oscillation data.
@@ -133,6 +111,7 @@ class CZCalibrationSSROQubitAnalysis(BaseQubitAnalysis):
         if self.swap:
             qubit_type_list.reverse()
         self.all_magnitudes = []
+        cm_invs = []
         for indx, _ in enumerate(self.sweeps):
             # Calculate confusion matrix from calibration shots
             y = np.repeat(self.calibs, self.shots)
@@ -173,11 +152,14 @@ class CZCalibrationSSROQubitAnalysis(BaseQubitAnalysis):
                 raw_prob = [0] * len(self.calibs)
                 for state_id, state in enumerate(uniques):
                     raw_prob[int(state)] = counts[state_id] / len(sweep)
-                mitigate_prob = mitigate(raw_prob, cm_inv)
-                data_res = np.append(data_res, mitigate_prob)
+                data_res = np.append(data_res, raw_prob)
             data_res = data_res.reshape(data_res_shape)
             self.all_magnitudes.append(data_res)
-        self.all_magnitudes = np.array(self.all_magnitudes)
+            cm_invs.append(cm_inv)
+        # The probabilities of all sweeps are mitigated at once
+        self.all_magnitudes = mitigate(
+            np.array(self.all_magnitudes), np.array(cm_invs)[:, np.newaxis]
+        )
         # Fitting the 0 state data
         self.magnitudes = self.all_magnitudes[:, :-3, 1]
 
@@ -335,6 +317,7 @@ class ResetCalibrationSSROQubitAnalysis(BaseQubitAnalysis):
 
         self.dynamic = self.dataset.attrs["node"] == "cz_dynamic_phase"
         self.all_magnitudes = []
+        cm_invs = []
         for indx, _ in enumerate(self.sweeps):
             # Calculate confusion matrix from calibration shots
             y = np.repeat(self.calibs, self.shots)
@@ -377,11 +360,14 @@ class ResetCalibrationSSROQubitAnalysis(BaseQubitAnalysis):
                 for state_id, state in enumerate(uniques):
                     raw_prob[int(state)] = counts[state_id] / len(sweep)
                 raw_prob = counts / len(sweep)
-                mitigate_prob = mitigate(raw_prob, cm_inv)
-                data_res = np.append(data_res, mitigate_prob)
+                data_res = np.append(data_res, raw_prob)
             data_res = data_res.reshape(data_res_shape)
             self.all_magnitudes.append(data_res)
-        self.all_magnitudes = np.array(self.all_magnitudes)
+            cm_invs.append(cm_inv)
+        # The probabilities of all sweeps are mitigated at once
+        self.all_magnitudes = mitigate(
+            np.array(self.all_magnitudes), np.array(cm_invs)[:, np.newaxis]
+        )
 
         # Fitting the 1 state data
         self.magnitudes = self.all_magnitudes[:, :-3, 1]
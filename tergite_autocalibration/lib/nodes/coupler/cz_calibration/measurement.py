@@ -32,9 +32,9 @@ from quantify_scheduler.operations.pulse_library import (
 )
 from quantify_scheduler.resources import ClockResource
 
-from tergite_autocalibration.config.globals import REDIS_CONNECTION
 from tergite_autocalibration.config.legacy import dh
 from tergite_autocalibration.lib.base.measurement import BaseMeasurement
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
 from tergite_autocalibration.utils.dto.extended_coupler_edge import (
     ExtendedCompositeSquareEdge,
 )
@@ -143,7 +143,7 @@ class CZ_calibration(BaseMeasurement):
         for coupler in all_couplers:
             qubits = coupler.split(sep="_")
             for this_coupler in all_couplers:
-                redis_config = REDIS_CONNECTION.hgetall(f"couplers:{this_coupler}")
+                redis_config = get_parameter_cache().hgetall(f"couplers:{this_coupler}")
                 cz_pulse_frequency[this_coupler] = float(
                     redis_config["cz_pulse_frequency"]
                 )
@@ -368,7 +368,7 @@ class CZ_calibration_SSRO(BaseMeasurement):
         for coupler in all_couplers:
             qubits = coupler.split(sep="_")
             for this_coupler in all_couplers:
-                redis_config = REDIS_CONNECTION.hgetall(f"couplers:{this_coupler}")
+                redis_config = get_parameter_cache().hgetall(f"couplers:{this_coupler}")
                 cz_pulse_frequency[this_coupler] = float(
                     redis_config["cz_pulse_frequency"]
                 )
@@ -660,7 +660,7 @@ class CZ_calibration_duration(BaseMeasurement):
             qubits = coupler.split(sep="_")
             cz_frequency_values, cz_duration_values, cz_amplitude_values = [], [], []
             for qubit in qubits:
-                redis_config = REDIS_CONNECTION.hgetall(f"transmons:{qubit}")
+                redis_config = get_parameter_cache().hgetall(f"transmons:{qubit}")
                 cz_frequency_values.append(float(redis_config["cz_pulse_frequency"]))
                 cz_duration_values.append(float(redis_config["cz_pulse_duration"]))
 
@@ -15,7 +15,6 @@
 
 import numpy as np
 
-from tergite_autocalibration.config.globals import REDIS_CONNECTION
 from tergite_autocalibration.lib.base.node import BaseNode
 from tergite_autocalibration.lib.nodes.coupler.cz_chevron.cz_chevron_analysis import (
     CZChevronAnalysis,
@@ -24,6 +23,7 @@ from tergite_autocalibration.lib.nodes.coupler.cz_chevron.cz_firstStep_analysis
     CZFirstStepAnalysis,
 )
 from tergite_autocalibration.lib.nodes.coupler.cz_chevron.measurement import CZ_Chevron
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
 
 
 class CZ_Chevron_Node(BaseNode):
@@ -47,7 +47,9 @@ class CZ_Chevron_Node(BaseNode):
             print(f'{self.node_dictionary["cz_pulse_amplitude"] = }')
         except:
             amplitude = float(
-                REDIS_CONNECTION.hget(f"couplers:{self.coupler}", "cz_pulse_amplitude")
+                get_parameter_cache().hget(
+                    f"couplers:{self.coupler}", "cz_pulse_amplitude"
+                )
             )
             print(f"Amplitude found for coupler {self.coupler} : {amplitude}")
             if np.isnan(amplitude):
@@ -82,16 +84,24 @@ class CZ_Chevron_Node(BaseNode):
     def transition_frequency(self, coupler: str):
         coupled_qubits = coupler.split(sep="_")
         q1_f01 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[0]}", "clock_freqs:f01")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[0]}", "clock_freqs:f01"
+            )
         )
         q2_f01 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[1]}", "clock_freqs:f01")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[1]}", "clock_freqs:f01"
+            )
         )
         q1_f12 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[0]}", "clock_freqs:f12")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[0]}", "clock_freqs:f12"
+            )
         )
         q2_f12 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[1]}", "clock_freqs:f12")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[1]}", "clock_freqs:f12"
+            )
         )
         # ac_freq = np.abs(q1_f01 + q2_f01 - (q1_f01 + q1_f12))
         ac_freq = np.max(
@@ -164,16 +174,16 @@ class CZ_Characterisation_Chevron_Node(BaseNode):
     def transition_frequency(self, coupler: str):
         coupled_qubits = coupler.split(sep="_")
         q1_f01 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[0]}", "freq_01")
+            get_parameter_cache().hget(f"transmons:{coupled_qubits[0]}", "freq_01")
         )
         q2_f01 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[1]}", "freq_01")
+            get_parameter_cache().hget(f"transmons:{coupled_qubits[1]}", "freq_01")
         )
         q1_f12 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[0]}", "freq_12")
+            get_parameter_cache().hget(f"transmons:{coupled_qubits[0]}", "freq_12")
         )
         q2_f12 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[1]}", "freq_12")
+            get_parameter_cache().hget(f"transmons:{coupled_qubits[1]}", "freq_12")
         )
         # ac_freq = np.abs(q1_f01 + q2_f01 - (q1_f01 + q1_f12))
         ac_freq = np.min(
@@ -224,16 +234,16 @@ class CZ_Optimize_Chevron_Node(BaseNode):
     def transition_frequency(self, coupler: str):
         coupled_qubits = coupler.split(sep="_")
         q1_f01 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[0]}", "freq_01")
+            get_parameter_cache().hget(f"transmons:{coupled_qubits[0]}", "freq_01")
         )
         q2_f01 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[1]}", "freq_01")
+            get_parameter_cache().hget(f"transmons:{coupled_qubits[1]}", "freq_01")
         )
         q1_f12 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[0]}", "freq_12")
+            get_parameter_cache().hget(f"transmons:{coupled_qubits[0]}", "freq_12")
         )
         q2_f12 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[1]}", "freq_12")
+            get_parameter_cache().hget(f"transmons:{coupled_qubits[1]}", "freq_12")
         )
         # ac_freq = np.abs(q1_f01 + q2_f01 - (q1_f01 + q1_f12))
         ac_freq = np.max(
@@ -288,16 +298,24 @@ class CZ_Chevron_Sweep_Node(BaseNode):
     def transition_frequency(self, coupler: str):
         coupled_qubits = coupler.split(sep="_")
         q1_f01 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[0]}", "clock_freqs:f01")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[0]}", "clock_freqs:f01"
+            )
         )
         q2_f01 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[1]}", "clock_freqs:f01")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[1]}", "clock_freqs:f01"
+            )
         )
         q1_f12 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[0]}", "clock_freqs:f12")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[0]}", "clock_freqs:f12"
+            )
         )
         q2_f12 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[1]}", "clock_freqs:f12")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[1]}", "clock_freqs:f12"
+            )
         )
         # ac_freq = np.abs(q1_f01 + q2_f01 - (q1_f01 + q1_f12))
         ac_freq = np.max(
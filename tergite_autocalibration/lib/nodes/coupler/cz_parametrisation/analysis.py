@@ -10,7 +10,7 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 
-import warnings
+from pathlib import Path
 from typing import List, Tuple
 
 import matplotlib.patches as mpatches
@@ -18,6 +18,7 @@ import numpy as np
 import xarray as xr
 from matplotlib import pyplot as plt
 
+from tergite_autocalibration.config.globals import ENV
 from tergite_autocalibration.lib.base.analysis import (
     BaseAllCouplersRepeatAnalysis,
     BaseCouplerAnalysis,
@@ -26,6 +27,8 @@ from tergite_autocalibration.lib.base.analysis import (
 from tergite_autocalibration.lib.nodes.coupler.cz_parametrisation.utils.no_valid_combination_exception import (
     NoValidCombinationException,
 )
+from tergite_autocalibration.lib.utils.plot_rendering import get_plot_renderer
+from tergite_autocalibration.utils.io.dataset_utils import to_complex_dataset
 
 
 class CombinedFrequencyVsAmplitudeAnalysis:
@@ -72,7 +75,7 @@ class FrequencyVsAmplitudeQubitAnalysis(BaseQubitAnalysis):
         self.dataset = dataset
         self.qubit = qubit_var_name[1:]  # dataset.attrs["qubit"]
         self.coord = dataset.coords
-        self.S21 = dataset.isel(ReIm=0) + 1j * dataset.isel(ReIm=1)
+        self.S21 = to_complex_dataset(dataset)
         self.magnitudes = np.abs(self.S21)
         self._qoi = self.analyse_qubit()
 
@@ -338,13 +341,14 @@ class CZParametrisationFixDurationCouplerAnalysis(BaseCouplerAnalysis):
             name = "CZParametrisationFixDurationAnalysis_" + str(
                 self.current_values[index]
             )
-            try:
-                fig.savefig(
-                    f"{self.data_path}/{name}.png", bbox_inches="tight", dpi=400
+            if ENV.save_plots and ENV.plot_dpi > 0:
+                get_plot_renderer().save_figure(
+                    fig,
+                    {Path(self.data_path) / f"{name}.png": ENV.plot_dpi},
+                    tight_layout=False,
                 )
-            except FileNotFoundError:
-                warnings.warn("File Not existing")
-                pass
+            else:
+                plt.close(fig)
 
 
 class CZParametrizationFixDurationNodeAnalysis(BaseAllCouplersRepeatAnalysis):
@@ -12,7 +12,6 @@
 
 import numpy as np
 
-from tergite_autocalibration.config.globals import REDIS_CONNECTION
 from tergite_autocalibration.lib.nodes.coupler.cz_parametrisation.analysis import (
     CZParametrizationFixDurationNodeAnalysis,
 )
@@ -20,6 +19,7 @@ from tergite_autocalibration.lib.nodes.coupler.cz_parametrisation.measurement im
     CZParametrizationFixDuration,
 )
 from tergite_autocalibration.lib.nodes.schedule_node import ScheduleNode
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
 
 
 class CZParametrizationFixDurationNode(ScheduleNode):
@@ -81,16 +81,24 @@ class CZParametrizationFixDurationNode(ScheduleNode):
     def transition_frequency(self, coupler: str):
         coupled_qubits = coupler.split(sep="_")
         q1_f01 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[0]}", "clock_freqs:f01")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[0]}", "clock_freqs:f01"
+            )
         )
         q2_f01 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[1]}", "clock_freqs:f01")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[1]}", "clock_freqs:f01"
+            )
         )
         q1_f12 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[0]}", "clock_freqs:f12")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[0]}", "clock_freqs:f12"
+            )
         )
         q2_f12 = float(
-            REDIS_CONNECTION.hget(f"transmons:{coupled_qubits[1]}", "clock_freqs:f12")
+            get_parameter_cache().hget(
+                f"transmons:{coupled_qubits[1]}", "clock_freqs:f12"
+            )
         )
         # ac_freq = np.abs(q1_f01 + q2_f01 - (q1_f01 + q1_f12))
         ac_freq = np.max(
@@ -105,13 +113,15 @@ class CZParametrizationFixDurationNode(ScheduleNode):
 
     def coupler_current(self):
         current = float(
-            REDIS_CONNECTION.hget(f"couplers:{self.couplers[0]}", "parking_current")
+            get_parameter_cache().hget(
+                f"couplers:{self.couplers[0]}", "parking_current"
+            )
         )
         return current
 
     def coupler_current_range(self):
         current_range = float(
-            REDIS_CONNECTION.hget(f"couplers:{self.couplers[0]}", "current_range")
+            get_parameter_cache().hget(f"couplers:{self.couplers[0]}", "current_range")
         )
         return current_range
 
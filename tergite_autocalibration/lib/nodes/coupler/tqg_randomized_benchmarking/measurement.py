@@ -15,7 +15,7 @@ import numpy as np
 from quantify_scheduler import Schedule
 from quantify_scheduler.enums import BinMode
 from quantify_scheduler.operations.control_flow_library import Loop
-from quantify_scheduler.operations.gate_library import Reset, X
+from quantify_scheduler.operations.gate_library import CZ, Reset, Rxy, X
 from quantify_scheduler.operations.pulse_library import IdlePulse
 from quantify_scheduler.resources import ClockResource
 
@@ -28,24 +28,59 @@ from tergite_autocalibration.utils.dto.extended_gates import (
     Measure_RO_3state_Opt,
 )
 from tergite_autocalibration.utils.dto.extended_transmon_element import ExtendedTransmon
-from tergite_autocalibration.utils.logger.tac_logger import logger
-
-try:
-    from superconducting_qubit_tools.clifford_module.randomized_benchmarking import (
-        randomized_benchmarking_sequence,
-    )
-    from superconducting_qubit_tools.clifford_module.cliffords_decomposition import (
-        decompose_clifford_seq,
-    )
-    from superconducting_qubit_tools.utils.clifford_module.from_list import (
-        add_two_qubit_gates_to_schedule,
-    )
-except ImportError:
-    logger.warning(
-        "Could not find package: superconducting-qubit-tools.",
-        "This is a proprietary licenced software.",
-        "Please make sure that you are having a correct licence and install the dependency",
-    )
+from tergite_autocalibration.utils.two_qubit_clifford_group import (
+    PADDING,
+    get_two_qubit_clifford_group,
+    native_gates,
+)
+
+
+def _add_two_qubit_cliffords(
+    schedule: Schedule,
+    cliffords: np.ndarray,
+    qubits: list[str],
+    ref_op,
+    separation_time: float = 300e-9,
+):
+    """
+    Add the native gates of a sequence of two qubit Cliffords to the schedule.
+
+    Args:
+        schedule: Schedule to add the gates to
+        cliffords: Indices of the Cliffords in the order they are applied
+        qubits: The qubits q0 and q1 of the Cliffords
+        ref_op: Operation after which the sequence starts
+        separation_time: Idle time between two Cliffords
+
+    Returns:
+        The operation that ends the sequence
+    """
+    last_operation = ref_op
+    for clifford_index, clifford in enumerate(cliffords):
+        if clifford_index > 0:
+            last_operation = schedule.add(
+                IdlePulse(separation_time), ref_op=last_operation
+            )
+        for layer in native_gates(clifford):
+            if layer == "CZ":
+                last_operation = schedule.add(
+                    CZ(qubits[0], qubits[1]), ref_op=last_operation
+                )
+                continue
+            # The rotations of both qubits start together, the longer one ends the layer
+            layer_start = last_operation
+            chains = sorted(
+                zip(qubits, layer), key=lambda chain: len(chain[1]), reverse=True
+            )
+            for chain_index, (qubit, rotations) in enumerate(chains):
+                operation = layer_start
+                for theta, phi in rotations:
+                    operation = schedule.add(
+                        Rxy(theta=theta, phi=phi, qubit=qubit), ref_op=operation
+                    )
+                if chain_index == 0:
+                    last_operation = operation
+    return last_operation
 
 
 class TQGRandomizedBenchmarkingSSRO(BaseMeasurement):
@@ -145,44 +180,35 @@ class TQGRandomizedBenchmarkingSSRO(BaseMeasurement):
         # for this_qubit, clifford_sequence_lengths in number_of_cliffords.items():
         clifford_sequence_lengths = list(number_of_cliffords.values())[0]
 
-        # all_cliffords = len(cliffords.XY_decompositions)
-        # rng = np.random.default_rng(seeds)
+        # All random sequences and their recovery Cliffords at once
+        clifford_group = get_two_qubit_clifford_group()
+        random_sequences, recovery_cliffords = clifford_group.random_sequences(
+            [seeds[next(iter(seeds))]],
+            clifford_sequence_lengths[:-3],
+            interleaving_clifford=interleaving_clifford_id,
+        )
 
         # The inner for loop iterates over the random clifford sequence lengths
         for acq_index, this_number_of_cliffords in enumerate(
             clifford_sequence_lengths[:-3]
         ):
-            # schedule.add(X(this_qubit))
-            # random_sequence = rng.integers(all_cliffords, size=this_number_of_cliffords)
-
             start = shot.add(IdlePulse(16e-9))
 
-            # for clifford_index, sequence_index in enumerate(random_sequence):
-            # n_cl = 1
-            index = 0
-
-            clifford_seq = randomized_benchmarking_sequence(
-                n_cl=this_number_of_cliffords,
-                meas_basis_index=index,
-                seed=seeds[next(iter(seeds))],
-                interleaving_clifford_id=interleaving_clifford_id,
-                apply_inverse_gate=apply_inverse_gate,
-                number_of_qubits=2,
-            )
-            # print('clifford sequence is: ', clifford_seq)
-            physical_gates = decompose_clifford_seq(
-                clifford_seq, [qubits[0], qubits[1]]
-            )
-            # print('physical gates are: ', physical_gates)
-            separation_time = 300e-9
-            # schedule = Schedule('rb_sequence_generation')
+            clifford_seq = random_sequences[0, acq_index]
+            clifford_seq = clifford_seq[clifford_seq != PADDING]
+            if apply_inverse_gate:
+                clifford_seq = np.append(clifford_seq, recovery_cliffords[0, acq_index])
             reset = shot.add(Reset(*qubits))
 
-            add_two_qubit_gates_to_schedule(
-                shot, physical_gates, ref_op=reset, separation_time=separation_time
+            last_gate = _add_two_qubit_cliffords(
+                shot,
+                clifford_seq,
+                [qubits[0], qubits[1]],
+                ref_op=reset,
+                separation_time=300e-9,
             )
 
-            buffer = shot.add(IdlePulse(20e-9))
+            buffer = shot.add(IdlePulse(20e-9), ref_op=last_gate)
             for this_qubit in qubits:
                 this_index = acq_index
 
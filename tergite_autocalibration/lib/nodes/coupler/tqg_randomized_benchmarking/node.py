@@ -19,6 +19,7 @@ from pathlib import Path
 import numpy as np
 import optuna
 
+from tergite_autocalibration.config.globals import REDIS_CONNECTION
 from tergite_autocalibration.config.legacy import dh
 from tergite_autocalibration.lib.nodes.characterization.randomized_benchmarking.analysis import (
     RandomizedBenchmarkingSSRONodeAnalysis,
@@ -34,7 +35,8 @@ from tergite_autocalibration.lib.nodes.coupler.tqg_randomized_benchmarking.measu
     TQGRandomizedBenchmarkingSSRO,
 )
 from tergite_autocalibration.lib.nodes.schedule_node import ScheduleNode
-from tergite_autocalibration.lib.utils import redis
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
+from tergite_autocalibration.utils.two_qubit_clifford_group import CZ_CLIFFORD_INDEX
 
 RB_REPEATS = 10
 
@@ -113,7 +115,7 @@ class TQGRandomizedBenchmarkingInterleavedSSRONode(ScheduleNode):
         self.backup = False
 
         self.qubit_state = 2
-        self.schedule_keywords["interleaving_clifford_id"] = 4386
+        self.schedule_keywords["interleaving_clifford_id"] = CZ_CLIFFORD_INDEX
         self.schedule_keywords["qubit_state"] = self.qubit_state
         # TODO change it a dictionary like samplespace
         self.external_samplespace = {
@@ -171,7 +173,7 @@ class CZRBOptimizeSSRONode(ScheduleNode):
         self.qubit_type_list = ["Control", "Target"]
         # if self.swap:
         #     qubit_type_list.reverse()
-        self.redis_connection = redis.Redis(decode_responses=True)
+        self.redis_connection = REDIS_CONNECTION
         measurement_start = datetime.now()
         self.time_id = measurement_start.strftime("%Y%m%d_%H%M%S")
         self.log_path = "cz_optimization/" + self.time_id + "/"
@@ -190,6 +192,11 @@ class CZRBOptimizeSSRONode(ScheduleNode):
             f"couplers:{self.coupler}"
         )
 
+    def _store_cz_param(self, cz_param: dict):
+        if cz_param:
+            self.redis_connection.hset(f"couplers:{self.coupler}", mapping=cz_param)
+            get_parameter_cache().invalidate(f"couplers:{self.coupler}")
+
     def objective(self, trial):
         param_dict = {}
         for param in self.full_params:
@@ -238,8 +245,7 @@ class CZRBOptimizeSSRONode(ScheduleNode):
 
         print("cz_param is:", cz_param)
 
-        for key, value in cz_param.items():
-            self.redis_connection.hset(f"couplers:{self.coupler}", key, value)
+        self._store_cz_param(cz_param)
 
         node_dynamic_phase = CZDynamicPhaseSSRONode(
             "cz_dynamic_phase", self.all_qubits, self.couplers
@@ -290,8 +296,7 @@ class CZRBOptimizeSSRONode(ScheduleNode):
                 ]
             )
 
-        for key, value in cz_param.items():
-            self.redis_connection.hset(f"couplers:{self.coupler}", key, value)
+        self._store_cz_param(cz_param)
 
         rb_node = TQGRandomizedBenchmarkingInterleavedSSRONode(
             "tqg_randomized_benchmarking_interleaved_ssro",
@@ -330,8 +335,7 @@ class CZRBOptimizeSSRONode(ScheduleNode):
                 - param_dict["cz_amplitude"][self.coupler]
             )
 
-        for key, value in original_cz_param.items():
-            self.redis_connection.hset(f"couplers:{self.coupler}", key, value)
+        self._store_cz_param(original_cz_param)
 
         # print(f"Results: {results}")
         self.all_results_list.append(
@@ -413,8 +417,7 @@ class CZRBOptimizeSSRONode(ScheduleNode):
                 + param_dict["cz_amplitude"][self.coupler]
             )
 
-        for key, value in cz_param.items():
-            self.redis_connection.hset(f"couplers:{self.coupler}", key, value)
+        self._store_cz_param(cz_param)
 
         node_dynamic_phase = CZDynamicPhaseSSRONode(
             "cz_dynamic_phase", self.all_qubits, self.couplers, **self.schedule_keywords
@@ -465,8 +468,7 @@ class CZRBOptimizeSSRONode(ScheduleNode):
                 ]
             )
 
-        for key, value in cz_param.items():
-            self.redis_connection.hset(f"couplers:{self.coupler}", key, value)
+        self._store_cz_param(cz_param)
 
         rb_node = TQGRandomizedBenchmarkingInterleavedSSRONode(
             "tqg_randomized_benchmarking_interleaved_ssro",
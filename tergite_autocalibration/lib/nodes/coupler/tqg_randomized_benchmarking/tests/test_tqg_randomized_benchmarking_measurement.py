@@ -0,0 +1,71 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+from quantify_scheduler import Schedule
+from quantify_scheduler.operations.gate_library import Reset
+from quantify_scheduler.operations.pulse_library import IdlePulse
+
+from tergite_autocalibration.lib.nodes.coupler.tqg_randomized_benchmarking.measurement import (
+    _add_two_qubit_cliffords,
+)
+from tergite_autocalibration.utils.two_qubit_clifford_group import (
+    CZ_CLIFFORD_INDEX,
+    native_gates,
+)
+
+
+def _operation_chain(schedule: Schedule, last_schedulable) -> list:
+    # Operations from the last one back to the start of the sequence
+    chain = []
+    schedulable = last_schedulable
+    while schedulable is not None:
+        chain.append(schedule.operations[schedulable["operation_id"]])
+        reference = schedulable["timing_constraints"][0]["ref_schedulable"]
+        schedulable = schedule.schedulables.get(reference)
+    return chain[::-1]
+
+
+def _chain_length(clifford: int) -> int:
+    # The longer chain of rotations of a layer ends it
+    return sum(
+        1 if layer == "CZ" else max(len(rotations) for rotations in layer)
+        for layer in native_gates(clifford)
+    )
+
+
+def test_cliffords_are_separated():
+    schedule = Schedule("two_qubit_cliffords")
+    reset = schedule.add(Reset("q0", "q1"))
+
+    last_operation = _add_two_qubit_cliffords(
+        schedule,
+        [CZ_CLIFFORD_INDEX, 1, CZ_CLIFFORD_INDEX],
+        ["q0", "q1"],
+        ref_op=reset,
+        separation_time=300e-9,
+    )
+
+    chain = _operation_chain(schedule, last_operation)
+    idles = [
+        index
+        for index, operation in enumerate(chain)
+        if isinstance(operation, IdlePulse)
+    ]
+    assert len(idles) == 2
+    assert all(chain[index].duration == 300e-9 for index in idles)
+    # The reset, each Clifford and an idle time between two Cliffords
+    assert idles == [
+        1 + _chain_length(CZ_CLIFFORD_INDEX),
+        2 + _chain_length(CZ_CLIFFORD_INDEX) + _chain_length(1),
+    ]
+    assert len(chain) == 3 + 2 * _chain_length(CZ_CLIFFORD_INDEX) + _chain_length(1)
+    assert isinstance(chain[0], Reset)
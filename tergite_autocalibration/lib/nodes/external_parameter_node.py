@@ -14,6 +14,7 @@ import numpy as np
 from quantify_scheduler.instrument_coordinator.utility import xarray
 
 from tergite_autocalibration.lib.base.node import BaseNode
+from tergite_autocalibration.utils.io.dataset_utils import StreamingDatasetWriter
 from tergite_autocalibration.utils.measurement_utils import reduce_samplespace
 
 
@@ -46,33 +47,33 @@ class ExternalParameterNode(BaseNode):
         iterations = self.external_dimensions
         external_dim = list(self.external_samplespace.keys())[0]
 
-        result_dataset = xarray.Dataset()
-
         compiled_schedule = self.precompile(self.schedule_samplespace)
 
-        self.initial_operation()
+        with StreamingDatasetWriter(external_dim) as writer:
+            self.initial_operation()
 
-        for current_iteration in range(iterations):
-            self.reduced_external_samplespace = reduce_samplespace(
-                current_iteration, self.external_samplespace
-            )
-            element_dict = list(self.reduced_external_samplespace.values())[0]
-            current_value = list(element_dict.values())[0]
+            for current_iteration in range(iterations):
+                self.reduced_external_samplespace = reduce_samplespace(
+                    current_iteration, self.external_samplespace
+                )
+                element_dict = list(self.reduced_external_samplespace.values())[0]
+                current_value = list(element_dict.values())[0]
 
-            self.pre_measurement_operation(
-                reduced_ext_space=self.reduced_external_samplespace
-            )
+                self.pre_measurement_operation(
+                    reduced_ext_space=self.reduced_external_samplespace
+                )
 
-            ds = self.measure_compiled_schedule(
-                compiled_schedule,
-                cluster_status,
-                measurement=(current_iteration, iterations),
-            )
+                ds = self.measure_compiled_schedule(
+                    compiled_schedule,
+                    cluster_status,
+                    measurement=(current_iteration, iterations),
+                )
 
-            ds = ds.expand_dims({external_dim: np.array([current_value])})
-            result_dataset = xarray.merge([ds, result_dataset])
+                ds = ds.expand_dims({external_dim: np.array([current_value])})
+                writer.append(ds)
 
-        # example of final Operation is ramping the current back to 0 in coupler spectroscopy
-        self.final_operation()
+            # example of final Operation is ramping the current back to 0 in coupler spectroscopy
+            self.final_operation()
 
+            result_dataset = writer.result()
         return result_dataset
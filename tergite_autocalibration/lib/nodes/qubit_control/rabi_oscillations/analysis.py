@@ -24,6 +24,7 @@ from tergite_autocalibration.lib.base.analysis import (
     BaseAllQubitsAnalysis,
     BaseQubitAnalysis,
 )
+from tergite_autocalibration.lib.utils.batched_fitting import Traces
 from tergite_autocalibration.utils.backend.redis_utils import fetch_redis_params
 
 
@@ -85,32 +86,30 @@ class RabiQubitAnalysis(BaseQubitAnalysis):
         self.amplitudes = ""
         self.fit_results = {}
 
-    def analyse_qubit(self):
+    def traces_to_fit(self):
         model = RabiModel()
 
         coord = list(self.dataset[self.data_var].coords.keys())[0]
         self.amplitudes = self.dataset[coord].values
 
+        # Gives an initial guess for the model parameters, the model is fitted for all qubits at once.
+        magnitudes = self.magnitudes[self.data_var].values
+        guess = model.guess(magnitudes, drive_amp=self.amplitudes)
+        return Traces(
+            model, magnitudes[np.newaxis], [guess], {"drive_amp": self.amplitudes}
+        )
+
+    def analyse_qubit(self):
+        fit_result = self.fitted_traces()[0]
+
         self.fit_amplitudes = np.linspace(
             self.amplitudes[0], self.amplitudes[-1], 400
         )  # x-values for plotting
 
-        # Gives an initial guess for the model parameters and then fits the model to the data.
-        guess = model.guess(
-            self.magnitudes[self.data_var].values, drive_amp=self.amplitudes
-        )
-        fit_result = model.fit(
-            self.magnitudes[self.data_var].values,
-            params=guess,
-            drive_amp=self.amplitudes,
-        )
-
         self.ampl = fit_result.params["amp180"].value
         self.uncertainty = fit_result.params["amp180"].stderr
 
-        self.fit_y = model.eval(
-            fit_result.params, **{model.independent_vars[0]: self.fit_amplitudes}
-        )
+        self.fit_y = fit_result.eval(drive_amp=self.fit_amplitudes)
         return [self.ampl]
 
     def plotter(self, ax):
@@ -20,11 +20,12 @@ from quantify_core.analysis.fitting_models import (
     fft_freq_phase_guess,
 )
 
-from tergite_autocalibration.config.globals import REDIS_CONNECTION
 from tergite_autocalibration.lib.base.analysis import (
     BaseAllQubitsAnalysis,
     BaseQubitAnalysis,
 )
+from tergite_autocalibration.lib.utils.batched_fitting import Traces
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
 
 
 class RamseyModel(lmfit.model.Model):
@@ -70,38 +71,39 @@ class RamseyDetuningsBaseQubitAnalysis(BaseQubitAnalysis):
         super().__init__(name, redis_fields)
         self.redis_field = ""
 
-    def analyse_qubit(self):
+    def traces_to_fit(self):
         for coord in self.dataset[self.data_var].coords:
             if "delay" in coord:
                 self.delay_coord = coord
             elif "detuning" in coord:
                 self.detuning_coord = coord
         self.artificial_detunings = self.dataset.coords[self.detuning_coord].values
+
+        model = RamseyModel()
+        self.ramsey_delays = self.dataset.coords[self.delay_coord].values
+
+        magnitudes = np.absolute(
+            self.magnitudes[self.data_var].transpose(self.detuning_coord, ...).values
+        )
+        magnitudes = magnitudes.reshape(len(self.artificial_detunings), -1)
+
+        # Gives an initial guess for the model parameters of every detuning
+        guesses = [model.guess(trace, t=self.ramsey_delays) for trace in magnitudes]
+        return Traces(model, magnitudes, guesses, {"t": self.ramsey_delays})
+
+    def analyse_qubit(self):
         redis_key = f"transmons:{self.qubit}"
-        redis_value = REDIS_CONNECTION.hget(f"{redis_key}", self.redis_field)
+        redis_value = get_parameter_cache().hget(f"{redis_key}", self.redis_field)
         self.qubit_frequency = float(redis_value)
 
         self.fit_results = {}
 
-        model = RamseyModel()
-        ramsey_delays = self.dataset.coords[self.delay_coord].values
-        self.fit_ramsey_delays = np.linspace(ramsey_delays[0], ramsey_delays[-1], 400)
-
         # ToDo: make this a data member and plot all nested fits
-        fits = []
-        for indx, detuning in enumerate(self.dataset.coords[self.detuning_coord]):
-            complex_values = self.magnitudes[self.data_var].isel(
-                {self.detuning_coord: [indx]}
-            )
-            magnitudes = np.array(np.absolute(complex_values.values).flat)
-            guess = model.guess(magnitudes, t=ramsey_delays)
-            fit_result = model.fit(magnitudes, params=guess, t=ramsey_delays)
-            fit_y = model.eval(
-                fit_result.params, **{model.independent_vars[0]: self.fit_ramsey_delays}
-            )
-            fitted_detuning = fit_result.params["frequency"].value
-            fits.append(fitted_detuning)
-        fits = np.array(fits)
+        fits = self.fitted_traces()
+        self.fit_ramsey_delays = np.linspace(
+            self.ramsey_delays[0], self.ramsey_delays[-1], 400
+        )
+        fits = np.array([fit_result.best_values["frequency"] for fit_result in fits])
         index_of_min = np.argmin(fits)
         self.fitted_detunings = np.concatenate(
             (fits[:index_of_min] * (-1), fits[index_of_min:])
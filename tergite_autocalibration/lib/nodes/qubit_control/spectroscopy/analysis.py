@@ -25,6 +25,7 @@ from tergite_autocalibration.lib.base.analysis import (
     BaseAllQubitsAnalysis,
     BaseQubitAnalysis,
 )
+from tergite_autocalibration.lib.utils.batched_fitting import Traces
 
 
 # Lorentzian function that is fit to qubit spectroscopy peaks
@@ -97,7 +98,7 @@ class QubitSpectroscopyAnalysis(BaseQubitAnalysis):
         super().__init__(name, redis_fields)
         self.fit_results = {}
 
-    def analyse_qubit(self):
+    def traces_to_fit(self):
         # Fetch the resulting measurement variables
         for coord in self.dataset[self.data_var].coords:
             if "frequencies" in coord:
@@ -108,31 +109,30 @@ class QubitSpectroscopyAnalysis(BaseQubitAnalysis):
         self.frequencies_value = self.dataset[self.frequencies].values
 
         if not self.has_peak():
+            return None
+
+        # Initialize the Lorentzian model
+        model = LorentzianModel()
+
+        # Gives an initial guess for the model parameters, the model is fitted for all qubits at once.
+        magnitudes = self.magnitudes.to_dataarray().values
+        guess = model.guess(magnitudes, x=self.frequencies_value)
+        return Traces(model, magnitudes, [guess], {"x": self.frequencies_value})
+
+    def analyse_qubit(self):
+        fits = self.fitted_traces()
+        if not fits:
             return [np.mean(self.frequencies_value)]
 
         self.fit_freqs = np.linspace(
             self.frequencies_value[0], self.frequencies_value[-1], 500
         )  # x-values for plotting
 
-        # Initialize the Lorentzian model
-        model = LorentzianModel()
-
-        # Gives an initial guess for the model parameters and then fits the model to the data.
-        guess = model.guess(
-            self.magnitudes.to_dataarray().values, x=self.frequencies_value
-        )
-        fit_result = model.fit(
-            self.magnitudes.to_dataarray().values,
-            params=guess,
-            x=self.frequencies_value,
-        )
-
+        fit_result = fits[0]
         self.freq = fit_result.params["x0"].value
         self.uncertainty = fit_result.params["x0"].stderr
 
-        self.fit_y = model.eval(
-            fit_result.params, **{model.independent_vars[0]: self.fit_freqs}
-        )
+        self.fit_y = fit_result.eval(x=self.fit_freqs)
 
         return self.freq
 
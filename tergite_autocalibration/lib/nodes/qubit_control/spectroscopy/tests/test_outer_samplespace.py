@@ -0,0 +1,132 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import quantify_scheduler
+from quantify_scheduler.device_under_test.quantum_device import QuantumDevice
+
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.lib.base import node as base_node
+from tergite_autocalibration.lib.nodes.qubit_control.spectroscopy import (
+    node as spectroscopy_node,
+)
+from tergite_autocalibration.lib.utils.device import DeviceConfiguration
+from tergite_autocalibration.lib.utils.schedule_compilation import _flatten_leaves
+from tergite_autocalibration.utils.dto.extended_transmon_element import (
+    ExtendedTransmon,
+)
+from tergite_autocalibration.utils.measurement_utils import reduce_samplespace
+
+NUMBER_OF_CHUNKS = 6
+
+
+@pytest.fixture(name="device_configuration")
+def fixture_device_configuration(monkeypatch):
+    hardware_config_path = os.path.join(
+        os.path.dirname(quantify_scheduler.__file__),
+        "schemas",
+        "examples",
+        "qblox_hardware_config_transmon.json",
+    )
+    with open(hardware_config_path) as f:
+        hardware_config = json.load(f)
+
+    device = QuantumDevice("test_outer_samplespace_device")
+    transmon = ExtendedTransmon("q0")
+    # The clock is defined by the spectroscopy schedule
+    transmon.clock_freqs.f01(np.nan)
+    transmon.clock_freqs.readout(7e9)
+    transmon.measure.acq_delay(100e-9)
+    transmon.spec.spec_duration(1e-6)
+    transmon.spec.spec_ampl_optimal(0.01)
+    device.add_element(transmon)
+    device.hardware_config(hardware_config)
+
+    device_configuration = DeviceConfiguration(["q0"], None)
+    device_configuration.device = device
+    device_configuration.transmons = {"q0": transmon}
+    device_manager = SimpleNamespace(
+        get_device_configuration=lambda qubits, couplers: device_configuration
+    )
+    monkeypatch.setattr(base_node, "get_device_manager", lambda: device_manager)
+
+    yield device_configuration
+
+    device.close()
+    transmon.close()
+
+
+@pytest.mark.parametrize("schedule_templates", [False, True])
+def test_frequency_chunks_through_the_schedule_template(
+    monkeypatch, device_configuration, schedule_templates
+):
+    monkeypatch.setattr(ENV, "schedule_templates", schedule_templates)
+    monkeypatch.setattr(ENV, "schedule_cache", False)
+    monkeypatch.setattr(
+        spectroscopy_node,
+        "qubit_samples",
+        lambda qubit, transition="01": np.linspace(4.9e9, 4.904e9, 5),
+    )
+    node = spectroscopy_node.Qubit_01_Spectroscopy_Multidim_Node(
+        "qubit_01_spectroscopy", ["q0"]
+    )
+    # A frequency sweep split into chunks shifted by 5 MHz
+    node.schedule_samplespace = {"spec_pulse_amplitudes": {"q0": np.array([0.01])}}
+    node.outer_schedule_samplespace = {
+        "spec_frequencies": {
+            "q0": np.array(
+                [
+                    np.linspace(4.9e9, 4.904e9, 5) + chunk * 5e6
+                    for chunk in range(NUMBER_OF_CHUNKS)
+                ]
+            )
+        }
+    }
+    reduced_outer_samplespaces = [
+        reduce_samplespace(iteration, node.outer_schedule_samplespace)
+        for iteration in range(node.outer_schedule_dimensions)
+    ]
+
+    precompile = node.precompile
+    compiled_samplespaces = []
+
+    def counting_precompile(samplespace):
+        compiled_samplespaces.append(samplespace)
+        return precompile(samplespace)
+
+    monkeypatch.setattr(node, "precompile", counting_precompile)
+
+    compile_iteration = node._compile_outer_iterations(reduced_outer_samplespaces)
+    compiled_schedules = [
+        compile_iteration(iteration) for iteration in range(NUMBER_OF_CHUNKS)
+    ]
+
+    # Two reference and two validation chunks are compiled
+    assert len(compiled_samplespaces) == (4 if schedule_templates else 6)
+    for reduced_outer_samplespace, compiled_schedule in zip(
+        reduced_outer_samplespaces, compiled_schedules
+    ):
+        expected_schedule = precompile(
+            node.schedule_samplespace | reduced_outer_samplespace
+        )
+        values, expected_values = [], []
+        assert _flatten_leaves(
+            compiled_schedule.compiled_instructions, values, []
+        ) == _flatten_leaves(
+            expected_schedule.compiled_instructions, expected_values, []
+        )
+        np.testing.assert_allclose(values, expected_values, rtol=1e-12)
@@ -18,11 +18,11 @@ import numpy as np
 import xarray as xr
 from quantify_core.analysis import fitting_models as fm
 
-from tergite_autocalibration.config.globals import REDIS_CONNECTION
 from tergite_autocalibration.lib.base.analysis import (
     BaseAllQubitsAnalysis,
     BaseQubitAnalysis,
 )
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
 
 model = fm.ResonatorModel()
 
@@ -119,7 +119,7 @@ class ResonatorSpectroscopy1QubitAnalysis(ResonatorSpectroscopyQubitAnalysis):
         ax.set_xlabel("Frequency (Hz)")
         ax.set_ylabel("|S21| (V)")
         ro_freq = float(
-            REDIS_CONNECTION.hget(f"transmons:{this_qubit}", "clock_freqs:readout")
+            get_parameter_cache().hget(f"transmons:{this_qubit}", "clock_freqs:readout")
         )
         self.fitting_model.plot_fit(ax, numpoints=400, xlabel=None, title=None)
         ax.axvline(self.minimum_freq, c="green", ls="solid", label="frequency |1> ")
@@ -137,10 +137,10 @@ class ResonatorSpectroscopy2QubitAnalysis(ResonatorSpectroscopyQubitAnalysis):
         ax.set_xlabel("Frequency (Hz)")
         ax.set_ylabel("|S21| (V)")
         ro_freq = float(
-            REDIS_CONNECTION.hget(f"transmons:{this_qubit}", "clock_freqs:readout")
+            get_parameter_cache().hget(f"transmons:{this_qubit}", "clock_freqs:readout")
         )
         ro_freq_1 = float(
-            REDIS_CONNECTION.hget(
+            get_parameter_cache().hget(
                 f"transmons:{this_qubit}", "extended_clock_freqs:readout_1"
             )
         )
@@ -12,18 +12,25 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 
+from typing import Optional
+
 import matplotlib.patches as mpatches
 import numpy as np
 from numpy.linalg import inv
-from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
-from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
+from sklearn.metrics import ConfusionMatrixDisplay
 
 from tergite_autocalibration.config.globals import REDIS_CONNECTION
 from tergite_autocalibration.lib.base.analysis import (
     BaseQubitAnalysis,
     BaseAllQubitsAnalysis,
 )
-from tergite_autocalibration.tools.mss.convert import structured_redis_storage
+from tergite_autocalibration.lib.utils.discriminant import (
+    LinearDiscriminants,
+    assignment_fidelities,
+    confusion_matrices,
+    fit_linear_discriminants,
+)
+from tergite_autocalibration.utils.backend.redis_utils import ParameterBatch
 
 
 class OptimalROAmplitudeQubitAnalysis(BaseQubitAnalysis):
@@ -62,26 +69,22 @@ class OptimalROAmplitudeQubitAnalysis(BaseQubitAnalysis):
         return np.array([I, Q]).T
 
     def run_initial_fitting(self):
-        self.fidelities = []
-        self.cms = []
-
         y = self.qubit_states
-        n_states = len(y)
 
-        self.lda = LinearDiscriminantAnalysis(solver="svd", store_covariance=True)
+        # The shots of all amplitudes are discriminated at once, in the order of IQ()
+        IQ_complex = self.S21[self.data_var].transpose(self.amplitude_coord, ...)
+        IQ_complex = IQ_complex.values.reshape(len(self.amplitudes), -1)
+        iq = np.stack([IQ_complex.real, IQ_complex.imag], axis=-1)
 
-        for index, ro_amplitude in enumerate(self.amplitudes):
-            iq = self.IQ(index)
-            y_pred = self.lda.fit(iq, y).predict(iq)
-
-            cm_norm = confusion_matrix(y, y_pred, normalize="true")
-            assignment = np.trace(cm_norm) / n_states
-            self.fidelities.append(assignment)
-            self.cms.append(cm_norm)
+        self.discriminants = fit_linear_discriminants(iq, y)
+        y_pred = self.discriminants.predict(iq)
+        self.cms = confusion_matrices(y, y_pred, self.discriminants.classes_)
+        self.fidelities = assignment_fidelities(self.cms)
 
         self.optimal_index = np.argmax(self.fidelities)
         self.optimal_amplitude = self.amplitudes.values[self.optimal_index]
         self.optimal_inv_cm = inv(self.cms[self.optimal_index])
+        self.lda = self.discriminants[self.optimal_index]
 
         return
 
@@ -105,7 +108,7 @@ class OptimalROAmplitudeQubitAnalysis(BaseQubitAnalysis):
 
 
 class Three_Class_Boundary:
-    def __init__(self, lda: LinearDiscriminantAnalysis):
+    def __init__(self, lda: LinearDiscriminants):
         if len(lda.classes_) != 3:
             raise ValueError("The Classifcation classes are not 3.")
         A0 = lda.coef_[0][0]
@@ -201,16 +204,15 @@ class OptimalROTwoStateAmplitudeQubitAnalysis(OptimalROAmplitudeQubitAnalysis):
         y = self.qubit_states
 
         optimal_IQ = self.IQ(self.optimal_index)
-        optimal_y = self.lda.fit(optimal_IQ, y).predict(optimal_IQ)
+        optimal_y = self.lda.predict(optimal_IQ)
 
         # determining the discriminant line from the canonical form Ax + By + intercept = 0
         A = self.lda.coef_[0][0]
         B = self.lda.coef_[0][1]
         intercept = self.lda.intercept_
         self.lamda = -A / B
-        theta = np.rad2deg(np.arctan(self.lamda))
-        threshold = np.abs(intercept) / np.sqrt(A**2 + B**2)
-        threshold = threshold[0]
+        theta = self.lda.rotation
+        threshold = self.lda.threshold
 
         self.y_intecept = +intercept / B
 
@@ -273,32 +275,39 @@ class OptimalROTwoStateAmplitudeQubitAnalysis(OptimalROAmplitudeQubitAnalysis):
         disp = ConfusionMatrixDisplay(confusion_matrix=optimal_confusion_matrix)
         disp.plot(ax=cm_axis)
 
-    def update_redis_trusted_values(self, node: str, this_element: str):
+    def update_redis_trusted_values(
+        self, node: str, this_element: str, batch: Optional[ParameterBatch] = None
+    ):
         """
         TODO: This method is a temporary solution to store the discriminator until we switch to ThresholdedAcquisition
         Args:
             node: The parent node
             this_element: Name of the qubit e.g. 'q12'
+            batch: Batch to add the values to, it is written by the caller.
+                   If None, the values are written immediately.
 
         Returns:
 
         """
-        super().update_redis_trusted_values(node, this_element)
+        write_batch = batch is None
+        if write_batch:
+            batch = ParameterBatch()
+        super().update_redis_trusted_values(node, this_element, batch)
 
         # We read coefficients and intercept from the lda model
         coef_0_ = str(float(self.lda.coef_[0][0]))
         coef_1_ = str(float(self.lda.coef_[0][1]))
         intercept_ = str(float(self.lda.intercept_[0]))
 
-        # We update the values in redis
-        REDIS_CONNECTION.hset(f"transmons:{this_element}", "lda_coef_0", coef_0_)
-        REDIS_CONNECTION.hset(f"transmons:{this_element}", "lda_coef_1", coef_1_)
-        REDIS_CONNECTION.hset(f"transmons:{this_element}", "lda_intercept", intercept_)
-
-        # We also update the values in the redis standard storage
-        structured_redis_storage("lda_coef_0", this_element.strip("q"), coef_0_)
-        structured_redis_storage("lda_coef_1", this_element.strip("q"), coef_1_)
-        structured_redis_storage("lda_intercept", this_element.strip("q"), intercept_)
+        # We update the values in redis and in the redis standard storage
+        component_id = this_element.strip("q")
+        batch.add(f"transmons:{this_element}", "lda_coef_0", coef_0_, component_id)
+        batch.add(f"transmons:{this_element}", "lda_coef_1", coef_1_, component_id)
+        batch.add(
+            f"transmons:{this_element}", "lda_intercept", intercept_, component_id
+        )
+        if write_batch:
+            batch.write(REDIS_CONNECTION)
 
 
 class OptimalROThreeStateAmplitudeQubitAnalysis(OptimalROAmplitudeQubitAnalysis):
@@ -315,7 +324,7 @@ class OptimalROThreeStateAmplitudeQubitAnalysis(OptimalROAmplitudeQubitAnalysis)
         y = self.qubit_states
 
         optimal_IQ = self.IQ(self.optimal_index)
-        optimal_y = self.lda.fit(optimal_IQ, y).predict(optimal_IQ)
+        optimal_y = self.lda.predict(optimal_IQ)
 
         self.boundary = Three_Class_Boundary(self.lda)
         self.centroid_I = self.boundary.centroid[0]
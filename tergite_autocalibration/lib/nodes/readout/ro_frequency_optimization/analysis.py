@@ -18,11 +18,11 @@ Module containing a class that fits data from a resonator spectroscopy experimen
 import numpy as np
 from quantify_core.analysis import fitting_models as fm
 
-from tergite_autocalibration.config.globals import REDIS_CONNECTION
 from tergite_autocalibration.lib.base.analysis import (
     BaseAllQubitsAnalysis,
     BaseQubitAnalysis,
 )
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
 
 model = fm.ResonatorModel()
 
@@ -91,10 +91,10 @@ class OptimalRO01FrequencyQubitAnalysis(BaseQubitAnalysis):
         f1 = self.fit_IQ_1[self.index_of_max_distance]
 
         ro_freq = float(
-            REDIS_CONNECTION.hget(f"transmons:{self.qubit}", "clock_freqs:readout")
+            get_parameter_cache().hget(f"transmons:{self.qubit}", "clock_freqs:readout")
         )
         ro_freq_1 = float(
-            REDIS_CONNECTION.hget(
+            get_parameter_cache().hget(
                 f"transmons:{self.qubit}", "extended_clock_freqs:readout_1"
             )
         )
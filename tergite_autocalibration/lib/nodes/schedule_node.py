@@ -9,10 +9,21 @@
 # Any modifications or derivative works of this code must retain this
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
+from typing import Callable
+
 import numpy as np
+from quantify_scheduler.instrument_coordinator.instrument_coordinator import (
+    CompiledSchedule,
+)
 from quantify_scheduler.instrument_coordinator.utility import xarray
 
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.config.legacy import dh
 from tergite_autocalibration.lib.base.node import BaseNode
+from tergite_autocalibration.lib.utils.schedule_compilation import (
+    ParametricScheduleTemplate,
+    compile_ahead,
+)
 from tergite_autocalibration.lib.utils.validators import (
     MixedSamplespace,
     Samplespace,
@@ -21,6 +32,11 @@ from tergite_autocalibration.lib.utils.validators import (
     get_number_of_batches,
     reduce_batch,
 )
+from tergite_autocalibration.utils.hardware.simulated_cluster import SimulatedDevice
+from tergite_autocalibration.utils.io.dataset_utils import (
+    StreamingDatasetWriter,
+    configure_dataset,
+)
 from tergite_autocalibration.utils.measurement_utils import reduce_samplespace
 
 
@@ -60,11 +76,56 @@ class ScheduleNode(BaseNode):
         return result_dataset
 
     def generate_dummy_dataset(self) -> xarray.Dataset:
-        result_dataset = xarray.Dataset()
         """
-        To be implemented by the Node Implementation Classes.
+        Simulate the dataset of the node for its current samplespace, without
+        compiling the schedule. The qubits are simulated from the device configuration.
         """
-        return result_dataset
+        simulated_device = SimulatedDevice.from_device_config(dh.device)
+        return configure_dataset(simulated_device.acquire(self), self)
+
+    def _compile_outer_iterations(
+        self, reduced_outer_samplespaces: list[dict]
+    ) -> Callable[[int], CompiledSchedule]:
+        """
+        Prepare the compilation of the iterations of the outer samplespace.
+
+        If SCHEDULE_TEMPLATES is enabled, only a few iterations are compiled
+        and the outer values are rebound into the compiled schedule for the
+        others, see ParametricScheduleTemplate.
+
+        Args:
+            reduced_outer_samplespaces: The outer samplespace of every iteration.
+
+        Returns:
+            Function returning the compiled schedule of an iteration.
+        """
+        samplespaces = [
+            self.schedule_samplespace | reduced_outer_samplespace
+            for reduced_outer_samplespace in reduced_outer_samplespaces
+        ]
+        if not ENV.schedule_templates:
+            return lambda iteration: self.precompile(samplespaces[iteration])
+
+        try:
+            parameters = np.array(
+                [
+                    list(list(reduced_outer_samplespace.values())[0].values())
+                    for reduced_outer_samplespace in reduced_outer_samplespaces
+                ],
+                dtype=float,
+            )
+        except (TypeError, ValueError):
+            return lambda iteration: self.precompile(samplespaces[iteration])
+
+        template = ParametricScheduleTemplate(self.precompile)
+        compiled_schedules = template.fit(samplespaces, parameters)
+
+        def compile_iteration(iteration: int) -> CompiledSchedule:
+            if iteration in compiled_schedules:
+                return compiled_schedules.pop(iteration)
+            return template.compile(samplespaces[iteration], parameters[iteration])
+
+        return compile_iteration
 
     def measure_schedule_node(
         self,
@@ -96,12 +157,16 @@ class ScheduleNode(BaseNode):
                 result_dataset = xarray.Dataset(
                     coords={coord: [] for coord in batched_dimensions}
                 )
-                for batch_index in range(number_of_batches):
-                    reduced_schedule_samplespace = reduce_batch(
-                        batched_schedule_samplespace, batch_index
-                    )
+                reduced_samplespaces = (
+                    reduce_batch(batched_schedule_samplespace, batch_index)
+                    for batch_index in range(number_of_batches)
+                )
+                # The next batch is compiled while the current one is measured
+                for batch_index, (
+                    reduced_schedule_samplespace,
+                    compiled_schedule,
+                ) in enumerate(compile_ahead(self.precompile, reduced_samplespaces)):
                     self.schedule_samplespace = reduced_schedule_samplespace
-                    compiled_schedule = self.precompile(reduced_schedule_samplespace)
                     ds = self.measure_compiled_schedule(
                         compiled_schedule,
                         cluster_status=cluster_status,
@@ -119,24 +184,32 @@ class ScheduleNode(BaseNode):
             iterations = self.outer_schedule_dimensions
             outer_dim = list(self.outer_schedule_samplespace.keys())[0]
 
-            result_dataset = xarray.Dataset()
-
-            for current_iteration in range(iterations):
-                reduced_outer_samplespace = reduce_samplespace(
-                    current_iteration, self.outer_schedule_samplespace
-                )
-                element_dict = list(reduced_outer_samplespace.values())[0]
-                current_value = list(element_dict.values())[0]
+            reduced_outer_samplespaces = [
+                reduce_samplespace(current_iteration, self.outer_schedule_samplespace)
+                for current_iteration in range(iterations)
+            ]
+            compile_iteration = self._compile_outer_iterations(
+                reduced_outer_samplespaces
+            )
+
+            # The next iteration is compiled while the current one is measured
+            with StreamingDatasetWriter(outer_dim) as writer:
+                for current_iteration, compiled_schedule in compile_ahead(
+                    compile_iteration, range(iterations)
+                ):
+                    element_dict = list(
+                        reduced_outer_samplespaces[current_iteration].values()
+                    )[0]
+                    current_value = list(element_dict.values())[0]
 
-                samplespace = self.schedule_samplespace | reduced_outer_samplespace
-                compiled_schedule = self.precompile(samplespace)
+                    ds = self.measure_compiled_schedule(
+                        compiled_schedule,
+                        cluster_status,
+                        measurement=(current_iteration, iterations),
+                    )
+                    ds = ds.expand_dims({outer_dim: np.array([current_value])})
+                    writer.append(ds)
 
-                ds = self.measure_compiled_schedule(
-                    compiled_schedule,
-                    cluster_status,
-                    measurement=(current_iteration, iterations),
-                )
-                ds = ds.expand_dims({outer_dim: np.array([current_value])})
-                result_dataset = xarray.merge([ds, result_dataset])
+                result_dataset = writer.result()
 
         return result_dataset
@@ -0,0 +1,136 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+import xarray as xr
+
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.utils.logger.tac_logger import logger
+
+# (analysis, name of the fit method, dataset, element)
+FitTask = Tuple[object, str, xr.Dataset, str]
+
+_analysis_executor: Optional[ProcessPoolExecutor] = None
+_analysis_executor_lock = threading.Lock()
+
+
+def _fit_element(analysis, fit_method: str, dataset: xr.Dataset, element: str):
+    getattr(analysis, fit_method)(dataset, element)
+    return analysis
+
+
+class _FitError(Exception):
+    """
+    Exception raised by a fit in a worker, as opposed to an error sending the
+    analysis to the worker or back. The original exception is the only argument.
+    """
+
+
+def _fit_element_in_worker(
+    analysis, fit_method: str, dataset: xr.Dataset, element: str
+):
+    try:
+        return _fit_element(analysis, fit_method, dataset, element)
+    except Exception as exception:
+        raise _FitError(exception) from exception
+
+
+def get_analysis_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    Get the process pool configured with ANALYSIS_WORKERS in the .env file.
+
+    The pool is created on first use and shared by all nodes. The workers are
+    spawned rather than forked, because the calibration supervisor can run
+    several threads at the same time.
+
+    Returns:
+        The shared process pool or None if the elements are fitted in the main process.
+    """
+    global _analysis_executor
+    if ENV.analysis_workers <= 1:
+        return None
+    with _analysis_executor_lock:
+        if _analysis_executor is None:
+            _analysis_executor = ProcessPoolExecutor(
+                max_workers=ENV.analysis_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _analysis_executor
+
+
+def _discard_analysis_executor(executor: ProcessPoolExecutor):
+    global _analysis_executor
+    with _analysis_executor_lock:
+        if _analysis_executor is executor:
+            _analysis_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fit_elements(
+    fit_tasks: List[FitTask], executor: Optional[ProcessPoolExecutor] = None
+) -> List[object]:
+    """
+    Run the fits of the qubits or couplers of a node.
+
+    The fits are independent of each other, so they are distributed over the
+    worker processes. The analyses are sent to the workers and returned with
+    the fitted values, which means that the redis values have to be written
+    by the caller afterwards. A fit that cannot run in a worker, e.g. because
+    the analysis cannot be pickled, is repeated in the main process. An
+    exception raised by the fit itself is raised again.
+
+    Args:
+        fit_tasks: Analyses to run with the name of their fit method, the dataset and the element.
+        executor: Process pool to use, by default the pool configured in the .env file.
+
+    Returns:
+        The fitted analyses in the same order as the tasks.
+    """
+    if executor is None:
+        executor = get_analysis_executor()
+    if executor is None or len(fit_tasks) < 2:
+        return [_fit_element(*fit_task) for fit_task in fit_tasks]
+
+    futures = []
+    for analysis, fit_method, dataset, element in fit_tasks:
+        # The workers cannot read from the files opened in this process
+        futures.append(
+            executor.submit(
+                _fit_element_in_worker, analysis, fit_method, dataset.load(), element
+            )
+        )
+
+    fitted_analyses = []
+    for fit_task, future in zip(fit_tasks, futures):
+        try:
+            fitted_analyses.append(future.result())
+        except BrokenProcessPool:
+            logger.warning("Analysis workers stopped, fitting in the main process")
+            _discard_analysis_executor(executor)
+            fitted_analyses.append(_fit_element(*fit_task))
+        except _FitError as error:
+            # The fit would fail the same way in the main process
+            raise error.args[0] from error
+        except (pickle.PicklingError, AttributeError, TypeError) as exception:
+            # The analysis or its results cannot be sent between the processes
+            logger.warning(
+                f"Fitting {fit_task[3]} in a worker failed ({exception!r}), "
+                f"fitting in the main process"
+            )
+            fitted_analyses.append(_fit_element(*fit_task))
+    return fitted_analyses
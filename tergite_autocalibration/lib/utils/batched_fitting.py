@@ -0,0 +1,497 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Fits of an lmfit model to many traces at once, e.g. to the traces of all qubits of a node.
+
+The parameters of all traces are stacked and fitted with one vectorised
+Levenberg-Marquardt iteration, which costs a few numpy calls per iteration
+instead of a minimisation in Python for every trace. The model function, the
+initial guesses and the bounds are taken from lmfit and the bounded parameters
+are transformed like in lmfit. Traces that do not converge are fitted again
+with lmfit, so the results can be used like the results of `Model.fit`.
+"""
+
+import ast
+import inspect
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import lmfit
+import numpy as np
+
+from tergite_autocalibration.utils.logger.tac_logger import logger
+
+_EPSILON = np.finfo(float).eps
+
+
+@dataclass
+class Traces:
+    """
+    Traces to fit with the same model.
+
+    Attributes:
+        model: The lmfit model, its function has to broadcast over numpy arrays
+        data: Traces with the shape (n_traces, n_points)
+        params: Initial parameters of every trace, e.g. from model.guess
+        independent_vars: Values of the independent variables of the model,
+            with the shape (n_points,) or (n_traces, n_points)
+    """
+
+    model: lmfit.Model
+    data: np.ndarray
+    params: List[lmfit.Parameters]
+    independent_vars: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.params)
+
+
+@dataclass
+class TraceFit:
+    """
+    Fit of a single trace with the attributes of an lmfit ModelResult that the analyses use.
+
+    Building the lmfit parameters takes longer than the batched fit itself, so
+    they are only built when the params are used.
+
+    Attributes:
+        model: The fitted model
+        best_values: Best fit values of the arguments of the model function
+        chisqr: Sum of the squared residuals
+        batched: Whether the trace converged in the batched fit or was fitted with lmfit
+    """
+
+    model: lmfit.Model
+    best_values: Dict[str, float]
+    chisqr: float
+    batched: bool
+    _params: Optional[lmfit.Parameters] = field(default=None, repr=False)
+    _initial_params: Optional[lmfit.Parameters] = field(default=None, repr=False)
+    _covariance: Optional[np.ndarray] = field(default=None, repr=False)
+
+    @property
+    def params(self) -> lmfit.Parameters:
+        """Best fit parameters with their standard errors, as in Model.fit"""
+        if self._params is None:
+            self._params = _best_fit_params(
+                self._initial_params,
+                {
+                    self.model.prefix + name: value
+                    for name, value in self.best_values.items()
+                },
+                self._covariance,
+            )
+        return self._params
+
+    def eval(self, **independent_vars) -> np.ndarray:
+        """Evaluate the model with the best fit values."""
+        return self.model.func(
+            **{**self.model.opts, **self.best_values, **independent_vars}
+        )
+
+
+def fit_traces(
+    traces: Traces,
+    max_iterations: int = 200,
+    ftol: float = 1.5e-8,
+    xtol: float = 1.5e-8,
+) -> List[TraceFit]:
+    """
+    Fit the model to all traces at once.
+
+    Args:
+        traces: The traces with their initial parameters
+        max_iterations: Iterations after which the remaining traces are fitted with lmfit
+        ftol: Relative reduction of the squared residuals at which a trace has converged
+        xtol: Relative change of the parameters at which a trace has converged
+
+    Returns:
+        The fit of every trace, in the order of the traces
+    """
+    model = traces.model
+    data = np.asarray(traces.data, dtype=float)
+    independent_vars = {
+        name: np.broadcast_to(np.asarray(values, dtype=float), data.shape)
+        for name, values in traces.independent_vars.items()
+    }
+    varying = [name for name, param in traces.params[0].items() if param.vary]
+
+    fits: List[Optional[TraceFit]] = [None] * len(traces)
+    if _can_be_batched(model, traces.params, varying, data.shape[1]):
+        fits = _fit_batched(
+            model,
+            data,
+            traces.params,
+            independent_vars,
+            varying,
+            max_iterations,
+            ftol,
+            xtol,
+        )
+
+    not_converged = [index for index, fit in enumerate(fits) if fit is None]
+    if not_converged:
+        logger.debug(f"Fitting {len(not_converged)} of {len(traces)} traces with lmfit")
+    for index in not_converged:
+        fit_result = model.fit(
+            data[index],
+            params=traces.params[index],
+            **{name: values[index] for name, values in independent_vars.items()},
+        )
+        fits[index] = TraceFit(
+            model,
+            fit_result.best_values,
+            fit_result.chisqr,
+            False,
+            _params=fit_result.params,
+        )
+    return fits
+
+
+def fit_all_traces(
+    all_traces: Sequence[Optional[Traces]], **kwargs
+) -> List[Optional[List[TraceFit]]]:
+    """
+    Fit the traces of several analyses, e.g. of all qubits of a node.
+
+    Traces with the same model function and number of points are fitted together.
+
+    Args:
+        all_traces: Traces of every analysis or None if an analysis has nothing to fit
+        **kwargs: Options of fit_traces
+
+    Returns:
+        The fits of the traces of every analysis, None where there were no traces
+    """
+    groups: Dict[tuple, List[int]] = {}
+    for index, traces in enumerate(all_traces):
+        if traces is None or len(traces) == 0:
+            continue
+        key = (
+            traces.model.func,
+            tuple(traces.model.param_names),
+            tuple(sorted(traces.independent_vars)),
+            np.shape(traces.data)[-1],
+        )
+        groups.setdefault(key, []).append(index)
+
+    all_fits: List[Optional[List[TraceFit]]] = [None] * len(all_traces)
+    for indices in groups.values():
+        group = [all_traces[index] for index in indices]
+        fits = fit_traces(
+            Traces(
+                model=group[0].model,
+                data=np.concatenate([np.asarray(traces.data) for traces in group]),
+                params=[params for traces in group for params in traces.params],
+                independent_vars={
+                    name: np.concatenate(
+                        [
+                            np.broadcast_to(
+                                traces.independent_vars[name], np.shape(traces.data)
+                            )
+                            for traces in group
+                        ]
+                    )
+                    for name in group[0].independent_vars
+                },
+            ),
+            **kwargs,
+        )
+        start = 0
+        for index, traces in zip(indices, group):
+            all_fits[index] = fits[start : start + len(traces)]
+            start += len(traces)
+    return all_fits
+
+
+def _can_be_batched(
+    model: lmfit.Model,
+    all_params: List[lmfit.Parameters],
+    varying: List[str],
+    n_points: int,
+) -> bool:
+    if not varying or n_points <= len(varying):
+        return False
+    for params in all_params:
+        if [name for name, param in params.items() if param.vary] != varying:
+            return False
+    # Arguments of the model with a constraint on a varying parameter are left to lmfit
+    for name in _argument_names(model):
+        expr = all_params[0][name].expr
+        if expr is not None and set(varying) & {
+            node.id for node in ast.walk(ast.parse(expr)) if isinstance(node, ast.Name)
+        }:
+            return False
+    return True
+
+
+def _argument_names(model: lmfit.Model) -> List[str]:
+    """Names of the parameters that are arguments of the model function"""
+    arguments = inspect.signature(model.func).parameters
+    return [
+        name for name in model.param_names if name[len(model.prefix) :] in arguments
+    ]
+
+
+def _fit_batched(
+    model: lmfit.Model,
+    data: np.ndarray,
+    all_params: List[lmfit.Parameters],
+    independent_vars: Dict[str, np.ndarray],
+    varying: List[str],
+    max_iterations: int,
+    ftol: float,
+    xtol: float,
+) -> List[Optional[TraceFit]]:
+    n_traces, n_points = data.shape
+    prefix_length = len(model.prefix)
+
+    lower = np.array([[params[name].min for name in varying] for params in all_params])
+    upper = np.array([[params[name].max for name in varying] for params in all_params])
+    values = np.array(
+        [[params[name].value for name in varying] for params in all_params]
+    )
+    values = np.clip(values, lower, upper)
+    # Arguments of the model function that are not varied keep their value
+    fixed_args = {
+        name[prefix_length:]: np.array([params[name].value for params in all_params])[
+            :, np.newaxis
+        ]
+        for name in _argument_names(model)
+        if name not in varying
+    }
+
+    def residuals(internal: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        args = {name: value[rows] for name, value in fixed_args.items()}
+        args.update({name: value[rows] for name, value in independent_vars.items()})
+        external = _to_external(internal, lower[rows], upper[rows])
+        for column, name in enumerate(varying):
+            args[name[prefix_length:]] = external[:, column, np.newaxis]
+        with np.errstate(all="ignore"):
+            return model.func(**args, **model.opts) - data[rows]
+
+    internal, chisqr, converged = _levenberg_marquardt(
+        residuals,
+        _to_internal(values, lower, upper),
+        max_iterations,
+        ftol,
+        xtol,
+    )
+
+    # Covariance of the internal parameters scaled with the reduced chi square, like in lmfit
+    rows = np.flatnonzero(converged)
+    fits: List[Optional[TraceFit]] = [None] * n_traces
+    if rows.size == 0:
+        return fits
+    jacobian = _jacobian(
+        residuals, internal[rows], rows, residuals(internal[rows], rows)
+    )
+    hessian = np.einsum("kmp,kmq->kpq", jacobian, jacobian)
+    # The parameters have very different scales, so the hessian is inverted normalised to its diagonal
+    with np.errstate(all="ignore"):
+        norm = np.sqrt(np.diagonal(hessian, axis1=1, axis2=2))
+        normalised = hessian / (norm[:, :, np.newaxis] * norm[:, np.newaxis, :])
+        is_regular = np.isfinite(normalised).all(axis=(1, 2))
+        is_regular[is_regular] = np.linalg.cond(normalised[is_regular]) < 1 / _EPSILON
+    rows, normalised, norm = rows[is_regular], normalised[is_regular], norm[is_regular]
+    reduced_chisqr = chisqr[rows] / (n_points - len(varying))
+    covariance = np.linalg.inv(normalised) / (
+        norm[:, :, np.newaxis] * norm[:, np.newaxis, :]
+    )
+    covariance *= reduced_chisqr[:, np.newaxis, np.newaxis]
+    gradient = _external_gradient(internal[rows], lower[rows], upper[rows])
+    covariance *= gradient[:, :, np.newaxis] * gradient[:, np.newaxis, :]
+
+    external = _to_external(internal[rows], lower[rows], upper[rows])
+    for row, best_values, trace_covariance in zip(rows, external, covariance):
+        fitted_args = {name: float(value[row, 0]) for name, value in fixed_args.items()}
+        for name, value in zip(varying, best_values):
+            fitted_args[name[prefix_length:]] = float(value)
+        fits[row] = TraceFit(
+            model,
+            fitted_args,
+            float(chisqr[row]),
+            True,
+            _initial_params=all_params[row],
+            _covariance=trace_covariance,
+        )
+    return fits
+
+
+def _levenberg_marquardt(
+    residuals: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    internal: np.ndarray,
+    max_iterations: int,
+    ftol: float,
+    xtol: float,
+):
+    """
+    Levenberg-Marquardt iteration with the scaling of MINPACK over a stack of parameters.
+
+    Returns:
+        The parameters, the sum of the squared residuals and whether every trace converged
+    """
+    internal = internal.copy()
+    n_traces, n_params = internal.shape
+    damping = np.full(n_traces, 1e-3)
+    scale = np.zeros((n_traces, n_params))
+    converged = np.zeros(n_traces, dtype=bool)
+
+    active = np.arange(n_traces)
+    residual = residuals(internal, active)
+    chisqr = np.sum(residual**2, axis=-1)
+    is_finite = np.isfinite(chisqr)
+    active, residual = active[is_finite], residual[is_finite]
+
+    for _ in range(max_iterations):
+        if active.size == 0:
+            break
+        params = internal[active]
+        jacobian = _jacobian(residuals, params, active, residual)
+        hessian = np.einsum("kmp,kmq->kpq", jacobian, jacobian)
+        gradient = np.einsum("kmp,km->kp", jacobian, residual)
+        scale[active] = np.maximum(
+            scale[active], np.diagonal(hessian, axis1=1, axis2=2)
+        )
+        # Parameters that do not change the residuals keep a small damping term
+        diagonal = np.maximum(
+            scale[active], _EPSILON * scale[active].max(axis=1, keepdims=True)
+        )
+        damped = hessian + np.einsum(
+            "k,kp,pq->kpq", damping[active], diagonal, np.identity(n_params)
+        )
+        with np.errstate(all="ignore"):
+            step = -np.linalg.solve(damped, gradient[..., np.newaxis])[..., 0]
+            trial = params + step
+            trial_residual = residuals(trial, active)
+            trial_chisqr = np.sum(trial_residual**2, axis=-1)
+
+            is_better = np.isfinite(trial_chisqr) & (trial_chisqr <= chisqr[active])
+            small_reduction = chisqr[active] - trial_chisqr <= ftol * chisqr[active]
+            scaled_norm = np.sqrt(diagonal)
+            small_step = np.linalg.norm(scaled_norm * step, axis=1) <= xtol * (
+                np.linalg.norm(scaled_norm * params, axis=1) + xtol
+            )
+
+        accepted = active[is_better]
+        internal[accepted] = trial[is_better]
+        chisqr[accepted] = trial_chisqr[is_better]
+        residual[is_better] = trial_residual[is_better]
+        damping[accepted] = np.maximum(damping[accepted] / 10, 1e-12)
+        damping[active[~is_better]] *= 10
+
+        # Without an improvement at a large damping the parameters are at the minimum
+        done = (
+            (is_better & small_reduction)
+            | (small_step & np.isfinite(step).all(axis=1))
+            | (damping[active] > 1e12)
+        )
+        converged[active[done]] = True
+        active, residual = active[~done], residual[~done]
+
+    return internal, chisqr, converged
+
+
+def _jacobian(
+    residuals: Callable[[np.ndarray, np.ndarray], np.ndarray],
+    params: np.ndarray,
+    rows: np.ndarray,
+    residual: np.ndarray,
+) -> np.ndarray:
+    """Forward difference jacobian with the shape (n_traces, n_points, n_params)"""
+    steps = np.sqrt(_EPSILON) * np.where(params != 0, np.abs(params), 1)
+    columns = []
+    for column in range(params.shape[1]):
+        shifted = params.copy()
+        shifted[:, column] += steps[:, column]
+        columns.append(
+            (residuals(shifted, rows) - residual) / steps[:, column, np.newaxis]
+        )
+    return np.stack(columns, axis=-1)
+
+
+# The bounds are applied with the transformations of lmfit, see lmfit.Parameter.setup_bounds
+def _to_internal(values: np.ndarray, lower: np.ndarray, upper: np.ndarray):
+    with np.errstate(all="ignore"):
+        return np.select(
+            [
+                np.isfinite(lower) & np.isfinite(upper),
+                np.isfinite(lower),
+                np.isfinite(upper),
+            ],
+            [
+                np.arcsin(2 * (values - lower) / (upper - lower) - 1),
+                np.sqrt((values - lower + 1) ** 2 - 1),
+                np.sqrt((upper - values + 1) ** 2 - 1),
+            ],
+            values,
+        )
+
+
+def _to_external(internal: np.ndarray, lower: np.ndarray, upper: np.ndarray):
+    with np.errstate(all="ignore"):
+        return np.select(
+            [
+                np.isfinite(lower) & np.isfinite(upper),
+                np.isfinite(lower),
+                np.isfinite(upper),
+            ],
+            [
+                lower + (np.sin(internal) + 1) * (upper - lower) / 2,
+                lower - 1 + np.sqrt(internal**2 + 1),
+                upper + 1 - np.sqrt(internal**2 + 1),
+            ],
+            internal,
+        )
+
+
+def _external_gradient(internal: np.ndarray, lower: np.ndarray, upper: np.ndarray):
+    with np.errstate(all="ignore"):
+        return np.select(
+            [
+                np.isfinite(lower) & np.isfinite(upper),
+                np.isfinite(lower),
+                np.isfinite(upper),
+            ],
+            [
+                np.cos(internal) * (upper - lower) / 2,
+                internal / np.sqrt(internal**2 + 1),
+                -internal / np.sqrt(internal**2 + 1),
+            ],
+            np.ones_like(internal),
+        )
+
+
+def _best_fit_params(
+    initial_params: lmfit.Parameters,
+    values: Dict[str, float],
+    covariance: np.ndarray,
+) -> lmfit.Parameters:
+    params = initial_params.copy()
+    varying = [name for name, param in params.items() if param.vary]
+    for name in varying:
+        params[name].value = values[name]
+    params.update_constraints()
+
+    stderr = np.sqrt(np.diagonal(covariance))
+    for index, name in enumerate(varying):
+        params[name].stderr = stderr[index]
+        params[name].correl = {
+            other: covariance[index, other_index]
+            / (stderr[index] * stderr[other_index])
+            for other_index, other in enumerate(varying)
+            if other_index != index
+        }
+    # Propagates the errors to the parameters with constraints
+    params.create_uvars(covar=covariance)
+    return params
@@ -11,7 +11,11 @@
 # that they have been altered from the originals.
 
 import json
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
 
+from quantify_scheduler.backends.graph_compilation import SerialCompilationConfig
 from quantify_scheduler.device_under_test.quantum_device import QuantumDevice
 from quantify_scheduler.json_utils import SchedulerJSONEncoder
 
@@ -20,10 +24,44 @@ from tergite_autocalibration.lib.utils.redis import (
     load_redis_config,
     load_redis_config_coupler,
 )
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
 from tergite_autocalibration.utils.dto.extended_coupler_edge import (
     ExtendedCompositeSquareEdge,
 )
 from tergite_autocalibration.utils.dto.extended_transmon_element import ExtendedTransmon
+from tergite_autocalibration.utils.logger.tac_logger import logger
+
+
+@dataclass(frozen=True)
+class DeviceSnapshot:
+    """
+    The device configuration of a node at the time the node was initialised.
+    It does not change when the device is updated for a later node.
+    """
+
+    name: str
+    compilation_config: SerialCompilationConfig
+    serial_device: Dict[str, dict]
+
+    def get_compilation_config(self) -> SerialCompilationConfig:
+        """
+        Get a copy of the compilation config, the compilation may modify it.
+
+        Returns:
+            Compilation config of the device at the time of the snapshot
+        """
+        return self.compilation_config.model_copy(deep=True)
+
+    def save(self, data_path) -> None:
+        """
+        Save the configuration of the device elements next to the node data.
+
+        Args:
+            data_path: Directory of the node data
+        """
+        data_path.mkdir(parents=True, exist_ok=True)
+        with open(f"{data_path}/{self.name}.json", "w") as f:
+            json.dump(self.serial_device, f, indent=4)
 
 
 class DeviceConfiguration:
@@ -34,9 +72,14 @@ class DeviceConfiguration:
         self.edges: dict[str, ExtendedCompositeSquareEdge] = {}
         self.device: QuantumDevice
 
+        # The redis hashes the elements were configured from
+        self._redis_configs: dict[str, dict[str, str]] = {}
+
     def configure_device(self, name: str) -> QuantumDevice:
         device = QuantumDevice(f"Device_{name}")
+        parameter_cache = get_parameter_cache()
         for channel, qubit in enumerate(self.qubits):
+            self._redis_configs[qubit] = parameter_cache.hgetall(f"transmons:{qubit}")
             transmon = ExtendedTransmon(qubit)
             transmon = load_redis_config(transmon, channel)
             device.add_element(transmon)
@@ -44,6 +87,9 @@ class DeviceConfiguration:
 
         if self.couplers is not None:
             for coupler in self.couplers:
+                self._redis_configs[coupler] = parameter_cache.hgetall(
+                    f"couplers:{coupler}"
+                )
                 control, target = coupler.split(sep="_")
                 edge = ExtendedCompositeSquareEdge(control, target)
                 edge = load_redis_config_coupler(edge)
@@ -54,6 +100,74 @@ class DeviceConfiguration:
         self.device = device
         return device
 
+    def _update_transmon(self, qubit: str, redis_config: dict[str, str]) -> bool:
+        # Only the fields with a ':' configure the transmon modules, see load_redis_config
+        previous_config = self._redis_configs[qubit]
+        if any(
+            ":" in key and key not in redis_config for key in previous_config.keys()
+        ):
+            # A removed field would have to be reset to the default
+            return False
+
+        transmon = self.transmons[qubit]
+        for redis_entry_key, redis_value in redis_config.items():
+            if (
+                ":" not in redis_entry_key
+                or previous_config.get(redis_entry_key) == redis_value
+            ):
+                continue
+            submodule, field = redis_entry_key.split(":")
+            if submodule not in transmon.submodules:
+                continue
+            if field not in transmon.submodules[submodule].parameters:
+                return False
+            if "measure" in submodule and field == "acq_channel":
+                # The acquisition channel is defined by the order of the qubits
+                continue
+            transmon.submodules[submodule].parameters[field](float(redis_value))
+        return True
+
+    def update_device(self) -> bool:
+        """
+        Apply the fields that changed in redis since the device was configured.
+        This is much faster than configuring a new device, because only the changed
+        parameters are set instead of recreating every element.
+
+        Returns:
+            True if the device is up-to-date, False if it has to be configured again
+        """
+        parameter_cache = get_parameter_cache()
+        for qubit in self.qubits:
+            redis_config = parameter_cache.hgetall(f"transmons:{qubit}")
+            if redis_config != self._redis_configs[qubit]:
+                if not self._update_transmon(qubit, redis_config):
+                    return False
+                self._redis_configs[qubit] = redis_config
+
+        if self.couplers is not None:
+            for coupler in self.couplers:
+                redis_config = parameter_cache.hgetall(f"couplers:{coupler}")
+                if redis_config != self._redis_configs[coupler]:
+                    load_redis_config_coupler(self.edges[coupler])
+                    self._redis_configs[coupler] = redis_config
+        return True
+
+    def snapshot(self, name: str) -> DeviceSnapshot:
+        """
+        Capture the current configuration of the device for a node.
+
+        Args:
+            name: Name of the node
+
+        Returns:
+            Snapshot with the compilation config and the serialised device elements
+        """
+        return DeviceSnapshot(
+            name=name,
+            compilation_config=self.device.generate_compilation_config(),
+            serial_device=self._serialize_device(self.device),
+        )
+
     def close_device(self):
         # after the compilation_config is acquired, free the transmon resources
         for transmon in self.transmons.values():
@@ -64,8 +178,8 @@ class DeviceConfiguration:
 
         self.device.close()
 
-    def save_serial_device(self, name: str, device: QuantumDevice, data_path) -> None:
-        # create a transmon with the same name but with updated config
+    @staticmethod
+    def _serialize_device(device: QuantumDevice) -> Dict[str, dict]:
         # get the transmon template in dictionary form
         serialized_device = json.dumps(device, cls=SchedulerJSONEncoder)
         decoded_device = json.loads(serialized_device)
@@ -73,7 +187,96 @@ class DeviceConfiguration:
         for element, element_config in decoded_device["data"]["elements"].items():
             serial_config = json.loads(element_config)
             serial_device[element] = serial_config
+        return serial_device
 
+    def save_serial_device(self, name: str, device: QuantumDevice, data_path) -> None:
+        serial_device = self._serialize_device(device)
         data_path.mkdir(parents=True, exist_ok=True)
         with open(f"{data_path}/{name}.json", "w") as f:
             json.dump(serial_device, f, indent=4)
+
+
+class DeviceManager:
+    """
+    Keeps the quantum device alive during a calibration run.
+
+    Configuring a device recreates every transmon from its JSON representation,
+    which takes a noticeable time per node and grows with the number of qubits.
+    The manager configures the device once and, before each node, only applies
+    the redis fields that have changed since. Each node takes a snapshot of the
+    device, so a node that is still compiling or saving its data is not affected
+    when the device is updated for the next node.
+
+    The device elements are shared, nodes must only read them while they hold
+    the cluster, e.g. in precompile.
+    """
+
+    def __init__(self):
+        self._device_configuration: Optional[DeviceConfiguration] = None
+        self._lock = threading.Lock()
+
+    def get_device_configuration(
+        self, qubits: list[str], couplers: Optional[list[str]]
+    ) -> DeviceConfiguration:
+        """
+        Get the device with the current redis values for the given elements.
+
+        Args:
+            qubits: Qubits of the device, in the order of their acquisition channels
+            couplers: Couplers of the device
+
+        Returns:
+            The up-to-date device configuration
+        """
+        with self._lock:
+            device_configuration = self._device_configuration
+            if (
+                device_configuration is not None
+                and device_configuration.qubits == qubits
+                and device_configuration.couplers == couplers
+                and device_configuration.update_device()
+            ):
+                return device_configuration
+
+            if device_configuration is not None:
+                logger.info("Configuring a new device")
+                device_configuration.close_device()
+            device_configuration = DeviceConfiguration(qubits, couplers)
+            self._device_configuration = device_configuration
+            device_configuration.configure_device("calibration")
+            return device_configuration
+
+    def close(self):
+        """
+        Close the device, the next node configures a new one.
+        """
+        with self._lock:
+            if self._device_configuration is not None:
+                self._device_configuration.close_device()
+                self._device_configuration = None
+
+
+_device_manager: Optional[DeviceManager] = None
+_device_manager_lock = threading.Lock()
+
+
+def get_device_manager() -> DeviceManager:
+    """
+    Get the device manager shared by all nodes.
+
+    Returns:
+        The shared device manager
+    """
+    global _device_manager
+    with _device_manager_lock:
+        if _device_manager is None:
+            _device_manager = DeviceManager()
+        return _device_manager
+
+
+def close_device_manager():
+    """
+    Close the device of the shared device manager, if a device has been configured.
+    """
+    if _device_manager is not None:
+        _device_manager.close()
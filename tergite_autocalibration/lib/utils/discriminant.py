@@ -0,0 +1,177 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Linear discriminant analysis of the IQ shots of many single shot readouts at once.
+
+The discriminants are fit in closed form from the class means and the pooled
+covariance, for a whole stack of readouts, e.g. all readout amplitudes of a qubit.
+The decision rule is the one of scikit-learn's `LinearDiscriminantAnalysis`
+with the svd solver and the attributes follow its naming.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class LinearDiscriminants:
+    """
+    Linear discriminants of a stack of readouts.
+
+    All arrays have the leading axes of the stack, e.g. coef_ has the shape
+    (..., n_classes, 2) or (..., 1, 2) for two classes, as in scikit-learn.
+    """
+
+    classes_: np.ndarray
+    priors_: np.ndarray
+    means_: np.ndarray
+    pooled_covariance: np.ndarray
+    coef_: np.ndarray
+    intercept_: np.ndarray
+
+    def __getitem__(self, index) -> "LinearDiscriminants":
+        """Discriminants of a part of the stack e.g. of a single readout"""
+        return LinearDiscriminants(
+            classes_=self.classes_,
+            priors_=self.priors_,
+            means_=self.means_[index],
+            pooled_covariance=self.pooled_covariance[index],
+            coef_=self.coef_[index],
+            intercept_=self.intercept_[index],
+        )
+
+    def decision_function(self, iq: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            iq: Shots with the shape (..., n_shots, 2)
+
+        Returns:
+            Score of each class with the shape (..., n_shots, n_classes), only the
+            score of the second class for two classes
+        """
+        scores = np.einsum("...si,...ki->...sk", iq, self.coef_)
+        scores = scores + self.intercept_[..., np.newaxis, :]
+        return scores[..., 0] if len(self.classes_) == 2 else scores
+
+    def predict(self, iq: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            iq: Shots with the shape (..., n_shots, 2)
+
+        Returns:
+            Predicted class of each shot with the shape (..., n_shots)
+        """
+        scores = self.decision_function(iq)
+        if len(self.classes_) == 2:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[np.argmax(scores, axis=-1)]
+
+    @property
+    def rotation(self) -> np.ndarray:
+        """Angle of the discriminant line of two classes in degrees"""
+        a, b = self._binary_line()[:2]
+        return np.rad2deg(np.arctan(-a / b))
+
+    @property
+    def threshold(self) -> np.ndarray:
+        """Distance of the discriminant line of two classes from the origin"""
+        a, b, intercept = self._binary_line()
+        return np.abs(intercept) / np.sqrt(a**2 + b**2)
+
+    def _binary_line(self):
+        if len(self.classes_) != 2:
+            raise ValueError("The discriminant line is defined for two classes.")
+        return self.coef_[..., 0, 0], self.coef_[..., 0, 1], self.intercept_[..., 0]
+
+
+def fit_linear_discriminants(iq: np.ndarray, y: np.ndarray) -> LinearDiscriminants:
+    """
+    Fit the linear discriminants of all readouts of a stack.
+
+    Args:
+        iq: Shots with the shape (..., n_shots, 2)
+        y: Prepared class of each shot, the same for all readouts
+
+    Returns:
+        The discriminants of every readout
+    """
+    iq = np.asarray(iq, dtype=float)
+    classes, y_index = np.unique(y, return_inverse=True)
+    n_classes = len(classes)
+    n_shots = iq.shape[-2]
+
+    one_hot = np.eye(n_classes)[y_index]
+    shots_per_class = one_hot.sum(axis=0)
+    priors = shots_per_class / n_shots
+    means = np.einsum("sk,...si->...ki", one_hot, iq) / shots_per_class[:, np.newaxis]
+
+    # Within class covariance normalised like the svd solver of scikit-learn
+    centered = iq - means[..., y_index, :]
+    pooled_covariance = np.einsum("...si,...sj->...ij", centered, centered) / (
+        n_shots - n_classes
+    )
+    precision = np.linalg.inv(pooled_covariance)
+
+    # The scores are taken relative to the overall mean, as in scikit-learn
+    mean = np.einsum("k,...ki->...i", priors, means)
+    centered_means = means - mean[..., np.newaxis, :]
+    coef = np.einsum("...ki,...ij->...kj", centered_means, precision)
+    intercept = (
+        -0.5 * np.einsum("...ki,...ki->...k", coef, centered_means)
+        + np.log(priors)
+        - np.einsum("...i,...ki->...k", mean, coef)
+    )
+    if n_classes == 2:
+        coef = coef[..., 1:, :] - coef[..., :1, :]
+        intercept = intercept[..., 1:] - intercept[..., :1]
+
+    return LinearDiscriminants(
+        classes_=classes,
+        priors_=priors,
+        means_=means,
+        pooled_covariance=pooled_covariance,
+        coef_=coef,
+        intercept_=intercept,
+    )
+
+
+def confusion_matrices(
+    y: np.ndarray, y_pred: np.ndarray, classes: np.ndarray
+) -> np.ndarray:
+    """
+    Confusion matrices normalised over the prepared classes, i.e. every row sums up to one.
+
+    Args:
+        y: Prepared class of each shot
+        y_pred: Predicted classes with the shape (..., n_shots)
+        classes: The classes in the order of the rows and columns
+
+    Returns:
+        The confusion matrices with the shape (..., n_classes, n_classes)
+    """
+    true_one_hot = (np.asarray(y)[:, np.newaxis] == classes).astype(float)
+    predicted_one_hot = (y_pred[..., np.newaxis] == classes).astype(float)
+    counts = np.einsum("sk,...sl->...kl", true_one_hot, predicted_one_hot)
+    return counts / true_one_hot.sum(axis=0)[:, np.newaxis]
+
+
+def assignment_fidelities(cms: np.ndarray) -> np.ndarray:
+    """
+    Args:
+        cms: Normalised confusion matrices with the shape (..., n_classes, n_classes)
+
+    Returns:
+        Mean probability to assign the prepared class, for every confusion matrix
+    """
+    return np.trace(cms, axis1=-2, axis2=-1) / cms.shape[-1]
@@ -14,6 +14,8 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 
+from typing import List, Union
+
 import matplotlib.pyplot as plt
 import networkx as nx
 
@@ -139,7 +141,17 @@ initial_pos = {
 
 
 # TODO add condition argument and explanation
-def filtered_topological_order(target_node: str):
+def filtered_topological_order(target_node: Union[str, List[str]]):
+    # Several target nodes are calibrated by walking the union of their paths
+    if isinstance(target_node, list):
+        print("Targeting nodes: " + ", ".join(target_node))
+        union_order = []
+        for node in target_node:
+            for path_node in range_topological_order("resonator_spectroscopy", node):
+                if path_node not in union_order:
+                    union_order.append(path_node)
+        return _sort_topologically(union_order)
+
     print("Targeting node: " + target_node)
     return range_topological_order("resonator_spectroscopy", target_node)
 
@@ -166,6 +178,42 @@ def range_topological_order(from_node: str, target_node: str):
     return filtered_order
 
 
+def calibration_dependency_graph(nodes: List[str]) -> nx.DiGraph:
+    """
+    Restrict the calibration graph to the nodes that are going to be calibrated.
+
+    Two nodes are connected in the returned graph if the first one is an ancestor of the
+    second one in the full calibration graph. This way, dependencies that pass through
+    nodes which are not part of the calibration run are preserved.
+
+    Args:
+        nodes: Names of the nodes to be calibrated e.g. the output of `filtered_topological_order`
+
+    Returns:
+        A directed acyclic graph with the dependencies between the given nodes.
+        Nodes without edges in the calibration graph (e.g. punchout) and nodes that are not
+        in it at all (e.g. cz_optimize_chevron) have no dependencies.
+
+    """
+    dependency_graph = nx.DiGraph()
+    dependency_graph.add_nodes_from(nodes)
+    for node in nodes:
+        if node not in graph:
+            continue
+        ancestors = nx.ancestors(graph, node)
+        for other_node in nodes:
+            if other_node in ancestors:
+                dependency_graph.add_edge(other_node, node)
+    # Only keep the direct dependencies, the rest is implied
+    return nx.transitive_reduction(dependency_graph)
+
+
+def _sort_topologically(nodes: List[str]) -> List[str]:
+    dependency_graph = calibration_dependency_graph(nodes)
+    # Ties are broken by the original order of the nodes
+    return list(nx.lexicographical_topological_sort(dependency_graph, key=nodes.index))
+
+
 if __name__ == "__main__":
     # nx.draw_spring(graph, with_labels=True, k=1, pos = initial_pos)
     # pos = nx.spring_layout(graph, k=0.3)
@@ -0,0 +1,63 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Readout error mitigation of the state probabilities of single shot measurements.
+"""
+
+import numpy as np
+
+
+def project_onto_simplex(points: np.ndarray) -> np.ndarray:
+    """
+    Closest probability distribution to each point in the euclidean norm.
+
+    The projection is computed in closed form by sorting the coordinates,
+    see Wang and Carreira-Perpinan, arXiv:1309.1541.
+
+    Args:
+        points: Points to project, the last axis runs over the states
+
+    Returns:
+        Non-negative probabilities that sum up to one, with the shape of the points
+    """
+    points = np.asarray(points, dtype=float)
+    number_of_states = points.shape[-1]
+
+    sorted_points = -np.sort(-points, axis=-1)
+    excess = np.cumsum(sorted_points, axis=-1) - 1
+    counts = np.arange(1, number_of_states + 1)
+    # Number of states with a non-zero probability, the condition always holds for the largest coordinate
+    is_positive = sorted_points - excess / counts > 0
+    support = number_of_states - np.argmax(is_positive[..., ::-1], axis=-1)
+    threshold = np.take_along_axis(excess, support[..., np.newaxis] - 1, axis=-1)
+    return np.maximum(points - threshold / support[..., np.newaxis], 0)
+
+
+def mitigate(probabilities: np.ndarray, cm_inv: np.ndarray) -> np.ndarray:
+    """
+    Correct measured state probabilities with the inverse of the confusion matrix.
+
+    The corrected probabilities can be negative, they are replaced by the closest
+    probability distribution.
+
+    Args:
+        probabilities: Measured probabilities, the last axis runs over the states
+        cm_inv: Inverse of the normalized confusion matrix, or a stack of them
+            that broadcasts against the leading axes of the probabilities
+
+    Returns:
+        Mitigated probabilities with the shape of the measured probabilities
+    """
+    probabilities = np.asarray(probabilities, dtype=float)
+    corrected = np.matmul(probabilities[..., np.newaxis, :], cm_inv)[..., 0, :]
+    return project_onto_simplex(corrected)
@@ -0,0 +1,147 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.utils.logger.phase_timing import (
+    current_node,
+    node_timing,
+    timed_phase,
+)
+from tergite_autocalibration.utils.logger.tac_logger import logger
+
+
+class PlotRenderer:
+    """
+    Saves figures to disk in a background thread.
+
+    Rendering a figure at a high resolution takes seconds, so the analysis hands
+    the figure over and continues. Matplotlib is not thread-safe, that is why the
+    figures are closed in pyplot before they are handed over and rendered one
+    after the other.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="plot_rendering"
+        )
+        self._pending: List[Future] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _render(
+        fig: Figure,
+        paths: Dict[Path, int],
+        tight_layout: bool,
+        node_name: Optional[str] = None,
+    ):
+        # The rendering time counts for the node that handed over the figure
+        with node_timing(node_name), timed_phase("render_plots"):
+            if tight_layout:
+                fig.tight_layout()
+            for path, dpi in paths.items():
+                fig.savefig(path, bbox_inches="tight", dpi=dpi)
+        logger.info(f"Plots saved to {' and '.join(str(path) for path in paths)}")
+
+    def _log_errors(self, future: Future):
+        with self._lock:
+            self._pending.remove(future)
+        if future.exception() is not None:
+            logger.error(f"Failed to save plots: {future.exception()!r}")
+
+    def save_figure(
+        self, fig: Figure, paths: Dict[Path, int], tight_layout: bool = True
+    ) -> Future:
+        """
+        Close the figure in pyplot and save it in the background.
+
+        Args:
+            fig: The figure to save, it must not be modified afterwards
+            paths: Paths to save the figure to and the resolution in dpi for each path
+            tight_layout: Whether to adjust the layout before saving
+
+        Returns:
+            Future that is done when the figure is saved
+        """
+        plt.close(fig)
+        with self._lock:
+            future = self._executor.submit(
+                self._render, fig, paths, tight_layout, current_node()
+            )
+            self._pending.append(future)
+        future.add_done_callback(self._log_errors)
+        return future
+
+    def wait(self, timeout: Optional[float] = None):
+        """
+        Wait until all figures handed over so far are saved.
+
+        Args:
+            timeout: Maximum time to wait in seconds, by default there is no limit
+        """
+        with self._lock:
+            pending = list(self._pending)
+        if pending:
+            logger.info(f"Waiting for {len(pending)} plots to be saved")
+            wait(pending, timeout=timeout)
+
+
+_plot_renderer: Optional[PlotRenderer] = None
+_plot_renderer_lock = threading.Lock()
+
+
+def get_plot_renderer() -> PlotRenderer:
+    """
+    Get the plot renderer shared by all analyses.
+
+    Returns:
+        The shared plot renderer
+    """
+    global _plot_renderer
+    with _plot_renderer_lock:
+        if _plot_renderer is None:
+            _plot_renderer = PlotRenderer()
+        return _plot_renderer
+
+
+def plot_resolutions(data_path: Path, name: str) -> Dict[Path, int]:
+    """
+    Paths and resolutions of the plots of a node as configured in the .env file.
+
+    Args:
+        data_path: Directory of the node data
+        name: Name of the plot
+
+    Returns:
+        Paths of the preview and of the full resolution plot with their resolution,
+        a plot with a resolution of 0 is not saved.
+    """
+    paths = {
+        data_path / f"{name}_preview.png": ENV.plot_preview_dpi,
+        data_path / f"{name}.png": ENV.plot_dpi,
+    }
+    return {path: dpi for path, dpi in paths.items() if dpi > 0}
+
+
+def wait_for_plots():
+    """
+    Wait until all plots are saved, if any plots have been handed over.
+    """
+    if _plot_renderer is not None:
+        _plot_renderer.wait()
@@ -19,6 +19,7 @@ from quantify_scheduler.json_utils import SchedulerJSONDecoder, SchedulerJSONEnc
 
 from tergite_autocalibration.config.globals import REDIS_CONNECTION
 from tergite_autocalibration.config.legacy import dh
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
 from tergite_autocalibration.utils.dto import extended_transmon_element
 from tergite_autocalibration.utils.dto.extended_coupler_edge import (
     ExtendedCompositeSquareEdge,
@@ -30,7 +31,7 @@ np.set_printoptions(legacy="1.25")
 
 def load_redis_config(transmon: ExtendedTransmon, channel: int):
     qubit = transmon.name
-    redis_config = REDIS_CONNECTION.hgetall(f"transmons:{qubit}")
+    redis_config = get_parameter_cache().hgetall(f"transmons:{qubit}")
 
     # get the transmon template in dictionary form
     serialized_transmon = json.dumps(transmon, cls=SchedulerJSONEncoder)
@@ -73,7 +74,7 @@ def load_redis_config(transmon: ExtendedTransmon, channel: int):
 def load_redis_config_coupler(coupler: ExtendedCompositeSquareEdge):
     bus = coupler.name
     bus_qubits = bus.split("_")
-    redis_config = REDIS_CONNECTION.hgetall(f"couplers:{bus}")
+    redis_config = get_parameter_cache().hgetall(f"couplers:{bus}")
     try:
         coupler.clock_freqs.cz_freq(float(redis_config["cz_pulse_frequency"]))
         coupler.cz.square_amp(float(redis_config["cz_pulse_amplitude"]))
@@ -107,4 +108,5 @@ def update_redis_values(node_name: str, qoi_results: dict[str, dict]):
             #     transmon_parameter, element.strip("q"), self._qoi[i]
             # )
             REDIS_CONNECTION.hset(f"cs:{element}", node_name, "calibrated")
+        get_parameter_cache().invalidate(f"{name}:{element}", f"cs:{element}")
     pass
@@ -0,0 +1,700 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import contextvars
+import copy
+import dataclasses
+import hashlib
+import json
+import os
+import pickle
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import Enum
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+import numpy as np
+import qblox_instruments
+import quantify_scheduler
+from quantify_scheduler.backends import SerialCompiler
+from quantify_scheduler.backends.graph_compilation import CompilationConfig
+from quantify_scheduler.schedules.schedule import CompiledSchedule, Schedule
+
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.utils.logger.tac_logger import logger
+
+T = TypeVar("T")
+C = TypeVar("C")
+
+
+def compile_ahead(
+    compile_function: Callable[[T], C], samplespaces: Iterable[T]
+) -> Iterator[Tuple[T, C]]:
+    """
+    Compile the samplespaces of a sweep one step ahead of their execution.
+
+    While the caller is executing the schedule of step N, the schedule of
+    step N + 1 is already compiled in a background worker. The worker is a
+    thread, because the device elements used during compilation are qcodes
+    instruments and cannot be sent to another process. The acquisition on
+    the instrument coordinator mostly waits on the hardware, so compilation
+    runs while it is idle.
+
+    Args:
+        compile_function: Function compiling a single samplespace,
+            e.g. `BaseNode.precompile`.
+        samplespaces: The samplespaces to compile, in execution order.
+
+    Returns:
+        Iterator of tuples (samplespace, compiled_schedule) in the same order
+        as the samplespaces.
+    """
+    samplespace_iterator = iter(samplespaces)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="compile_ahead")
+
+    def submit_next() -> Tuple[Optional[T], Optional[Future]]:
+        try:
+            samplespace = next(samplespace_iterator)
+        except StopIteration:
+            return None, None
+        # The worker runs in the context of the caller, e.g. so that the compilation
+        # time is recorded for the node in the phase timing
+        return samplespace, executor.submit(
+            contextvars.copy_context().run, compile_function, samplespace
+        )
+
+    try:
+        samplespace, future = submit_next()
+        while future is not None:
+            compiled_schedule = future.result()
+            # Start compiling the next step before handing out the current one
+            next_samplespace, next_future = submit_next()
+            if next_future is not None:
+                logger.info("Compiling next schedule ahead of execution")
+            yield samplespace, compiled_schedule
+            samplespace, future = next_samplespace, next_future
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Operation ids are Python hashes and schedulable labels are uuids, both of them
+# change between processes, so they are replaced by their order of appearance
+_VOLATILE_ID_PATTERN = re.compile(
+    r'"(-?\d{8,}|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})"'
+)
+
+
+def _json_default(value):
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    if callable(value):
+        return (
+            f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', '')}"
+        )
+    return repr(value)
+
+
+class CompiledScheduleCache:
+    """
+    Content-addressed cache for compiled schedules.
+
+    Compiled schedules are stored under a hash of the schedule, the
+    compilation configuration (device and hardware configuration) and the
+    versions of the compilation libraries. Recently
+    used schedules are kept in memory, all schedules are pickled to disk if a
+    cache directory is given. Both tiers are evicted in least recently used
+    order, the memory tier by number of schedules and the disk tier by size.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]] = None,
+        max_memory_items: int = 16,
+        max_disk_size_mb: float = 256,
+    ):
+        """
+        Args:
+            cache_dir: Directory for the on-disk tier, if None only the
+                in-memory tier is used.
+            max_memory_items: Maximum number of compiled schedules in memory.
+            max_disk_size_mb: Maximum size of the on-disk tier in MB.
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_items = max_memory_items
+        self.max_disk_size = int(max_disk_size_mb * 1024**2)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory: "OrderedDict[str, CompiledSchedule]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def compute_key(schedule: Schedule, compilation_config: CompilationConfig) -> str:
+        """
+        Compute the cache key of a schedule and its compilation configuration.
+
+        Args:
+            schedule: The schedule before compilation.
+            compilation_config: The output of `generate_compilation_config()`.
+
+        Returns:
+            Hex digest identifying the compiled schedule.
+        """
+        volatile_ids = {}
+
+        def replace_volatile_id(match: re.Match) -> str:
+            return f'"id{volatile_ids.setdefault(match.group(1), len(volatile_ids))}"'
+
+        schedule_json = _VOLATILE_ID_PATTERN.sub(
+            replace_volatile_id, schedule.to_json()
+        )
+        config_json = json.dumps(
+            compilation_config.model_dump(), default=_json_default, sort_keys=True
+        )
+
+        # A new version of the compiler or the firmware interface may compile differently
+        library_versions = (
+            f"quantify-scheduler {quantify_scheduler.__version__}, "
+            f"qblox-instruments {qblox_instruments.__version__}"
+        )
+
+        digest = hashlib.sha256()
+        digest.update(schedule_json.encode())
+        digest.update(config_json.encode())
+        digest.update(library_versions.encode())
+        return digest.hexdigest()
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+    def get(self, key: str) -> Optional[CompiledSchedule]:
+        """
+        Look up a compiled schedule, counts a hit or a miss.
+
+        Args:
+            key: Key from `compute_key`.
+
+        Returns:
+            The compiled schedule or None if it is not cached.
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+            compiled_schedule = self._read_from_disk(key)
+            if compiled_schedule is None:
+                self.misses += 1
+                return None
+
+            self.disk_hits += 1
+            self._put_in_memory(key, compiled_schedule)
+            return compiled_schedule
+
+    def put(self, key: str, compiled_schedule: CompiledSchedule) -> None:
+        """
+        Store a compiled schedule in the cache.
+
+        Args:
+            key: Key from `compute_key`.
+            compiled_schedule: The compiled schedule to store.
+        """
+        with self._lock:
+            self._put_in_memory(key, compiled_schedule)
+            self._write_to_disk(key, compiled_schedule)
+
+    def compile(
+        self,
+        compiler: SerialCompiler,
+        schedule: Schedule,
+        compilation_config: CompilationConfig,
+    ) -> CompiledSchedule:
+        """
+        Return the cached compiled schedule or compile and cache it.
+
+        Args:
+            compiler: Compiler used on a cache miss.
+            schedule: The schedule to compile.
+            compilation_config: Configuration to compile the schedule with.
+
+        Returns:
+            The compiled schedule.
+        """
+        key = self.compute_key(schedule, compilation_config)
+        compiled_schedule = self.get(key)
+        if compiled_schedule is not None:
+            logger.info(f"Compiled schedule cache hit ({self.stats})")
+            return compiled_schedule
+
+        compiled_schedule = compiler.compile(
+            schedule=schedule, config=compilation_config
+        )
+        self.put(key, compiled_schedule)
+        return compiled_schedule
+
+    def clear(self) -> None:
+        """
+        Remove all compiled schedules from memory and disk.
+        """
+        with self._lock:
+            self._memory.clear()
+            for file in self._disk_files():
+                file.unlink(missing_ok=True)
+
+    def _put_in_memory(self, key: str, compiled_schedule: CompiledSchedule) -> None:
+        self._memory[key] = compiled_schedule
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _disk_files(self) -> List[Path]:
+        if self.cache_dir is None:
+            return []
+        return list(self.cache_dir.glob("*.pkl"))
+
+    def _read_from_disk(self, key: str) -> Optional[CompiledSchedule]:
+        if self.cache_dir is None:
+            return None
+        file = self.cache_dir / f"{key}.pkl"
+        try:
+            with open(file, "rb") as f:
+                compiled_schedule = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            # e.g. written by another version of quantify-scheduler
+            logger.warning(f"Discarding unreadable compiled schedule {file}: {e}")
+            file.unlink(missing_ok=True)
+            return None
+        # The modification time is used as last access time for the eviction
+        os.utime(file)
+        return compiled_schedule
+
+    def _write_to_disk(self, key: str, compiled_schedule: CompiledSchedule) -> None:
+        if self.cache_dir is None:
+            return
+        file = self.cache_dir / f"{key}.pkl"
+        # Several processes may share the cache directory
+        with tempfile.NamedTemporaryFile(
+            dir=self.cache_dir, suffix=".tmp", delete=False
+        ) as f:
+            pickle.dump(compiled_schedule, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, file)
+        self._evict_from_disk()
+
+    def _evict_from_disk(self) -> None:
+        files = [(file, file.stat()) for file in self._disk_files()]
+        total_size = sum(stat.st_size for _, stat in files)
+        for file, stat in sorted(files, key=lambda file_stat: file_stat[1].st_mtime):
+            if total_size <= self.max_disk_size:
+                break
+            file.unlink(missing_ok=True)
+            total_size -= stat.st_size
+
+
+_compiled_schedule_cache: Optional[CompiledScheduleCache] = None
+
+
+def get_compiled_schedule_cache() -> Optional[CompiledScheduleCache]:
+    """
+    Get the compiled schedule cache configured in the .env file.
+
+    The on-disk tier is only used if SCHEDULE_CACHE_DIR is set.
+
+    Returns:
+        The shared cache or None if SCHEDULE_CACHE is disabled.
+    """
+    global _compiled_schedule_cache
+    if not ENV.schedule_cache:
+        return None
+    if _compiled_schedule_cache is None:
+        _compiled_schedule_cache = CompiledScheduleCache(
+            cache_dir=ENV.schedule_cache_dir or None,
+            max_memory_items=ENV.schedule_cache_memory_items,
+            max_disk_size_mb=ENV.schedule_cache_disk_size_mb,
+        )
+    return _compiled_schedule_cache
+
+
+# Settings of the sequencers, modules and local oscillators that are affine
+# functions of the clock frequencies and the offsets and gains of a schedule.
+# All the other compiled instructions, e.g. the sequencer programs and the
+# waveforms, have to be the same for every point of a sweep.
+_AFFINE_SETTINGS = frozenset(
+    {
+        # Sequencer settings
+        "modulation_freq",
+        "init_offset_awg_path_I",
+        "init_offset_awg_path_Q",
+        "init_gain_awg_path_I",
+        "init_gain_awg_path_Q",
+        # Module settings
+        "lo0_freq",
+        "lo1_freq",
+        "offset_ch0_path_I",
+        "offset_ch0_path_Q",
+        "offset_ch1_path_I",
+        "offset_ch1_path_Q",
+        # Local oscillator settings
+        "frequency",
+    }
+)
+
+
+def _flatten_leaves(obj, values: List[float], is_integer: List[bool], affine=False):
+    """
+    Collect the affine settings of compiled instructions.
+
+    Args:
+        obj: Compiled instructions or a part of them.
+        values: List to which the values of the affine settings are appended.
+        is_integer: List to which it is appended whether the value is an integer.
+        affine: Whether the object is the value of an affine setting.
+
+    Returns:
+        Hashable structure of the object, which contains everything except
+        the values of the affine settings. Two objects with equal structures
+        have their affine values in the same order.
+    """
+    if obj is None or isinstance(obj, (bool, np.bool_, Enum)):
+        return "constant", obj
+    if isinstance(obj, (int, float, np.integer, np.floating)):
+        if not affine:
+            return "constant", type(obj), obj
+        values.append(float(obj))
+        is_integer.append(isinstance(obj, (int, np.integer)))
+        return "number", type(obj)
+    if isinstance(obj, str):
+        return "constant", obj
+    if isinstance(obj, np.ndarray):
+        return "array", obj.shape, obj.dtype.str, obj.tobytes()
+    if isinstance(obj, dict):
+        return "dict", tuple(
+            (
+                key,
+                _flatten_leaves(
+                    value, values, is_integer, affine or key in _AFFINE_SETTINGS
+                ),
+            )
+            for key, value in obj.items()
+        )
+    if isinstance(obj, (list, tuple)):
+        return (
+            "sequence",
+            type(obj),
+            tuple(_flatten_leaves(item, values, is_integer, affine) for item in obj),
+        )
+    if dataclasses.is_dataclass(obj):
+        return (
+            "dataclass",
+            type(obj),
+            tuple(
+                (
+                    field.name,
+                    _flatten_leaves(
+                        getattr(obj, field.name),
+                        values,
+                        is_integer,
+                        affine or field.name in _AFFINE_SETTINGS,
+                    ),
+                )
+                for field in dataclasses.fields(obj)
+            ),
+        )
+    return "constant", repr(obj)
+
+
+def _replace_leaves(obj, values: Iterator[float], affine=False):
+    """
+    Rebuild compiled instructions with new values of the affine settings.
+
+    Args:
+        obj: Compiled instructions or a part of them, used as template.
+        values: New values in the order of `_flatten_leaves`.
+        affine: Whether the object is the value of an affine setting.
+
+    Returns:
+        Copy of the object with the affine settings replaced, all the other
+        values are shared with the template.
+    """
+    if obj is None or isinstance(obj, (bool, np.bool_, Enum)):
+        return obj
+    if isinstance(obj, (int, np.integer)):
+        return type(obj)(round(next(values))) if affine else obj
+    if isinstance(obj, (float, np.floating)):
+        return type(obj)(next(values)) if affine else obj
+    if isinstance(obj, dict):
+        return {
+            key: _replace_leaves(value, values, affine or key in _AFFINE_SETTINGS)
+            for key, value in obj.items()
+        }
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_replace_leaves(item, values, affine) for item in obj)
+    if dataclasses.is_dataclass(obj):
+        new_obj = copy.copy(obj)
+        for field in dataclasses.fields(obj):
+            # Also works for frozen dataclasses
+            object.__setattr__(
+                new_obj,
+                field.name,
+                _replace_leaves(
+                    getattr(obj, field.name),
+                    values,
+                    affine or field.name in _AFFINE_SETTINGS,
+                ),
+            )
+        return new_obj
+    return obj
+
+
+def _timing(compiled_schedule: CompiledSchedule) -> tuple:
+    # The absolute times of the timing table, in the order of the schedulables
+    return tuple(
+        schedulable["abs_time"]
+        for schedulable in compiled_schedule.schedulables.values()
+    )
+
+
+class ParametricScheduleTemplate:
+    """
+    Compile a sweep once and rebind the swept values into the compiled schedule.
+
+    Sweeps over an outer samplespace often only change the clock frequency or
+    the offsets and gains of the sequencers, e.g. a spectroscopy split into
+    chunks shifted in frequency only changes the LO frequency. The template
+    compiles reference points of the sweep and models the affine settings of
+    the compiled instructions (NCO and LO frequencies, offsets and gains) as
+    an affine function of the swept parameters. Everything else, including
+    the sequencer programs, the waveforms and the timing of the schedule, has
+    to be the same for every compiled point. The model is validated against
+    full compilations of two other points of the sweep. If the compiled
+    schedules differ in anything else than the affine settings, or the
+    validation fails, every point of the sweep is compiled as usual.
+
+    Only the compiled instructions are rebound. The timing table of the
+    rebound schedules is the same as the one of every compiled point, the
+    operations are the ones of the first reference point. The execution of a
+    compiled schedule only depends on its compiled instructions.
+    """
+
+    # Relative tolerance of the singular values of the swept parameters
+    _PARAMETER_RTOL = 1e-9
+    _FLOAT_RTOL = 1e-9
+    _FLOAT_ATOL = 1e-6
+    _NUMBER_OF_VALIDATION_POINTS = 2
+
+    def __init__(self, compile_function: Callable[[dict], CompiledSchedule]):
+        """
+        Args:
+            compile_function: Function compiling a samplespace, e.g.
+                `BaseNode.precompile`.
+        """
+        self.compile_function = compile_function
+        self.is_valid = False
+
+        self._template: Optional[CompiledSchedule] = None
+        self._reference_parameters: Optional[np.ndarray] = None
+        self._directions: Optional[np.ndarray] = None
+        self._reference_values: Optional[np.ndarray] = None
+        self._is_integer: Optional[np.ndarray] = None
+        self._structure = None
+        self._varying_leaves: Optional[np.ndarray] = None
+        self._gradient: Optional[np.ndarray] = None
+
+    def fit(
+        self, samplespaces: List[dict], parameters: np.ndarray
+    ) -> Dict[int, CompiledSchedule]:
+        """
+        Compile the reference points of a sweep and validate the template.
+
+        Args:
+            samplespaces: The samplespaces of the sweep.
+            parameters: Array with the swept values of every point, the first
+                axis is the point of the sweep.
+
+        Returns:
+            The compiled schedules of the points compiled while fitting, by
+            their index in the sweep.
+        """
+        parameters = np.asarray(parameters, dtype=float).reshape(len(samplespaces), -1)
+        number_of_points = len(parameters)
+        if number_of_points == 0:
+            return {}
+
+        # Only the directions in which the parameters vary are fitted, e.g. all
+        # the values of a chunk of a frequency sweep are shifted by the same offset
+        self._reference_parameters = parameters[0]
+        _, singular_values, directions = np.linalg.svd(
+            parameters - self._reference_parameters, full_matrices=False
+        )
+        number_of_parameters = int(
+            np.sum(singular_values > self._PARAMETER_RTOL * singular_values.max())
+        )
+        self._directions = directions[:number_of_parameters]
+
+        # One point per parameter plus the first one and the points to validate
+        if number_of_parameters == 0 or number_of_points < (
+            number_of_parameters + 1 + self._NUMBER_OF_VALIDATION_POINTS
+        ):
+            return {}
+
+        reference_indices = [
+            int(index)
+            for index in np.linspace(0, number_of_points - 1, number_of_parameters + 1)
+        ]
+        validation_indices = [
+            index
+            for index in [number_of_points // 2, *range(number_of_points)]
+            if index not in reference_indices
+        ]
+        validation_indices = list(dict.fromkeys(validation_indices))[
+            : self._NUMBER_OF_VALIDATION_POINTS
+        ]
+
+        compiled_schedules = {
+            index: self.compile_function(samplespaces[index])
+            for index in reference_indices
+        }
+
+        structures, leaves = [], []
+        for index in reference_indices:
+            values, is_integer = [], []
+            structures.append(
+                self._flatten(compiled_schedules[index], values, is_integer)
+            )
+            leaves.append(np.asarray(values))
+        if any(structure != structures[0] for structure in structures[1:]):
+            logger.info("Compiled programs differ in structure, compiling every point")
+            return compiled_schedules
+
+        self._template = compiled_schedules[reference_indices[0]]
+        self._reference_values = leaves[0]
+        self._is_integer = np.asarray(is_integer, dtype=bool)
+        self._structure = structures[0]
+
+        leaf_differences = np.array(leaves[1:]) - leaves[0]
+        self._varying_leaves = np.flatnonzero(np.any(leaf_differences != 0, axis=0))
+        self._gradient, *_ = np.linalg.lstsq(
+            self._coordinates(parameters[reference_indices[1:]]),
+            leaf_differences[:, self._varying_leaves],
+            rcond=None,
+        )
+
+        self.is_valid = True
+        for index in validation_indices:
+            compiled_schedules[index] = self.compile_function(samplespaces[index])
+            if not self._validate(compiled_schedules[index], parameters[index]):
+                self.is_valid = False
+                break
+
+        if self.is_valid:
+            logger.info(
+                f"Rebinding {len(self._varying_leaves)} settings of the compiled "
+                f"schedule for the remaining points of the sweep"
+            )
+        else:
+            logger.info("Compiled settings are not affine, compiling every point")
+        return compiled_schedules
+
+    def compile(self, samplespace: dict, parameters: np.ndarray) -> CompiledSchedule:
+        """
+        Rebind the parameters into the template or compile the samplespace.
+
+        Args:
+            samplespace: The samplespace to compile if the template is not valid.
+            parameters: The swept values of the samplespace.
+
+        Returns:
+            The compiled schedule.
+        """
+        if not self.is_valid:
+            return self.compile_function(samplespace)
+
+        compiled_schedule = copy.copy(self._template)
+        compiled_schedule["compiled_instructions"] = _replace_leaves(
+            self._template.compiled_instructions,
+            iter(self._predict(parameters)),
+        )
+        return compiled_schedule
+
+    @staticmethod
+    def _flatten(
+        compiled_schedule: CompiledSchedule, values: List[float], is_integer: List[bool]
+    ) -> tuple:
+        return (
+            _flatten_leaves(
+                compiled_schedule.compiled_instructions, values, is_integer
+            ),
+            _timing(compiled_schedule),
+        )
+
+    def _coordinates(self, parameters: np.ndarray) -> np.ndarray:
+        return (
+            np.asarray(parameters, dtype=float).reshape(-1, len(self._directions.T))
+            - self._reference_parameters
+        ) @ self._directions.T
+
+    def _predict(self, parameters: np.ndarray) -> np.ndarray:
+        values = self._reference_values.copy()
+        values[self._varying_leaves] += (
+            self._coordinates(parameters)[0] @ self._gradient
+        )
+        return values
+
+    def _validate(
+        self, compiled_schedule: CompiledSchedule, parameters: np.ndarray
+    ) -> bool:
+        values, is_integer = [], []
+        if self._flatten(compiled_schedule, values, is_integer) != self._structure:
+            return False
+
+        predicted_values = self._predict(parameters)
+        values = np.asarray(values)
+        integers = self._is_integer
+        return bool(
+            np.array_equal(values[integers], np.round(predicted_values[integers]))
+            and np.allclose(
+                values[~integers],
+                predicted_values[~integers],
+                rtol=self._FLOAT_RTOL,
+                atol=self._FLOAT_ATOL,
+            )
+        )
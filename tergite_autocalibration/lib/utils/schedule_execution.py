@@ -22,37 +22,106 @@ from quantify_scheduler.instrument_coordinator.instrument_coordinator import (
 )
 
 from tergite_autocalibration.utils.dto.enums import MeasurementMode
+from tergite_autocalibration.utils.logger.phase_timing import timed_phase
 from tergite_autocalibration.utils.logger.tac_logger import logger
 
 
+# Seconds between two updates of the progress bar
+PROGRESS_INTERVAL = 0.2
+
+
+def _display_progress(
+    name: str,
+    schedule_duration: float,
+    measurement_done: threading.Event,
+    show_estimate: bool,
+) -> None:
+    """
+    Show the progress of a measurement until it is done.
+
+    Args:
+        name: Name of the schedule
+        schedule_duration: Expected duration of the measurement in seconds
+        measurement_done: Event that is set when the measurement has finished
+        show_estimate: Whether to show the remaining time based on the schedule duration
+    """
+    if show_estimate:
+        progress_bar = tqdm.tqdm(
+            total=schedule_duration,
+            desc=name,
+            colour="blue",
+            bar_format="{desc}: {percentage:3.0f}%|{bar}| [{elapsed}<{remaining}]",
+        )
+    else:
+        progress_bar = tqdm.tqdm(
+            desc=name, colour="blue", bar_format="{desc}: {elapsed}"
+        )
+
+    start_time = time.monotonic()
+    with progress_bar:
+        while not measurement_done.wait(PROGRESS_INTERVAL):
+            elapsed_time = time.monotonic() - start_time
+            # A measurement taking longer than expected stays just below 100 %
+            progress_bar.n = (
+                min(elapsed_time, 0.99 * schedule_duration)
+                if show_estimate
+                else elapsed_time
+            )
+            progress_bar.refresh()
+        if show_estimate:
+            progress_bar.n = schedule_duration
+            progress_bar.refresh()
+
+
+@timed_phase("execute_schedule")
 def execute_schedule(
     compiled_schedule: CompiledSchedule,
     schedule_duration: float,
     lab_ic: InstrumentCoordinator,
     cluster_status,
 ) -> xarray.Dataset:
+    """
+    Run a compiled schedule on the instruments and retrieve the acquisitions.
+
+    The progress is shown while the instrument coordinator waits for the
+    instruments, and the function returns as soon as they are done, regardless
+    of the expected schedule duration.
+
+    Args:
+        compiled_schedule: The compiled schedule to run
+        schedule_duration: Expected duration of the measurement in seconds
+        lab_ic: Instrument coordinator of the cluster
+        cluster_status: Measurement mode, the remaining time is only estimated on real hardware
+
+    Returns:
+        The raw dataset of the acquisitions
+    """
     logger.info("Starting measurement")
 
+    measurement_done = threading.Event()
+    measurement_errors = []
+
     def run_measurement() -> None:
-        lab_ic.prepare(compiled_schedule)
-        lab_ic.start()
-        lab_ic.wait_done(timeout_sec=3600)
-
-    def display_progress() -> None:
-        steps = int(schedule_duration * 5)
-        if cluster_status == MeasurementMode.dummy:
-            progress_sleep = 0.004
-        elif cluster_status == MeasurementMode.real:
-            progress_sleep = 0.2
-        for _ in tqdm.tqdm(range(steps), desc=compiled_schedule.name, colour="blue"):
-            time.sleep(progress_sleep)
-
-    thread_tqdm = threading.Thread(target=display_progress)
-    thread_tqdm.start()
-    thread_lab = threading.Thread(target=run_measurement)
+        try:
+            lab_ic.prepare(compiled_schedule)
+            lab_ic.start()
+            lab_ic.wait_done(timeout_sec=3600)
+        except BaseException as error:
+            measurement_errors.append(error)
+        finally:
+            measurement_done.set()
+
+    thread_lab = threading.Thread(target=run_measurement, name="measurement")
     thread_lab.start()
+    _display_progress(
+        compiled_schedule.name,
+        schedule_duration,
+        measurement_done,
+        show_estimate=cluster_status == MeasurementMode.real and schedule_duration > 0,
+    )
     thread_lab.join()
-    thread_tqdm.join()
+    if measurement_errors:
+        raise measurement_errors[0]
 
     raw_dataset: xarray.Dataset = lab_ic.retrieve_acquisition()
     lab_ic.stop()
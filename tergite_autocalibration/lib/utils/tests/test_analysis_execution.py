@@ -0,0 +1,120 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.lib.utils.analysis_execution import (
+    fit_elements,
+    get_analysis_executor,
+)
+
+
+class _Analysis:
+    def __init__(self):
+        self.result = None
+        self.pid = None
+
+    def fit_qubit(self, dataset, qubit_element):
+        self.result = (qubit_element, float(dataset[f"y{qubit_element}"].sum()))
+        self.pid = os.getpid()
+
+
+class _UnpicklableAnalysis(_Analysis):
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+
+
+class _FailingAnalysis(_Analysis):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def fit_qubit(self, dataset, qubit_element):
+        self.calls += 1
+        raise ValueError(f"fit of {qubit_element} failed")
+
+
+def _fit_tasks(analysis_class, qubits):
+    return [
+        (
+            analysis_class(),
+            "fit_qubit",
+            xr.Dataset({f"y{qubit}": ("x", np.arange(4.0) * index)}),
+            qubit,
+        )
+        for index, qubit in enumerate(qubits)
+    ]
+
+
+@pytest.fixture(name="executor")
+def fixture_executor():
+    executor = ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context("fork")
+    )
+    yield executor
+    executor.shutdown()
+
+
+def test_fit_elements_in_worker_processes(executor):
+    qubits = ["q06", "q07", "q08"]
+
+    fitted_analyses = fit_elements(_fit_tasks(_Analysis, qubits), executor)
+
+    assert [analysis.result for analysis in fitted_analyses] == [
+        ("q06", 0.0),
+        ("q07", 6.0),
+        ("q08", 12.0),
+    ]
+    assert all(analysis.pid != os.getpid() for analysis in fitted_analyses)
+
+
+def test_fit_elements_falls_back_to_main_process(executor):
+    fitted_analyses = fit_elements(
+        _fit_tasks(_UnpicklableAnalysis, ["q06", "q07"]), executor
+    )
+
+    assert [analysis.result for analysis in fitted_analyses] == [
+        ("q06", 0.0),
+        ("q07", 6.0),
+    ]
+    assert all(analysis.pid == os.getpid() for analysis in fitted_analyses)
+
+
+def test_fit_elements_sequential_by_default(monkeypatch):
+    monkeypatch.setattr(ENV, "analysis_workers", 1)
+    fit_tasks = _fit_tasks(_Analysis, ["q06", "q07"])
+
+    assert get_analysis_executor() is None
+    fitted_analyses = fit_elements(fit_tasks)
+
+    # Without workers the analyses are fitted in place
+    assert fitted_analyses == [fit_task[0] for fit_task in fit_tasks]
+    assert all(analysis.pid == os.getpid() for analysis in fitted_analyses)
+
+
+def test_fit_elements_raises_fit_errors(executor):
+    fit_tasks = _fit_tasks(_FailingAnalysis, ["q06", "q07"])
+
+    with pytest.raises(ValueError, match="fit of q06 failed"):
+        fit_elements(fit_tasks, executor)
+
+    # The failed fit is not repeated in the main process
+    assert [fit_task[0].calls for fit_task in fit_tasks] == [0, 0]
@@ -0,0 +1,102 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import lmfit
+import numpy as np
+
+from tergite_autocalibration.lib.utils.batched_fitting import (
+    Traces,
+    fit_all_traces,
+    fit_traces,
+)
+
+
+def _damped_cosine(t, frequency, amplitude, tau, offset, phase):
+    return (
+        amplitude * np.exp(-t / tau) * np.cos(2 * np.pi * frequency * t + phase)
+        + offset
+    )
+
+
+def _model() -> lmfit.Model:
+    model = lmfit.Model(_damped_cosine)
+    model.set_param_hint("frequency", min=0)
+    model.set_param_hint("amplitude", min=0, max=2)
+    model.set_param_hint("tau", min=0)
+    model.set_param_hint("phase", expr="0")
+    model.set_param_hint("period", expr="1/frequency")
+    return model
+
+
+def _traces(rng, n_traces, n_points=80) -> Traces:
+    t = np.linspace(0, 4e-6, n_points)
+    frequencies = rng.uniform(0.5e6, 2e6, n_traces)
+    data = (
+        0.4 * np.exp(-t / 3e-6) * np.cos(2 * np.pi * frequencies[:, np.newaxis] * t)
+        + 0.5
+        + rng.normal(0, 0.02, (n_traces, n_points))
+    )
+    model = _model()
+    params = []
+    for frequency in frequencies:
+        params.append(
+            model.make_params(
+                frequency=frequency * 1.05, amplitude=0.3, tau=2e-6, offset=0.4
+            )
+        )
+    return Traces(model, data, params, {"t": t})
+
+
+def _assert_matches_lmfit(traces, fits):
+    for data, params, fit in zip(traces.data, traces.params, fits):
+        expected = traces.model.fit(data, params=params, **traces.independent_vars)
+        for name in ["frequency", "amplitude", "tau", "offset", "period"]:
+            assert np.isclose(
+                fit.params[name].value, expected.params[name].value, rtol=1e-4
+            )
+            assert np.isclose(
+                fit.params[name].stderr, expected.params[name].stderr, rtol=2e-2
+            )
+        assert np.isclose(fit.chisqr, expected.chisqr, rtol=1e-6)
+
+
+def test_fit_traces_matches_lmfit():
+    traces = _traces(np.random.default_rng(0), 20)
+
+    fits = fit_traces(traces)
+
+    assert all(fit.batched for fit in fits)
+    _assert_matches_lmfit(traces, fits)
+    t = np.linspace(0, 4e-6, 7)
+    assert np.allclose(fits[0].eval(t=t), traces.model.eval(fits[0].params, t=t))
+
+
+def test_not_converged_traces_are_fitted_with_lmfit():
+    traces = _traces(np.random.default_rng(1), 3)
+
+    fits = fit_traces(traces, max_iterations=0)
+
+    assert not any(fit.batched for fit in fits)
+    _assert_matches_lmfit(traces, fits)
+
+
+def test_fit_all_traces_groups_the_traces():
+    rng = np.random.default_rng(2)
+    all_traces = [_traces(rng, 2), None, _traces(rng, 3), _traces(rng, 1, 60)]
+
+    all_fits = fit_all_traces(all_traces)
+
+    assert all_fits[1] is None
+    for traces, fits in zip(all_traces, all_fits):
+        if traces is not None:
+            assert len(fits) == len(traces)
+            _assert_matches_lmfit(traces, fits)
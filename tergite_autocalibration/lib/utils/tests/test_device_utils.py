@@ -12,12 +12,13 @@
 import numpy
 import pytest
 
-# from tergite_autocalibration.lib.utils.device import configure_device
+from tergite_autocalibration.lib.utils.device import DeviceManager
 from tergite_autocalibration.lib.utils.validators import (
     get_batched_dimensions,
     get_number_of_batches,
     reduce_batch,
 )
+from tergite_autocalibration.tests.utils.fake_redis import FakeRedis
 
 
 def test_device_configuration():
@@ -29,6 +30,59 @@ def test_device_configuration():
     # TODO: ----------------------------------------------------
 
 
+@pytest.fixture(name="redis_connection")
+def fixture_redis_connection(monkeypatch):
+    from tergite_autocalibration.utils.backend import parameter_cache
+
+    redis_connection = FakeRedis()
+    for qubit in ["q01", "q02"]:
+        redis_connection.hset(
+            f"transmons:{qubit}",
+            mapping={
+                "clock_freqs:f01": "4.5e9",
+                "rxy:amp180": "0.1",
+                "measure:pulse_amp": "0.02",
+                "t1_time": "nan",
+            },
+        )
+    cache = parameter_cache.ParameterCache(redis_connection, enabled=False)
+    monkeypatch.setattr(parameter_cache, "_parameter_cache", cache)
+    return redis_connection
+
+
+def test_device_manager_applies_changed_fields(redis_connection):
+    manager = DeviceManager()
+    qubits = ["q01", "q02"]
+    try:
+        device_configuration = manager.get_device_configuration(qubits, None)
+        transmon = device_configuration.transmons["q02"]
+        snapshot = device_configuration.snapshot("rabi_oscillations")
+
+        redis_connection.hset("transmons:q02", "rxy:amp180", "0.2")
+        updated_configuration = manager.get_device_configuration(qubits, None)
+
+        # The same device is reused with the new value
+        assert updated_configuration is device_configuration
+        assert updated_configuration.transmons["q02"] is transmon
+        assert transmon.rxy.amp180() == 0.2
+        # The measure submodule keeps the acquisition channel of the qubit
+        assert transmon.measure.acq_channel() == 1
+        # The snapshot of the earlier node is not affected
+        assert snapshot.serial_device["q02"]["data"]["rxy"]["amp180"] == 0.1
+        assert (
+            updated_configuration.snapshot("ramsey_correction").serial_device["q02"][
+                "data"
+            ]["rxy"]["amp180"]
+            == 0.2
+        )
+
+        # Other elements require a new device
+        other_configuration = manager.get_device_configuration(["q01"], None)
+        assert other_configuration is not device_configuration
+    finally:
+        manager.close()
+
+
 def test_batched_samplespaces():
     batched_samplespace = {
         "frequencies": {
@@ -0,0 +1,64 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import numpy as np
+import pytest
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+from sklearn.metrics import confusion_matrix
+
+from tergite_autocalibration.lib.utils.discriminant import (
+    assignment_fidelities,
+    confusion_matrices,
+    fit_linear_discriminants,
+)
+
+
+def _shots(rng, n_states, n_readouts, shots_per_state):
+    centers = rng.normal(scale=2.0, size=(n_readouts, n_states, 2))
+    y = np.repeat(np.arange(n_states), shots_per_state)
+    iq = centers[:, y] + rng.normal(size=(n_readouts, len(y), 2))
+    return iq, y
+
+
+@pytest.mark.parametrize("n_states", [2, 3])
+def test_discriminants_match_scikit_learn(n_states):
+    rng = np.random.default_rng(n_states)
+    iq, y = _shots(rng, n_states, n_readouts=5, shots_per_state=300)
+
+    discriminants = fit_linear_discriminants(iq, y)
+    y_pred = discriminants.predict(iq)
+    cms = confusion_matrices(y, y_pred, discriminants.classes_)
+
+    for index in range(len(iq)):
+        lda = LinearDiscriminantAnalysis(solver="svd").fit(iq[index], y)
+        assert np.allclose(discriminants[index].coef_, lda.coef_)
+        assert np.allclose(discriminants[index].intercept_, lda.intercept_)
+        assert np.all(discriminants[index].predict(iq[index]) == lda.predict(iq[index]))
+        assert np.allclose(
+            cms[index], confusion_matrix(y, y_pred[index], normalize="true")
+        )
+    assert np.allclose(
+        assignment_fidelities(cms), np.trace(cms, axis1=1, axis2=2) / n_states
+    )
+
+
+def test_discriminant_line_of_two_states():
+    rng = np.random.default_rng(0)
+    iq, y = _shots(rng, 2, n_readouts=1, shots_per_state=300)
+
+    lda = fit_linear_discriminants(iq, y)[0]
+    a, b = lda.coef_[0]
+
+    assert np.isclose(lda.rotation, np.rad2deg(np.arctan(-a / b)))
+    assert np.isclose(lda.threshold, abs(lda.intercept_[0]) / np.hypot(a, b))
+    with pytest.raises(ValueError):
+        fit_linear_discriminants(*_shots(rng, 3, 1, 10)).rotation
@@ -0,0 +1,52 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+from tergite_autocalibration.lib.utils.graph import (
+    calibration_dependency_graph,
+    filtered_topological_order,
+)
+
+
+def test_single_target_is_a_chain():
+    topo_order = filtered_topological_order("T2")
+    dependency_graph = calibration_dependency_graph(topo_order)
+
+    assert topo_order[0] == "resonator_spectroscopy"
+    assert topo_order[-1] == "T2"
+    # Every node depends only on its predecessor in the order
+    assert list(dependency_graph.edges) == list(zip(topo_order[:-1], topo_order[1:]))
+
+
+def test_multiple_targets_have_independent_branches():
+    topo_order = filtered_topological_order(["T2", "n_rabi_oscillations"])
+    dependency_graph = calibration_dependency_graph(topo_order)
+
+    assert topo_order[0] == "resonator_spectroscopy"
+    assert len(topo_order) == len(set(topo_order))
+    # The order is still a valid topological order
+    for dependency, node in dependency_graph.edges:
+        assert topo_order.index(dependency) < topo_order.index(node)
+
+    # T1 -> T2 and ramsey_correction -> motzoi_parameter do not depend on each other
+    assert dependency_graph.has_edge("rabi_oscillations", "T1")
+    assert dependency_graph.has_edge("rabi_oscillations", "ramsey_correction")
+    assert not dependency_graph.has_edge("T1", "ramsey_correction")
+    assert not dependency_graph.has_edge("ramsey_correction", "T1")
+
+
+def test_dependencies_through_skipped_nodes_are_kept():
+    dependency_graph = calibration_dependency_graph(
+        ["resonator_spectroscopy", "T1", "punchout"]
+    )
+
+    assert dependency_graph.has_edge("resonator_spectroscopy", "T1")
+    assert dependency_graph.in_degree("punchout") == 0
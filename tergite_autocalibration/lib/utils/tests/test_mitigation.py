@@ -0,0 +1,66 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import numpy as np
+from scipy.optimize import minimize
+
+from tergite_autocalibration.lib.utils.mitigation import (
+    mitigate,
+    project_onto_simplex,
+)
+
+
+def _constrained_fit(probabilities, cm_inv):
+    corrected = probabilities @ cm_inv
+    result = minimize(
+        lambda t: np.linalg.norm(corrected - t),
+        probabilities,
+        method="SLSQP",
+        constraints=(
+            {"type": "eq", "fun": lambda t: np.sum(t) - 1},
+            {"type": "ineq", "fun": lambda t: t},
+        ),
+    )
+    return result.x
+
+
+def _confusion_matrices(rng, number):
+    confusion = 0.9 * np.identity(3) + 0.1 * rng.random((number, 3, 3))
+    return confusion / confusion.sum(axis=-1, keepdims=True)
+
+
+def test_projection_keeps_probabilities():
+    probabilities = np.array([[0.2, 0.3, 0.5], [1.0, 0.0, 0.0]])
+
+    assert np.allclose(project_onto_simplex(probabilities), probabilities)
+
+
+def test_projection_of_points_outside_the_simplex():
+    projected = project_onto_simplex(np.array([[1.2, -0.1, -0.1], [0.6, 0.6, -0.2]]))
+
+    assert np.allclose(projected, [[1.0, 0.0, 0.0], [0.5, 0.5, 0.0]])
+
+
+def test_mitigate_matches_the_constrained_fit():
+    rng = np.random.default_rng(0)
+    cm_inv = np.linalg.inv(_confusion_matrices(rng, 4))
+    probabilities = rng.dirichlet([1.0, 0.3, 0.1], size=(4, 25))
+
+    mitigated = mitigate(probabilities, cm_inv[:, np.newaxis])
+
+    assert mitigated.shape == probabilities.shape
+    assert np.allclose(mitigated.sum(axis=-1), 1)
+    assert np.all(mitigated >= 0)
+    for sweep in range(4):
+        for point in range(25):
+            expected = _constrained_fit(probabilities[sweep, point], cm_inv[sweep])
+            assert np.allclose(mitigated[sweep, point], expected, atol=1e-3)
@@ -0,0 +1,67 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import matplotlib.pyplot as plt
+import pytest
+
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.lib.utils.plot_rendering import (
+    PlotRenderer,
+    plot_resolutions,
+)
+
+
+def _figure():
+    fig, ax = plt.subplots(figsize=(2, 1))
+    ax.plot([0, 1], [1, 0])
+    return fig
+
+
+def test_save_figure_in_background(tmp_path):
+    renderer = PlotRenderer()
+    fig = _figure()
+
+    future = renderer.save_figure(
+        fig, {tmp_path / "low.png": 50, tmp_path / "high.png": 100}
+    )
+
+    # The figure is not managed by pyplot anymore
+    assert not plt.fignum_exists(fig.number)
+    renderer.wait()
+    assert future.done()
+    low_width, _ = plt.imread(tmp_path / "low.png").shape[1::-1]
+    high_width, _ = plt.imread(tmp_path / "high.png").shape[1::-1]
+    assert high_width == pytest.approx(2 * low_width, abs=2)
+
+
+def test_save_figure_errors_do_not_propagate(tmp_path):
+    renderer = PlotRenderer()
+
+    future = renderer.save_figure(_figure(), {tmp_path / "missing" / "fig.png": 50})
+    renderer.wait()
+
+    assert isinstance(future.exception(), FileNotFoundError)
+    # Saving later figures still works
+    renderer.save_figure(_figure(), {tmp_path / "fig.png": 50}).result()
+    assert (tmp_path / "fig.png").exists()
+
+
+def test_plot_resolutions(tmp_path, monkeypatch):
+    monkeypatch.setattr(ENV, "plot_preview_dpi", 100)
+    monkeypatch.setattr(ENV, "plot_dpi", 400)
+    assert plot_resolutions(tmp_path, "rabi") == {
+        tmp_path / "rabi_preview.png": 100,
+        tmp_path / "rabi.png": 400,
+    }
+
+    monkeypatch.setattr(ENV, "plot_dpi", 0)
+    assert plot_resolutions(tmp_path, "rabi") == {tmp_path / "rabi_preview.png": 100}
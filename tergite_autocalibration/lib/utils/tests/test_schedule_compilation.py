@@ -0,0 +1,420 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import dataclasses
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+import qblox_instruments
+import quantify_scheduler
+from quantify_scheduler.backends import SerialCompiler
+from quantify_scheduler.device_under_test.quantum_device import QuantumDevice
+from quantify_scheduler.device_under_test.transmon_element import BasicTransmonElement
+from quantify_scheduler.schedules.schedule import CompiledSchedule, Schedule
+from quantify_scheduler.schedules.timedomain_schedules import rabi_sched
+
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.lib.utils import schedule_compilation
+from tergite_autocalibration.lib.utils.schedule_compilation import (
+    CompiledScheduleCache,
+    ParametricScheduleTemplate,
+    _flatten_leaves,
+    _replace_leaves,
+    compile_ahead,
+    get_compiled_schedule_cache,
+)
+from tergite_autocalibration.utils.logger.phase_timing import (
+    get_phase_timer,
+    node_timing,
+    timed_phase,
+)
+
+
+def test_compile_ahead_keeps_order():
+    samplespaces = [{"x": i} for i in range(5)]
+
+    results = list(compile_ahead(lambda s: s["x"] ** 2, samplespaces))
+
+    assert results == [(s, s["x"] ** 2) for s in samplespaces]
+
+
+def test_compile_ahead_compiles_next_step_during_execution():
+    compiled = []
+    next_compiled = threading.Event()
+
+    def compile_function(samplespace):
+        compiled.append(samplespace)
+        if samplespace == 1:
+            next_compiled.set()
+        return samplespace
+
+    for samplespace, _ in compile_ahead(compile_function, [0, 1]):
+        if samplespace == 0:
+            # Step 1 is compiled while step 0 is being "executed"
+            assert next_compiled.wait(timeout=5)
+
+    assert compiled == [0, 1]
+
+
+def test_compile_ahead_raises_compilation_errors():
+    def compile_function(samplespace):
+        if samplespace == 1:
+            raise ValueError("compilation failed")
+        return samplespace
+
+    with pytest.raises(ValueError, match="compilation failed"):
+        list(compile_ahead(compile_function, [0, 1, 2]))
+
+
+def test_compile_ahead_records_the_phases_of_the_node():
+    phase_timer = get_phase_timer()
+    phase_timer.reset()
+
+    @timed_phase("precompile")
+    def compile_function(samplespace):
+        return samplespace
+
+    try:
+        with node_timing("qubit_01_spectroscopy"):
+            compile_function(0)
+            list(compile_ahead(compile_function, [1, 2, 3]))
+
+        phases = phase_timer.node_phases("qubit_01_spectroscopy")
+        assert phases["precompile"].calls == 4
+    finally:
+        phase_timer.reset()
+
+
+def test_compile_ahead_empty():
+    assert list(compile_ahead(lambda s: s, [])) == []
+
+
+@pytest.fixture(name="quantum_device", scope="module")
+def fixture_quantum_device():
+    hardware_config_path = os.path.join(
+        os.path.dirname(quantify_scheduler.__file__),
+        "schemas",
+        "examples",
+        "qblox_hardware_config_transmon.json",
+    )
+    with open(hardware_config_path) as f:
+        hardware_config = json.load(f)
+
+    quantum_device = QuantumDevice("test_schedule_cache_device")
+    transmon = BasicTransmonElement("q0")
+    transmon.clock_freqs.f01(5e9)
+    transmon.clock_freqs.readout(7e9)
+    transmon.rxy.amp180(0.2)
+    transmon.measure.acq_delay(100e-9)
+    quantum_device.add_element(transmon)
+    quantum_device.hardware_config(hardware_config)
+
+    yield quantum_device
+
+    quantum_device.close()
+    transmon.close()
+
+
+def _rabi_schedule(amplitudes=(0.1, 0.2, 0.3)):
+    return rabi_sched(list(amplitudes), 12e-9, 5e9, "q0")
+
+
+def test_cache_key_is_independent_of_schedulable_labels(quantum_device):
+    compilation_config = quantum_device.generate_compilation_config()
+
+    key = CompiledScheduleCache.compute_key(_rabi_schedule(), compilation_config)
+
+    assert key == CompiledScheduleCache.compute_key(
+        _rabi_schedule(), compilation_config
+    )
+    assert key != CompiledScheduleCache.compute_key(
+        _rabi_schedule((0.1, 0.2, 0.4)), compilation_config
+    )
+
+
+def test_cache_key_depends_on_device_configuration(quantum_device):
+    transmon = quantum_device.get_element("q0")
+    key = CompiledScheduleCache.compute_key(
+        _rabi_schedule(), quantum_device.generate_compilation_config()
+    )
+
+    transmon.rxy.amp180(0.25)
+    try:
+        assert key != CompiledScheduleCache.compute_key(
+            _rabi_schedule(), quantum_device.generate_compilation_config()
+        )
+    finally:
+        transmon.rxy.amp180(0.2)
+
+
+def test_cache_key_depends_on_library_versions(quantum_device, monkeypatch):
+    compilation_config = quantum_device.generate_compilation_config()
+    key = CompiledScheduleCache.compute_key(_rabi_schedule(), compilation_config)
+
+    monkeypatch.setattr(qblox_instruments, "__version__", "0.0.0")
+    qblox_key = CompiledScheduleCache.compute_key(_rabi_schedule(), compilation_config)
+    monkeypatch.setattr(quantify_scheduler, "__version__", "0.0.0")
+    quantify_key = CompiledScheduleCache.compute_key(
+        _rabi_schedule(), compilation_config
+    )
+
+    assert len({key, qblox_key, quantify_key}) == 3
+
+
+@pytest.mark.parametrize("cache_dir", ["", "schedule_cache"])
+def test_disk_cache_is_opt_in(monkeypatch, tmp_path, cache_dir):
+    monkeypatch.setattr(schedule_compilation, "_compiled_schedule_cache", None)
+    monkeypatch.setattr(ENV, "schedule_cache", True)
+    monkeypatch.setattr(ENV, "data_dir", tmp_path)
+    monkeypatch.setattr(
+        ENV, "schedule_cache_dir", str(tmp_path / cache_dir) if cache_dir else ""
+    )
+
+    cache = get_compiled_schedule_cache()
+    cache.put("key", b"compiled schedule")
+
+    if cache_dir:
+        assert cache.cache_dir == tmp_path / cache_dir
+        assert [file.name for file in cache.cache_dir.iterdir()] == ["key.pkl"]
+    else:
+        assert cache.cache_dir is None
+        assert not any(tmp_path.iterdir())
+
+
+def test_cache_hits_and_misses(quantum_device, tmp_path):
+    compiler = SerialCompiler("test_schedule_cache_compiler")
+    compilation_config = quantum_device.generate_compilation_config()
+    cache = CompiledScheduleCache(cache_dir=tmp_path)
+
+    compiled_schedule = cache.compile(compiler, _rabi_schedule(), compilation_config)
+    assert cache.stats == {"memory_hits": 0, "disk_hits": 0, "misses": 1}
+
+    assert cache.compile(compiler, _rabi_schedule(), compilation_config) is (
+        compiled_schedule
+    )
+    assert cache.stats == {"memory_hits": 1, "disk_hits": 0, "misses": 1}
+
+    # A new cache on the same directory reads the schedule from disk
+    new_cache = CompiledScheduleCache(cache_dir=tmp_path)
+    from_disk = new_cache.compile(compiler, _rabi_schedule(), compilation_config)
+    assert new_cache.stats == {"memory_hits": 0, "disk_hits": 1, "misses": 0}
+    assert from_disk.compiled_instructions.keys() == (
+        compiled_schedule.compiled_instructions.keys()
+    )
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = CompiledScheduleCache(
+        cache_dir=tmp_path, max_memory_items=2, max_disk_size_mb=2.5 / 1024
+    )
+    payload = b"x" * 1000
+
+    for key in ["a", "b", "c"]:
+        cache.put(key, payload)
+        time.sleep(0.01)
+
+    assert list(cache._memory) == ["b", "c"]
+    assert sorted(file.stem for file in tmp_path.glob("*.pkl")) == ["b", "c"]
+
+    cache.clear()
+    assert cache.get("c") is None
+    assert cache.misses == 1
+
+
+def _leaves(compiled_schedule):
+    values, is_integer = [], []
+    structure = _flatten_leaves(
+        compiled_schedule.compiled_instructions, values, is_integer
+    )
+    return structure, np.array(values)
+
+
+def test_replace_leaves_round_trip():
+    @dataclasses.dataclass(frozen=True)
+    class Settings:
+        modulation_freq: float
+        attenuation: int
+
+    instructions = {
+        "program": " set_awg_gain 8191,-8191\n upd_param 4",
+        "waveforms": {"-8314646351233697364": {"data": [0.0, 0.5], "index": 0}},
+        "sequencers": [Settings(modulation_freq=5e7, attenuation=4)],
+        "settings": {"lo0_freq": 5e9, "out0_att": 4},
+        "frequency": {"lo0": 4},
+    }
+    values, is_integer = [], []
+    structure = _flatten_leaves(instructions, values, is_integer)
+    # Only the affine settings are leaves, the rest is part of the structure
+    assert values == [5e7, 5e9, 4]
+    assert is_integer == [False, False, True]
+
+    new_instructions = _replace_leaves(instructions, iter([6e7, 6e9, 5]))
+
+    assert new_instructions["sequencers"] == [
+        Settings(modulation_freq=6e7, attenuation=4)
+    ]
+    assert new_instructions["settings"] == {"lo0_freq": 6e9, "out0_att": 4}
+    assert new_instructions["frequency"] == {"lo0": 5}
+    assert new_instructions["program"] is instructions["program"]
+    assert new_instructions["waveforms"] == instructions["waveforms"]
+    # The template is not modified
+    assert instructions["sequencers"][0].modulation_freq == 5e7
+    assert _flatten_leaves(new_instructions, [], []) == structure
+
+    instructions["settings"]["out0_att"] = 2
+    assert _flatten_leaves(instructions, [], []) != structure
+
+
+def test_parametric_template_rebinds_frequency(quantum_device):
+    compiler = SerialCompiler("test_schedule_template_compiler")
+    compilation_config = quantum_device.generate_compilation_config()
+    compiled_points = []
+
+    def compile_function(samplespace):
+        compiled_points.append(samplespace["index"])
+        schedule = rabi_sched([0.1, 0.2], 12e-9, samplespace["frequency"], "q0")
+        return compiler.compile(schedule, compilation_config)
+
+    frequencies = np.linspace(4.9e9, 5.1e9, 7)
+    samplespaces = [
+        {"index": index, "frequency": frequency}
+        for index, frequency in enumerate(frequencies)
+    ]
+
+    template = ParametricScheduleTemplate(compile_function)
+    compiled_schedules = template.fit(samplespaces, frequencies)
+
+    assert template.is_valid
+    # Two reference points and two validation points
+    assert sorted(compiled_schedules) == sorted(compiled_points)
+    assert len(compiled_points) == 4
+
+    for index in set(range(len(samplespaces))) - set(compiled_schedules):
+        rebound_schedule = template.compile(samplespaces[index], frequencies[index])
+        compiled_schedule = compile_function(samplespaces[index])
+        rebound_structure, rebound_values = _leaves(rebound_schedule)
+        structure, values = _leaves(compiled_schedule)
+
+        assert rebound_structure == structure
+        np.testing.assert_allclose(rebound_values, values, rtol=1e-12)
+        assert rebound_schedule.timing_table.data["abs_time"].equals(
+            compiled_schedule.timing_table.data["abs_time"]
+        )
+
+
+@pytest.mark.parametrize(
+    "samplespaces, parameters",
+    [
+        # The number of samples of the waveforms changes with the duration
+        (
+            [{"duration": duration} for duration in [12e-9, 16e-9, 20e-9, 24e-9]],
+            [12e-9, 16e-9, 20e-9, 24e-9],
+        ),
+        # The amplitudes are immediate values of the sequencer programs
+        (
+            [{"amplitude": amplitude} for amplitude in [0.1, 0.2, 0.3, 0.4]],
+            [0.1, 0.2, 0.3, 0.4],
+        ),
+    ],
+)
+def test_parametric_template_falls_back_to_compilation(
+    quantum_device, samplespaces, parameters
+):
+    compiler = SerialCompiler("test_schedule_template_fallback_compiler")
+    compilation_config = quantum_device.generate_compilation_config()
+    compiled_points = []
+
+    def compile_function(samplespace):
+        compiled_points.append(samplespace)
+        schedule = rabi_sched(
+            [samplespace.get("amplitude", 0.1)],
+            samplespace.get("duration", 12e-9),
+            5e9,
+            "q0",
+        )
+        return compiler.compile(schedule, compilation_config)
+
+    template = ParametricScheduleTemplate(compile_function)
+    template.fit(samplespaces, np.array(parameters))
+
+    assert not template.is_valid
+    template.compile(samplespaces[1], parameters[1])
+    assert compiled_points[-1] == samplespaces[1]
+
+
+def _settings_schedule(settings):
+    compiled_schedule = CompiledSchedule(Schedule("settings"))
+    compiled_schedule["compiled_instructions"] = {"seq0": settings}
+    return compiled_schedule
+
+
+def test_parametric_template_compares_integers_exactly():
+    def compile_function(samplespace):
+        # An integer setting that is not affine in the least significant bit
+        value = 2 * samplespace["x"] + (samplespace["x"] == 2)
+        return _settings_schedule({"lo0_freq": value})
+
+    samplespaces = [{"x": x} for x in range(5)]
+    template = ParametricScheduleTemplate(compile_function)
+    template.fit(samplespaces, np.arange(5))
+
+    assert not template.is_valid
+
+
+def test_parametric_template_validates_two_points():
+    compiled_points = []
+
+    def compile_function(samplespace):
+        compiled_points.append(samplespace["x"])
+        return _settings_schedule({"modulation_freq": 1e6 * samplespace["x"]})
+
+    samplespaces = [{"x": x} for x in range(3)]
+    template = ParametricScheduleTemplate(compile_function)
+
+    # One parameter needs two reference points and two validation points
+    assert template.fit(samplespaces, np.arange(3)) == {}
+    assert not template.is_valid
+
+    samplespaces = [{"x": x} for x in range(4)]
+    template.fit(samplespaces, np.arange(4))
+    assert template.is_valid
+    assert sorted(compiled_points) == [0, 1, 2, 3]
+
+
+def test_parametric_template_fits_the_directions_of_the_parameters():
+    compiled_points = []
+
+    def compile_function(samplespace):
+        compiled_points.append(samplespace["shift"])
+        return _settings_schedule({"lo0_freq": samplespace["frequencies"][0]})
+
+    # Chunks of a frequency sweep shifted by the same offset have one parameter
+    frequencies = np.linspace(4e9, 4.1e9, 11)
+    shifts = np.arange(6) * 0.1e9
+    samplespaces = [
+        {"shift": shift, "frequencies": frequencies + shift} for shift in shifts
+    ]
+    parameters = np.array([samplespace["frequencies"] for samplespace in samplespaces])
+
+    template = ParametricScheduleTemplate(compile_function)
+    template.fit(samplespaces, parameters)
+
+    assert template.is_valid
+    assert len(compiled_points) == 4
+    rebound_schedule = template.compile(samplespaces[4], parameters[4])
+    assert rebound_schedule.compiled_instructions["seq0"]["lo0_freq"] == (
+        pytest.approx(4.4e9, rel=1e-12)
+    )
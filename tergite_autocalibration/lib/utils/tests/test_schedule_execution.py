@@ -0,0 +1,78 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import time
+from types import SimpleNamespace
+
+import pytest
+import xarray as xr
+
+from tergite_autocalibration.lib.utils.schedule_execution import execute_schedule
+from tergite_autocalibration.utils.dto.enums import MeasurementMode
+
+
+class _InstrumentCoordinator:
+    def __init__(self, measurement_time: float, error: Exception = None):
+        self.measurement_time = measurement_time
+        self.error = error
+        self.calls = []
+
+    def prepare(self, compiled_schedule):
+        self.calls.append("prepare")
+
+    def start(self):
+        self.calls.append("start")
+
+    def wait_done(self, timeout_sec):
+        time.sleep(self.measurement_time)
+        if self.error is not None:
+            raise self.error
+        self.calls.append("wait_done")
+
+    def retrieve_acquisition(self):
+        self.calls.append("retrieve_acquisition")
+        return xr.Dataset()
+
+    def stop(self):
+        self.calls.append("stop")
+
+
+@pytest.mark.parametrize(
+    "cluster_status", [MeasurementMode.real, MeasurementMode.dummy]
+)
+def test_returns_when_the_measurement_is_done(cluster_status):
+    lab_ic = _InstrumentCoordinator(measurement_time=0.3)
+
+    start_time = time.monotonic()
+    execute_schedule(SimpleNamespace(name="schedule"), 60, lab_ic, cluster_status)
+
+    # The expected duration of 60 s does not delay the execution
+    assert time.monotonic() - start_time < 5
+    assert lab_ic.calls == [
+        "prepare",
+        "start",
+        "wait_done",
+        "retrieve_acquisition",
+        "stop",
+    ]
+
+
+def test_measurement_errors_are_raised():
+    lab_ic = _InstrumentCoordinator(
+        measurement_time=0.0, error=TimeoutError("cluster not done")
+    )
+
+    with pytest.raises(TimeoutError, match="cluster not done"):
+        execute_schedule(
+            SimpleNamespace(name="schedule"), 1, lab_ic, MeasurementMode.real
+        )
+    assert "retrieve_acquisition" not in lab_ic.calls
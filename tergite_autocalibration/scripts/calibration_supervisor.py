@@ -17,30 +17,61 @@
 #
 # - Martin Ahindura, 2023
 
+import contextlib
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
 from dataclasses import dataclass, field
 from ipaddress import IPv4Address
 from pathlib import Path
-from typing import Union, List
+from typing import Dict, List, Optional, Union
 
 from colorama import Fore, Style
 from colorama import init as colorama_init
 from qblox_instruments import Cluster
-from qblox_instruments.types import ClusterType
 from quantify_scheduler.instrument_coordinator import InstrumentCoordinator
 from quantify_scheduler.instrument_coordinator.components.qblox import ClusterComponent
 
-from tergite_autocalibration.config.globals import REDIS_CONNECTION, CLUSTER_IP, CONFIG
+from tergite_autocalibration.config.globals import (
+    REDIS_CONNECTION,
+    CLUSTER_IP,
+    CONFIG,
+    ENV,
+)
 from tergite_autocalibration.config.legacy import dh
 from tergite_autocalibration.lib.base.node import BaseNode
-from tergite_autocalibration.lib.utils.graph import filtered_topological_order
+from tergite_autocalibration.lib.utils.device import close_device_manager
+from tergite_autocalibration.lib.utils.graph import (
+    calibration_dependency_graph,
+    filtered_topological_order,
+)
 from tergite_autocalibration.lib.utils.node_factory import NodeFactory
+from tergite_autocalibration.lib.utils.plot_rendering import wait_for_plots
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
 from tergite_autocalibration.utils.backend.redis_utils import (
     populate_initial_parameters,
     populate_node_parameters,
     populate_quantities_of_interest,
 )
-from tergite_autocalibration.utils.dto.enums import DataStatus, MeasurementMode
+from tergite_autocalibration.utils.dto.enums import (
+    DataStatus,
+    MeasurementMode,
+    SchedulerMode,
+)
+from tergite_autocalibration.utils.hardware.simulated_cluster import (
+    SimulatedDevice,
+    SimulatedInstrumentCoordinator,
+)
 from tergite_autocalibration.utils.io.dataset_utils import create_node_data_path
+from tergite_autocalibration.utils.logger.phase_timing import (
+    get_phase_timer,
+    node_timing,
+)
 from tergite_autocalibration.utils.logger.tac_logger import logger
 from tergite_autocalibration.utils.logger.visuals import draw_arrow_chart
 
@@ -59,8 +90,12 @@ class CalibrationConfig:
     data_path: Path = Path("")
     qubits: List[str] = field(default_factory=lambda: CONFIG.run.qubits)
     couplers: List[str] = field(default_factory=lambda: CONFIG.run.couplers)
-    target_node_name: str = CONFIG.run.target_node
+    target_node_name: Union[str, List[str]] = CONFIG.run.target_node
     user_samplespace: dict = field(default_factory=lambda: CONFIG.samplespace())
+    # If not set, CALIBRATION_SCHEDULER and MAX_PARALLEL_NODES from the .env file
+    # are used when the supervisor is created
+    scheduler_mode: Optional["SchedulerMode"] = None
+    max_parallel_nodes: Optional[int] = None
 
 
 class HardwareManager:
@@ -79,6 +114,12 @@ class HardwareManager:
             logger.info(
                 "Cluster will not be defined as there is no need to take a measurement in re-analysis mode."
             )
+        elif self.config.cluster_mode == MeasurementMode.dummy:
+            # In dummy mode, the acquisitions are simulated from the device configuration
+            logger.info("Measurements will be simulated on the simulated cluster.")
+            self.lab_ic: "SimulatedInstrumentCoordinator" = (
+                self._create_simulated_instrument_coordinator()
+            )
         else:
             # In measurement mode, create the cluster and initialize the instrument coordinator
             self.cluster: "Cluster" = self._create_cluster()
@@ -92,32 +133,37 @@ class HardwareManager:
         based on the given IP address in the configuration.
         """
         cluster: "Cluster"
-        if self.config.cluster_mode == MeasurementMode.real:
-            # Ensure all previous connections are closed before creating a new cluster instance
-            Cluster.close_all()
-
-            try:
-                # Create a new cluster instance using the specified cluster name and IP address
-                cluster = Cluster(dh.cluster_name, str(self.config.cluster_ip))
-            except ConnectionRefusedError:
-                msg = "Cluster is disconnected. Maybe it has crushed? Try flick it off and on"
-                print("-" * len(msg))
-                print(f"{Fore.LIGHTRED_EX}{Style.BRIGHT}{msg}{Style.RESET_ALL}")
-                print("-" * len(msg))
-                quit()
-
-            print(
-                f" \n\u26A0 {Fore.MAGENTA}{Style.BRIGHT}Reseting Cluster at IP *{str(self.config.cluster_ip)[-3:]}{Style.RESET_ALL}\n"
+        # Ensure all previous connections are closed before creating a new cluster instance
+        Cluster.close_all()
+
+        try:
+            # Create a new cluster instance using the specified cluster name and IP address
+            cluster = Cluster(dh.cluster_name, str(self.config.cluster_ip))
+        except ConnectionRefusedError:
+            msg = (
+                "Cluster is disconnected. Maybe it has crushed? Try flick it off and on"
             )
-            cluster.reset()  # Reset the cluster to a default state for consistency
-            return cluster
-        else:
-            Cluster.close_all()
-            dummy_setup = {str(mod): ClusterType.CLUSTER_QCM_RF for mod in range(1, 16)}
-            dummy_setup["16"] = ClusterType.CLUSTER_QRM_RF
-            dummy_setup["17"] = ClusterType.CLUSTER_QRM_RF
-            cluster = Cluster(dh.cluster_name, dummy_cfg=dummy_setup)
-            return cluster
+            print("-" * len(msg))
+            print(f"{Fore.LIGHTRED_EX}{Style.BRIGHT}{msg}{Style.RESET_ALL}")
+            print("-" * len(msg))
+            quit()
+
+        print(
+            f" \n\u26A0 {Fore.MAGENTA}{Style.BRIGHT}Reseting Cluster at IP *{str(self.config.cluster_ip)[-3:]}{Style.RESET_ALL}\n"
+        )
+        cluster.reset()  # Reset the cluster to a default state for consistency
+        return cluster
+
+    @staticmethod
+    def _create_simulated_instrument_coordinator() -> "SimulatedInstrumentCoordinator":
+        """
+        Creates the simulated cluster, it replaces the dummy cluster of qblox_instruments,
+        which only returns meaningless acquisitions. The qubits are parameterised from the
+        device configuration.
+        """
+        return SimulatedInstrumentCoordinator(
+            SimulatedDevice.from_device_config(dh.device)
+        )
 
     def _create_instrument_coordinator(
         self, clusters: Union["Cluster", List["Cluster"]]
@@ -189,36 +235,61 @@ class NodeManager:
         self.lab_ic = lab_ic
 
     @staticmethod
-    def topo_order(target_node: str):
+    def topo_order(target_node: Union[str, List[str]]):
         return filtered_topological_order(target_node)
 
-    def inspect_node(self, node_name: str):
+    def inspect_node(
+        self,
+        node_name: str,
+        hardware_lock: Optional[threading.Lock] = None,
+        analysis_executor: Optional[Executor] = None,
+    ) -> Optional[Future]:
+        """
+        Check whether a node is in spec and calibrate it if required.
+
+        Args:
+            node_name: Name of the node to inspect
+            hardware_lock: If given, the lock is held while the node is initialised and measuring.
+                           The analysis runs after releasing it, so other nodes can use the cluster.
+            analysis_executor: If given, the analysis is submitted to the executor instead of
+                               running before this method returns.
+
+        Returns:
+            The future of the analysis if it has been submitted to the analysis executor.
+
+        """
         logger.info(f"Inspecting node {node_name}")
 
-        # Populate initial parameters
-        populate_initial_parameters(
-            self.config.qubits,
-            self.config.couplers,
-            REDIS_CONNECTION,
-        )
+        if hardware_lock is None:
+            hardware_lock = contextlib.nullcontext()
 
-        # Check Redis if node is calibrated
-        status: "DataStatus" = self._check_calibration_status_redis(node_name)
+        # The redis updates before the measurement count for the node
+        with node_timing(node_name), hardware_lock:
+            # Populate initial parameters
+            populate_initial_parameters(
+                self.config.qubits,
+                self.config.couplers,
+                REDIS_CONNECTION,
+            )
 
-        populate_node_parameters(
-            node_name,
-            status == DataStatus.in_spec,
-            self.config.qubits,
-            self.config.couplers,
-            REDIS_CONNECTION,
-        )
+            # Check Redis if node is calibrated
+            status: "DataStatus" = self._check_calibration_status_redis(node_name)
 
-        # Log status
-        if status == DataStatus.in_spec:
-            logger.info(
-                f" \u2714  {Fore.GREEN}{Style.BRIGHT}Node {node_name} in spec{Style.RESET_ALL}"
+            populate_node_parameters(
+                node_name,
+                status == DataStatus.in_spec,
+                self.config.qubits,
+                self.config.couplers,
+                REDIS_CONNECTION,
             )
-        else:
+
+            # Log status
+            if status == DataStatus.in_spec:
+                logger.info(
+                    f" \u2714  {Fore.GREEN}{Style.BRIGHT}Node {node_name} in spec{Style.RESET_ALL}"
+                )
+                return None
+
             logger.warning(
                 f"\u2691\u2691\u2691 {Fore.RED}{Style.BRIGHT}Calibration required for Node {node_name}{Style.RESET_ALL}"
             )
@@ -234,13 +305,23 @@ class NodeManager:
                 else create_node_data_path(node)
             )
 
-            # Perform calibration
-            node.calibrate(data_path, self.config.cluster_mode)
+            # Perform the measurement, this is the only part that needs the cluster
+            node.measure_and_save(data_path, self.config.cluster_mode)
+
+        # Perform the analysis
+        if analysis_executor is not None:
+            return analysis_executor.submit(self._analyse_node, node, data_path)
+        self._analyse_node(node, data_path)
 
-            # TODO:  develop failure strategies ->
-            # if node_calibration_status == DataStatus.out_of_spec:
-            #     node_expand()
-            #     node_calibration_status = self.calibrate_node(node)
+        # TODO:  develop failure strategies ->
+        # if node_calibration_status == DataStatus.out_of_spec:
+        #     node_expand()
+        #     node_calibration_status = self.calibrate_node(node)
+
+    @staticmethod
+    def _analyse_node(node: BaseNode, data_path: Path) -> None:
+        node.post_process(data_path)
+        logger.info(f"analysis of {node.name} completed")
 
     def _initialize_node(self, node_name: str) -> BaseNode:
         """Initializes a node and updates it with user-defined samplespace if available."""
@@ -271,7 +352,7 @@ class NodeManager:
             else self.config.qubits
         )
         for element in elements:
-            status = REDIS_CONNECTION.hget(f"cs:{element}", node_name)
+            status = get_parameter_cache().hget(f"cs:{element}", node_name)
             if status == "not_calibrated":
                 return DataStatus.out_of_spec
             elif status != "calibrated":
@@ -293,6 +374,10 @@ class NodeManager:
 
 class CalibrationSupervisor:
     def __init__(self, config: CalibrationConfig) -> None:
+        if config.scheduler_mode is None:
+            config.scheduler_mode = SchedulerMode(ENV.calibration_scheduler)
+        if config.max_parallel_nodes is None:
+            config.max_parallel_nodes = ENV.max_parallel_nodes
         self.config = config
         self.hardware_manager = HardwareManager(config=config)
         self.lab_ic = self.hardware_manager.get_instrument_coordinator()
@@ -313,6 +398,134 @@ class CalibrationSupervisor:
             REDIS_CONNECTION,
         )
 
+        parallel_nodes = self.config.scheduler_mode == SchedulerMode.dag
+        if parallel_nodes and ENV.plotting:
+            # Interactive plots have to be shown from the main thread
+            logger.warning(
+                "Interactive plotting is not supported when nodes run in parallel, "
+                "the nodes are calibrated one after the other. "
+                "Set PLOTTING=False in the .env file to calibrate them in parallel."
+            )
+            parallel_nodes = False
+
+        phase_timer = get_phase_timer()
+        phase_timer.reset()
+        try:
+            if parallel_nodes:
+                self._calibrate_dag()
+            elif ENV.background_analysis and not ENV.plotting:
+                # Interactive plots have to be shown from the main thread
+                self._calibrate_serial_with_background_analysis()
+            else:
+                self._calibrate_serial()
+        finally:
+            # The plots are saved in the background, make sure they are all on disk
+            wait_for_plots()
+            # Also the timing of the nodes completed before a failure is saved
+            phase_timer.save()
+            logger.info(phase_timer.summary())
+            # The instruments of the shared device are also closed after a failure
+            close_device_manager()
+
+        cache_stats = get_parameter_cache().stats()
+        logger.info(
+            f"Parameter cache: {cache_stats.hits} hits, {cache_stats.misses} misses "
+            f"({cache_stats.hit_rate:.0%} hit rate)"
+        )
+
+    def _calibrate_serial(self):
+        """
+        Calibrate the nodes one after the other in topological order.
+        """
         for calibration_node in self.topo_order:
             self.node_manager.inspect_node(calibration_node)
             logger.info(f"{calibration_node} node is completed")
+
+    def _calibrate_serial_with_background_analysis(self):
+        """
+        Calibrate the nodes one after the other in topological order.
+        The analysis of a node runs in the background while the next node is measured.
+        Before a node is inspected, the analyses of all nodes it depends on are awaited,
+        so it always starts from the quantities of interest they have written to redis.
+        """
+        dependency_graph = calibration_dependency_graph(self.topo_order)
+        pending_analyses: Dict[str, Future] = {}
+
+        def complete(node_name: str):
+            # Raises the exception in case the analysis has failed
+            pending_analyses.pop(node_name).result()
+            logger.info(f"{node_name} node is completed")
+
+        analysis_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="node_analysis"
+        )
+        try:
+            for node_name in self.topo_order:
+                for dependency in dependency_graph.predecessors(node_name):
+                    if dependency in pending_analyses:
+                        complete(dependency)
+
+                analysis = self.node_manager.inspect_node(
+                    node_name, analysis_executor=analysis_executor
+                )
+                if analysis is None:
+                    logger.info(f"{node_name} node is completed")
+                else:
+                    pending_analyses[node_name] = analysis
+
+                # Stop as early as possible if an analysis has failed
+                for pending_node in list(pending_analyses):
+                    if pending_analyses[pending_node].done():
+                        complete(pending_node)
+
+            for pending_node in list(pending_analyses):
+                complete(pending_node)
+        finally:
+            # After a failure, the analyses that have not started yet are dropped
+            analysis_executor.shutdown(wait=True, cancel_futures=True)
+
+    def _calibrate_dag(self):
+        """
+        Calibrate the nodes following the dependencies in the calibration graph.
+        A node is started as soon as all nodes it depends on are completed. Several nodes
+        can be in flight at the same time, but only one of them is using the cluster.
+        The analyses run on worker threads, so it cannot be used with interactive plots.
+        """
+        dependency_graph = calibration_dependency_graph(self.topo_order)
+        hardware_lock = threading.Lock()
+        pending_dependencies: Dict[str, int] = {
+            node: dependency_graph.in_degree(node) for node in self.topo_order
+        }
+        running: Dict[Future, str] = {}
+
+        executor = ThreadPoolExecutor(
+            max_workers=self.config.max_parallel_nodes,
+            thread_name_prefix="calibration_node",
+        )
+
+        def submit_ready_nodes():
+            # Walk in topological order, so the order of the serial mode is the priority
+            for node_name in self.topo_order:
+                if pending_dependencies[node_name] == 0:
+                    # Mark the node as submitted
+                    pending_dependencies[node_name] = -1
+                    future = executor.submit(
+                        self.node_manager.inspect_node, node_name, hardware_lock
+                    )
+                    running[future] = node_name
+
+        try:
+            submit_ready_nodes()
+            while running:
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    node_name = running.pop(future)
+                    # Raises the exception in case the node has failed
+                    future.result()
+                    logger.info(f"{node_name} node is completed")
+                    for successor in dependency_graph.successors(node_name):
+                        pending_dependencies[successor] -= 1
+                submit_ready_nodes()
+        finally:
+            # After a failure, the running nodes are completed and the waiting ones dropped
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -26,7 +26,7 @@ import toml
 
 from tergite_autocalibration.config.globals import ENV
 from tergite_autocalibration.tools.mss.convert import store_manual_parameters
-from tergite_autocalibration.tools.mss.storage import get_component_value
+from tergite_autocalibration.tools.mss.storage import get_component_values
 
 BACKEND_CONFIG = Path(__file__).parent / "backend_config_default.toml"
 
@@ -57,35 +57,39 @@ def create_backend_snapshot() -> dict:
     resonators = []
     lda_discriminators = {}
 
-    for qubit_id in qubit_ids:
-        id = str(qubit_id).strip("q")
-
-        store_manual_parameters(qubit_id)
+    store_manual_parameters(*qubit_ids)
+
+    # reading all component parameter values in redis at once
+    component_parameters = [
+        ("qubit", qubit_parameters),
+        ("readout_resonator", resonator_parameters),
+        ("discriminator", discriminator_parameters),
+    ]
+    requested_values = [
+        (component, parameter, str(qubit_id).strip("q"))
+        for qubit_id in qubit_ids
+        for component, parameters in component_parameters
+        for parameter in parameters
+        if parameter != "id" or component == "discriminator"
+    ]
+    values = iter(get_component_values(requested_values))
 
+    for qubit_id in qubit_ids:
         qubit = {}
         for parameter in qubit_parameters:
-            if parameter == "id":
-                value = qubit_id
-            else:
-                # reading the component parameter values in redis
-                value = get_component_value("qubit", parameter, id)
+            value = qubit_id if parameter == "id" else next(values)
             qubit.update({parameter: value})
         qubits.append(qubit)
 
         resonator = {}
         for parameter in resonator_parameters:
-            if parameter == "id":
-                value = qubit_id
-            else:
-                # reading the component parameter values in redis
-                value = get_component_value("readout_resonator", parameter, id)
+            value = qubit_id if parameter == "id" else next(values)
             resonator.update({parameter: value})
         resonators.append(resonator)
 
         # Here, we are doing it only for lda
         lda_discriminators[qubit_id] = {
-            parameter: get_component_value("discriminator", parameter, id)
-            for parameter in discriminator_parameters
+            parameter: next(values) for parameter in discriminator_parameters
         }
 
     # more components, like couplers etc. can be added in similar manner and added
@@ -0,0 +1,245 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import ast
+
+import pytest
+import toml
+
+from tergite_autocalibration.scripts import db_backend_update
+from tergite_autocalibration.tests.utils.fake_redis import FakeRedis
+from tergite_autocalibration.tools.mss import storage
+from tergite_autocalibration.tools.mss.convert import store_manual_parameters
+from tergite_autocalibration.tools.mss.storage import (
+    BackendProperty,
+    PropertyType,
+    create_redis_key,
+    get_component_value,
+    get_component_values,
+    set_component_property,
+)
+
+QUBIT_IDS = ["q00", "q01", "q02"]
+
+QUBIT_PARAMETERS = ["id", "frequency", "pi_pulse_amplitude", "t1_time", "pulse_type"]
+RESONATOR_PARAMETERS = ["id", "frequency", "acq_delay"]
+LDA_PARAMETERS = ["coef_0", "coef_1", "intercept"]
+
+
+@pytest.fixture(name="redis_connection")
+def fixture_redis_connection(monkeypatch):
+    redis_connection = FakeRedis()
+    monkeypatch.setattr(storage, "red", redis_connection)
+    return redis_connection
+
+
+def _read_per_key(property_type, name, component=None, component_id=None):
+    # Every field is read on its own, as BackendProperty.read did before
+    fields = list(storage._included_fields) + ["timestamp", "count"]
+    entries = {}
+    for field in fields:
+        value = storage.red.get(
+            create_redis_key(
+                property_type,
+                name,
+                component=component,
+                component_id=component_id,
+                field=field,
+            )
+        )
+        if value is not None:
+            entries[field] = ast.literal_eval(value)
+    if not entries:
+        return None
+    timestamp = entries.pop("timestamp", None)
+    count = entries.pop("count", None)
+    return (
+        BackendProperty(
+            property_type=property_type,
+            name=name,
+            component=component,
+            component_id=component_id,
+            **entries,
+        ),
+        timestamp,
+        count,
+    )
+
+
+def _write_properties():
+    set_component_property("qubit", "frequency", "00", value=4.5e9, unit="Hz")
+    set_component_property("qubit", "frequency", "01", value=4.6e9, unit="Hz")
+    set_component_property("qubit", "frequency", "01", value=4.7e9, unit="Hz")
+    set_component_property(
+        "qubit", "pulse_type", "00", value="Gaussian", tags=["manual"]
+    )
+    set_component_property("readout_resonator", "frequency", "00", value=[6.5e9])
+    # A property with metadata only
+    BackendProperty(
+        PropertyType.DEVICE,
+        "t1_time",
+        unit="s",
+        component="qubit",
+        component_id="02",
+    ).write_metadata()
+
+
+PROPERTIES = [
+    ("frequency", "qubit", "00"),
+    ("frequency", "qubit", "01"),
+    ("pulse_type", "qubit", "00"),
+    ("frequency", "readout_resonator", "00"),
+    ("t1_time", "qubit", "02"),
+    # Not in redis
+    ("frequency", "qubit", "03"),
+    # Requested twice
+    ("frequency", "qubit", "00"),
+]
+
+
+def test_read_many_matches_per_key_reads(redis_connection):
+    _write_properties()
+    expected = [
+        _read_per_key(PropertyType.DEVICE, *properties) for properties in PROPERTIES
+    ]
+    redis_connection.round_trips = 0
+
+    records = BackendProperty.read_many(PropertyType.DEVICE, PROPERTIES)
+
+    assert records == expected
+    assert records[1][0].value == 4.7e9 and records[1][2] == 2
+    assert records[4][0].value is None and records[4][2] is None
+    assert records[5] is None
+    # WATCH and EXEC of one transaction
+    assert redis_connection.round_trips == 2
+    assert records == [
+        BackendProperty.read(PropertyType.DEVICE, *properties)
+        for properties in PROPERTIES
+    ]
+    assert BackendProperty.read_many(PropertyType.DEVICE, []) == []
+
+
+def test_read_many_values_matches_per_key_reads(redis_connection):
+    _write_properties()
+    set_component_property("qubit", "anharmonicity", "00", value=float("nan"))
+    properties = PROPERTIES + [("anharmonicity", "qubit", "00")]
+    expected = [
+        BackendProperty.read_value(PropertyType.DEVICE, *property_)
+        for property_ in properties
+    ]
+    redis_connection.round_trips = 0
+
+    values = BackendProperty.read_many_values(PropertyType.DEVICE, properties)
+
+    assert values == expected
+    assert values == [4.5e9, 4.7e9, "Gaussian", [6.5e9], None, None, 4.5e9, None]
+    assert redis_connection.round_trips == 1
+    assert BackendProperty.read_many_values(PropertyType.DEVICE, []) == []
+
+
+def test_get_component_values_matches_per_key_reads(redis_connection):
+    _write_properties()
+    component_properties = [
+        (component, name, component_id) for name, component, component_id in PROPERTIES
+    ]
+
+    values = get_component_values(component_properties)
+
+    assert values == [
+        get_component_value(*component_property)
+        for component_property in component_properties
+    ]
+
+
+def _write_backend_config(path):
+    backend_config = {
+        "general_config": {"name": "test_backend", "num_qubits": len(QUBIT_IDS)},
+        "device_config": {
+            "qubit_ids": QUBIT_IDS,
+            "qubit_parameters": QUBIT_PARAMETERS,
+            "resonator_parameters": RESONATOR_PARAMETERS,
+            "discriminator_parameters": {"lda_parameters": LDA_PARAMETERS},
+            "coupling_map": [[0, 1], [1, 2]],
+            "meas_map": [[0], [1], [2]],
+        },
+        "gates": {"x": {"coupling_map": [[0], [1], [2]]}},
+    }
+    with open(path, "w") as f:
+        toml.dump(backend_config, f)
+
+
+def _snapshot_per_key() -> dict:
+    # The snapshot with a redis read for every value, as create_backend_snapshot did before
+    qubits, resonators, lda_discriminators = [], [], {}
+    for qubit_id in QUBIT_IDS:
+        index = qubit_id.strip("q")
+        store_manual_parameters(qubit_id)
+        qubits.append(
+            {
+                parameter: (
+                    qubit_id
+                    if parameter == "id"
+                    else get_component_value("qubit", parameter, index)
+                )
+                for parameter in QUBIT_PARAMETERS
+            }
+        )
+        resonators.append(
+            {
+                parameter: (
+                    qubit_id
+                    if parameter == "id"
+                    else get_component_value("readout_resonator", parameter, index)
+                )
+                for parameter in RESONATOR_PARAMETERS
+            }
+        )
+        lda_discriminators[qubit_id] = {
+            parameter: get_component_value("discriminator", parameter, index)
+            for parameter in LDA_PARAMETERS
+        }
+    return {
+        "name": "test_backend",
+        "num_qubits": len(QUBIT_IDS),
+        "qubit_ids": QUBIT_IDS,
+        "device_properties": {"qubit": qubits, "readout_resonator": resonators},
+        "discriminators": {"lda": lda_discriminators},
+        "coupling_map": [[0, 1], [1, 2]],
+        "meas_map": [[0], [1], [2]],
+        "gates": {"x": {"coupling_map": [[0], [1], [2]]}},
+    }
+
+
+def test_backend_snapshot_matches_per_key_reads(
+    monkeypatch, tmp_path, redis_connection
+):
+    backend_config = tmp_path / "backend_config.toml"
+    _write_backend_config(backend_config)
+    monkeypatch.setattr(db_backend_update, "BACKEND_CONFIG", backend_config)
+    for index, qubit_id in enumerate(QUBIT_IDS):
+        qubit_index = qubit_id.strip("q")
+        set_component_property("qubit", "frequency", qubit_index, value=4.5e9 + index)
+        set_component_property("readout_resonator", "frequency", qubit_index, value=6e9)
+        set_component_property(
+            "discriminator", "coef_0", qubit_index, value=[0.1 * index]
+        )
+    redis_connection.round_trips = 0
+
+    snapshot = db_backend_update.create_backend_snapshot()
+    round_trips = redis_connection.round_trips
+
+    assert snapshot == _snapshot_per_key()
+    assert snapshot["device_properties"]["qubit"][1]["frequency"] == 4.5e9 + 1
+    # The manual parameters are stored before reading
+    assert snapshot["device_properties"]["qubit"][0]["pulse_type"] == "Gaussian"
+    # WATCH and EXEC to store the manual parameters and one MGET of all values
+    assert round_trips == 3
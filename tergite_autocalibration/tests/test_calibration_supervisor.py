@@ -0,0 +1,348 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import threading
+from types import SimpleNamespace
+
+import networkx as nx
+import pytest
+
+from tergite_autocalibration.scripts import calibration_supervisor
+from tergite_autocalibration.scripts.calibration_supervisor import (
+    CalibrationConfig,
+    CalibrationSupervisor,
+)
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.utils.dto.enums import MeasurementMode, SchedulerMode
+
+TIMEOUT = 5
+
+
+class FakeNodeManager:
+    """
+    Records when the nodes are measured and analysed instead of calibrating them.
+    """
+
+    def __init__(self, analyses=None):
+        # Functions called with the node name during the analysis
+        self.analyses = analyses or {}
+        self.events = []
+        self.measurement_threads = set()
+        self.analysis_threads = set()
+        self._lock = threading.Lock()
+
+    def record(self, *event):
+        with self._lock:
+            self.events.append(event)
+
+    def index(self, *event):
+        return self.events.index(event)
+
+    def inspect_node(self, node_name, hardware_lock=None, analysis_executor=None):
+        self.measurement_threads.add(threading.current_thread().name)
+        self.record("measure", node_name)
+
+        def analyse():
+            self.analysis_threads.add(threading.current_thread().name)
+            self.analyses.get(node_name, lambda name: None)(node_name)
+            self.record("analyse", node_name)
+
+        if analysis_executor is None:
+            analyse()
+            return None
+        return analysis_executor.submit(analyse)
+
+
+def _supervisor(monkeypatch, edges, node_manager) -> CalibrationSupervisor:
+    graph = nx.DiGraph(edges)
+    monkeypatch.setattr(
+        calibration_supervisor,
+        "calibration_dependency_graph",
+        lambda topo_order: graph.subgraph(topo_order),
+    )
+    supervisor = CalibrationSupervisor.__new__(CalibrationSupervisor)
+    supervisor.config = CalibrationConfig(cluster_mode=MeasurementMode.re_analyse)
+    supervisor.node_manager = node_manager
+    supervisor.topo_order = list(nx.topological_sort(graph))
+    return supervisor
+
+
+def _threads_alive(prefix: str) -> bool:
+    return any(thread.name.startswith(prefix) for thread in threading.enumerate())
+
+
+def _analysis_threads_alive() -> bool:
+    return _threads_alive("node_analysis")
+
+
+def _set_after_measurement(inspect_node, node_name, event):
+    def inspect_and_set(name, **kwargs):
+        future = inspect_node(name, **kwargs)
+        if name == node_name:
+            event.set()
+        return future
+
+    return inspect_and_set
+
+
+def test_serial_analyses_run_in_the_foreground():
+    node_manager = FakeNodeManager()
+    supervisor = CalibrationSupervisor.__new__(CalibrationSupervisor)
+    supervisor.node_manager = node_manager
+    supervisor.topo_order = ["a", "b", "c"]
+
+    supervisor._calibrate_serial()
+
+    assert node_manager.events == [
+        ("measure", "a"),
+        ("analyse", "a"),
+        ("measure", "b"),
+        ("analyse", "b"),
+        ("measure", "c"),
+        ("analyse", "c"),
+    ]
+    assert node_manager.analysis_threads == {threading.current_thread().name}
+
+
+def test_background_analysis_waits_for_the_dependencies(monkeypatch):
+    c_measured = threading.Event()
+    node_manager = FakeNodeManager(
+        # The analysis of a only completes once the independent node c is measured
+        analyses={"a": lambda name: c_measured.wait(TIMEOUT)}
+    )
+    node_manager.inspect_node = _set_after_measurement(
+        node_manager.inspect_node, "c", c_measured
+    )
+    supervisor = _supervisor(
+        monkeypatch, [("a", "b"), ("root", "a"), ("root", "c")], node_manager
+    )
+    supervisor.topo_order = ["root", "a", "c", "b"]
+
+    supervisor._calibrate_serial_with_background_analysis()
+
+    assert c_measured.is_set()
+    assert node_manager.index("measure", "c") < node_manager.index("analyse", "a")
+    assert node_manager.index("analyse", "a") < node_manager.index("measure", "b")
+    assert node_manager.index("analyse", "root") < node_manager.index("measure", "a")
+    assert node_manager.index("analyse", "root") < node_manager.index("measure", "c")
+    assert len(node_manager.events) == 8
+    assert all(
+        thread.startswith("node_analysis") for thread in node_manager.analysis_threads
+    )
+    assert not _analysis_threads_alive()
+
+
+def test_background_analysis_raises_analysis_errors(monkeypatch):
+    c_measured = threading.Event()
+
+    def failing_analysis(name):
+        c_measured.wait(TIMEOUT)
+        raise ValueError(f"analysis of {name} failed")
+
+    node_manager = FakeNodeManager(analyses={"a": failing_analysis})
+    node_manager.inspect_node = _set_after_measurement(
+        node_manager.inspect_node, "c", c_measured
+    )
+    supervisor = _supervisor(monkeypatch, [("a", "b"), ("c", "d")], node_manager)
+    supervisor.topo_order = ["a", "c", "b", "d"]
+
+    with pytest.raises(ValueError, match="analysis of a failed"):
+        supervisor._calibrate_serial_with_background_analysis()
+
+    # The node depending on the failed analysis is never measured
+    assert ("measure", "b") not in node_manager.events
+    assert ("measure", "d") not in node_manager.events
+    assert not _analysis_threads_alive()
+
+
+def test_background_analysis_shuts_down_after_a_measurement_error(monkeypatch):
+    a_started = threading.Event()
+    b_failed = threading.Event()
+
+    def analysis(name):
+        a_started.set()
+        b_failed.wait(TIMEOUT)
+
+    node_manager = FakeNodeManager(analyses={"a": analysis})
+    inspect_node = node_manager.inspect_node
+
+    def failing_inspect_node(name, **kwargs):
+        if name == "b":
+            a_started.wait(TIMEOUT)
+            b_failed.set()
+            raise RuntimeError("measurement of b failed")
+        return inspect_node(name, **kwargs)
+
+    node_manager.inspect_node = failing_inspect_node
+    supervisor = _supervisor(monkeypatch, [("a", "c"), ("b", "c")], node_manager)
+    supervisor.topo_order = ["a", "b", "c"]
+
+    with pytest.raises(RuntimeError, match="measurement of b failed"):
+        supervisor._calibrate_serial_with_background_analysis()
+
+    # The executor waits for the running analysis before it is shut down
+    assert node_manager.events[-1] == ("analyse", "a")
+    assert ("measure", "c") not in node_manager.events
+    assert not _analysis_threads_alive()
+
+
+@pytest.mark.parametrize("calibration_scheduler", ["serial", "dag"])
+def test_scheduler_settings_are_read_when_the_supervisor_is_created(
+    monkeypatch, calibration_scheduler
+):
+    config = CalibrationConfig(cluster_mode=MeasurementMode.re_analyse)
+    monkeypatch.setattr(ENV, "calibration_scheduler", calibration_scheduler)
+    monkeypatch.setattr(ENV, "max_parallel_nodes", 3)
+    monkeypatch.setattr(
+        calibration_supervisor,
+        "HardwareManager",
+        lambda config: SimpleNamespace(get_instrument_coordinator=lambda: None),
+    )
+    monkeypatch.setattr(
+        calibration_supervisor,
+        "NodeManager",
+        lambda lab_ic, config: SimpleNamespace(topo_order=lambda target: []),
+    )
+
+    supervisor = CalibrationSupervisor(config)
+
+    assert supervisor.config.scheduler_mode == SchedulerMode(calibration_scheduler)
+    assert supervisor.config.max_parallel_nodes == 3
+
+    # Settings given in the configuration are kept
+    config = CalibrationConfig(
+        cluster_mode=MeasurementMode.re_analyse,
+        scheduler_mode=SchedulerMode.serial,
+        max_parallel_nodes=1,
+    )
+    supervisor = CalibrationSupervisor(config)
+
+    assert supervisor.config.scheduler_mode == SchedulerMode.serial
+    assert supervisor.config.max_parallel_nodes == 1
+
+
+def test_dag_follows_the_dependencies(monkeypatch):
+    edges = [("root", "a"), ("root", "b"), ("a", "c"), ("b", "c"), ("c", "d")]
+    node_manager = FakeNodeManager()
+    supervisor = _supervisor(monkeypatch, edges, node_manager)
+    supervisor.config.max_parallel_nodes = 2
+
+    supervisor._calibrate_dag()
+
+    assert len(node_manager.events) == 10
+    for dependency, node_name in edges:
+        assert node_manager.index("analyse", dependency) < node_manager.index(
+            "measure", node_name
+        )
+    assert all(
+        thread.startswith("calibration_node")
+        for thread in node_manager.measurement_threads
+    )
+    assert not _threads_alive("calibration_node")
+
+
+def test_dag_runs_independent_branches_in_parallel(monkeypatch):
+    # Both branches only pass the barrier if they are calibrated at the same time
+    barrier = threading.Barrier(2, timeout=TIMEOUT)
+    node_manager = FakeNodeManager(
+        analyses={"a": lambda name: barrier.wait(), "b": lambda name: barrier.wait()}
+    )
+    supervisor = _supervisor(
+        monkeypatch, [("root", "a"), ("root", "b"), ("a", "c")], node_manager
+    )
+    supervisor.config.max_parallel_nodes = 2
+
+    supervisor._calibrate_dag()
+
+    assert not barrier.broken
+    assert len(node_manager.measurement_threads) == 2
+    assert node_manager.index("analyse", "a") < node_manager.index("measure", "c")
+
+
+def test_dag_stops_after_a_failed_node(monkeypatch):
+    a_started = threading.Event()
+    b_failed = threading.Event()
+
+    def failing_analysis(name):
+        a_started.wait(TIMEOUT)
+        b_failed.set()
+        raise ValueError(f"analysis of {name} failed")
+
+    def analysis(name):
+        a_started.set()
+        b_failed.wait(TIMEOUT)
+
+    node_manager = FakeNodeManager(analyses={"a": analysis, "b": failing_analysis})
+    supervisor = _supervisor(
+        monkeypatch, [("a", "c"), ("b", "d"), ("d", "e")], node_manager
+    )
+    supervisor.topo_order = ["a", "b", "c", "d", "e"]
+    supervisor.config.max_parallel_nodes = 2
+
+    with pytest.raises(ValueError, match="analysis of b failed"):
+        supervisor._calibrate_dag()
+
+    # The node running during the failure is completed, no node depending on the
+    # failed one is started
+    assert ("analyse", "a") in node_manager.events
+    assert ("measure", "d") not in node_manager.events
+    assert ("measure", "e") not in node_manager.events
+    assert not _threads_alive("calibration_node")
+
+
+@pytest.mark.parametrize("failing_node", [None, "b"])
+def test_device_is_closed_after_the_calibration(monkeypatch, failing_node):
+    def failing_analysis(name):
+        raise ValueError(f"analysis of {name} failed")
+
+    closed = []
+    monkeypatch.setattr(
+        calibration_supervisor, "close_device_manager", lambda: closed.append(True)
+    )
+    monkeypatch.setattr(
+        calibration_supervisor, "populate_quantities_of_interest", lambda *args: None
+    )
+    monkeypatch.setattr(ENV, "background_analysis", False)
+    node_manager = FakeNodeManager(analyses={failing_node: failing_analysis})
+    node_manager.node_factory = None
+    supervisor = _supervisor(monkeypatch, [("a", "b"), ("b", "c")], node_manager)
+    supervisor.config.scheduler_mode = SchedulerMode.serial
+
+    if failing_node is None:
+        supervisor.calibrate_system()
+    else:
+        with pytest.raises(ValueError, match="analysis of b failed"):
+            supervisor.calibrate_system()
+
+    assert closed == [True]
+
+
+@pytest.mark.parametrize("plotting", [False, True])
+def test_dag_is_not_used_with_interactive_plots(monkeypatch, plotting):
+    monkeypatch.setattr(calibration_supervisor, "close_device_manager", lambda: None)
+    monkeypatch.setattr(
+        calibration_supervisor, "populate_quantities_of_interest", lambda *args: None
+    )
+    monkeypatch.setattr(ENV, "plotting", plotting)
+    monkeypatch.setattr(ENV, "background_analysis", False)
+    node_manager = FakeNodeManager()
+    node_manager.node_factory = None
+    supervisor = _supervisor(monkeypatch, [("a", "b"), ("a", "c")], node_manager)
+    supervisor.config.scheduler_mode = SchedulerMode.dag
+    supervisor.config.max_parallel_nodes = 2
+
+    supervisor.calibrate_system()
+
+    assert len(node_manager.events) == 6
+    main_thread = {threading.current_thread().name}
+    assert (node_manager.measurement_threads == main_thread) == plotting
+    assert (node_manager.analysis_threads == main_thread) == plotting
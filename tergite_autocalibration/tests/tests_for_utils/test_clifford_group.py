@@ -0,0 +1,83 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import numpy as np
+
+from tergite_autocalibration.utils.clifford_elements_decomposition import (
+    RXY,
+    XY_decompositions,
+    reversing_XY_matrix,
+)
+from tergite_autocalibration.utils.clifford_group import (
+    CLIFFORD_PTMS,
+    IDENTITY,
+    INVERSE_TABLE,
+    MULTIPLICATION_TABLE,
+    PADDING,
+    compose_sequences,
+    random_clifford_sequences,
+)
+
+
+def _unitary(sequence) -> np.ndarray:
+    matrix = np.identity(2)
+    for index in sequence:
+        for operation in XY_decompositions[index].values():
+            matrix = RXY(operation["theta"], operation["phi"]) @ matrix
+    return matrix
+
+
+def _is_identity_up_to_phase(matrix: np.ndarray) -> bool:
+    return np.isclose(abs(np.trace(matrix)), 2)
+
+
+def test_tables_match_the_transfer_matrices():
+    for later in range(24):
+        for earlier in range(24):
+            product = MULTIPLICATION_TABLE[later, earlier]
+            assert np.array_equal(
+                CLIFFORD_PTMS[product], CLIFFORD_PTMS[later] @ CLIFFORD_PTMS[earlier]
+            )
+    assert np.all(MULTIPLICATION_TABLE[np.arange(24), INVERSE_TABLE] == IDENTITY)
+    assert np.all(MULTIPLICATION_TABLE[INVERSE_TABLE, np.arange(24)] == IDENTITY)
+
+
+def test_compose_sequences_skips_padding():
+    rng = np.random.default_rng(0)
+    sequence = rng.integers(24, size=13)
+    padded = np.append(sequence, [PADDING] * 4)
+
+    assert compose_sequences(padded) == compose_sequences(sequence)
+    assert compose_sequences(np.array([], dtype=int)) == IDENTITY
+
+
+def test_recovery_returns_to_the_initial_state():
+    lengths = [0, 1, 2, 5, 8, 17]
+    sequences, recoveries = random_clifford_sequences([3, 7], lengths)
+
+    assert sequences.shape == (2, len(lengths), 17)
+    for seed_sequences, seed_recoveries in zip(sequences, recoveries):
+        for sequence, recovery, length in zip(seed_sequences, seed_recoveries, lengths):
+            assert np.all(sequence[length:] == PADDING)
+            sequence = sequence[:length]
+            assert reversing_XY_matrix(sequence)[0] == recovery
+            assert _is_identity_up_to_phase(_unitary(np.append(sequence, recovery)))
+
+
+def test_sequences_are_drawn_like_one_draw_per_length():
+    lengths = [0, 8, 16, 32]
+    sequences, _ = random_clifford_sequences([5], lengths)
+
+    rng = np.random.default_rng(5)
+    for index, length in enumerate(lengths):
+        expected = rng.integers(24, size=length)
+        assert np.array_equal(sequences[0, index, :length], expected)
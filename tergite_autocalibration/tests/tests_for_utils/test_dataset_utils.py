@@ -0,0 +1,258 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import xarray
+
+from tergite_autocalibration.utils.io.dataset_utils import (
+    StreamingDatasetWriter,
+    configure_dataset,
+    save_dataset,
+    to_complex_dataset,
+    to_real_dataset,
+)
+
+
+def _iteration_dataset(current: float, seed: int) -> xarray.Dataset:
+    rng = np.random.default_rng(seed)
+    frequencies = np.linspace(4e9, 4.1e9, 5)
+    dataset = xarray.Dataset(
+        coords={
+            "frequenciesq06": (
+                "frequenciesq06",
+                frequencies,
+                {"element_type": "qubit", "qubit": "q06"},
+            )
+        },
+        attrs={"elements": ["q06"]},
+    )
+    dataset["yq06"] = (
+        ("frequenciesq06",),
+        rng.normal(size=5) + 1j * rng.normal(size=5),
+        {"qubit": "q06", "element": "q06_q07"},
+    )
+    return dataset.expand_dims({"dc_currents": np.array([current])})
+
+
+def test_streaming_writer_matches_merge(tmp_path):
+    currents = [3e-4, 1e-4, 2e-4, -1e-4]
+
+    merged_dataset = xarray.Dataset()
+    with StreamingDatasetWriter("dc_currents", directory=tmp_path) as writer:
+        for seed, current in enumerate(currents):
+            ds = _iteration_dataset(current, seed)
+            merged_dataset = xarray.merge([ds, merged_dataset])
+            writer.append(ds)
+
+        result_dataset = writer.result()
+
+    xarray.testing.assert_identical(result_dataset, merged_dataset)
+    assert result_dataset.attrs["elements"] == ["q06"]
+
+
+def test_streaming_writer_removes_temporary_files(tmp_path):
+    with StreamingDatasetWriter("dc_currents", directory=tmp_path) as writer:
+        writer.append(_iteration_dataset(1e-4, 0))
+        assert any(tmp_path.iterdir())
+        result_dataset = writer.result()
+
+    assert not any(tmp_path.iterdir())
+    # The result is in memory, also the datasets derived from it
+    xarray.testing.assert_identical(
+        (result_dataset * 2)["yq06"], 2 * _iteration_dataset(1e-4, 0)["yq06"]
+    )
+
+
+def test_streaming_writer_removes_temporary_files_on_errors(tmp_path):
+    with pytest.raises(RuntimeError):
+        with StreamingDatasetWriter("dc_currents", directory=tmp_path) as writer:
+            writer.append(_iteration_dataset(1e-4, 0))
+            raise RuntimeError("measurement failed")
+
+    assert not any(tmp_path.iterdir())
+
+
+def test_streaming_writer_removes_directories_of_crashed_processes(tmp_path):
+    # No process has an id above the maximum process id of Linux
+    crashed_directory = tmp_path / ".dc_currents_sweep_999999999-abc_12"
+    crashed_directory.mkdir()
+    (crashed_directory / "part_000000.h5").touch()
+    running_directory = tmp_path / f".dc_currents_sweep_{os.getpid()}-abc_12"
+    running_directory.mkdir()
+    other_directory = tmp_path / ".other"
+    other_directory.mkdir()
+
+    with StreamingDatasetWriter("dc_currents", directory=tmp_path):
+        assert not crashed_directory.exists()
+        assert running_directory.exists()
+        assert other_directory.exists()
+
+
+def test_streaming_writer_without_iterations(tmp_path):
+    with StreamingDatasetWriter("dc_currents", directory=tmp_path) as writer:
+        assert writer.result().equals(xarray.Dataset())
+
+    assert not any(tmp_path.iterdir())
+
+
+def _node(name, qubits, samplespace, dimensions, loops=None, couplers=None):
+    return SimpleNamespace(
+        name=name,
+        all_qubits=qubits,
+        schedule_samplespace=samplespace,
+        dimensions=dimensions,
+        loops=loops,
+        couplers=couplers,
+    )
+
+
+def test_configure_dataset_layout():
+    qubits = ["q01", "q02"]
+    frequencies = np.linspace(4e9, 4.1e9, 3)
+    amplitudes = np.linspace(0, 1, 2)
+    node = _node(
+        "qubit_01_spectroscopy",
+        qubits,
+        {
+            "spec_frequencies": {qubit: frequencies for qubit in qubits},
+            "spec_pulse_amplitudes": {qubit: amplitudes for qubit in qubits},
+        },
+        [3, 2],
+    )
+    raw_values = [np.arange(6) + 1j, np.arange(6, 12) + 2j]
+    raw_dataset = xarray.Dataset(
+        {key: (f"acq_index_{key}", values) for key, values in enumerate(raw_values)}
+    )
+
+    dataset = configure_dataset(raw_dataset, node)
+
+    assert list(dataset.variables) == [
+        "spec_frequenciesq01",
+        "spec_pulse_amplitudesq01",
+        "yq01",
+        "spec_frequenciesq02",
+        "spec_pulse_amplitudesq02",
+        "yq02",
+    ]
+    assert dataset.attrs == {"elements": ["q01", "q02"]}
+    assert dataset["yq02"].dims == ("spec_frequenciesq02", "spec_pulse_amplitudesq02")
+    assert dataset["yq02"].attrs == {
+        "qubit": "q02",
+        "element": "q02",
+        "long_name": "yq02",
+        "units": "NA",
+    }
+    assert dataset["spec_frequenciesq01"].attrs["element_type"] == "qubit"
+    # The frequencies are the fastest changing dimension in the raw data
+    np.testing.assert_array_equal(
+        dataset["yq02"].values, raw_values[1].reshape(3, 2, order="F")
+    )
+
+
+def test_configure_dataset_ssro_shots():
+    node = _node(
+        "ro_amplitude_three_state_optimization_ssro",
+        ["q01"],
+        {"qubit_states": {"q01": np.array([0, 1, 2])}},
+        [3],
+    )
+    raw_values = np.arange(12).reshape(1, 12) + 0j
+    raw_dataset = xarray.Dataset({0: (("repetition", "acq_index_0"), raw_values)})
+
+    dataset = configure_dataset(raw_dataset, node)
+
+    assert dataset["yq01"].dims == ("shot", "qubit_statesq01")
+    np.testing.assert_array_equal(dataset["shot"].values, np.arange(4))
+    np.testing.assert_array_equal(dataset["yq01"].values, raw_values.reshape(4, 3))
+
+
+def test_configure_dataset_coupler_coordinates_are_shared():
+    node = _node(
+        "cz_calibration",
+        ["q06", "q07"],
+        {
+            "cz_amplitudes": {"q06_q07": np.linspace(0, 1, 4)},
+            "ramsey_phases": {"q06": np.arange(3), "q07": np.arange(3)},
+        },
+        [4, 3],
+        couplers=["q06_q07"],
+    )
+    raw_dataset = xarray.Dataset(
+        {key: (f"acq_index_{key}", np.arange(12) + 0j) for key in range(2)}
+    )
+
+    dataset = configure_dataset(raw_dataset, node)
+
+    assert dataset["yq07"].dims == ("cz_amplitudesq06_q07", "ramsey_phasesq07")
+    # The shared coordinate keeps the attributes of the first qubit
+    assert dataset["cz_amplitudesq06_q07"].attrs["measured_qubit"] == "q06"
+    assert dataset.attrs["elements"] == ["q06_q07", "q06_q07"]
+
+
+def _ssro_dataset(shots: int = 1000) -> xarray.Dataset:
+    rng = np.random.default_rng(0)
+    return xarray.Dataset(
+        {
+            "yq01": (
+                ("shot", "qubit_statesq01"),
+                rng.normal(size=(shots, 3)) + 1j * rng.normal(size=(shots, 3)),
+                {"qubit": "q01"},
+            )
+        },
+        coords={"shot": np.arange(shots), "qubit_statesq01": [0, 1, 2]},
+        attrs={"elements": ["q01"]},
+    )
+
+
+def test_real_dataset_is_a_view():
+    iq_dataset = _ssro_dataset()
+
+    real_dataset = to_real_dataset(iq_dataset)
+
+    assert real_dataset["yq01"].dims == ("shot", "qubit_statesq01", "ReIm")
+    assert real_dataset["yq01"].attrs == {"qubit": "q01"}
+    np.testing.assert_array_equal(
+        real_dataset["yq01"].isel(ReIm=0), iq_dataset["yq01"].real
+    )
+    np.testing.assert_array_equal(
+        real_dataset["yq01"].isel(ReIm=1), iq_dataset["yq01"].imag
+    )
+    assert np.shares_memory(real_dataset["yq01"].values, iq_dataset["yq01"].values)
+
+
+def test_complex_dataset_round_trip():
+    iq_dataset = _ssro_dataset()
+
+    complex_dataset = to_complex_dataset(to_real_dataset(iq_dataset))
+
+    xarray.testing.assert_identical(complex_dataset, iq_dataset)
+
+
+def test_saved_dataset_is_compressed_and_chunked_along_shots(tmp_path):
+    iq_dataset = _ssro_dataset(shots=100_000)
+
+    save_dataset(iq_dataset, "ssro_node", tmp_path)
+
+    with xarray.open_dataset(tmp_path / "dataset_ssro_node_0.hdf5") as dataset:
+        encoding = dataset["yq01"].encoding
+        assert encoding["zlib"]
+        # A chunk is 1 MiB of consecutive shots, the other dimensions are split first
+        assert encoding["chunksizes"] == (2**20 // (2 * 8), 1, 2)
+
+        complex_dataset = to_complex_dataset(dataset.load())
+        np.testing.assert_array_equal(
+            complex_dataset["yq01"].values, iq_dataset["yq01"].values
+        )
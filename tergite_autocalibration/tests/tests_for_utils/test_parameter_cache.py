@@ -0,0 +1,127 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import pytest
+import redis
+
+from tergite_autocalibration.utils.backend.parameter_cache import ParameterCache
+
+
+class _Connection:
+    def __init__(self, hashes):
+        self.hashes = hashes
+        self.reads = 0
+        self.on_read = None
+
+    def hgetall(self, key):
+        self.reads += 1
+        fields = dict(self.hashes.get(key, {}))
+        if self.on_read is not None:
+            self.on_read()
+        return fields
+
+    def config_get(self, name):
+        raise redis.ConnectionError("No redis server")
+
+
+def _subscribed_cache(connection):
+    cache = ParameterCache(connection)
+    # Pretend that the subscription to the keyspace notifications succeeded
+    cache._started = True
+    return cache
+
+
+def test_hashes_are_read_once():
+    connection = _Connection({"transmons:q06": {"clock_freqs:f01": "4.5e9"}})
+    cache = _subscribed_cache(connection)
+
+    assert cache.hget("transmons:q06", "clock_freqs:f01") == "4.5e9"
+    assert cache.hget("transmons:q06", "clock_freqs:f12") is None
+    # Modifying the returned hash does not modify the cache
+    cache.hgetall("transmons:q06")["clock_freqs:f01"] = "0"
+    assert cache.hgetall("transmons:q06") == {"clock_freqs:f01": "4.5e9"}
+
+    assert connection.reads == 1
+    stats = cache.stats()
+    assert (stats.hits, stats.misses) == (3, 1)
+    assert stats.hit_rate == 0.75
+
+
+def test_keyspace_notification_invalidates_hash():
+    connection = _Connection({"transmons:q06": {"rxy:amp180": "0.1"}})
+    cache = _subscribed_cache(connection)
+    assert cache.hget("transmons:q06", "rxy:amp180") == "0.1"
+
+    connection.hashes["transmons:q06"]["rxy:amp180"] = "0.2"
+    cache._on_notification(
+        {"type": "pmessage", "channel": "__keyspace@0__:transmons:q06", "data": "hset"}
+    )
+
+    assert cache.hget("transmons:q06", "rxy:amp180") == "0.2"
+    assert connection.reads == 2
+
+
+def test_hash_changed_during_read_is_not_cached():
+    connection = _Connection({"cs:q06": {"rabi_oscillations": "not_calibrated"}})
+    cache = _subscribed_cache(connection)
+    connection.on_read = lambda: cache.invalidate("cs:q06")
+
+    cache.hgetall("cs:q06")
+    connection.on_read = None
+    cache.hgetall("cs:q06")
+
+    assert connection.reads == 2
+
+
+def test_reads_go_to_redis_without_notifications():
+    connection = _Connection({"couplers:q06_q07": {"parking_current": "1e-4"}})
+    cache = ParameterCache(connection)
+
+    assert cache.hget("couplers:q06_q07", "parking_current") == "1e-4"
+    assert cache.hget("couplers:q06_q07", "parking_current") == "1e-4"
+
+    assert not cache.active
+    assert connection.reads == 2
+    assert cache.stats().misses == 2
+
+
+class _ConfiguredConnection(_Connection):
+    def __init__(self, hashes, events):
+        super().__init__(hashes)
+        self.events = events
+
+    def config_get(self, name):
+        return {name: self.events}
+
+    def config_set(self, name, value):
+        raise AssertionError("The redis configuration must not be changed")
+
+
+@pytest.mark.parametrize(
+    "events, missing",
+    [("", "Kghx"), ("Kg", "hx"), ("KA", ""), ("Kghx", ""), ("AE", "K")],
+)
+def test_missing_notifications(events, missing):
+    cache = ParameterCache(_ConfiguredConnection({}, events))
+
+    assert cache._missing_notifications() == missing
+
+
+def test_reads_go_to_redis_if_notifications_are_disabled_on_the_server():
+    connection = _ConfiguredConnection({"transmons:q06": {"rxy:amp180": "0.1"}}, "Kg")
+    cache = ParameterCache(connection)
+
+    assert cache.hget("transmons:q06", "rxy:amp180") == "0.1"
+    assert cache.hget("transmons:q06", "rxy:amp180") == "0.1"
+
+    assert not cache.active
+    assert connection.reads == 2
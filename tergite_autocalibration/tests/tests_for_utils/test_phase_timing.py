@@ -0,0 +1,95 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import json
+import threading
+import time
+
+import pytest
+
+from tergite_autocalibration.utils.logger.phase_timing import (
+    PhaseTimer,
+    get_phase_timer,
+    node_timing,
+    timed_phase,
+)
+
+
+@pytest.fixture
+def phase_timer():
+    timer = get_phase_timer()
+    timer.reset()
+    yield timer
+    timer.reset()
+
+
+@timed_phase("decorated")
+def _decorated_phase():
+    time.sleep(0.01)
+
+
+def test_phases_are_recorded_for_the_node(phase_timer):
+    with node_timing("rabi_oscillations"):
+        with timed_phase("outer"):
+            _decorated_phase()
+            _decorated_phase()
+
+    phases = phase_timer.node_phases("rabi_oscillations")
+    assert list(phases) == ["decorated", "outer"]
+    assert phases["decorated"].calls == 2
+    assert phases["decorated"].wall_time >= 0.02
+    # Nested phases are included in the time of the outer phase
+    assert phases["outer"].wall_time >= phases["decorated"].wall_time
+    # Sleeping does not take CPU time
+    assert phases["decorated"].cpu_time < phases["decorated"].wall_time
+
+
+def test_nothing_is_recorded_outside_of_a_node(phase_timer):
+    _decorated_phase()
+
+    assert phase_timer.summary().splitlines()[1:] == ["  total: "]
+
+
+def test_nodes_in_threads_are_recorded_separately(phase_timer):
+    def run_node(node_name, calls):
+        with node_timing(node_name):
+            for _ in range(calls):
+                _decorated_phase()
+
+    threads = [
+        threading.Thread(target=run_node, args=(f"node_{calls}", calls))
+        for calls in [1, 2, 3]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for calls in [1, 2, 3]:
+        assert phase_timer.node_phases(f"node_{calls}")["decorated"].calls == calls
+
+
+def test_timing_is_saved_to_the_node_data_path(tmp_path):
+    phase_timer = PhaseTimer()
+    phase_timer.set_data_path("T1", tmp_path)
+    phase_timer.record("T1", "precompile", wall_time=2.0, cpu_time=1.5)
+    phase_timer.record("T1", "precompile", wall_time=1.0, cpu_time=0.5)
+
+    phase_timer.save()
+
+    with open(tmp_path / "T1_timing.json") as f:
+        timing = json.load(f)
+    assert timing == {
+        "node": "T1",
+        "phases": {"precompile": {"calls": 2, "wall_time": 3.0, "cpu_time": 2.0}},
+    }
+    assert "precompile 3.00 / 2.00" in phase_timer.summary()
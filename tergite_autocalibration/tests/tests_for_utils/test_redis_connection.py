@@ -0,0 +1,59 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import asyncio
+
+import redis
+
+from tergite_autocalibration.config.globals import ENV, REDIS_CONNECTION
+from tergite_autocalibration.utils.backend.redis_connection import (
+    RedisConnectionFactory,
+)
+
+
+def test_global_connection_uses_env():
+    pool = REDIS_CONNECTION.connection_pool
+
+    assert isinstance(pool, redis.BlockingConnectionPool)
+    assert pool.max_connections == ENV.redis_max_connections
+    assert pool.connection_kwargs["host"] == ENV.redis_host
+    assert pool.connection_kwargs["port"] == ENV.redis_port
+    assert pool.connection_kwargs["db"] == ENV.redis_db
+    assert pool.connection_kwargs["decode_responses"]
+
+
+def test_async_connection_per_event_loop():
+    factory = RedisConnectionFactory(port=6380, max_connections=4)
+
+    async def get_connections():
+        return factory.async_connection(), factory.async_connection()
+
+    first, same = asyncio.run(get_connections())
+    other, _ = asyncio.run(get_connections())
+
+    assert first is same
+    assert first is not other
+    assert first.connection_pool.max_connections == 4
+    assert first.connection_pool.connection_kwargs["port"] == 6380
+    assert factory.connection() is factory.connection()
+
+
+def test_select_db():
+    factory = RedisConnectionFactory(port=6380, db=0)
+
+    factory.select_db(3)
+
+    async def get_connection():
+        return factory.async_connection()
+
+    assert factory.connection().connection_pool.connection_kwargs["db"] == 3
+    assert asyncio.run(get_connection()).connection_pool.connection_kwargs["db"] == 3
@@ -0,0 +1,98 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import pytest
+
+from tergite_autocalibration.tests.utils.fake_redis import FakeRedis
+from tergite_autocalibration.tools.mss import storage
+from tergite_autocalibration.tools.mss.convert import structured_redis_storage
+from tergite_autocalibration.utils.backend.redis_utils import ParameterBatch
+
+# Redis key, field, value and index in the standard redis storage
+PARAMETERS = [
+    ("transmons:q06", "clock_freqs:f01", 4.5e9, "06"),
+    ("transmons:q06", "rxy:amp180", 0.1, "06"),
+    ("transmons:q07", "rxy:amp180", 0.2, "07"),
+    ("transmons:q06", "rxy:amp180", 0.3, "06"),
+    ("transmons:q06", "rxy:mw_pulse_type", "Gaussian", "06"),
+    ("transmons:q07", "lda_coef_0", "nan", "07"),
+    # Not in the parameter map of the standard redis storage
+    ("transmons:q06", "spec:spec_ampl_optimal", 0.01, "06"),
+    ("couplers:q06_q07", "parking_current", 1e-4, "q06_q07"),
+    ("cs:q06", "rabi_oscillations", "calibrated", None),
+]
+
+
+def test_parameter_batch_keeps_last_value():
+    batch = ParameterBatch()
+
+    batch.add("transmons:q06", "rxy:amp180", 0.1, "06")
+    batch.add("transmons:q07", "rxy:amp180", 0.2, "07")
+    batch.add("transmons:q06", "rxy:amp180", 0.3, "06")
+    batch.add("cs:q06", "rabi_oscillations", "calibrated")
+
+    assert batch.hash_fields == {
+        "transmons:q06": {"rxy:amp180": 0.3},
+        "transmons:q07": {"rxy:amp180": 0.2},
+        "cs:q06": {"rabi_oscillations": "calibrated"},
+    }
+    # The standard redis storage is written in order, the last value wins
+    assert batch.structured_entries == [
+        ("rxy:amp180", "06", 0.1),
+        ("rxy:amp180", "07", 0.2),
+        ("rxy:amp180", "06", 0.3),
+    ]
+
+
+def _write_per_parameter(redis_connection: FakeRedis, monkeypatch):
+    # Every parameter with its own hset and structured_redis_storage call
+    monkeypatch.setattr(storage, "red", redis_connection)
+    for redis_key, field, value, component_id in PARAMETERS:
+        redis_connection.hset(redis_key, field, value)
+        if component_id is not None:
+            structured_redis_storage(field, component_id, value)
+
+
+def _write_batch(redis_connection: FakeRedis, monkeypatch):
+    monkeypatch.setattr(storage, "red", redis_connection)
+    batch = ParameterBatch()
+    for parameters in PARAMETERS:
+        batch.add(*parameters)
+    batch.write(redis_connection)
+
+
+def _without_timestamps(data: dict) -> dict:
+    return {key: value for key, value in data.items() if not key.endswith(":timestamp")}
+
+
+@pytest.mark.parametrize("repeats", [1, 2])
+def test_parameter_batch_writes_the_same_keys(monkeypatch, repeats):
+    per_parameter_redis = FakeRedis()
+    batch_redis = FakeRedis()
+
+    for _ in range(repeats):
+        _write_per_parameter(per_parameter_redis, monkeypatch)
+        _write_batch(batch_redis, monkeypatch)
+
+    assert set(batch_redis.data) == set(per_parameter_redis.data)
+    assert _without_timestamps(batch_redis.data) == _without_timestamps(
+        per_parameter_redis.data
+    )
+    assert batch_redis.data["transmons:q06"]["rxy:amp180"] == "0.3"
+    assert batch_redis.data["device:qubit:06:pi_pulse_amplitude:value"] == "0.3"
+    # Both values of the parameter increase the counter
+    assert batch_redis.data["device:qubit:06:pi_pulse_amplitude:count"] == str(
+        2 * repeats
+    )
+    assert batch_redis.data["device:discriminator:07:coef_0:value"] == "nan"
+    # The hashes in one pipeline and the standard redis storage in one transaction
+    assert batch_redis.round_trips == 3 * repeats
@@ -0,0 +1,179 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from tergite_autocalibration.utils.hardware.simulated_cluster import (
+    SimulatedDevice,
+    SimulatedInstrumentCoordinator,
+    SimulatedQubit,
+)
+from tergite_autocalibration.utils.io.dataset_utils import configure_dataset
+
+QUBITS = ["q00", "q01"]
+
+DEVICE = {
+    "resonator": {
+        "q00": {"VNA_frequency": 6.5e9},
+        "q01": {"VNA_frequency": 6.3e9},
+    },
+    "qubit": {
+        "q00": {"VNA_f01_frequency": 3.8e9, "VNA_f12_frequency": 3.6e9},
+        "q01": {
+            "VNA_f01_frequency": 3.4e9,
+            "VNA_f12_frequency": 3.2e9,
+            "simulation": {"t1": 20e-6},
+        },
+    },
+}
+
+
+def _node(name, samplespace, qubit_state=0, loops=None):
+    dimensions = [np.size(settable[QUBITS[0]]) for settable in samplespace.values()]
+    if loops is not None:
+        dimensions.append(loops)
+    return SimpleNamespace(
+        name=name,
+        all_qubits=QUBITS,
+        couplers=None,
+        schedule_samplespace=samplespace,
+        schedule_keywords={},
+        dimensions=dimensions,
+        loops=loops,
+        qubit_state=qubit_state,
+    )
+
+
+def _measure(node):
+    lab_ic = SimulatedInstrumentCoordinator(
+        SimulatedDevice.from_device_config(DEVICE, seed=0)
+    )
+    lab_ic.bind(node)
+    lab_ic.prepare(SimpleNamespace(name=node.name))
+    lab_ic.start()
+    lab_ic.wait_done(timeout_sec=1)
+    raw_dataset = lab_ic.retrieve_acquisition()
+    lab_ic.stop()
+    return configure_dataset(raw_dataset, node)
+
+
+def test_qubit_parameters_from_device_config():
+    device = SimulatedDevice.from_device_config(DEVICE)
+
+    assert device.qubits["q00"].resonator_frequency == 6.5e9
+    assert device.qubits["q00"].f12 == 3.6e9
+    assert device.qubits["q01"].t1 == 20e-6
+    assert device.qubits["q00"].t1 == SimulatedQubit.t1
+
+    with pytest.raises(ValueError, match="t3"):
+        SimulatedQubit.from_device_config(
+            "q00",
+            {
+                **DEVICE,
+                "qubit": {"q00": {**DEVICE["qubit"]["q00"], "simulation": {"t3": 1}}},
+            },
+        )
+
+
+@pytest.mark.parametrize("qubit_state", [0, 1])
+def test_resonator_spectroscopy(qubit_state):
+    samplespace = {
+        "ro_frequencies": {
+            qubit: np.linspace(-2e6, 2e6, 101)
+            + DEVICE["resonator"][qubit]["VNA_frequency"]
+            for qubit in QUBITS
+        }
+    }
+    dataset = _measure(_node("resonator_spectroscopy", samplespace, qubit_state))
+
+    for qubit in QUBITS:
+        magnitudes = np.abs(dataset[f"y{qubit}"].values)
+        frequencies = samplespace["ro_frequencies"][qubit]
+        expected = (
+            DEVICE["resonator"][qubit]["VNA_frequency"]
+            + qubit_state * SimulatedQubit.dispersive_shift
+        )
+        assert frequencies[np.argmin(magnitudes)] == pytest.approx(expected, abs=5e4)
+
+
+def test_rabi_oscillations():
+    samplespace = {
+        "mw_amplitudes": {qubit: np.linspace(0, 0.6, 61) for qubit in QUBITS}
+    }
+    dataset = _measure(_node("rabi_oscillations", samplespace))
+
+    values = dataset["yq00"].values
+    amplitudes = samplespace["mw_amplitudes"]["q00"]
+    # The response is furthest from the ground state after a pi pulse
+    distance = np.abs(values - values[0])
+    assert amplitudes[np.argmax(distance)] == pytest.approx(
+        SimulatedQubit.pi_amplitude, abs=0.02
+    )
+
+
+def test_t1_decay():
+    delays = np.linspace(0, 100e-6, 21)
+    samplespace = {"delays": {qubit: delays for qubit in QUBITS}}
+    dataset = _measure(_node("T1", samplespace))
+
+    for qubit, t1 in [("q00", SimulatedQubit.t1), ("q01", 20e-6)]:
+        values = dataset[f"y{qubit}"].values
+        decay = np.abs(values - values[-1]) / np.abs(values[0] - values[-1])
+        excitation = np.exp(-delays / t1)
+        expected = (excitation - excitation[-1]) / (1 - excitation[-1])
+        assert decay == pytest.approx(expected, abs=0.05)
+
+
+def test_single_shots():
+    samplespace = {
+        "qubit_states": {qubit: np.array([0, 1]) for qubit in QUBITS},
+        "ro_amplitudes": {qubit: np.array([0.03]) for qubit in QUBITS},
+    }
+    dataset = _measure(
+        _node("ro_amplitude_two_state_optimization", samplespace, loops=500)
+    )
+
+    shots = dataset["yq00"].values
+    assert shots.shape == (2, 1, 500)
+    centroids = shots.mean(axis=-1)[:, 0]
+    # The blobs of the two states are separated by more than their width
+    assert np.abs(centroids[1] - centroids[0]) > 3 * shots[0].real.std()
+    assert shots[0].real.std() == pytest.approx(SimulatedQubit.readout_noise, rel=0.2)
+
+
+def test_ssro_shots_are_the_slowest_axis():
+    samplespace = {
+        "number_of_cliffords": {
+            qubit: np.array([0, 16, 256, 1024, 0, 1, 2]) for qubit in QUBITS
+        },
+        "seeds": {qubit: 3 for qubit in QUBITS},
+    }
+    node = _node("randomized_benchmarking_ssro", samplespace, qubit_state=2)
+    node.dimensions = [7, 1]
+    dataset = _measure(node)
+
+    shots = dataset["yq00"].values
+    assert shots.shape == (1024, 7, 1)
+    # The calibration points of the states 0 and 1 are the extremes of the decay
+    means = shots.mean(axis=0)[:, 0]
+    assert np.abs(means[0] - means[4]) < np.abs(means[3] - means[4])
+    assert np.abs(means[5] - means[4]) > np.abs(means[3] - means[4])
+
+
+def test_prepare_requires_a_node():
+    lab_ic = SimulatedInstrumentCoordinator(SimulatedDevice.from_device_config(DEVICE))
+
+    with pytest.raises(RuntimeError):
+        lab_ic.prepare(SimpleNamespace(name="schedule"))
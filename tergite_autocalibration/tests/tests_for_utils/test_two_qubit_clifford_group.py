@@ -0,0 +1,104 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import numpy as np
+import pytest
+
+from tergite_autocalibration.utils.clifford_elements_decomposition import RXY
+from tergite_autocalibration.utils.two_qubit_clifford_group import (
+    CZ_CLIFFORD_INDEX,
+    IDENTITY,
+    NUMBER_OF_CLIFFORDS,
+    PADDING,
+    TwoQubitCliffordGroup,
+    native_gates,
+)
+
+_CZ = np.diag([1, 1, 1, -1])
+
+
+@pytest.fixture(scope="module")
+def clifford_group(tmp_path_factory):
+    return TwoQubitCliffordGroup(tmp_path_factory.mktemp("clifford_tables"))
+
+
+def _unitary(cliffords) -> np.ndarray:
+    unitary = np.identity(4, dtype=complex)
+    for clifford in cliffords:
+        for layer in native_gates(clifford):
+            if layer == "CZ":
+                unitary = _CZ @ unitary
+                continue
+            q0, q1 = np.identity(2), np.identity(2)
+            for theta, phi in layer[0]:
+                q0 = RXY(theta, phi) @ q0
+            for theta, phi in layer[1]:
+                q1 = RXY(theta, phi) @ q1
+            unitary = np.kron(q1, q0) @ unitary
+    return unitary
+
+
+def _is_same_up_to_phase(first: np.ndarray, second: np.ndarray) -> bool:
+    return np.isclose(abs(np.trace(first.conj().T @ second)), 4)
+
+
+def test_cz_index():
+    assert _is_same_up_to_phase(_unitary([CZ_CLIFFORD_INDEX]), _CZ)
+    assert sum(layer == "CZ" for layer in native_gates(CZ_CLIFFORD_INDEX)) == 1
+
+
+def test_compose_and_inverse_match_the_unitaries(clifford_group):
+    rng = np.random.default_rng(0)
+    later = rng.integers(NUMBER_OF_CLIFFORDS, size=100)
+    earlier = rng.integers(NUMBER_OF_CLIFFORDS, size=100)
+
+    composed = clifford_group.compose(later, earlier)
+    inverse = clifford_group.inverse(later)
+    for index in range(100):
+        assert _is_same_up_to_phase(
+            _unitary([composed[index]]), _unitary([earlier[index], later[index]])
+        )
+        assert _is_same_up_to_phase(
+            _unitary([later[index], inverse[index]]), np.identity(4)
+        )
+
+    all_cliffords = np.arange(NUMBER_OF_CLIFFORDS)
+    assert np.all(
+        clifford_group.compose(clifford_group.inverse(all_cliffords), all_cliffords)
+        == IDENTITY
+    )
+
+
+def test_tables_are_memory_mapped_once_saved(tmp_path):
+    TwoQubitCliffordGroup(tmp_path)
+    clifford_group = TwoQubitCliffordGroup(tmp_path)
+
+    assert isinstance(clifford_group.images, np.memmap)
+    assert clifford_group.inverse(CZ_CLIFFORD_INDEX) == CZ_CLIFFORD_INDEX
+    assert not list(tmp_path.glob("**/*.tmp"))
+
+
+def test_interleaved_sequences_recover(clifford_group):
+    lengths = [0, 1, 3, 6]
+    sequences, recoveries = clifford_group.random_sequences(
+        [1, 2], lengths, interleaving_clifford=CZ_CLIFFORD_INDEX
+    )
+
+    assert sequences.shape == (2, len(lengths), 12)
+    for seed_sequences, seed_recoveries in zip(sequences, recoveries):
+        for sequence, recovery, length in zip(seed_sequences, seed_recoveries, lengths):
+            sequence = sequence[sequence != PADDING]
+            assert len(sequence) == 2 * length
+            assert np.all(sequence[1::2] == CZ_CLIFFORD_INDEX)
+            assert _is_same_up_to_phase(
+                _unitary(np.append(sequence, recovery)), np.identity(4)
+            )
@@ -0,0 +1,168 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+from collections import defaultdict
+from fnmatch import fnmatch
+from typing import Any, Dict, List, Optional, Union
+
+
+def _encode(value: Any) -> str:
+    # Like a client with decode_responses=True, all values are read back as strings
+    return value if isinstance(value, str) else str(value)
+
+
+class FakeRedis:
+    """
+    In-memory redis with the string and hash commands used by the package.
+
+    It counts the round trips to the server: every command sent directly is a
+    round trip, a pipeline is one round trip when it is executed and a WATCH is
+    one round trip on its own.
+
+    Like the RedisConnectionFactory, it can switch between the databases of the
+    server, the commands use the selected database.
+    """
+
+    def __init__(self):
+        self.databases: Dict[int, Dict[str, Union[str, Dict[str, str]]]] = defaultdict(
+            dict
+        )
+        self.db = 0
+        self.round_trips = 0
+
+    @property
+    def data(self) -> Dict[str, Union[str, Dict[str, str]]]:
+        return self.databases[self.db]
+
+    # Connection
+
+    def select_db(self, db: int):
+        self.db = db
+
+    def connection(self) -> "FakeRedis":
+        return self
+
+    # Strings
+
+    def get(self, key: str) -> Optional[str]:
+        self.round_trips += 1
+        return self._get(key)
+
+    def _get(self, key: str) -> Optional[str]:
+        return self.data.get(key)
+
+    def set(self, key: str, value: Any) -> bool:
+        self.round_trips += 1
+        return self._set(key, value)
+
+    def _set(self, key: str, value: Any) -> bool:
+        self.data[key] = _encode(value)
+        return True
+
+    def mget(self, keys: List[str]) -> List[Optional[str]]:
+        self.round_trips += 1
+        return [self._get(key) for key in keys]
+
+    def incrby(self, key: str, amount: int = 1) -> int:
+        self.round_trips += 1
+        return self._incrby(key, amount)
+
+    def _incrby(self, key: str, amount: int = 1) -> int:
+        value = int(self.data.get(key, 0)) + amount
+        self.data[key] = str(value)
+        return value
+
+    # Hashes
+
+    def hset(
+        self,
+        key: str,
+        field: Optional[str] = None,
+        value: Any = None,
+        mapping: Optional[dict] = None,
+    ) -> int:
+        self.round_trips += 1
+        return self._hset(key, field, value, mapping)
+
+    def _hset(self, key, field=None, value=None, mapping=None) -> int:
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        fields = self.data.setdefault(key, {})
+        added = len(set(items) - set(fields))
+        fields.update({name: _encode(value) for name, value in items.items()})
+        return added
+
+    def hget(self, key: str, field: str) -> Optional[str]:
+        self.round_trips += 1
+        return self.data.get(key, {}).get(field)
+
+    def hgetall(self, key: str) -> Dict[str, str]:
+        self.round_trips += 1
+        return dict(self.data.get(key, {}))
+
+    # Keys
+
+    def exists(self, *keys: str) -> int:
+        self.round_trips += 1
+        return sum(key in self.data for key in keys)
+
+    def delete(self, *keys: str) -> int:
+        self.round_trips += 1
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def scan_iter(self, match: str = "*"):
+        self.round_trips += 1
+        return iter([key for key in list(self.data) if fnmatch(key, match)])
+
+    def pipeline(self) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """
+    Pipeline of a FakeRedis, the commands are queued and run when the pipeline is executed.
+    Nothing changes the data between WATCH and EXEC, so a transaction always succeeds.
+    """
+
+    _COMMANDS = ("get", "set", "incrby", "hset")
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.reset()
+
+    def __getattr__(self, name: str):
+        if name not in self._COMMANDS:
+            raise AttributeError(name)
+        command = getattr(self.redis, f"_{name}")
+        return lambda *args, **kwargs: self.commands.append((command, args, kwargs))
+
+    def watch(self, *keys: str):
+        self.redis.round_trips += 1
+
+    def multi(self):
+        pass
+
+    def execute(self) -> list:
+        self.redis.round_trips += 1
+        results = [command(*args, **kwargs) for command, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+    def reset(self):
+        self.commands = []
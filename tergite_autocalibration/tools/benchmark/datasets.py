@@ -0,0 +1,263 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Reference datasets of the node tests as input for the benchmarks.
+
+The datasets are scaled to any number of qubits by copying the data of the
+measured qubits to new qubit names. A scaled dataset is turned back into the
+raw acquisitions of the instrument coordinator, so that the whole chain from
+`configure_dataset` to the analysis can be replayed.
+"""
+
+import collections
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import xarray as xr
+
+from tergite_autocalibration.lib.base.analysis import BaseAllQubitsAnalysis
+from tergite_autocalibration.lib.utils.node_factory import NodeFactory
+from tergite_autocalibration.utils.io.dataset_utils import to_complex_dataset
+from tergite_autocalibration.utils.logger.tac_logger import logger
+
+NODES_DIR = Path(__file__).parents[2] / "lib" / "nodes"
+
+# The benchmark qubits are numbered from here on, far from the qubits of a real chip
+BENCHMARK_QUBIT_OFFSET = 900
+
+_DATASET_FILE = re.compile(r"dataset_(?P<node>.+)_(?P<index>\d+)\.hdf5")
+
+# Dimensions that are not swept per qubit
+_SHARED_DIMS = ("shot", "loops")
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    """
+    Datasets of a node as they are saved by a single run of the node.
+    """
+
+    node_name: str
+    dataset_paths: Tuple[Path, ...]
+
+    @property
+    def data_dir(self) -> str:
+        """Directory of the datasets relative to the nodes"""
+        return str(self.dataset_paths[0].parent.relative_to(NODES_DIR))
+
+    def load(self) -> List[xr.Dataset]:
+        """
+        Load the datasets with complex data variables, in the order of their index.
+
+        Returns:
+            The datasets of the case
+        """
+        return [
+            to_complex_dataset(xr.load_dataset(path)) for path in self.dataset_paths
+        ]
+
+
+def benchmark_qubits(n_qubits: int) -> List[str]:
+    """
+    Names of the qubits of a benchmark.
+
+    Args:
+        n_qubits: Number of qubits
+
+    Returns:
+        Qubit names starting at q900
+    """
+    return [f"q{BENCHMARK_QUBIT_OFFSET + index}" for index in range(n_qubits)]
+
+
+def is_single_qubit_dataset(dataset: xr.Dataset) -> bool:
+    """
+    Check whether every data variable is a measurement of one qubit that is
+    only swept over the quantities of this qubit.
+
+    Args:
+        dataset: Dataset as saved by a node
+
+    Returns:
+        True if the dataset can be scaled with `replicate_dataset`
+    """
+    for name, data_array in dataset.data_vars.items():
+        qubit = data_array.attrs.get("qubit")
+        if qubit is None or name != f"y{qubit}":
+            return False
+        for dim in data_array.dims:
+            if dim not in _SHARED_DIMS + ("ReIm",) and not dim.endswith(qubit):
+                return False
+    return len(dataset.data_vars) > 0
+
+
+def discover_cases(
+    node_names: Optional[Iterable[str]] = None, nodes_dir: Path = NODES_DIR
+) -> List[BenchmarkCase]:
+    """
+    Find the datasets of the node tests that can be replayed.
+
+    Only nodes that are analysed qubit by qubit are included, the datasets of
+    nodes that calibrate couplers cannot be scaled to an arbitrary number of qubits.
+
+    Args:
+        node_names: Nodes to include, by default all nodes with test datasets
+        nodes_dir: Directory of the node implementations
+
+    Returns:
+        One case for each node and directory of test datasets
+    """
+    node_factory = NodeFactory()
+    known_nodes = set(node_factory.all_node_names())
+    selected_nodes = known_nodes if node_names is None else set(node_names)
+
+    datasets = collections.defaultdict(dict)
+    for path in sorted(nodes_dir.glob("**/tests/data*/dataset_*.hdf5")):
+        match = _DATASET_FILE.fullmatch(path.name)
+        if match is None or match["node"] not in known_nodes & selected_nodes:
+            continue
+        datasets[(match["node"], path.parent)][int(match["index"])] = path
+
+    cases = []
+    for (node_name, _), paths in sorted(datasets.items()):
+        # The node saves its datasets with consecutive indices
+        if sorted(paths) != list(range(len(paths))):
+            logger.warning(f"Skipping the datasets of {node_name}, indices are missing")
+            continue
+        node_class = node_factory.get_node_class(node_name)
+        if node_class.coupler_qois is not None or not issubclass(
+            node_class.analysis_obj, BaseAllQubitsAnalysis
+        ):
+            continue
+        with xr.open_dataset(paths[0]) as dataset:
+            if not is_single_qubit_dataset(dataset):
+                continue
+        cases.append(
+            BenchmarkCase(node_name, tuple(paths[index] for index in sorted(paths)))
+        )
+    return cases
+
+
+def _replace_qubit(name: str, source: str, target: str) -> str:
+    if name.endswith(source):
+        return name[: -len(source)] + target
+    return name
+
+
+def replicate_dataset(dataset: xr.Dataset, qubits: List[str]) -> xr.Dataset:
+    """
+    Scale a dataset to other qubits by copying the data of the measured qubits.
+
+    The measured qubits are repeated in their order until every target qubit
+    has data. Variables, coordinates and attributes are renamed to the target qubit.
+
+    Args:
+        dataset: Complex dataset in which every data variable belongs to one qubit
+        qubits: Names of the qubits of the scaled dataset
+
+    Returns:
+        Complex dataset with a data variable for each of the qubits
+    """
+    source_qubits = [
+        data_array.attrs["qubit"] for data_array in dataset.data_vars.values()
+    ]
+
+    replicas = []
+    for index, qubit in enumerate(qubits):
+        source = source_qubits[index % len(source_qubits)]
+        replica = xr.Dataset({f"y{qubit}": dataset[f"y{source}"]})
+        replica = replica.rename(
+            {
+                name: _replace_qubit(name, source, qubit)
+                for name in replica.variables
+                if name.endswith(source)
+            }
+        )
+        for variable in replica.variables.values():
+            variable.attrs = {
+                key: (
+                    _replace_qubit(value, source, qubit)
+                    if isinstance(value, str)
+                    else value
+                )
+                for key, value in variable.attrs.items()
+            }
+        replicas.append(replica)
+
+    return xr.merge(replicas, combine_attrs="drop_conflicts")
+
+
+def to_acquisition(
+    dataset: xr.Dataset, node_name: str
+) -> Tuple[xr.Dataset, SimpleNamespace]:
+    """
+    Turn a dataset back into the raw acquisitions of the instrument coordinator.
+
+    This is the inverse of `configure_dataset`, which can reconfigure the dataset
+    from the raw acquisitions and the returned node.
+
+    Args:
+        dataset: Complex dataset in which every data variable belongs to one qubit
+        node_name: Name of the node that measured the dataset
+
+    Returns:
+        The raw dataset with one acquisition channel per qubit and an object with
+        the attributes of the node that `configure_dataset` needs.
+    """
+    is_ssro = "ssro" in node_name
+    qubits = [data_array.attrs["qubit"] for data_array in dataset.data_vars.values()]
+
+    samplespace = {}
+    dimensions = []
+    loops = None
+    raw_data_vars = {}
+    for channel, qubit in enumerate(qubits):
+        data_array = dataset[f"y{qubit}"]
+        sweep_dims = [dim for dim in data_array.dims if dim not in _SHARED_DIMS]
+        for dim in sweep_dims:
+            quantity = dim[: -len(qubit)]
+            samplespace.setdefault(quantity, {})[qubit] = data_array[dim].values
+        if channel == 0:
+            dimensions = [data_array.sizes[dim] for dim in sweep_dims]
+            if "loops" in data_array.dims:
+                loops = data_array.sizes["loops"]
+                dimensions.append(loops)
+
+        order = (["shot"] if is_ssro else []) + sweep_dims
+        order += ["loops"] if "loops" in data_array.dims else []
+        values = data_array.transpose(*order).values
+        if is_ssro:
+            # The shots are the slowest axis of the single shot acquisitions
+            raw_data_vars[channel] = (
+                ("repetition", f"acq_index_{channel}"),
+                values.reshape(1, -1),
+            )
+        else:
+            raw_data_vars[channel] = (
+                f"acq_index_{channel}",
+                np.ravel(values, order="F"),
+            )
+
+    node = SimpleNamespace(
+        name=node_name,
+        all_qubits=qubits,
+        couplers=None,
+        schedule_samplespace=samplespace,
+        dimensions=dimensions,
+        loops=loops,
+    )
+    return xr.Dataset(raw_data_vars), node
@@ -0,0 +1,264 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Benchmark of the analysis chain of the nodes with the datasets of the node tests.
+
+Each stage that follows a measurement is timed separately:
+
+- configure_dataset: shape the raw acquisitions into the node dataset
+- save_dataset: write the dataset to disk
+- analyze_node: open the dataset, fit all qubits, update redis and plot
+- save_plots: wait until the plots are rendered in the background
+
+The analyses write their results to redis like in a calibration run, so a redis
+instance is required. The benchmark switches the redis connection to the database
+BENCHMARK_REDIS_DB, so the calibration parameters in REDIS_DB are not touched. The
+benchmark qubits are named from q900 on and are removed from redis afterwards.
+"""
+
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from tergite_autocalibration.config.globals import (
+    ENV,
+    REDIS_CONNECTION,
+    REDIS_CONNECTION_FACTORY,
+)
+from tergite_autocalibration.lib.utils.node_factory import NodeFactory
+from tergite_autocalibration.lib.utils.plot_rendering import wait_for_plots
+from tergite_autocalibration.tools.benchmark.datasets import (
+    BenchmarkCase,
+    benchmark_qubits,
+    discover_cases,
+    replicate_dataset,
+    to_acquisition,
+)
+from tergite_autocalibration.tools.mss.storage import PropertyType, create_redis_key
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
+from tergite_autocalibration.utils.backend.redis_utils import ParameterBatch
+from tergite_autocalibration.utils.io.dataset_utils import (
+    configure_dataset,
+    save_dataset,
+)
+from tergite_autocalibration.utils.logger.tac_logger import logger
+
+DEFAULT_QUBIT_COUNTS = (10, 50, 100)
+
+STAGES = ("configure_dataset", "save_dataset", "analyze_node", "save_plots")
+
+# Parameters some analyses read from redis, e.g. the amplitude to correct or the
+# previous readout frequency to plot
+_NOMINAL_PARAMETERS = {
+    "rxy:amp180": 0.1,
+    "r12:ef_amp180": 0.1,
+    "clock_freqs:f01": 4.0e9,
+    "clock_freqs:f12": 3.8e9,
+    "clock_freqs:readout": 6.5e9,
+    "extended_clock_freqs:readout_1": 6.4995e9,
+}
+
+
+class _StageRecorder:
+    def __init__(self, trace_memory: bool):
+        self.trace_memory = trace_memory
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.peak_memory: Dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def measure(self, stage: str):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start_time = time.perf_counter()
+        yield
+        # A stage that runs for several datasets adds up the time
+        self.seconds[stage] += time.perf_counter() - start_time
+        if self.trace_memory:
+            peak_memory = tracemalloc.get_traced_memory()[1] - start_memory
+            self.peak_memory[stage] = max(self.peak_memory[stage], peak_memory)
+
+
+def _run_chain(
+    case: BenchmarkCase, datasets: list, data_path: Path, recorder: _StageRecorder
+):
+    for dataset in datasets:
+        raw_dataset, node = to_acquisition(dataset, case.node_name)
+        with recorder.measure("configure_dataset"):
+            result_dataset = configure_dataset(raw_dataset, node)
+        with recorder.measure("save_dataset"):
+            save_dataset(result_dataset, case.node_name, data_path)
+        del raw_dataset, result_dataset
+
+    node_class = NodeFactory().get_node_class(case.node_name)
+    with recorder.measure("analyze_node"):
+        node_analysis = node_class.analysis_obj(case.node_name, node_class.qubit_qois)
+        node_analysis.analyze_node(data_path)
+    with recorder.measure("save_plots"):
+        wait_for_plots()
+
+
+def _benchmark_case(
+    case: BenchmarkCase, qubits: List[str], repeats: int, trace_memory: bool
+) -> dict:
+    datasets = [replicate_dataset(dataset, qubits) for dataset in case.load()]
+
+    samples = defaultdict(list)
+    for _ in range(repeats):
+        recorder = _StageRecorder(trace_memory=False)
+        with tempfile.TemporaryDirectory(prefix="tac_benchmark_") as data_dir:
+            _run_chain(case, datasets, Path(data_dir), recorder)
+        for stage, seconds in recorder.seconds.items():
+            samples[stage].append(seconds)
+
+    # Tracing the allocations slows everything down, the memory is measured in a separate run
+    peak_memory = {}
+    if trace_memory:
+        recorder = _StageRecorder(trace_memory=True)
+        tracemalloc.start()
+        try:
+            with tempfile.TemporaryDirectory(prefix="tac_benchmark_") as data_dir:
+                _run_chain(case, datasets, Path(data_dir), recorder)
+        finally:
+            tracemalloc.stop()
+        peak_memory = recorder.peak_memory
+
+    return {
+        stage: {
+            "median_seconds": statistics.median(samples[stage]),
+            "min_seconds": min(samples[stage]),
+            "samples_seconds": samples[stage],
+            "peak_memory_bytes": peak_memory.get(stage),
+        }
+        for stage in STAGES
+    }
+
+
+@contextmanager
+def _benchmark_database():
+    if ENV.benchmark_redis_db == ENV.redis_db:
+        raise RuntimeError(
+            f"BENCHMARK_REDIS_DB and REDIS_DB are both {ENV.redis_db}, "
+            f"the benchmark would write to the calibration parameters."
+        )
+    REDIS_CONNECTION_FACTORY.select_db(ENV.benchmark_redis_db)
+    # Hashes cached from the other database must not be served
+    get_parameter_cache().invalidate()
+    try:
+        yield
+    finally:
+        REDIS_CONNECTION_FACTORY.select_db(ENV.redis_db)
+        get_parameter_cache().invalidate()
+
+
+def _redis_keys(qubits: List[str]) -> List[str]:
+    keys = []
+    for qubit in qubits:
+        keys += [f"transmons:{qubit}", f"cs:{qubit}"]
+        # Keys of the standard redis storage e.g. device:qubit:900:frequency:value
+        pattern = create_redis_key(
+            PropertyType.DEVICE, "*", component="*", component_id=qubit.strip("q")
+        )
+        keys += list(REDIS_CONNECTION.scan_iter(match=f"{pattern}*"))
+    return keys
+
+
+def _populate_benchmark_qubits(qubits: List[str]):
+    if REDIS_CONNECTION.exists(*(f"transmons:{qubit}" for qubit in qubits)):
+        raise RuntimeError(
+            f"Qubits {qubits[0]} to {qubits[-1]} are in use, the benchmark would overwrite them."
+        )
+    batch = ParameterBatch()
+    for qubit in qubits:
+        for field, value in _NOMINAL_PARAMETERS.items():
+            batch.add(f"transmons:{qubit}", field, value)
+    batch.write(REDIS_CONNECTION)
+
+
+def _remove_benchmark_qubits(qubits: List[str]):
+    keys = _redis_keys(qubits)
+    if keys:
+        REDIS_CONNECTION.delete(*keys)
+    get_parameter_cache().invalidate(*(f"transmons:{qubit}" for qubit in qubits))
+
+
+def run_benchmark(
+    qubit_counts: Iterable[int] = DEFAULT_QUBIT_COUNTS,
+    node_names: Optional[Iterable[str]] = None,
+    repeats: int = 3,
+    trace_memory: bool = True,
+) -> dict:
+    """
+    Replay the datasets of the node tests through the analysis chain.
+
+    Args:
+        qubit_counts: Numbers of qubits to scale the datasets to
+        node_names: Nodes to benchmark, by default all nodes with test datasets
+        repeats: Number of timed runs of each case
+        trace_memory: Whether to measure the peak memory in an additional run
+
+    Returns:
+        Report with the timing and peak memory of each stage, for every node and number of qubits
+    """
+    if ENV.plotting:
+        logger.warning(
+            "PLOTTING is enabled, the analysis times include showing the plots"
+        )
+
+    cases = discover_cases(node_names)
+    results = []
+    with _benchmark_database():
+        for n_qubits in qubit_counts:
+            qubits = benchmark_qubits(n_qubits)
+            _populate_benchmark_qubits(qubits)
+            try:
+                for case in cases:
+                    logger.info(f"Benchmarking {case.node_name} on {n_qubits} qubits")
+                    result = {
+                        "node": case.node_name,
+                        "data_dir": case.data_dir,
+                        "datasets": len(case.dataset_paths),
+                        "qubits": n_qubits,
+                    }
+                    try:
+                        result["stages"] = _benchmark_case(
+                            case, qubits, repeats, trace_memory
+                        )
+                    except Exception as e:
+                        logger.error(f"Benchmark of {case.node_name} failed: {e!r}")
+                        result["error"] = repr(e)
+                    results.append(result)
+            finally:
+                _remove_benchmark_qubits(qubits)
+
+    return {
+        "metadata": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeats": repeats,
+            "redis_db": ENV.benchmark_redis_db,
+            "analysis_workers": ENV.analysis_workers,
+            "save_plots": ENV.save_plots,
+            # tracemalloc only sees the allocations of this process, not of the analysis workers
+            "memory": "tracemalloc" if trace_memory else None,
+        },
+        "results": results,
+    }
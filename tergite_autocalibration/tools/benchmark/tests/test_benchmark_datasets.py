@@ -0,0 +1,88 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from tergite_autocalibration.tools.benchmark.datasets import (
+    NODES_DIR,
+    benchmark_qubits,
+    discover_cases,
+    replicate_dataset,
+    to_acquisition,
+)
+from tergite_autocalibration.utils.io.dataset_utils import (
+    configure_dataset,
+    to_complex_dataset,
+)
+
+
+def _load(relative_path: str) -> xr.Dataset:
+    return to_complex_dataset(xr.load_dataset(NODES_DIR / relative_path))
+
+
+def test_discover_cases():
+    cases = discover_cases(["T1", "rabi_oscillations", "cz_calibration_ssro"])
+
+    assert [case.node_name for case in cases] == ["T1", "rabi_oscillations"]
+    assert [path.name for path in cases[0].dataset_paths] == [
+        f"dataset_T1_{index}.hdf5" for index in range(3)
+    ]
+
+
+def test_replicate_dataset():
+    dataset = _load(
+        "qubit_control/rabi_oscillations/tests/data_rabi_01/dataset_rabi_oscillations_0.hdf5"
+    )
+    source_qubits = [
+        data_array.attrs["qubit"] for data_array in dataset.data_vars.values()
+    ]
+    qubits = benchmark_qubits(len(source_qubits) + 2)
+
+    replicated = replicate_dataset(dataset, qubits)
+
+    assert list(replicated.data_vars) == [f"y{qubit}" for qubit in qubits]
+    # The measured qubits are repeated for the additional qubits
+    for index in [0, len(source_qubits)]:
+        source, qubit = source_qubits[index % len(source_qubits)], qubits[index]
+        data_array = replicated[f"y{qubit}"]
+        assert data_array.dims == (f"mw_amplitudes{qubit}",)
+        assert data_array.attrs["qubit"] == qubit
+        np.testing.assert_array_equal(data_array.values, dataset[f"y{source}"].values)
+        np.testing.assert_array_equal(
+            replicated[f"mw_amplitudes{qubit}"].values,
+            dataset[f"mw_amplitudes{source}"].values,
+        )
+
+
+@pytest.mark.parametrize(
+    "relative_path, node_name",
+    [
+        (
+            "qubit_control/spectroscopy/tests/data_01/dataset_qubit_01_spectroscopy_0.hdf5",
+            "qubit_01_spectroscopy",
+        ),
+        (
+            "characterization/process_tomography/tests/data/dataset_process_tomography_ssro_0.hdf5",
+            "process_tomography_ssro",
+        ),
+    ],
+)
+def test_acquisition_is_configured_to_the_dataset(relative_path, node_name):
+    dataset = replicate_dataset(_load(relative_path), benchmark_qubits(4))
+
+    raw_dataset, node = to_acquisition(dataset, node_name)
+    result = configure_dataset(raw_dataset, node)
+
+    assert list(raw_dataset.data_vars) == list(range(4))
+    xr.testing.assert_equal(result, dataset)
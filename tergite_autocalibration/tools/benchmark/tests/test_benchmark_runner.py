@@ -0,0 +1,84 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import pytest
+
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.tests.utils.fake_redis import FakeRedis
+from tergite_autocalibration.tools.benchmark import runner
+
+
+@pytest.fixture(name="redis_instance")
+def fixture_redis_instance(monkeypatch):
+    redis_instance = FakeRedis()
+    redis_instance.databases[0]["transmons:q900"] = {"rxy:amp180": "0.3"}
+    monkeypatch.setattr(runner, "REDIS_CONNECTION", redis_instance)
+    monkeypatch.setattr(runner, "REDIS_CONNECTION_FACTORY", redis_instance)
+    monkeypatch.setattr(ENV, "redis_db", 0)
+    monkeypatch.setattr(ENV, "benchmark_redis_db", 15)
+    return redis_instance
+
+
+def test_benchmark_runs_in_a_separate_database(monkeypatch, redis_instance):
+    benchmarked = []
+
+    def benchmark_case(case, qubits, repeats, trace_memory):
+        # An analysis writing its results, also to the standard redis storage
+        redis_instance.hset(f"transmons:{qubits[0]}", mapping={"clock_freqs:f01": 1})
+        redis_instance.set(f"device:qubit:{qubits[0].strip('q')}:frequency:value", 1)
+        benchmarked.append(
+            (case.node_name, redis_instance.db, dict(redis_instance.data))
+        )
+        return {}
+
+    monkeypatch.setattr(runner, "_benchmark_case", benchmark_case)
+
+    report = runner.run_benchmark(
+        qubit_counts=[2], node_names=["T1"], repeats=1, trace_memory=False
+    )
+
+    [(node_name, db, data)] = benchmarked
+    assert (node_name, db) == ("T1", 15)
+    assert set(data) == {
+        "transmons:q900",
+        "transmons:q901",
+        "device:qubit:900:frequency:value",
+    }
+    assert data["transmons:q901"] == {
+        field: str(value) for field, value in runner._NOMINAL_PARAMETERS.items()
+    }
+    assert report["metadata"]["redis_db"] == 15
+    assert report["results"][0]["stages"] == {}
+    # The benchmark qubits are removed and the calibration parameters are unchanged
+    assert redis_instance.db == 0
+    assert redis_instance.databases[15] == {}
+    assert redis_instance.databases[0] == {"transmons:q900": {"rxy:amp180": "0.3"}}
+
+
+def test_benchmark_does_not_overwrite_qubits(monkeypatch, redis_instance):
+    redis_instance.databases[15]["transmons:q901"] = {"rxy:amp180": "0.3"}
+    monkeypatch.setattr(runner, "_benchmark_case", pytest.fail)
+
+    with pytest.raises(RuntimeError, match="in use"):
+        runner.run_benchmark(qubit_counts=[2], node_names=["T1"], trace_memory=False)
+
+    assert redis_instance.db == 0
+    assert redis_instance.databases[15] == {"transmons:q901": {"rxy:amp180": "0.3"}}
+
+
+def test_benchmark_refuses_the_calibration_database(monkeypatch, redis_instance):
+    monkeypatch.setattr(ENV, "benchmark_redis_db", 0)
+
+    with pytest.raises(RuntimeError, match="BENCHMARK_REDIS_DB"):
+        runner.run_benchmark(qubit_counts=[2], node_names=["T1"], trace_memory=False)
+
+    assert redis_instance.databases[0] == {"transmons:q900": {"rxy:amp180": "0.3"}}
@@ -16,6 +16,7 @@ from typing import Annotated
 
 import typer
 
+from tergite_autocalibration.tools.cli.benchmark import benchmark_cli
 from tergite_autocalibration.tools.cli.calibration import calibration_cli
 from tergite_autocalibration.tools.cli.cluster import cluster_cli
 from tergite_autocalibration.tools.cli.config import config_cli
@@ -56,6 +57,12 @@ cli.add_typer(
     help="Functions related to the configuration.",
     no_args_is_help=True,
 )
+cli.add_typer(
+    benchmark_cli,
+    name="benchmark",
+    help="Measure the performance of the calibration.",
+    no_args_is_help=True,
+)
 
 
 @cli.command(help="Quickly runs to set reasonable defaults for the configuration.")
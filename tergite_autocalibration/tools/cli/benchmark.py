@@ -0,0 +1,101 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import json
+from pathlib import Path
+from typing import Annotated, List
+
+import typer
+
+from tergite_autocalibration.tools.cli.node import complete_node_name
+
+benchmark_cli = typer.Typer()
+
+
+@benchmark_cli.command(
+    help="Time the analysis chain with the datasets of the node tests."
+)
+def analysis(
+    qubits: Annotated[
+        List[int],
+        typer.Option(
+            "--qubits",
+            "-q",
+            help="Number of qubits to scale the datasets to, can be given several times.",
+        ),
+    ] = None,
+    name: Annotated[
+        List[str],
+        typer.Option(
+            "--name",
+            "-n",
+            help="Node to benchmark, can be given several times. By default all nodes with test datasets.",
+            autocompletion=complete_node_name,
+        ),
+    ] = None,
+    repeats: Annotated[
+        int,
+        typer.Option(
+            "--repeats",
+            "-r",
+            help="Number of timed runs of each node.",
+        ),
+    ] = 3,
+    no_memory: Annotated[
+        bool,
+        typer.Option(
+            "--no-memory",
+            is_flag=True,
+            help="Skip the additional run that measures the peak memory.",
+        ),
+    ] = False,
+    output: Annotated[
+        Path,
+        typer.Option(
+            "--output",
+            "-o",
+            help="File to write the JSON report to. If not set, the report is printed.",
+        ),
+    ] = None,
+):
+    """
+    Replay the datasets of the node tests through configure_dataset, save_dataset
+    and the node analysis. The analyses write to redis, so redis has to be running.
+    The benchmark writes to the redis database BENCHMARK_REDIS_DB, not to REDIS_DB.
+
+    Args:
+        qubits: Numbers of qubits to scale the datasets to, by default 10, 50 and 100.
+        name: Nodes to benchmark.
+        repeats: Number of timed runs of each node.
+        no_memory: Whether to skip measuring the peak memory.
+        output: File to write the JSON report to.
+
+    Returns:
+
+    """
+    from tergite_autocalibration.tools.benchmark import (
+        DEFAULT_QUBIT_COUNTS,
+        run_benchmark,
+    )
+
+    report = run_benchmark(
+        qubit_counts=qubits or DEFAULT_QUBIT_COUNTS,
+        node_names=name or None,
+        repeats=repeats,
+        trace_memory=not no_memory,
+    )
+    report_json = json.dumps(report, indent=2)
+    if output is None:
+        typer.echo(report_json)
+    else:
+        output.write_text(report_json)
+        typer.echo(f"Benchmark report written to {output}")
@@ -61,6 +61,16 @@ def start(
             help="Opens the quantifiles data browser in the background with live plotting enabled.",
         ),
     ] = False,
+    simulate: Annotated[
+        bool,
+        typer.Option(
+            "--simulate",
+            is_flag=True,
+            help="Run the calibration on the simulated cluster instead of the hardware. "
+            "The qubits are simulated with the frequencies from the device configuration. "
+            "Cannot be combined with -r.",
+        ),
+    ] = False,
 ):
     from ipaddress import ip_address, IPv4Address
     from tergite_autocalibration.tools.quantifiles import quantifiles
@@ -95,6 +105,13 @@ def start(
             )
             exit(1)  # Exit with an error exit
 
+        if simulate:
+            typer.echo(
+                "You are trying to re-run the analysis on a dataset and to run the calibration on the simulated cluster. "
+                "Please use either -r or --simulate."
+            )
+            exit(1)  # Exit with an error exit
+
         cluster_mode = MeasurementMode.re_analyse
         data_path = folder_path
         target_node_name = name
@@ -110,6 +127,9 @@ def start(
                 "Trying to start the calibration supervisor with default cluster configuration."
             )
 
+    if simulate:
+        cluster_mode = MeasurementMode.dummy
+
     # Start the quantifiles dataset browser in the background
     if browser:
         typer.echo("Starting dataset browser...")
@@ -0,0 +1,32 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+
+from typer.testing import CliRunner
+
+from tergite_autocalibration.scripts import calibration_supervisor
+from tergite_autocalibration.tools.cli.calibration import calibration_cli
+
+
+def test_start_refuses_to_simulate_a_reanalysis(monkeypatch, tmp_path):
+    def _supervisor(config):
+        raise AssertionError("The calibration should not start")
+
+    monkeypatch.setattr(calibration_supervisor, "CalibrationSupervisor", _supervisor)
+
+    result = CliRunner().invoke(
+        calibration_cli,
+        ["-r", str(tmp_path), "-n", "rabi_oscillations", "--simulate"],
+    )
+
+    assert result.exit_code == 1
+    assert "Please use either -r or --simulate." in result.output
@@ -20,7 +20,7 @@
 # this file can be discarded when no mapping would be
 # necessary.
 
-from typing import List, Any
+from typing import Any, List, Tuple
 
 import tergite_autocalibration.tools.mss.storage as store
 from tergite_autocalibration.config.globals import REDIS_CONNECTION
@@ -91,17 +91,23 @@ manual_param_map = {
 }
 
 
-def store_manual_parameters(qubit_id):
+def store_manual_parameters(*qubit_ids: str):
     """
     This function can be used to load static default values into redis
 
+    Args:
+        *qubit_ids: Qubits to store the values for, they are written in a single transaction
+
     Returns:
 
     """
-    for manual_parameter_key, manual_parameter_value in manual_param_map.items():
-        structured_redis_storage(
-            manual_parameter_key, qubit_id.strip("q"), manual_parameter_value
-        )
+    structured_redis_storage_many(
+        [
+            (manual_parameter_key, qubit_id.strip("q"), manual_parameter_value)
+            for qubit_id in qubit_ids
+            for manual_parameter_key, manual_parameter_value in manual_param_map.items()
+        ]
+    )
 
 
 def manual_checks(
@@ -145,6 +151,39 @@ def structured_redis_storage(field_key: str, comp_index: str, field_value, **kwa
         )
 
 
+def structured_redis_storage_many(entries: List[Tuple[str, str, Any]]):
+    """
+    Store several parameters in the standard redis storage in a single transaction.
+    The resulting keys are the same as calling structured_redis_storage for each entry.
+
+    Args:
+        entries: Parameter name, component index and value of each parameter
+
+    """
+    properties = []
+    for field_key, comp_index, field_value in entries:
+        if field_key in param_map:
+            component, name, unit, _ = param_map[field_key]
+            properties.append(
+                store.BackendProperty(
+                    store.PropertyType.DEVICE,
+                    name,
+                    value=manual_checks(
+                        field_key, field_value, overwrite_default=False
+                    ),
+                    unit=unit,
+                    component=component,
+                    component_id=comp_index,
+                )
+            )
+        else:
+            logger.debug(
+                f"'{field_key}' is not in mapped parameter list in utilities/standard_redis_storage.py. "
+                f"Please add appropriate parameter atributes in the map"
+            )
+    store.BackendProperty.write_many(properties)
+
+
 def convert_all_redis_values(component_ids: List[str] = None):
     """
     This function will go through all redis values in the param_map and store them again in the structured format
@@ -226,6 +226,38 @@ class BackendProperty:
         success = success and self.write_value()
         return success
 
+    @classmethod
+    def write_many(cls, properties: List[_BackendProperty]) -> bool:
+        """Write the whole records of several properties into Redis
+        in a single transaction. The resulting keys are the same as
+        calling write() for each property: the metadata and the value
+        are set, the timestamp is set and the counter is increased.
+        Properties are written in the given order, so a property that
+        appears twice ends up with the later value. Return True if
+        the write succeeded, and False otherwise.
+        """
+        if not properties:
+            return True
+
+        watch_keys = []
+        for p in properties:
+            watch_keys.extend(
+                p._create_redis_key(field) for field in ["value", "count", "timestamp"]
+            )
+
+        def set_fields(pipe):
+            timestamp = to_string(utc_now_iso())
+            for p in properties:
+                for field, value in p.__dict__.items():
+                    if field in _included_fields - set(["value"]) and value is not None:
+                        pipe.set(p._create_redis_key(field), to_string(value))
+                pipe.set(p._create_redis_key("value"), to_string(p.value))
+                pipe.set(p._create_redis_key("timestamp"), timestamp)
+                pipe.incrby(p._create_redis_key("count"), 1)
+
+        results = _transaction(list(dict.fromkeys(watch_keys)), set_fields)
+        return results is not None
+
     @classmethod
     def read(
         cls,
@@ -239,78 +271,94 @@ class BackendProperty:
         metadata fields, plus Counter and TimeStamp (that are not
         class members)
         """
+        return cls.read_many(property_type, [(name, component, component_id)])[0]
 
-        value_key = create_redis_key(
-            property_type,
-            name,
-            component=component,
-            component_id=component_id,
-            field="value",
-        )
-        count_key = create_redis_key(
-            property_type,
-            name,
-            component=component,
-            component_id=component_id,
-            field="count",
-        )
-        timestamp_key = create_redis_key(
-            property_type,
-            name,
-            component=component,
-            component_id=component_id,
-            field="timestamp",
-        )
-        watch_keys = [value_key, count_key, timestamp_key]
-        fields = list(_included_fields)
+    @classmethod
+    def read_many(
+        cls,
+        property_type: PropertyType,
+        properties: List[Tuple[str, Optional[str], Optional[str]]],
+    ) -> List[Optional[Tuple[_BackendProperty, TimeStamp, Counter]]]:
+        """Get several backend properties from Redis in a single
+        transaction. Each property is identified by a (name, component,
+        component_id) tuple. The result contains, for each property,
+        the same as read() would return, in the given order.
+        """
+        if not properties:
+            return []
 
-        def get_fields(pipe):
-            for field in fields:
-                field_key = create_redis_key(
+        fields = list(_included_fields)
+        # these two are not class members:
+        all_fields = fields + ["timestamp", "count"]
+        property_keys = [
+            [
+                create_redis_key(
                     property_type,
                     name,
                     component=component,
                     component_id=component_id,
                     field=field,
                 )
-                pipe.get(field_key)
-            # these two are not class members:
-            pipe.get(timestamp_key)
-            pipe.get(count_key)
+                for field in all_fields
+            ]
+            for name, component, component_id in properties
+        ]
+        watch_keys = [
+            create_redis_key(
+                property_type,
+                name,
+                component=component,
+                component_id=component_id,
+                field=field,
+            )
+            for name, component, component_id in properties
+            for field in ["value", "count", "timestamp"]
+        ]
 
-        results = _transaction(watch_keys, get_fields)
-        if results is None:
-            return
+        def get_fields(pipe):
+            for keys in property_keys:
+                for field_key in keys:
+                    pipe.get(field_key)
 
-        field_entries = dict(
-            {
+        results = _transaction(list(dict.fromkeys(watch_keys)), get_fields)
+        if results is None:
+            return [None] * len(properties)
+
+        records = []
+        for index, (name, component, component_id) in enumerate(properties):
+            property_results = results[
+                index * len(all_fields) : (index + 1) * len(all_fields)
+            ]
+            field_entries = {
                 # all values v were created with to_string(v), therefore
                 # ast.literal_eval is safe here, unless something else has
                 # gone seriously wrong
-                (field, ast.literal_eval(value))
-                for field, value in zip(fields + ["timestamp", "count"], results)
+                field: ast.literal_eval(value)
+                for field, value in zip(all_fields, property_results)
                 if value is not None  # don't include keys absent in Redis
             }
-        )
-        # as long as field_entries is non-empty, we can instantiate
-        if field_entries:
-            # isolate the non class member fields
-            timestamp = field_entries.pop("timestamp", None)
-            count = field_entries.pop("count", None)
-            return (
-                cls(
-                    property_type=property_type,
-                    name=name,
-                    component=component,
-                    component_id=component_id,
-                    **field_entries,
-                ),
-                timestamp,
-                count,
-            )
-        else:
-            # None of the fields had any Redis entry stored
-            return
+            # as long as field_entries is non-empty, we can instantiate
+            if field_entries:
+                # isolate the non class member fields
+                timestamp = field_entries.pop("timestamp", None)
+                count = field_entries.pop("count", None)
+                records.append(
+                    (
+                        cls(
+                            property_type=property_type,
+                            name=name,
+                            component=component,
+                            component_id=component_id,
+                            **field_entries,
+                        ),
+                        timestamp,
+                        count,
+                    )
+                )
+            else:
+                # None of the fields had any Redis entry stored
+                records.append(None)
+        return records
 
     @classmethod
     def read_value(
@@ -331,12 +379,31 @@ class BackendProperty:
             component_id=component_id,
             field="value",
         )
-        result = red.get(value_key)
-        return (
-            ast.literal_eval(result)
-            if result is not None and str(result).lower() != "nan"
-            else None
-        )
+        return _parse_value(red.get(value_key))
+
+    @classmethod
+    def read_many_values(
+        cls,
+        property_type: PropertyType,
+        properties: List[Tuple[str, Optional[str], Optional[str]]],
+    ) -> List[Optional[T]]:
+        """Return the values of several properties, each identified by
+        a (name, component, component_id) tuple, with a single MGET.
+        The result is in the given order, as read_value() would return.
+        """
+        value_keys = [
+            create_redis_key(
+                property_type,
+                name,
+                component=component,
+                component_id=component_id,
+                field="value",
+            )
+            for name, component, component_id in properties
+        ]
+        if not value_keys:
+            return []
+        return [_parse_value(result) for result in red.mget(value_keys)]
 
     def _create_redis_key(self, field: Optional[str] = None) -> str:
         return create_redis_key(
@@ -485,6 +552,15 @@ _included_fields = _all_fields - _excluded_fields
 # =============================================================================
 
 
+def _parse_value(result: Optional[str]) -> Optional[T]:
+    """Parse a value written with to_string, missing and nan values are None"""
+    return (
+        ast.literal_eval(result)
+        if result is not None and str(result).lower() != "nan"
+        else None
+    )
+
+
 def _transaction(watch_keys: List[str], command: callable) -> Optional[list]:
     """Perform 'command', watching 'watch_keys'. If any of the watch
     keys are modified in Redis during execution of 'command', the
@@ -587,6 +663,23 @@ def get_component_value(
     )
 
 
+def get_component_values(
+    component_properties: List[Tuple[str, str, str]],
+) -> List[Optional[T]]:
+    """Get the values of several component device properties, each
+    identified by a (component, name, component_id) tuple, in a single
+    round trip.
+    """
+    property_type = PropertyType.DEVICE
+    return BackendProperty.read_many_values(
+        property_type,
+        [
+            (name, component, component_id)
+            for component, name, component_id in component_properties
+        ],
+    )
+
+
 """Resonator helpers"""
 
 
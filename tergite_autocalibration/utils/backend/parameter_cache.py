@@ -0,0 +1,240 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import redis
+
+from tergite_autocalibration.config.globals import ENV, REDIS_CONNECTION
+from tergite_autocalibration.utils.logger.tac_logger import logger
+
+# Keyspace events: K for the keyspace channel, g for generic commands such as
+# del and rename, h for hash commands and x for expired keys
+_REQUIRED_EVENTS = "Kghx"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        reads = self.hits + self.misses
+        return self.hits / reads if reads else 0.0
+
+
+class ParameterCache:
+    """
+    Process-local read-through cache of the redis hashes, e.g. transmons:q06.
+
+    A hash is read from redis once and served from memory until it changes.
+    The cache subscribes to the redis keyspace notifications, so writes from
+    any process invalidate the cached hash. Writes from this process through
+    ParameterBatch or update_redis_values invalidate the hash immediately,
+    other writes are invalidated as soon as the notification arrives.
+
+    The cache does not change the configuration of the redis server. If the
+    keyspace notifications are not enabled on the server (notify-keyspace-events
+    has to contain the classes Kghx, or KA), or the subscription is lost, all
+    reads go to redis directly.
+    """
+
+    def __init__(self, redis_connection: redis.Redis, enabled: bool = True):
+        self._redis = redis_connection
+        self._enabled = enabled
+        self._started = False
+        self._hashes: Dict[str, Dict[str, str]] = {}
+        # Incremented on every invalidation, a hash read while an invalidation
+        # arrives might be outdated and is not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = CacheStats()
+        self._pubsub = None
+        self._listener = None
+
+    @property
+    def active(self) -> bool:
+        """
+        Whether the reads are served from memory.
+        """
+        with self._lock:
+            if not self._started:
+                self._started = True
+                self._enabled = self._enabled and self._subscribe()
+            return self._enabled
+
+    def _missing_notifications(self) -> str:
+        events = self._redis.config_get("notify-keyspace-events").get(
+            "notify-keyspace-events", ""
+        )
+        # A stands for all event classes except the key miss events
+        return "".join(
+            event
+            for event in _REQUIRED_EVENTS
+            if event not in events and not (event != "K" and "A" in events)
+        )
+
+    def _subscribe(self) -> bool:
+        try:
+            missing = self._missing_notifications()
+            if missing:
+                logger.warning(
+                    f"The redis keyspace notifications {missing} are not enabled, "
+                    f"parameters are read from redis directly. Set "
+                    f"notify-keyspace-events to {_REQUIRED_EVENTS} in the redis "
+                    f"configuration to cache them."
+                )
+                return False
+            db = self._redis.connection_pool.connection_kwargs.get("db", 0)
+            self._pubsub = self._redis.pubsub()
+            self._pubsub.psubscribe(**{f"__keyspace@{db}__:*": self._on_notification})
+            # Only changes after the confirmation are notified
+            if self._pubsub.get_message(timeout=5.0) is None:
+                raise redis.TimeoutError("No subscription confirmation")
+            self._listener = self._pubsub.run_in_thread(
+                sleep_time=1.0,
+                daemon=True,
+                exception_handler=self._on_listener_error,
+            )
+        except redis.RedisError as error:
+            logger.warning(
+                f"Cannot subscribe to redis keyspace notifications ({error!r}), "
+                f"parameters are read from redis directly"
+            )
+            if self._pubsub is not None:
+                self._pubsub.close()
+            return False
+        return True
+
+    def _on_notification(self, message: dict):
+        _, key = message["channel"].split(":", 1)
+        self.invalidate(key)
+
+    def _on_listener_error(self, error: Exception, pubsub, listener):
+        logger.warning(
+            f"Lost the redis keyspace notifications ({error!r}), "
+            f"parameters are read from redis directly"
+        )
+        listener.stop()
+        pubsub.close()
+        with self._lock:
+            self._enabled = False
+            self._generation += 1
+            self._hashes.clear()
+
+    def invalidate(self, *keys: str):
+        """
+        Remove hashes from the cache.
+
+        Args:
+            *keys: Keys of the hashes to remove, all hashes are removed if no key is given
+        """
+        with self._lock:
+            self._generation += 1
+            self._stats.invalidations += 1
+            if not keys:
+                self._hashes.clear()
+            for key in keys:
+                self._hashes.pop(key, None)
+
+    def hgetall(self, key: str) -> Dict[str, str]:
+        """
+        Get all fields of a hash, same as REDIS_CONNECTION.hgetall.
+
+        Args:
+            key: Key of the hash e.g. transmons:q06
+
+        Returns:
+            Copy of the fields of the hash, empty if the hash does not exist
+        """
+        if not self.active:
+            with self._lock:
+                self._stats.misses += 1
+            return self._redis.hgetall(key)
+
+        with self._lock:
+            if key in self._hashes:
+                self._stats.hits += 1
+                return dict(self._hashes[key])
+            self._stats.misses += 1
+            generation = self._generation
+
+        fields = self._redis.hgetall(key)
+        with self._lock:
+            if self._enabled and generation == self._generation:
+                self._hashes[key] = fields
+        return dict(fields)
+
+    def hget(self, key: str, field: str) -> Optional[str]:
+        """
+        Get a field of a hash, same as REDIS_CONNECTION.hget. The whole hash
+        is cached, so reading other fields of the same hash is free.
+
+        Args:
+            key: Key of the hash e.g. transmons:q06
+            field: Name of the field e.g. clock_freqs:f01
+
+        Returns:
+            Value of the field or None if it does not exist
+        """
+        return self.hgetall(key).get(field)
+
+    def stats(self) -> CacheStats:
+        """
+        Get the hit and miss statistics.
+
+        Returns:
+            Copy of the statistics since the cache was created
+        """
+        with self._lock:
+            return CacheStats(
+                self._stats.hits, self._stats.misses, self._stats.invalidations
+            )
+
+    def close(self):
+        """
+        Stop listening to the keyspace notifications and clear the cache.
+        """
+        with self._lock:
+            self._enabled = False
+            self._hashes.clear()
+            listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+            listener.join(timeout=2.0)
+        if self._pubsub is not None:
+            self._pubsub.close()
+
+
+_parameter_cache: Optional[ParameterCache] = None
+_parameter_cache_lock = threading.Lock()
+
+
+def get_parameter_cache() -> ParameterCache:
+    """
+    Get the parameter cache over REDIS_CONNECTION shared by the whole process.
+    It is enabled with PARAMETER_CACHE in the .env file.
+
+    Returns:
+        The shared parameter cache
+    """
+    global _parameter_cache
+    with _parameter_cache_lock:
+        if _parameter_cache is None:
+            _parameter_cache = ParameterCache(
+                REDIS_CONNECTION, enabled=ENV.parameter_cache
+            )
+        return _parameter_cache
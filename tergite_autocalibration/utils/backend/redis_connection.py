@@ -0,0 +1,141 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+import asyncio
+import threading
+import weakref
+from typing import TYPE_CHECKING, Optional
+
+import redis
+import redis.asyncio
+
+if TYPE_CHECKING:
+    from tergite_autocalibration.config.env import EnvironmentConfiguration
+
+
+class RedisConnectionFactory:
+    """
+    Creates the redis clients of the package on top of shared connection pools.
+
+    All synchronous clients share one blocking connection pool, so threads running
+    node measurements and analyses at the same time use separate sockets instead of
+    waiting for each other. If all connections are in use, a command waits for a
+    free connection instead of failing. The asyncio clients have a pool per event
+    loop, because asyncio connections cannot be shared between event loops.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        max_connections: int = 16,
+        pool_timeout: float = 20.0,
+    ):
+        self._connection_kwargs = {
+            "host": host,
+            "port": port,
+            "db": db,
+            "decode_responses": True,
+            "socket_keepalive": True,
+            "health_check_interval": 30,
+        }
+        self._max_connections = max_connections
+        self._pool_timeout = pool_timeout
+
+        self._pool = redis.BlockingConnectionPool(
+            max_connections=max_connections,
+            timeout=pool_timeout,
+            **self._connection_kwargs,
+        )
+        self._connection = redis.Redis(connection_pool=self._pool)
+
+        # Event loop -> asyncio client
+        self._async_connections = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, env: "EnvironmentConfiguration") -> "RedisConnectionFactory":
+        """
+        Create the factory with the redis settings from the .env file.
+
+        Args:
+            env: Environment configuration with the redis settings
+
+        Returns:
+            Factory connecting to the configured redis instance
+        """
+        return cls(
+            host=env.redis_host,
+            port=env.redis_port,
+            db=env.redis_db,
+            max_connections=env.redis_max_connections,
+        )
+
+    def connection(self) -> redis.Redis:
+        """
+        Get the synchronous client. It is thread-safe, every command takes a
+        connection from the shared pool and returns it afterwards.
+
+        Returns:
+            The shared synchronous client
+        """
+        return self._connection
+
+    def async_connection(
+        self, loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> redis.asyncio.Redis:
+        """
+        Get the asyncio client for an event loop.
+
+        Args:
+            loop: Event loop the client is used in, by default the running loop
+
+        Returns:
+            The asyncio client shared by all coroutines of the event loop
+        """
+        if loop is None:
+            loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._async_connections:
+                pool = redis.asyncio.BlockingConnectionPool(
+                    max_connections=self._max_connections,
+                    timeout=self._pool_timeout,
+                    **self._connection_kwargs,
+                )
+                self._async_connections[loop] = redis.asyncio.Redis(
+                    connection_pool=pool
+                )
+            return self._async_connections[loop]
+
+    def select_db(self, db: int):
+        """
+        Switch all clients of the factory to another database of the redis instance.
+        The open connections are closed, the next commands connect to the new database.
+        Only to be used while no other thread is using the clients.
+
+        Args:
+            db: Index of the database
+        """
+        with self._lock:
+            self._connection_kwargs["db"] = db
+            self._pool.connection_kwargs["db"] = db
+            self._pool.disconnect()
+            self._pool.reset()
+            self._async_connections.clear()
+
+    def close(self):
+        """
+        Close all connections of the synchronous pool. The asyncio clients have to
+        be closed with `await client.close()` in their event loop.
+        """
+        self._pool.disconnect()
@@ -11,11 +11,92 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
 import toml
 
-from tergite_autocalibration.config.globals import REDIS_CONNECTION, CONFIG
+from tergite_autocalibration.config.globals import CONFIG
 from tergite_autocalibration.config.legacy import dh
-from tergite_autocalibration.tools.mss.convert import structured_redis_storage
+from tergite_autocalibration.utils.backend.parameter_cache import get_parameter_cache
+from tergite_autocalibration.tools.mss.convert import (
+    structured_redis_storage,
+    structured_redis_storage_many,
+)
+from tergite_autocalibration.utils.logger.phase_timing import timed_phase
+
+
+class ParameterBatch:
+    """
+    Collects parameters and writes them to redis at once.
+
+    Setting parameters one by one costs a round trip for every hset and a transaction
+    for every parameter in the standard redis storage. A batch writes all hashes in one
+    pipeline and all parameters of the standard redis storage in one transaction.
+    The resulting keys are the same as setting the parameters one after the other.
+    """
+
+    def __init__(self):
+        self.hash_fields: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        self.structured_entries: List[Tuple[str, str, Any]] = []
+
+    def add(
+        self,
+        redis_key: str,
+        field: str,
+        value: Any,
+        component_id: Optional[str] = None,
+    ):
+        """
+        Add a parameter to the batch, a later value for the same field replaces the earlier one.
+
+        Args:
+            redis_key: Key of the hash e.g. transmons:q06
+            field: Name of the parameter e.g. clock_freqs:f01
+            value: Value of the parameter
+            component_id: Component index in the standard redis storage e.g. 06 or q06_q07,
+                          if None, the parameter is not stored in the standard redis storage
+
+        """
+        self.hash_fields[redis_key][field] = value
+        if component_id is not None:
+            self.structured_entries.append((field, component_id, value))
+
+    @timed_phase("redis_update")
+    def write(self, redis_connection):
+        """
+        Write all parameters of the batch to redis.
+
+        Args:
+            redis_connection: Connection to write the hashes to
+
+        """
+        if self.hash_fields:
+            with redis_connection.pipeline() as pipe:
+                for redis_key, mapping in self.hash_fields.items():
+                    pipe.hset(redis_key, mapping=mapping)
+                pipe.execute()
+            get_parameter_cache().invalidate(*self.hash_fields)
+        if self.structured_entries:
+            structured_redis_storage_many(self.structured_entries)
+        self.hash_fields.clear()
+        self.structured_entries.clear()
+
+
+def _add_qubit_parameters(batch: ParameterBatch, qubit: str, parameters: dict):
+    # Nested tables in the toml file are stored as module:parameter e.g. rxy:amp180
+    for module_key, module_value in parameters.items():
+        if isinstance(module_value, dict):
+            for parameter_key, parameter_value in module_value.items():
+                sub_module_key = module_key + ":" + parameter_key
+                batch.add(
+                    f"transmons:{qubit}",
+                    sub_module_key,
+                    parameter_value,
+                    qubit.strip("q"),
+                )
+        else:
+            batch.add(f"transmons:{qubit}", module_key, module_value, qubit.strip("q"))
 
 
 def populate_parking_currents(
@@ -25,15 +106,16 @@ def populate_parking_currents(
 
     initial_coupler_parameters = initial_device_config["couplers"]
 
+    batch = ParameterBatch()
     for coupler in couplers:
         if coupler in initial_coupler_parameters:
             for parameter_key, parameter_value in initial_coupler_parameters[
                 coupler
             ].items():
-                redis_connection.hset(
-                    f"couplers:{coupler}", parameter_key, parameter_value
+                batch.add(
+                    f"couplers:{coupler}", parameter_key, parameter_value, coupler
                 )
-                structured_redis_storage(parameter_key, coupler, parameter_value)
+    batch.write(redis_connection)
 
 
 def populate_initial_parameters(qubits: list, couplers: list, redis_connection):
@@ -46,51 +128,26 @@ def populate_initial_parameters(qubits: list, couplers: list, redis_connection):
 
     # Populate the Redis database with the initial 'reasonable'
     # parameter values from the toml file
+    batch = ParameterBatch()
 
     for qubit in qubits:
         # parameter common to all qubits:
         if "all" in initial_qubit_parameters.keys():
-            for module_key, module_value in initial_qubit_parameters["all"].items():
-                if isinstance(module_value, dict):
-                    for parameter_key, parameter_value in module_value.items():
-                        sub_module_key = module_key + ":" + parameter_key
-                        redis_connection.hset(
-                            f"transmons:{qubit}", sub_module_key, parameter_value
-                        )
-                        structured_redis_storage(
-                            sub_module_key, qubit.strip("q"), parameter_value
-                        )
-                else:
-                    redis_connection.hset(
-                        f"transmons:{qubit}", module_key, module_value
-                    )
-                    structured_redis_storage(module_key, qubit.strip("q"), module_value)
+            _add_qubit_parameters(batch, qubit, initial_qubit_parameters["all"])
 
         # parameter specific to each qubit:
-        for module_key, module_value in initial_qubit_parameters[qubit].items():
-            if isinstance(module_value, dict):
-                for parameter_key, parameter_value in module_value.items():
-                    sub_module_key = module_key + ":" + parameter_key
-                    redis_connection.hset(
-                        f"transmons:{qubit}", sub_module_key, parameter_value
-                    )
-                    structured_redis_storage(
-                        sub_module_key, qubit.strip("q"), parameter_value
-                    )
-            else:
-                redis_connection.hset(f"transmons:{qubit}", module_key, module_value)
-                structured_redis_storage(module_key, qubit.strip("q"), module_value)
+        _add_qubit_parameters(batch, qubit, initial_qubit_parameters[qubit])
 
     for coupler in couplers:
         if "all" in initial_coupler_parameters.keys():
             for module_key, module_value in initial_coupler_parameters["all"].items():
-                redis_connection.hset(f"couplers:{coupler}", module_key, module_value)
-                structured_redis_storage(module_key, coupler, module_value)
+                batch.add(f"couplers:{coupler}", module_key, module_value, coupler)
 
         if coupler in initial_coupler_parameters:
             for module_key, module_value in initial_coupler_parameters[coupler].items():
-                redis_connection.hset(f"couplers:{coupler}", module_key, module_value)
-                structured_redis_storage(module_key, coupler, module_value)
+                batch.add(f"couplers:{coupler}", module_key, module_value, coupler)
+
+    batch.write(redis_connection)
 
 
 def populate_active_reset_parameters(
@@ -102,21 +159,11 @@ def populate_active_reset_parameters(
 
     # Populate the Redis database with the initial active reset
     # parameter values from the toml file
+    batch = ParameterBatch()
     for qubit in qubits:
         # parameter specific to each qubit:
-        for module_key, module_value in ar_qubit_parameters[qubit].items():
-            if isinstance(module_value, dict):
-                for parameter_key, parameter_value in module_value.items():
-                    sub_module_key = module_key + ":" + parameter_key
-                    redis_connection.hset(
-                        f"transmons:{qubit}", sub_module_key, parameter_value
-                    )
-                    structured_redis_storage(
-                        sub_module_key, qubit.strip("q"), parameter_value
-                    )
-            else:
-                redis_connection.hset(f"transmons:{qubit}", module_key, module_value)
-                structured_redis_storage(module_key, qubit.strip("q"), module_value)
+        _add_qubit_parameters(batch, qubit, ar_qubit_parameters[qubit])
+    batch.write(redis_connection)
 
 
 def populate_node_parameters(
@@ -130,31 +177,33 @@ def populate_node_parameters(
     transmon_configuration = toml.load(CONFIG.node)
     if node_name in transmon_configuration and not is_node_calibrated:
         node_specific_dict = transmon_configuration[node_name]["all"]
+        batch = ParameterBatch()
         for field_key, field_value in node_specific_dict.items():
             if isinstance(field_value, dict):
                 for sub_field_key, sub_field_value in field_value.items():
                     sub_field_key = field_key + ":" + sub_field_key
                     for qubit in qubits:
-                        redis_connection.hset(
-                            f"transmons:{qubit}", sub_field_key, sub_field_value
-                        )
-                        structured_redis_storage(
-                            sub_field_key, qubit.strip("q"), sub_field_value
+                        batch.add(
+                            f"transmons:{qubit}",
+                            sub_field_key,
+                            sub_field_value,
+                            qubit.strip("q"),
                         )
                     for coupler in couplers:
-                        redis_connection.hset(
-                            f"couplers:{coupler}", sub_field_key, sub_field_value
-                        )
-                        structured_redis_storage(
-                            sub_field_key, coupler, sub_field_value
+                        batch.add(
+                            f"couplers:{coupler}",
+                            sub_field_key,
+                            sub_field_value,
+                            coupler,
                         )
             else:
                 for qubit in qubits:
-                    redis_connection.hset(f"transmons:{qubit}", field_key, field_value)
-                    structured_redis_storage(field_key, qubit.strip("q"), field_value)
+                    batch.add(
+                        f"transmons:{qubit}", field_key, field_value, qubit.strip("q")
+                    )
                 for coupler in couplers:
-                    redis_connection.hset(f"couplers:{coupler}", field_key, field_value)
-                    structured_redis_storage(field_key, coupler, field_value)
+                    batch.add(f"couplers:{coupler}", field_key, field_value, coupler)
+        batch.write(redis_connection)
 
 
 def populate_quantities_of_interest(
@@ -200,6 +249,7 @@ def populate_quantities_of_interest(
                 # flag for the calibration supervisor
                 if not redis_connection.hexists(calibration_supervisor_key, node_name):
                     redis_connection.hset(f"cs:{coupler}", node_name, "not_calibrated")
+    get_parameter_cache().invalidate()
 
 
 def reset_all_nodes(nodes, qubits: list, couplers: list, redis_connection):
@@ -222,6 +272,7 @@ def reset_all_nodes(nodes, qubits: list, couplers: list, redis_connection):
             structured_redis_storage(key, coupler, None)
         for node in nodes:
             redis_connection.hset(cs_key, node, "not_calibrated")
+    get_parameter_cache().invalidate()
 
 
 def fetch_redis_params(param: str, this_element: str):
@@ -229,5 +280,5 @@ def fetch_redis_params(param: str, this_element: str):
         name = "couplers"
     else:
         name = "transmons"
-    redis_config = REDIS_CONNECTION.hgetall(f"{name}:{this_element}")
+    redis_config = get_parameter_cache().hgetall(f"{name}:{this_element}")
     return float(redis_config[param])
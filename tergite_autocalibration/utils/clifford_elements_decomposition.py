@@ -211,24 +211,10 @@ def is_sequence_identity(rng_sequence: np.ndarray) -> bool:
 
 
 def reversing_XY_matrix(rng_sequence):
-    product_matrix = np.identity(4, dtype=np.int64)
-    for rng in rng_sequence:
-        physical_decomp = XY_decompositions[rng]
-        ptm = from_physical_decomp_to_PTM(physical_decomp)
-        product_matrix = np.matmul(ptm, product_matrix, dtype=np.int64)
-
-    for decomp in XY_decompositions:
-        ptm = from_physical_decomp_to_PTM(decomp)
-        if np.array_equal(product_matrix, ptm):
-            equivalent_ptm = ptm
-            # print(f'{ equivalent_ptm = }')
-            reversing_matrix = np.linalg.inv(equivalent_ptm).astype(np.int64)
-
-    for i, decomp in enumerate(XY_decompositions):
-        ptm = from_physical_decomp_to_PTM(decomp)
-        if np.array_equal(reversing_matrix, ptm):
-            reversing_index = i
+    # The Clifford tables are built from this module, so they are imported here
+    from tergite_autocalibration.utils.clifford_group import recovery_cliffords
 
+    reversing_index = int(recovery_cliffords(np.asarray(rng_sequence, dtype=int)))
     reversing_decomposition = XY_decompositions[reversing_index]
     return reversing_index, reversing_decomposition
 
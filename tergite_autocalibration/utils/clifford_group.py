@@ -0,0 +1,129 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Lookup tables of the single qubit Clifford group.
+
+The 24 Cliffords are indexed like `XY_decompositions`. The tables are built once
+from the Pauli transfer matrices of the decompositions, afterwards composing and
+inverting Cliffords is an integer lookup that works on whole arrays of sequences.
+"""
+
+from typing import Iterable, Tuple
+
+import numpy as np
+
+from tergite_autocalibration.utils.clifford_elements_decomposition import (
+    XY_decompositions,
+    from_physical_decomp_to_PTM,
+)
+
+NUMBER_OF_CLIFFORDS = len(XY_decompositions)
+
+IDENTITY = 0
+
+# Index used to pad sequences that are shorter than the longest sequence
+PADDING = -1
+
+
+def _build_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ptms = np.array(
+        [from_physical_decomp_to_PTM(decomp) for decomp in XY_decompositions]
+    )
+    index_of = {ptm.tobytes(): index for index, ptm in enumerate(ptms)}
+    if len(index_of) != NUMBER_OF_CLIFFORDS:
+        raise ValueError("The Clifford decompositions are not unique")
+
+    multiplication = np.empty((NUMBER_OF_CLIFFORDS, NUMBER_OF_CLIFFORDS), dtype=int)
+    for later, later_ptm in enumerate(ptms):
+        for earlier, earlier_ptm in enumerate(ptms):
+            multiplication[later, earlier] = index_of[
+                (later_ptm @ earlier_ptm).tobytes()
+            ]
+    inverse = np.argmax(multiplication == IDENTITY, axis=1)
+    return ptms, multiplication, inverse
+
+
+# CLIFFORD_PTMS[i] is the Pauli transfer matrix of Clifford i
+# MULTIPLICATION_TABLE[a, b] is the Clifford of applying b and then a
+# INVERSE_TABLE[a] is the Clifford that undoes a
+CLIFFORD_PTMS, MULTIPLICATION_TABLE, INVERSE_TABLE = _build_tables()
+
+
+def compose_sequences(sequences: np.ndarray) -> np.ndarray:
+    """
+    Clifford that is equivalent to applying each sequence from the first to the last element.
+
+    Args:
+        sequences: Clifford indices, the last axis runs over the elements of a sequence.
+            Elements equal to PADDING are skipped.
+
+    Returns:
+        Index of the equivalent Clifford for each sequence, the shape of the input without the last axis
+    """
+    sequences = np.where(np.asarray(sequences) == PADDING, IDENTITY, sequences)
+    if sequences.shape[-1] == 0:
+        return np.full(sequences.shape[:-1], IDENTITY)
+    # Neighbouring elements are merged pairwise, so the sequences are reduced
+    # in a logarithmic number of lookups
+    while sequences.shape[-1] > 1:
+        if sequences.shape[-1] % 2:
+            identity = np.full(sequences.shape[:-1] + (1,), IDENTITY)
+            sequences = np.concatenate([sequences, identity], axis=-1)
+        sequences = MULTIPLICATION_TABLE[sequences[..., 1::2], sequences[..., 0::2]]
+    return sequences[..., 0]
+
+
+def recovery_cliffords(sequences: np.ndarray) -> np.ndarray:
+    """
+    Clifford that returns the qubit to its initial state after each sequence.
+
+    Args:
+        sequences: Clifford indices, the last axis runs over the elements of a sequence.
+            Elements equal to PADDING are skipped.
+
+    Returns:
+        Index of the recovery Clifford for each sequence
+    """
+    return INVERSE_TABLE[compose_sequences(sequences)]
+
+
+def random_clifford_sequences(
+    seeds: Iterable[int], lengths: Iterable[int]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Random Clifford sequences of randomized benchmarking and their recovery Cliffords.
+
+    For each seed a random generator draws the sequences in the order of the lengths,
+    the sequences are the same as drawing them one after the other with
+    `rng.integers(NUMBER_OF_CLIFFORDS, size=length)`.
+
+    Args:
+        seeds: Seed of the random generator of each set of sequences
+        lengths: Number of Cliffords of each sequence
+
+    Returns:
+        The sequences with the shape (seeds, lengths, longest length), padded at
+        the end with PADDING, and the recovery Cliffords with the shape (seeds, lengths)
+    """
+    seeds = list(seeds)
+    lengths = np.asarray(lengths, dtype=int)
+    max_length = int(lengths.max(initial=0))
+
+    in_sequence = np.arange(max_length) < lengths[:, np.newaxis]
+    sequences = np.full((len(seeds), len(lengths), max_length), PADDING)
+    for seed_index, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        sequences[seed_index][in_sequence] = rng.integers(
+            NUMBER_OF_CLIFFORDS, size=lengths.sum()
+        )
+    return sequences, recovery_cliffords(sequences)
@@ -31,3 +31,13 @@ class MeasurementMode(Enum):
     real = 0
     dummy = 1
     re_analyse = 2
+
+
+class SchedulerMode(Enum):
+    """
+    Used to set how the calibration supervisor walks through the calibration graph
+    e.g. one node after the other or several independent nodes at the same time
+    """
+
+    serial = "serial"
+    dag = "dag"
@@ -0,0 +1,487 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+A simulated cluster to run the calibration chain without hardware.
+
+The acquisitions are not computed from the pulses of the compiled schedule.
+Instead, every qubit is described by a small physical model and the response
+is evaluated on the samplespace of the node that is measured:
+
+- Readout: Lorentzian resonator dip, shifted dispersively by the qubit state
+- Qubit spectroscopy: power broadened Lorentzian line of the 01 or 12 transition
+- Rabi oscillations: excitation as a function of the drive amplitude
+- Amplitude and DRAG error amplification: excitation after trains of pulses
+- Ramsey fringes: damped oscillation with the detuning of the calibrated frequency
+- T1 and T2: exponential decays
+- Single shots: Gaussian blobs around the readout point of each state
+- Randomized benchmarking: exponential decay of the survival probability
+
+Quantities without a model, e.g. the two qubit gate parameters of the coupler
+nodes, leave the qubit in its prepared state.
+"""
+
+import math
+from dataclasses import dataclass, fields, replace
+from typing import Dict, Optional
+
+import numpy as np
+import xarray
+from quantify_scheduler.instrument_coordinator.instrument_coordinator import (
+    CompiledSchedule,
+)
+
+from tergite_autocalibration.utils.io.dataset_utils import _element_of_qubit
+from tergite_autocalibration.utils.logger.tac_logger import logger
+
+# Number of single shots if the node does not define the repetitions of its schedule
+SSRO_SHOTS = 1024
+# Number of averages of a binned acquisition, it scales the noise of averaged data
+AVERAGES = 1024
+# Number of levels of the transmon in the simulation
+LEVELS = 3
+
+
+@dataclass(frozen=True)
+class SimulatedQubit:
+    """
+    Physical parameters of a simulated qubit and its readout resonator.
+    Frequencies are in Hz, times in seconds and amplitudes in the units of the schedules.
+    """
+
+    resonator_frequency: float
+    f01: float
+    f12: float
+    # Shift of the resonator frequency per excitation of the qubit
+    dispersive_shift: float = -0.5e6
+    resonator_linewidth: float = 0.5e6
+    # Relative depth of the resonator dip
+    resonator_depth: float = 0.9
+    qubit_linewidth: float = 0.5e6
+    pi_amplitude: float = 0.3
+    pi_amplitude_12: float = 0.2
+    # Optimal DRAG parameters of the 01 and the 12 transition
+    motzoi: float = -0.1
+    motzoi_12: float = 0.05
+    # Amplitude of the spectroscopy pulse that saturates the transition
+    saturation_amplitude: float = 0.01
+    t1: float = 40e-6
+    t2: float = 25e-6
+    clifford_error: float = 2e-3
+    readout_amplitude: float = 0.03
+    # Standard deviation of a single shot in I and Q
+    readout_noise: float = 0.005
+
+    @classmethod
+    def from_device_config(cls, qubit: str, device: dict) -> "SimulatedQubit":
+        """
+        Create the qubit from the device configuration.
+
+        The frequencies are the VNA frequencies of the resonator and the qubit.
+        The other parameters can be overridden in a `simulation` table of the qubit,
+        e.g. `simulation.t1 = 60e-6` in `[device.qubit.all]` or `[device.qubit.q00]`.
+
+        Args:
+            qubit: Name of the qubit
+            device: Device section of the device configuration, see `dh.device`
+
+        Returns:
+            The simulated qubit
+        """
+        qubit_config = device["qubit"][qubit]
+        simulated_qubit = cls(
+            resonator_frequency=device["resonator"][qubit]["VNA_frequency"],
+            f01=qubit_config["VNA_f01_frequency"],
+            f12=qubit_config["VNA_f12_frequency"],
+        )
+        overrides = qubit_config.get("simulation", {})
+        unknown_parameters = set(overrides) - {field.name for field in fields(cls)}
+        if unknown_parameters:
+            raise ValueError(
+                f"Unknown simulation parameters for {qubit}: {sorted(unknown_parameters)}"
+            )
+        return replace(simulated_qubit, **overrides)
+
+    def resonator_response(
+        self, frequencies: np.ndarray, amplitudes: np.ndarray
+    ) -> np.ndarray:
+        """
+        Transmission of the readout resonator for each state of the qubit.
+
+        Args:
+            frequencies: Readout frequencies
+            amplitudes: Readout amplitudes, broadcastable to the frequencies
+
+        Returns:
+            Complex IQ values with an additional last axis for the qubit state
+        """
+        levels = np.arange(LEVELS)
+        resonances = self.resonator_frequency + levels * self.dispersive_shift
+        detunings = np.expand_dims(frequencies, -1) - resonances
+        transmission = 1 - self.resonator_depth / (
+            1 + 2j * detunings / self.resonator_linewidth
+        )
+        return np.expand_dims(amplitudes, -1) * transmission
+
+
+class SimulatedDevice:
+    """
+    The qubits of the simulated cluster. It simulates the raw acquisitions of a
+    node in the format returned by the instrument coordinator.
+    """
+
+    def __init__(self, qubits: Dict[str, SimulatedQubit], seed: Optional[int] = None):
+        self.qubits = qubits
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_device_config(
+        cls, device: dict, seed: Optional[int] = None
+    ) -> "SimulatedDevice":
+        """
+        Create the device with all qubits of the device configuration.
+
+        Args:
+            device: Device section of the device configuration, see `dh.device`
+            seed: Seed of the noise, by default the noise is not reproducible
+
+        Returns:
+            The simulated device
+        """
+        qubits = {
+            qubit: SimulatedQubit.from_device_config(qubit, device)
+            for qubit in device["qubit"]
+        }
+        return cls(qubits, seed)
+
+    def acquire(self, node) -> xarray.Dataset:
+        """
+        Simulate the acquisitions of a node for its current samplespace.
+
+        Args:
+            node: The node that is measured
+
+        Returns:
+            Raw dataset with one acquisition channel per qubit, as expected by `configure_dataset`
+        """
+        is_ssro = "ssro" in node.name
+        shots = (
+            node.schedule_keywords.get("repetitions", SSRO_SHOTS) if is_ssro else None
+        )
+
+        data_vars = {}
+        for channel, qubit in enumerate(node.all_qubits):
+            iq_values = self._simulate_qubit(node, qubit, shots)
+            if is_ssro:
+                # Shots are the slowest axis of the single shot acquisitions
+                data_vars[channel] = (
+                    ("repetition", f"acq_index_{channel}"),
+                    iq_values.reshape(1, -1),
+                )
+            else:
+                # The bins of the other dimensions are acquired in Fortran order
+                data_vars[channel] = (
+                    f"acq_index_{channel}",
+                    iq_values.ravel(order="F"),
+                )
+        return xarray.Dataset(data_vars)
+
+    def _simulate_qubit(self, node, qubit: str, shots: Optional[int]) -> np.ndarray:
+        simulated_qubit = self.qubits[qubit]
+        calibration = _calibrated_parameters(node, qubit)
+        sweeps = _sweeps(node, qubit)
+        shape = tuple(len(values) for values in sweeps.values())
+        grids = dict(zip(sweeps.keys(), np.meshgrid(*sweeps.values(), indexing="ij")))
+
+        populations = _populations(node, simulated_qubit, calibration, grids, shape)
+
+        frequencies = grids.get(
+            "ro_frequencies",
+            grids.get(
+                "ro_opt_frequencies",
+                np.full(
+                    shape,
+                    calibration.get(
+                        "readout",
+                        simulated_qubit.resonator_frequency
+                        + simulated_qubit.dispersive_shift / 2,
+                    ),
+                ),
+            ),
+        )
+        amplitudes = grids.get(
+            "ro_amplitudes",
+            np.full(
+                shape,
+                calibration.get("pulse_amp", simulated_qubit.readout_amplitude),
+            ),
+        )
+        level_iq = simulated_qubit.resonator_response(frequencies, amplitudes)
+
+        if shots is not None:
+            # Single shots of the ssro nodes
+            return self._single_shots(
+                populations, level_iq, simulated_qubit.readout_noise, axis=0, n=shots
+            )
+        if node.loops is not None:
+            # Every loop repetition is a single shot
+            return self._single_shots(
+                populations,
+                level_iq,
+                simulated_qubit.readout_noise,
+                axis=len(shape),
+                n=node.loops,
+            )
+
+        iq_values = np.sum(populations * level_iq, axis=-1)
+        return iq_values + self._noise(
+            shape, simulated_qubit.readout_noise / math.sqrt(AVERAGES)
+        )
+
+    def _single_shots(
+        self,
+        populations: np.ndarray,
+        level_iq: np.ndarray,
+        noise: float,
+        axis: int,
+        n: int,
+    ) -> np.ndarray:
+        populations = np.expand_dims(populations, axis)
+        level_iq = np.expand_dims(level_iq, axis)
+        shape = list(populations.shape[:-1])
+        shape[axis] = n
+
+        # Project every shot on a state of the qubit
+        thresholds = np.cumsum(populations, axis=-1)[..., :-1]
+        states = np.sum(
+            self._rng.random((*shape, 1)) >= thresholds, axis=-1, keepdims=True
+        )
+        level_iq = np.broadcast_to(level_iq, (*shape, LEVELS))
+        iq_values = np.take_along_axis(level_iq, states, axis=-1)[..., 0]
+        return iq_values + self._noise(tuple(shape), noise)
+
+    def _noise(self, shape: tuple, standard_deviation: float) -> np.ndarray:
+        return self._rng.normal(0, standard_deviation, shape) + 1j * self._rng.normal(
+            0, standard_deviation, shape
+        )
+
+
+def _sweeps(node, qubit: str) -> Dict[str, np.ndarray]:
+    """
+    Values of each settable quantity of the node for a qubit, in the order of the node dimensions.
+    """
+    sweeps = {}
+    for quantity, quantity_samplespace in node.schedule_samplespace.items():
+        element, _ = _element_of_qubit(quantity_samplespace.keys(), qubit)
+        values = quantity_samplespace[element]
+        sweeps[quantity] = np.atleast_1d(np.asarray(values))
+    return sweeps
+
+
+def _calibrated_parameters(node, qubit: str) -> Dict[str, float]:
+    """
+    Parameters of the device configuration the node is measured with.
+    Parameters that are not calibrated yet are missing.
+    """
+    device_snapshot = getattr(node, "device_snapshot", None)
+    if device_snapshot is None:
+        return {}
+    qubit_config = device_snapshot.serial_device.get(qubit, {}).get("data", {})
+    parameters = {
+        "f01": qubit_config.get("clock_freqs", {}).get("f01"),
+        "f12": qubit_config.get("clock_freqs", {}).get("f12"),
+        "readout": qubit_config.get("clock_freqs", {}).get("readout"),
+        "amp180": qubit_config.get("rxy", {}).get("amp180"),
+        "ef_amp180": qubit_config.get("r12", {}).get("ef_amp180"),
+        "pulse_amp": qubit_config.get("measure", {}).get("pulse_amp"),
+    }
+    return {
+        name: value
+        for name, value in parameters.items()
+        if isinstance(value, (int, float)) and math.isfinite(value)
+    }
+
+
+def _populations(
+    node,
+    simulated_qubit: SimulatedQubit,
+    calibration: Dict[str, float],
+    grids: Dict[str, np.ndarray],
+    shape: tuple,
+) -> np.ndarray:
+    """
+    Populations of the qubit states at readout, with the states on the last axis.
+
+    The qubit is prepared in the qubit state of the node. If the node drives the
+    qubit, the drive acts on the transition from the qubit state to the next state.
+    """
+    level = min(node.qubit_state, LEVELS - 1)
+    excitation = None
+    if level == 0:
+        transition_frequency = simulated_qubit.f01
+        pi_amplitude = simulated_qubit.pi_amplitude
+        calibrated_frequency = calibration.get("f01", transition_frequency)
+        calibrated_amplitude = calibration.get("amp180", pi_amplitude)
+    else:
+        transition_frequency = simulated_qubit.f12
+        pi_amplitude = simulated_qubit.pi_amplitude_12
+        calibrated_frequency = calibration.get("f12", transition_frequency)
+        calibrated_amplitude = calibration.get("ef_amp180", pi_amplitude)
+
+    if "spec_frequencies" in grids:
+        saturation = (
+            grids.get(
+                "spec_pulse_amplitudes",
+                np.full(shape, simulated_qubit.saturation_amplitude),
+            )
+            / simulated_qubit.saturation_amplitude
+        ) ** 2
+        detunings = grids["spec_frequencies"] - transition_frequency
+        excitation = (
+            0.5
+            * saturation
+            / (1 + saturation + (2 * detunings / simulated_qubit.qubit_linewidth) ** 2)
+        )
+    elif "mw_amplitudes" in grids:
+        excitation = np.sin(np.pi / 2 * grids["mw_amplitudes"] / pi_amplitude) ** 2
+    elif "mw_amplitudes_sweep" in grids:
+        # Pulse trains with the calibrated amplitude plus the sweep, see N_Rabi_Oscillations
+        rotations = (
+            np.pi * (calibrated_amplitude + grids["mw_amplitudes_sweep"]) / pi_amplitude
+        )
+        excitation = _pulse_train_excitation(
+            rotations,
+            grids.get("X_repetitions", np.ones(shape)).astype(int),
+            with_y_pulses=level == 0,
+        )
+    elif "mw_motzois" in grids:
+        # The error of the pulse pairs accumulates with the detuning from the optimal DRAG
+        motzoi = simulated_qubit.motzoi if level == 0 else simulated_qubit.motzoi_12
+        repetitions = grids.get("X_repetitions", np.ones(shape))
+        excitation = np.sin(repetitions * (grids["mw_motzois"] - motzoi)) ** 2
+    elif "ramsey_delays" in grids:
+        detunings = (
+            calibrated_frequency
+            - transition_frequency
+            + grids.get("artificial_detunings", np.zeros(shape))
+        )
+        delays = grids["ramsey_delays"]
+        excitation = 0.5 * (
+            1
+            - np.exp(-delays / simulated_qubit.t2)
+            * np.cos(2 * np.pi * detunings * delays)
+        )
+    elif "delays" in grids:
+        delays = grids["delays"]
+        if "t2" in node.name.lower():
+            excitation = 0.5 * (1 - np.exp(-delays / simulated_qubit.t2))
+        else:
+            excitation = np.exp(-delays / simulated_qubit.t1)
+
+    populations = np.zeros((*shape, LEVELS))
+    if excitation is not None:
+        populations[..., level] = 1 - excitation
+        populations[..., min(level + 1, LEVELS - 1)] += excitation
+    elif "qubit_states" in grids:
+        prepared_states = grids["qubit_states"].astype(int)
+        np.put_along_axis(populations, prepared_states[..., None], 1.0, axis=-1)
+    elif "number_of_cliffords" in grids:
+        populations[...] = _randomized_benchmarking_populations(
+            grids["number_of_cliffords"], simulated_qubit.clifford_error
+        )
+    elif "ssro" in node.name:
+        # The qubit state of the ssro nodes is the number of discriminated states
+        populations[..., 0] = 1.0
+    else:
+        populations[..., level] = 1.0
+    return populations
+
+
+def _pulse_train_excitation(
+    rotations: np.ndarray, repetitions: np.ndarray, with_y_pulses: bool
+) -> np.ndarray:
+    """
+    Excitation after the repetitions of two X pulses, followed by two Y pulses if
+    with_y_pulses is set. Each pulse rotates the qubit by the given angle.
+    """
+    cos, sin = np.cos(rotations), np.sin(rotations)
+    # Rotation by twice the angle around the x and the y axis
+    unitaries = np.stack(
+        [np.stack([cos, -1j * sin], -1), np.stack([-1j * sin, cos], -1)], -2
+    )
+    if with_y_pulses:
+        y_rotations = np.stack(
+            [np.stack([cos, -sin], -1), np.stack([sin, cos], -1)], -2
+        )
+        unitaries = y_rotations @ unitaries
+
+    excitation = np.zeros(rotations.shape)
+    for repetition in np.unique(repetitions):
+        selection = repetitions == repetition
+        repeated = np.linalg.matrix_power(unitaries[selection], int(repetition))
+        excitation[selection] = np.abs(repeated[:, 1, 0]) ** 2
+    return excitation
+
+
+def _randomized_benchmarking_populations(
+    number_of_cliffords: np.ndarray, clifford_error: float
+) -> np.ndarray:
+    """
+    The last three entries of the first axis are the calibration points of the states 0, 1 and 2.
+    """
+    survival = 0.5 + 0.5 * (1 - 2 * clifford_error) ** number_of_cliffords
+    populations = np.stack(
+        [survival, 1 - survival, np.zeros_like(survival)], axis=-1
+    ).astype(float)
+    populations[-LEVELS:] = 0
+    for state in range(LEVELS):
+        populations[-LEVELS + state, ..., state] = 1
+    return populations
+
+
+class SimulatedInstrumentCoordinator:
+    """
+    Replaces the instrument coordinator of the cluster in the dummy measurement mode.
+    The acquisitions are simulated for the node that has been bound to the coordinator,
+    see `BaseNode.measure_compiled_schedule`.
+    """
+
+    def __init__(self, device: SimulatedDevice):
+        self.device = device
+        self._node = None
+        self._compiled_schedule: Optional[CompiledSchedule] = None
+
+    def bind(self, node) -> None:
+        """
+        Set the node whose acquisitions are simulated.
+
+        Args:
+            node: The node that is measured next
+        """
+        self._node = node
+
+    def prepare(self, compiled_schedule: CompiledSchedule) -> None:
+        if self._node is None:
+            raise RuntimeError("No node is bound to the simulated cluster")
+        self._compiled_schedule = compiled_schedule
+
+    def start(self) -> None:
+        logger.info(f"Simulating {self._compiled_schedule.name}")
+
+    def wait_done(self, timeout_sec: int = 10) -> None:
+        pass
+
+    def retrieve_acquisition(self) -> xarray.Dataset:
+        return self.device.acquire(self._node)
+
+    def stop(self, allow_failure: bool = False) -> None:
+        self._compiled_schedule = None
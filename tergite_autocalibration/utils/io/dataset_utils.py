@@ -13,17 +13,48 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 
+import os
 import pathlib
+import re
+import shutil
+import tempfile
 from collections.abc import Iterable
 from datetime import datetime
+from typing import List, Optional
 from uuid import uuid4
 
 import numpy as np
 import xarray
 
 from tergite_autocalibration.config.globals import DATA_DIR
+from tergite_autocalibration.utils.logger.phase_timing import timed_phase
 
+# Chunks of about 1 MiB compressed with the fastest zlib level, the byte shuffle
+# groups the exponents of neighbouring floats and makes IQ data compressible.
+# Higher levels hardly reduce the size of IQ data but take longer to write.
+_CHUNK_BYTES = 2**20
+_COMPRESSION_LEVEL = 1
 
+
+def _element_of_qubit(settable_elements, measured_qubit: str) -> tuple[str, str]:
+    """
+    Find the settable element (qubit or coupler) a measured qubit belongs to.
+
+    Returns:
+        Tuple of the element and the element type, 'qubit' or 'coupler'.
+    """
+    # distinguish if the settable is on a qubit or a coupler:
+    if measured_qubit in settable_elements:
+        return measured_qubit, "qubit"
+    matching = [s for s in settable_elements if measured_qubit in s]
+    # TODO: len(matching) == 1 implies that we operate on only 1 coupler.
+    # To be changed in future
+    if len(matching) == 1 and "_" in matching[0]:
+        return matching[0], "coupler"
+    raise (ValueError)
+
+
+@timed_phase("configure_dataset")
 def configure_dataset(
     raw_ds: xarray.Dataset,
     node,
@@ -32,87 +63,95 @@ def configure_dataset(
     The dataset retrieved from the instrument coordinator is
     too bare-bones. Here the dims, coords and data_vars are configured
     """
-    dataset = xarray.Dataset(attrs={"elements": []})
-
-    raw_ds_keys = raw_ds.data_vars.keys()
+    raw_ds_keys = list(raw_ds.data_vars.keys())
     measurement_qubits = node.all_qubits
     samplespace = node.schedule_samplespace
-
-    sweep_quantities = samplespace.keys()
+    dimensions = list(node.dimensions)
+    is_ssro = "ssro" in node.name
 
     n_qubits = len(measurement_qubits)
-    if "ssro" in node.name:
+    if is_ssro:
         qubit_states = ["c0", "c1", "c2"]  # for calibration points
 
-    for key in raw_ds_keys:
-        key_indx = key % n_qubits  # this is to handle ro_opt_frequencies node where
-
-        coords_dict = {}
-        measured_qubit = measurement_qubits[key_indx]
-        dimensions = node.dimensions
-
-        if "ssro" in node.name:
+    # Reshape all acquisition channels at once if they have the same shape
+    raw_values = [raw_ds[key].values for key in raw_ds_keys]
+    if len({values.shape for values in raw_values}) == 1:
+        stacked_values = np.stack(raw_values)
+        n_channels = len(raw_values)
+        if is_ssro:
             # TODO: We are not sure about this one
             # dimensions[0] += len(qubit_states)  # for calibration points
-            shots = int(len(raw_ds[key].values[0]) / (np.product(dimensions)))
-            coords_dict["shot"] = (
-                "shot",
-                range(shots),
-                {"qubit": measured_qubit, "long_name": "shot", "units": "NA"},
-            )
-
-        for quantity in sweep_quantities:
-            # eg settable_elements -> ['q1','q2',...] or ['q1_q2','q3_q4',...] :
-            settable_elements = samplespace[quantity].keys()
-
-            # distinguish if the settable is on a qubit or a coupler:
-            if measured_qubit in settable_elements:
-                element = measured_qubit
-                element_type = "qubit"
+            shots = int(len(raw_values[0][0]) / (np.prod(dimensions)))
+            channel_values = stacked_values.reshape(n_channels, shots, *dimensions)
+        else:
+            # Fortran order reshaping of each channel
+            channel_values = stacked_values.reshape(
+                n_channels, *reversed(dimensions)
+            ).transpose(0, *range(len(dimensions), 0, -1))
+    else:
+        channel_values = []
+        for values in raw_values:
+            if is_ssro:
+                shots = int(len(values[0]) / (np.prod(dimensions)))
+                channel_values.append(values.reshape(shots, *dimensions))
             else:
-                matching = [s for s in settable_elements if measured_qubit in s]
-                # TODO: len(matching) == 1 implies that we operate on only 1 coupler.
-                # To be changed in future
-                if len(matching) == 1 and "_" in matching[0]:
-                    element = matching[0]
-                    element_type = "coupler"
-                else:
-                    raise (ValueError)
-
-            coord_key = quantity + element
-
-            settable_values = samplespace[quantity][element]
-            coord_attrs = {
-                "element_type": element_type,  # 'element_type' is ether 'qubit' or 'coupler'
-                element_type: element,
-                "measured_qubit": measured_qubit,
-                "long_name": f"{coord_key}",
-                "units": "NA",
-            }
-
-            if not isinstance(settable_values, Iterable):
-                settable_values = np.array([settable_values])
-
-            coords_dict[coord_key] = (coord_key, settable_values, coord_attrs)
-
-        if node.loops is not None:
-            coords_dict["loops"] = (
-                "loops",
-                np.arange(node.loops),
-                {"element_type": "NA"},
-            )
+                channel_values.append(values.reshape(*dimensions, order="F"))
 
-        partial_ds = xarray.Dataset(coords=coords_dict)
+    # The coordinates of a qubit are the same for all of its channels
+    qubit_coords = {}
+    # Coordinates and data variables in the order a merge of each channel would give
+    variables = {}
+    coord_names = set()
+    elements = []
 
-        data_values = raw_ds[key].values
+    for key, data_values in zip(raw_ds_keys, channel_values):
+        key_indx = key % n_qubits  # this is to handle ro_opt_frequencies node where
+        measured_qubit = measurement_qubits[key_indx]
 
-        reshaping = reversed(node.dimensions)
-        if "ssro" in node.name:
-            reshaping = np.array([shots])
-            reshaping = np.append(reshaping, dimensions)
-            data_values = data_values.reshape(*reshaping)
-        else:
-            data_values = data_values.reshape(*node.dimensions, order="F")
+        if measured_qubit not in qubit_coords:
+            coords_dict = {}
+            if is_ssro:
+                coords_dict["shot"] = (
+                    "shot",
+                    range(data_values.shape[0]),
+                    {"qubit": measured_qubit, "long_name": "shot", "units": "NA"},
+                )
+
+            for quantity, quantity_samplespace in samplespace.items():
+                # eg settable_elements -> ['q1','q2',...] or ['q1_q2','q3_q4',...] :
+                element, element_type = _element_of_qubit(
+                    quantity_samplespace.keys(), measured_qubit
+                )
+                coord_key = quantity + element
+
+                settable_values = quantity_samplespace[element]
+                coord_attrs = {
+                    "element_type": element_type,  # 'element_type' is ether 'qubit' or 'coupler'
+                    element_type: element,
+                    "measured_qubit": measured_qubit,
+                    "long_name": f"{coord_key}",
+                    "units": "NA",
+                }
+
+                if not isinstance(settable_values, Iterable):
+                    settable_values = np.array([settable_values])
+
+                coords_dict[coord_key] = (coord_key, settable_values, coord_attrs)
+
+            if node.loops is not None:
+                coords_dict["loops"] = (
+                    "loops",
+                    np.arange(node.loops),
+                    {"element_type": "NA"},
+                )
+            qubit_coords[measured_qubit] = coords_dict
+
+            # Like in a merge, coordinates shared between qubits keep the first definition
+            for coord_key, coord in coords_dict.items():
+                variables.setdefault(coord_key, coord)
+            coord_names.update(coords_dict)
+
+        coords_dict = qubit_coords[measured_qubit]
 
         # determine if this dataarray examines a qubit or a coupler:
         # TODO: this needs improvement
@@ -126,22 +165,132 @@ def configure_dataset(
             "long_name": f"y{measured_qubit}",
             "units": "NA",
         }
-        partial_ds[f"y{measured_qubit}"] = (
-            tuple(coords_dict.keys()),
-            data_values,
-            attributes,
-        )
+        data_var_name = f"y{measured_qubit}"
+        data_var = (tuple(coords_dict.keys()), data_values, attributes)
+        if data_var_name in variables and not np.array_equal(
+            variables[data_var_name][1], data_values
+        ):
+            raise xarray.MergeError(
+                f"conflicting values for variable {data_var_name!r} "
+                "on objects to be combined."
+            )
+        variables.setdefault(data_var_name, data_var)
+        elements.append(element)
 
-        dataset = xarray.merge([dataset, partial_ds])
-        dataset.attrs["elements"].append(element)
+    dataset = xarray.Dataset(variables, attrs={"elements": elements}).set_coords(
+        coord_names
+    )
 
     return dataset
 
 
 def to_real_dataset(iq_dataset: xarray.Dataset) -> xarray.Dataset:
-    ds = iq_dataset.expand_dims("ReIm", axis=-1)  # Add ReIm axis at the end
-    ds = xarray.concat([ds.real, ds.imag], dim="ReIm")
-    return ds
+    """
+    Convert complex data variables to real ones with a trailing ReIm dimension.
+
+    The real and imaginary parts of a complex128 array are already interleaved
+    in memory, so the result is a view of the complex data and no copy.
+
+    Args:
+        iq_dataset: Dataset with complex data variables.
+
+    Returns:
+        Dataset where every data variable has an additional last dimension
+        ReIm of size 2 with the real and the imaginary part.
+    """
+    data_vars = {}
+    for name, data_array in iq_dataset.data_vars.items():
+        values = np.asarray(data_array.values)
+        if np.iscomplexobj(values):
+            values = np.ascontiguousarray(values, dtype=np.complex128)
+            real_values = values.view(np.float64).reshape(*values.shape, 2)
+        else:
+            real_values = np.stack([values, np.zeros_like(values)], axis=-1)
+        data_vars[name] = (
+            (*data_array.dims, "ReIm"),
+            real_values,
+            data_array.attrs,
+        )
+    return xarray.Dataset(data_vars, coords=iq_dataset.coords, attrs=iq_dataset.attrs)
+
+
+def to_complex_dataset(real_dataset: xarray.Dataset) -> xarray.Dataset:
+    """
+    Convert data variables with a ReIm dimension back to complex ones.
+
+    This is the inverse of `to_real_dataset`. If ReIm is the last dimension of
+    a float64 variable, the complex data is a view of the loaded values.
+
+    Args:
+        real_dataset: Dataset as saved by `save_dataset`.
+
+    Returns:
+        Dataset with complex data variables and without the ReIm dimension.
+    """
+    data_vars = {}
+    for name, data_array in real_dataset.data_vars.items():
+        if "ReIm" not in data_array.dims:
+            data_vars[name] = data_array
+            continue
+
+        values = data_array.values
+        dims = tuple(dim for dim in data_array.dims if dim != "ReIm")
+        if (
+            data_array.dims[-1] == "ReIm"
+            and values.dtype == np.float64
+            and values.flags.c_contiguous
+        ):
+            complex_values = values.view(np.complex128)[..., 0]
+        else:
+            complex_values = (
+                data_array.isel(ReIm=0).values + 1j * data_array.isel(ReIm=1).values
+            )
+        data_vars[name] = (dims, complex_values, data_array.attrs)
+
+    return xarray.Dataset(
+        data_vars,
+        coords=real_dataset.drop_dims("ReIm", errors="ignore").coords,
+        attrs=real_dataset.attrs,
+    )
+
+
+def _chunk_sizes(dims: tuple, shape: tuple, itemsize: int) -> tuple:
+    """
+    Chunk shape for a variable, contiguous along the shot axis.
+
+    Single shots are read along the shot axis for every other coordinate, so
+    the shot axis (and ReIm) is kept whole as long as possible and the other
+    dimensions are split until a chunk is about 1 MiB.
+    """
+    chunks = [max(size, 1) for size in shape]
+    reduction_order = [
+        axis for axis, dim in enumerate(dims) if dim not in ("shot", "ReIm")
+    ] + [axis for axis, dim in enumerate(dims) if dim == "shot"]
+
+    for axis in reduction_order:
+        other_size = int(np.prod(chunks)) // chunks[axis]
+        chunks[axis] = max(
+            1, min(chunks[axis], _CHUNK_BYTES // (other_size * itemsize))
+        )
+        if int(np.prod(chunks)) * itemsize <= _CHUNK_BYTES:
+            break
+    return tuple(chunks)
+
+
+def _storage_encoding(real_dataset: xarray.Dataset) -> dict:
+    encoding = {}
+    for name, data_array in real_dataset.data_vars.items():
+        if data_array.ndim == 0:
+            continue
+        encoding[name] = {
+            "zlib": True,
+            "complevel": _COMPRESSION_LEVEL,
+            "shuffle": True,
+            "chunksizes": _chunk_sizes(
+                data_array.dims, data_array.shape, data_array.dtype.itemsize
+            ),
+        }
+    return encoding
 
 
 def create_node_data_path(node) -> pathlib.Path:
@@ -153,6 +302,7 @@ def create_node_data_path(node) -> pathlib.Path:
     return data_path
 
 
+@timed_phase("save_dataset")
 def save_dataset(
     result_dataset: xarray.Dataset, node_name: str, data_path: pathlib.Path
 ) -> None:
@@ -179,7 +329,117 @@ def save_dataset(
     while (data_path / dataset_name).is_file():
         count += 1
         dataset_name = f"dataset_{node_name}_{count}.hdf5"
-    result_dataset_real.to_netcdf(data_path / dataset_name)
+    result_dataset_real.to_netcdf(
+        data_path / dataset_name, encoding=_storage_encoding(result_dataset_real)
+    )
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists, but belongs to another user
+        return True
+    return True
+
+
+class StreamingDatasetWriter:
+    """
+    Accumulate the datasets of a sweep on disk instead of merging them in memory.
+
+    Every appended dataset is written to its own file in a temporary directory.
+    The result reads all files and concatenates them along the sweep dimension.
+    The writer owns the temporary directory, use it as a context manager or
+    call `close` to remove it:
+
+        with StreamingDatasetWriter("dc_currents") as writer:
+            for dataset in datasets:
+                writer.append(dataset)
+            result_dataset = writer.result()
+
+    Temporary directories left behind by a process that has crashed are
+    removed when the next writer is created in the same directory.
+    """
+
+    # e.g. .dc_currents_sweep_1234-k3j2_x9a, the suffix never contains a "-"
+    _DIRECTORY_PATTERN = re.compile(r"\..+_sweep_(\d+)-[^-]+")
+
+    def __init__(self, dim: str, directory: Optional[pathlib.Path] = None):
+        """
+        Args:
+            dim: Name of the sweep dimension, every appended dataset has to
+                contain it.
+            directory: Directory for the temporary files, defaults to DATA_DIR.
+        """
+        self.dim = dim
+        directory = pathlib.Path(directory or DATA_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        self._remove_stale_directories(directory)
+        self._directory = pathlib.Path(
+            tempfile.mkdtemp(prefix=f".{dim}_sweep_{os.getpid()}-", dir=directory)
+        )
+        self._parts: List[pathlib.Path] = []
+        self._attrs: dict = {}
+
+    def __enter__(self) -> "StreamingDatasetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def append(self, dataset: xarray.Dataset) -> None:
+        """
+        Write the dataset of one sweep iteration to disk.
+
+        Args:
+            dataset: Dataset with the sweep dimension.
+        """
+        if not self._parts:
+            self._attrs = dict(dataset.attrs)
+        part = self._directory / f"part_{len(self._parts):06d}.h5"
+        # invalid_netcdf allows complex values in the files
+        dataset.to_netcdf(part, engine="h5netcdf", invalid_netcdf=True)
+        self._parts.append(part)
+
+    def result(self) -> xarray.Dataset:
+        """
+        Concatenate all appended datasets along the sweep dimension.
+
+        Returns:
+            The dataset of the whole sweep in memory, sorted along the sweep
+            dimension as `xarray.merge` would do.
+        """
+        if not self._parts:
+            return xarray.Dataset()
+
+        datasets = []
+        try:
+            for part in self._parts:
+                datasets.append(xarray.open_dataset(part, engine="h5netcdf"))
+            result_dataset = xarray.concat(datasets, dim=self.dim).load()
+        finally:
+            for dataset in datasets:
+                dataset.close()
+
+        result_dataset = result_dataset.sortby(self.dim)
+        result_dataset.attrs = self._attrs
+        return result_dataset
+
+    def close(self) -> None:
+        """
+        Remove the temporary files, the result is loaded in memory and stays valid.
+        """
+        shutil.rmtree(self._directory, ignore_errors=True)
+        self._parts = []
+
+    @classmethod
+    def _remove_stale_directories(cls, directory: pathlib.Path) -> None:
+        for path in directory.glob(".*_sweep_*"):
+            match = cls._DIRECTORY_PATTERN.fullmatch(path.name)
+            if match is not None and not _is_running(int(match.group(1))):
+                shutil.rmtree(path, ignore_errors=True)
 
 
 # TODO: how does this function work?
@@ -0,0 +1,237 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Wall and CPU time of the phases of the nodes during a calibration run.
+
+A node marks the code that works on its behalf with `node_timing`, the phases
+inside, e.g. `precompile` or `save_dataset`, are timed with `timed_phase`.
+Phases can be nested, the time of a phase includes the phases it contains.
+Outside of a node, `timed_phase` does not record anything.
+
+The CPU time is the time of the thread that runs the phase. Fits in the
+analysis worker processes and the rendering of the plots in the background
+are not part of the CPU time of the phase that started them.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from tergite_autocalibration.utils.logger.tac_logger import logger
+
+_current_node: ContextVar[Optional[str]] = ContextVar("timed_node", default=None)
+
+
+@dataclass
+class PhaseStats:
+    calls: int = 0
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+
+
+class PhaseTimer:
+    """
+    Collects the time of the phases of every node of a calibration run.
+    Nodes run in several threads at the same time, so every access is locked.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases: Dict[str, Dict[str, PhaseStats]] = {}
+        self._data_paths: Dict[str, Path] = {}
+
+    def record(self, node_name: str, phase: str, wall_time: float, cpu_time: float):
+        """
+        Add the time of one call of a phase.
+
+        Args:
+            node_name: Name of the node the phase belongs to
+            phase: Name of the phase e.g. precompile
+            wall_time: Elapsed time in seconds
+            cpu_time: CPU time of the thread in seconds
+        """
+        with self._lock:
+            stats = self._phases.setdefault(node_name, {}).setdefault(
+                phase, PhaseStats()
+            )
+            stats.calls += 1
+            stats.wall_time += wall_time
+            stats.cpu_time += cpu_time
+
+    def set_data_path(self, node_name: str, data_path: Path):
+        """
+        Set the directory the timing of a node is saved to.
+
+        Args:
+            node_name: Name of the node
+            data_path: Directory of the node data
+        """
+        with self._lock:
+            self._data_paths[node_name] = Path(data_path)
+
+    def node_phases(self, node_name: str) -> Dict[str, PhaseStats]:
+        """
+        Time of the phases of a node recorded so far.
+
+        Args:
+            node_name: Name of the node
+
+        Returns:
+            Copy of the statistics of each phase in the order the phases were first entered
+        """
+        with self._lock:
+            return {
+                phase: PhaseStats(**asdict(stats))
+                for phase, stats in self._phases.get(node_name, {}).items()
+            }
+
+    def save(self):
+        """
+        Write the timing of each node as JSON to the data directory of the node.
+        """
+        with self._lock:
+            data_paths = dict(self._data_paths)
+        for node_name, data_path in data_paths.items():
+            timing = {
+                "node": node_name,
+                "phases": {
+                    phase: asdict(stats)
+                    for phase, stats in self.node_phases(node_name).items()
+                },
+            }
+            data_path.mkdir(parents=True, exist_ok=True)
+            with open(data_path / f"{node_name}_timing.json", "w") as f:
+                json.dump(timing, f, indent=4)
+
+    def summary(self) -> str:
+        """
+        Summary of the time of all nodes and phases.
+
+        Returns:
+            A line for each node with the wall and CPU time of its phases and
+            a line with the total time of each phase over all nodes
+        """
+        with self._lock:
+            node_names = list(self._phases)
+        totals: Dict[str, PhaseStats] = {}
+        lines = ["Phase timing (wall / CPU seconds):"]
+        for node_name in node_names:
+            phases = self.node_phases(node_name)
+            lines.append(
+                f"  {node_name}: "
+                + ", ".join(
+                    f"{phase} {stats.wall_time:.2f} / {stats.cpu_time:.2f}"
+                    for phase, stats in phases.items()
+                )
+            )
+            for phase, stats in phases.items():
+                total = totals.setdefault(phase, PhaseStats())
+                total.calls += stats.calls
+                total.wall_time += stats.wall_time
+                total.cpu_time += stats.cpu_time
+        lines.append(
+            "  total: "
+            + ", ".join(
+                f"{phase} {stats.wall_time:.2f} / {stats.cpu_time:.2f}"
+                for phase, stats in sorted(
+                    totals.items(), key=lambda item: item[1].wall_time, reverse=True
+                )
+            )
+        )
+        return "\n".join(lines)
+
+    def reset(self):
+        """
+        Remove all recorded times, e.g. before a new calibration run.
+        """
+        with self._lock:
+            self._phases.clear()
+            self._data_paths.clear()
+
+
+_phase_timer: Optional[PhaseTimer] = None
+_phase_timer_lock = threading.Lock()
+
+
+def get_phase_timer() -> PhaseTimer:
+    """
+    Get the phase timer shared by all nodes.
+
+    Returns:
+        The shared phase timer
+    """
+    global _phase_timer
+    with _phase_timer_lock:
+        if _phase_timer is None:
+            _phase_timer = PhaseTimer()
+        return _phase_timer
+
+
+def current_node() -> Optional[str]:
+    """
+    Name of the node the current phases belong to.
+
+    Returns:
+        The node name or None outside of a node
+    """
+    return _current_node.get()
+
+
+@contextmanager
+def node_timing(node_name: Optional[str], data_path: Optional[Path] = None):
+    """
+    Attribute the phases timed in this context to a node.
+
+    Args:
+        node_name: Name of the node, if None nothing is recorded
+        data_path: Directory to save the timing of the node to
+    """
+    if node_name is not None and data_path is not None:
+        get_phase_timer().set_data_path(node_name, data_path)
+    token = _current_node.set(node_name)
+    try:
+        yield
+    finally:
+        _current_node.reset(token)
+
+
+@contextmanager
+def timed_phase(phase: str):
+    """
+    Record the wall and CPU time of a phase of the current node.
+    It can be used as a context manager or as a decorator.
+
+    Args:
+        phase: Name of the phase
+    """
+    node_name = _current_node.get()
+    if node_name is None:
+        yield
+        return
+
+    start_wall_time = time.perf_counter()
+    start_cpu_time = time.thread_time()
+    try:
+        yield
+    finally:
+        get_phase_timer().record(
+            node_name,
+            phase,
+            time.perf_counter() - start_wall_time,
+            time.thread_time() - start_cpu_time,
+        )
@@ -0,0 +1,407 @@
+# This code is part of Tergite
+#
+# (C) Copyright Chalmers Next Labs 2024
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+The two qubit Clifford group for randomized benchmarking with CZ gates.
+
+The 11520 Cliffords are indexed in four classes by their number of CZ gates:
+
+- single qubit like (576): C1 on q0 and C1 on q1
+- CNOT like (5184): C1 on both qubits, CZ, S1 on q0 and S1 Y90 on q1
+- iSWAP like (5184): C1 on both qubits, CZ, Y90 on q0 and -X90 on q1, CZ, S1 Y90 on q0 and S1 X90 on q1
+- SWAP like (576): C1 on both qubits, CZ, -Y90 on q0 and Y90 on q1, CZ, Y90 on q0 and -Y90 on q1, CZ, Y90 on q1
+
+C1 are the single qubit Cliffords of `XY_decompositions` and S1 the subgroup of
+the first three of them, see Corcoles et al., Phys. Rev. A 87, 030301 (2013).
+The indices are the same as in PycQED, the CZ is the Clifford 4368.
+
+A Clifford is represented by how it maps the 16 two qubit Paulis onto each other,
+i.e. an image and a sign for each Pauli. The images of X and Z of both qubits are
+the tableau of the Clifford and determine it, they are packed into a key that
+points back to the index. Composing Cliffords is then a lookup in the tables,
+which works on whole arrays of sequences at once.
+"""
+
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+from tergite_autocalibration.config.globals import ENV
+from tergite_autocalibration.utils.clifford_elements_decomposition import (
+    RXY,
+    XY_decompositions,
+)
+from tergite_autocalibration.utils.clifford_group import (
+    MULTIPLICATION_TABLE as SINGLE_QUBIT_MULTIPLICATION_TABLE,
+)
+from tergite_autocalibration.utils.logger.tac_logger import logger
+
+NUMBER_OF_CLIFFORDS = 11520
+
+IDENTITY = 0
+
+CZ_CLIFFORD_INDEX = 4368
+
+# Index used to pad sequences that are shorter than the longest sequence
+PADDING = -1
+
+# Increase when the indexing or the layout of the tables changes
+_TABLES_VERSION = 1
+
+_TABLE_NAMES = ("images", "signs", "inverse", "index_of_key")
+
+# Indices of the single qubit Cliffords used in the decompositions
+_Y90, _X90, _MINUS_X90, _MINUS_Y90 = 21, 16, 13, 15
+_S1 = np.array([0, 1, 2])
+_S1_Y90 = SINGLE_QUBIT_MULTIPLICATION_TABLE[_S1, _Y90]
+_S1_X90 = SINGLE_QUBIT_MULTIPLICATION_TABLE[_S1, _X90]
+
+# The Paulis are indexed as 4 * P1 + P0 with I, X, Y, Z = 0, 1, 2, 3 on each qubit
+_PAULI_MATRICES = np.array(
+    [[[1, 0], [0, 1]], [[0, 1], [1, 0]], [[0, -1j], [1j, 0]], [[1, 0], [0, -1]]]
+)
+_PAULIS = np.array(
+    [np.kron(_PAULI_MATRICES[p // 4], _PAULI_MATRICES[p % 4]) for p in range(16)]
+)
+
+# X0, Z0, X1 and Z1, their images determine the Clifford
+_GENERATORS = np.array([1, 3, 4, 12])
+
+_CZ = np.diag([1, 1, 1, -1]).astype(complex)
+
+
+# Number of Cliffords in the single qubit like, CNOT like, iSWAP like and SWAP like classes
+_CLASS_SIZES = (576, 5184, 5184, 576)
+_CLASS_STARTS = np.cumsum((0,) + _CLASS_SIZES[:-1])
+
+
+def _class_layers(class_index: int, offset):
+    # Single qubit Cliffords on (q0, q1) and CZ gates, in the order they are applied.
+    # The offset within the class can also be an array of offsets.
+    c1 = (offset % 24, (offset // 24) % 24)
+    if class_index == 0:
+        return (c1,)
+    if class_index == 1:
+        s1 = (_S1[(offset // 576) % 3], _S1_Y90[offset // 1728])
+        return c1, "CZ", s1
+    if class_index == 2:
+        s1 = (_S1_Y90[(offset // 576) % 3], _S1_X90[offset // 1728])
+        return c1, "CZ", (_Y90, _MINUS_X90), "CZ", s1
+    return (
+        c1,
+        "CZ",
+        (_MINUS_Y90, _Y90),
+        "CZ",
+        (_Y90, _MINUS_Y90),
+        "CZ",
+        (IDENTITY, _Y90),
+    )
+
+
+def _decomposition_layers(index: int) -> Tuple[Union[Tuple[int, int], str], ...]:
+    if not 0 <= index < NUMBER_OF_CLIFFORDS:
+        raise ValueError(f"{index} is not a two qubit Clifford index")
+    class_index = int(np.searchsorted(_CLASS_STARTS, index, side="right")) - 1
+    return tuple(
+        layer if layer == "CZ" else (int(layer[0]), int(layer[1]))
+        for layer in _class_layers(class_index, index - _CLASS_STARTS[class_index])
+    )
+
+
+def _single_qubit_unitary(index: int) -> np.ndarray:
+    unitary = np.identity(2, dtype=complex)
+    for operation in XY_decompositions[index].values():
+        unitary = RXY(operation["theta"], operation["phi"]) @ unitary
+    return unitary
+
+
+def _build_tables() -> dict:
+    single_qubit_unitaries = np.array(
+        [_single_qubit_unitary(index) for index in range(24)]
+    )
+    # Unitaries of all pairs of single qubit Cliffords, indexed by (q0, q1)
+    layer_unitaries = np.einsum(
+        "bij,akl->abikjl", single_qubit_unitaries, single_qubit_unitaries
+    ).reshape(24, 24, 4, 4)
+
+    class_unitaries = []
+    for class_index, class_size in enumerate(_CLASS_SIZES):
+        unitaries = np.broadcast_to(np.identity(4, dtype=complex), (class_size, 4, 4))
+        for layer in _class_layers(class_index, np.arange(class_size)):
+            if layer == "CZ":
+                unitaries = _CZ @ unitaries
+            else:
+                unitaries = layer_unitaries[layer[0], layer[1]] @ unitaries
+        class_unitaries.append(np.broadcast_to(unitaries, (class_size, 4, 4)))
+    unitaries = np.concatenate(class_unitaries)
+
+    # transfer[c, a, b] = tr(P_a U_c P_b U_c^dagger) / 4 is +-1 for the image a of b
+    transfer = (
+        np.einsum(
+            "aij,cjk,bkl,cil->cab",
+            _PAULIS,
+            unitaries,
+            _PAULIS,
+            unitaries.conj(),
+            optimize=True,
+        ).real
+        / 4
+    )
+    images = np.abs(transfer).argmax(axis=1).astype(np.uint8)
+    signs = np.sign(
+        np.take_along_axis(transfer, images[:, np.newaxis, :], axis=1)[:, 0, :]
+    ).astype(np.int8)
+
+    index_of_key = np.full(2 ** (5 * len(_GENERATORS)), PADDING, dtype=np.int16)
+    keys = _tableau_keys(images[:, _GENERATORS], signs[:, _GENERATORS])
+    index_of_key[keys] = np.arange(NUMBER_OF_CLIFFORDS)
+    if len(np.unique(keys)) != NUMBER_OF_CLIFFORDS:
+        raise ValueError("The two qubit Clifford decompositions are not unique")
+
+    # The inverse maps the image of each Pauli back to the Pauli
+    inverse_images = np.empty_like(images)
+    inverse_signs = np.empty_like(signs)
+    rows = np.arange(NUMBER_OF_CLIFFORDS)[:, np.newaxis]
+    inverse_images[rows, images] = np.arange(16)
+    inverse_signs[rows, images] = signs
+    inverse = index_of_key[
+        _tableau_keys(inverse_images[:, _GENERATORS], inverse_signs[:, _GENERATORS])
+    ]
+
+    return {
+        "images": images,
+        "signs": signs,
+        "inverse": inverse,
+        "index_of_key": index_of_key,
+    }
+
+
+def _tableau_keys(images: np.ndarray, signs: np.ndarray) -> np.ndarray:
+    # Five bits per generator, four for the image and one for a negative sign
+    codes = images.astype(np.int64) | ((signs < 0).astype(np.int64) << 4)
+    shifts = 5 * np.arange(len(_GENERATORS))
+    return np.sum(codes << shifts, axis=-1)
+
+
+def _tables_dir() -> Path:
+    return Path(ENV.data_dir) / "clifford_tables" / f"v{_TABLES_VERSION}"
+
+
+def _load_tables(tables_dir: Path) -> Optional[dict]:
+    try:
+        return {
+            name: np.load(tables_dir / f"{name}.npy", mmap_mode="r")
+            for name in _TABLE_NAMES
+        }
+    except (OSError, ValueError):
+        return None
+
+
+def _save_tables(tables: dict, tables_dir: Path):
+    tables_dir.mkdir(parents=True, exist_ok=True)
+    for name, table in tables.items():
+        # Written under a unique temporary name, so that readers and other processes
+        # building the tables never see partial tables
+        with tempfile.NamedTemporaryFile(
+            dir=tables_dir, prefix=f"{name}.", suffix=".tmp", delete=False
+        ) as f:
+            np.save(f, table)
+        os.replace(f.name, tables_dir / f"{name}.npy")
+
+
+@lru_cache(maxsize=None)
+def native_gates(index: int) -> Tuple[Union[Tuple[tuple, tuple], str], ...]:
+    """
+    Decomposition of a Clifford into the gates the schedules apply.
+
+    Args:
+        index: Index of the Clifford
+
+    Returns:
+        The layers in the order they are applied. A layer is either "CZ" or the
+        rotations (theta, phi) in degrees on q0 and on q1, identities have no rotations.
+    """
+    layers = []
+    for layer in _decomposition_layers(int(index)):
+        if layer == "CZ":
+            layers.append(layer)
+            continue
+        layers.append(
+            tuple(
+                tuple(
+                    (operation["theta"], operation["phi"])
+                    for operation in XY_decompositions[qubit_clifford].values()
+                    if qubit_clifford != IDENTITY
+                )
+                for qubit_clifford in layer
+            )
+        )
+    return tuple(layers)
+
+
+class TwoQubitCliffordGroup:
+    """
+    Composition, inversion and native gates of the two qubit Cliffords.
+    """
+
+    def __init__(self, tables_dir: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            tables_dir: Directory the tables are memory mapped from. The tables are
+                built and saved there if they do not exist. If None, the tables are
+                only kept in memory.
+        """
+        tables = None
+        if tables_dir is not None:
+            tables_dir = Path(tables_dir)
+            tables = _load_tables(tables_dir)
+        if tables is None:
+            logger.info("Building the tables of the two qubit Clifford group")
+            tables = _build_tables()
+            if tables_dir is not None:
+                try:
+                    _save_tables(tables, tables_dir)
+                except OSError as e:
+                    logger.warning(f"Could not save the Clifford tables: {e}")
+
+        self.images = tables["images"]
+        self.signs = tables["signs"]
+        self.inverse_table = tables["inverse"]
+        self._index_of_key = tables["index_of_key"]
+
+    def compose(self, later: np.ndarray, earlier: np.ndarray) -> np.ndarray:
+        """
+        Clifford of applying `earlier` and then `later`, element-wise.
+
+        Args:
+            later: Indices of the Cliffords applied second
+            earlier: Indices of the Cliffords applied first
+
+        Returns:
+            Indices of the composed Cliffords
+        """
+        earlier = np.asarray(earlier)[..., np.newaxis]
+        later = np.asarray(later)[..., np.newaxis]
+        earlier_images = self.images[earlier, _GENERATORS]
+        earlier_signs = self.signs[earlier, _GENERATORS]
+        images = self.images[later, earlier_images]
+        signs = earlier_signs * self.signs[later, earlier_images]
+        return self._index_of_key[_tableau_keys(images, signs)].astype(int)
+
+    def inverse(self, cliffords: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            cliffords: Indices of Cliffords
+
+        Returns:
+            Indices of the Cliffords that undo them
+        """
+        return self.inverse_table[cliffords].astype(int)
+
+    def compose_sequences(self, sequences: np.ndarray) -> np.ndarray:
+        """
+        Clifford that is equivalent to applying each sequence from the first to the last element.
+
+        Args:
+            sequences: Clifford indices, the last axis runs over the elements of a sequence.
+                Elements equal to PADDING are skipped.
+
+        Returns:
+            Index of the equivalent Clifford for each sequence, the shape of the input without the last axis
+        """
+        sequences = np.where(np.asarray(sequences) == PADDING, IDENTITY, sequences)
+        if sequences.shape[-1] == 0:
+            return np.full(sequences.shape[:-1], IDENTITY)
+        # Neighbouring elements are merged pairwise, as for the single qubit Cliffords
+        while sequences.shape[-1] > 1:
+            if sequences.shape[-1] % 2:
+                identity = np.full(sequences.shape[:-1] + (1,), IDENTITY)
+                sequences = np.concatenate([sequences, identity], axis=-1)
+            sequences = self.compose(sequences[..., 1::2], sequences[..., 0::2])
+        return sequences[..., 0]
+
+    def recovery_cliffords(self, sequences: np.ndarray) -> np.ndarray:
+        """
+        Clifford that returns the qubits to their initial state after each sequence.
+
+        Args:
+            sequences: Clifford indices, the last axis runs over the elements of a sequence.
+                Elements equal to PADDING are skipped.
+
+        Returns:
+            Index of the recovery Clifford for each sequence
+        """
+        return self.inverse(self.compose_sequences(sequences))
+
+    def random_sequences(
+        self,
+        seeds: Iterable[int],
+        lengths: Iterable[int],
+        interleaving_clifford: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Random Clifford sequences of randomized benchmarking and their recovery Cliffords.
+
+        For each seed a random generator draws the sequences in the order of the lengths.
+
+        Args:
+            seeds: Seed of the random generator of each set of sequences
+            lengths: Number of random Cliffords of each sequence
+            interleaving_clifford: Clifford applied after each random Clifford
+                for interleaved randomized benchmarking
+
+        Returns:
+            The sequences with the shape (seeds, lengths, longest sequence), padded
+            at the end with PADDING, and the recovery Cliffords with the shape (seeds, lengths)
+        """
+        seeds = list(seeds)
+        lengths = np.asarray(lengths, dtype=int)
+        max_length = int(lengths.max(initial=0))
+
+        in_sequence = np.arange(max_length) < lengths[:, np.newaxis]
+        sequences = np.full((len(seeds), len(lengths), max_length), PADDING)
+        for seed_index, seed in enumerate(seeds):
+            rng = np.random.default_rng(seed)
+            sequences[seed_index][in_sequence] = rng.integers(
+                NUMBER_OF_CLIFFORDS, size=lengths.sum()
+            )
+
+        if interleaving_clifford is not None:
+            interleaved = np.where(sequences == PADDING, PADDING, interleaving_clifford)
+            sequences = np.stack([sequences, interleaved], axis=-1).reshape(
+                sequences.shape[:-1] + (2 * max_length,)
+            )
+        return sequences, self.recovery_cliffords(sequences)
+
+
+_two_qubit_clifford_group: Optional[TwoQubitCliffordGroup] = None
+_two_qubit_clifford_group_lock = threading.Lock()
+
+
+def get_two_qubit_clifford_group() -> TwoQubitCliffordGroup:
+    """
+    Get the two qubit Clifford group shared by all nodes. The tables are memory
+    mapped from the data directory and built on the first use.
+
+    Returns:
+        The shared two qubit Clifford group
+    """
+    global _two_qubit_clifford_group
+    with _two_qubit_clifford_group_lock:
+        if _two_qubit_clifford_group is None:
+            _two_qubit_clifford_group = TwoQubitCliffordGroup(_tables_dir())
+        return _two_qubit_clifford_group